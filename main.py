@@ -1,16 +1,17 @@
-from ncatbot.core import BotClient
-from ncatbot.core.message import GroupMessage, PrivateMessage
-
-from ncatbot.utils.config import config
-from utils.config_manager import load_config
-bot = BotClient()
-load_config()
-
-config.set_ws_uri("ws://localhost:3001") 
-
-
-
-if __name__ == "__main__":
-    bot.run(enable_webui_interaction=False)
-   
-   
\ No newline at end of file
+def main():
+    # 渲染进程池以 spawn 方式启动时，工作进程会把本模块作为 __mp_main__ 重新导入，
+    # 因此创建 BotClient、加载配置等副作用都放在这里，只在主进程执行
+    from ncatbot.core import BotClient
+
+    from ncatbot.utils.config import config
+    from utils.config_manager import load_config
+    bot = BotClient()
+    load_config()
+
+    config.set_ws_uri("ws://localhost:3001")
+
+    bot.run(enable_webui_interaction=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,3 @@
-import aiohttp
 import random
 import json
 import re
@@ -8,6 +7,7 @@ from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
 from ncatbot.core.element import MessageChain, Text, Image, Reply
 from PluginManager.plugin_manager import feature_required
+from utils.http_client import http_session
 
 bot = CompatibleEnrollment
 
@@ -74,7 +74,7 @@ class AIDrawing(BasePlugin):
             return text  # 如果不包含中文，直接返回原文
             
         try:
-            async with aiohttp.ClientSession() as session:
+            async with http_session() as session:
                 payload = {
                     "text": "把这句话翻译成英文:"+text,
                     "target": "en"  # 目标语言为英文
@@ -147,7 +147,7 @@ class AIDrawing(BasePlugin):
     async def get_random_tag(self) -> str:
         """从API获取随机标签"""
         try:
-            async with aiohttp.ClientSession() as session:
+            async with http_session() as session:
                 async with session.get(self.SD_RANDOM_TAG_URL, timeout=30) as response:
                     if response.status == 200:
                         result = await response.json()
@@ -187,7 +187,7 @@ class AIDrawing(BasePlugin):
                 "seed": seed
             }
             
-            async with aiohttp.ClientSession() as session:
+            async with http_session() as session:
                 async with session.post(
                     self.SD_API_URL,
                     headers={
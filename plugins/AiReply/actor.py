@@ -0,0 +1,130 @@
+"""
+AI 对话群队列 - 每个群一个串行处理的 actor，生成期间到达的消息合并成一次请求
+"""
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from ncatbot.utils.logger import get_log
+from utils.config_manager import get_config
+
+_log = get_log()
+
+# config.yaml 中未配置 ai_queue 段时使用的默认值
+DEFAULT_AI_QUEUE_CONFIG: Dict[str, Any] = {
+    "max_batch": 5,       # 一次最多合并的消息数
+    "idle_timeout": 300,  # 群队列空闲多久（秒）后回收
+}
+
+
+@dataclass
+class PendingPrompt:
+    msg: Any                 # GroupMessage
+    text: str
+    use_search_model: bool = False
+    image_urls: List[str] = field(default_factory=list)
+
+    @property
+    def sender_name(self) -> str:
+        sender = getattr(self.msg, "sender", None)
+        name = getattr(sender, "card", None) or getattr(sender, "nickname", None)
+        return name or str(getattr(self.msg, "user_id", ""))
+
+
+BatchHandler = Callable[[int, List[PendingPrompt]], Awaitable[None]]
+
+
+class _GroupActor:
+    def __init__(self):
+        self.queue: List[PendingPrompt] = []
+        self.wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+        self.last_active = time.monotonic()
+
+
+class ConversationActors:
+    """
+    AI 对话的群级 actor
+
+    - 同一个群的请求按顺序一次只处理一批，上下文的读取和追加不会交错
+    - 上一批生成期间到达的消息在下一批中合并成一次模型调用，突发聊天时调用次数有上限
+    - 不同群之间互不阻塞；群队列空闲超过 idle_timeout 后自动回收
+    """
+
+    def __init__(self, handler: BatchHandler, config: Optional[Dict[str, Any]] = None):
+        self.handler = handler
+        user_config = config if config is not None else (get_config("ai_queue", {}) or {})
+        self.config = {**DEFAULT_AI_QUEUE_CONFIG, **user_config}
+        self._actors: Dict[int, _GroupActor] = {}
+        self.stats = {"submitted": 0, "batches": 0, "coalesced": 0, "evicted": 0}
+
+    def submit(self, group_id: int, prompt: PendingPrompt) -> None:
+        """把消息放入群队列，必要时启动该群的 actor"""
+        actor = self._actors.get(group_id)
+        if actor is None:
+            actor = self._actors[group_id] = _GroupActor()
+        actor.queue.append(prompt)
+        actor.last_active = time.monotonic()
+        actor.wakeup.set()
+        self.stats["submitted"] += 1
+        if actor.task is None or actor.task.done():
+            actor.task = asyncio.create_task(self._run(group_id, actor))
+
+    async def _run(self, group_id: int, actor: _GroupActor) -> None:
+        max_batch = max(1, int(self.config["max_batch"]))
+        idle_timeout = float(self.config["idle_timeout"])
+        try:
+            while True:
+                if not actor.queue:
+                    actor.wakeup.clear()
+                    try:
+                        await asyncio.wait_for(actor.wakeup.wait(), idle_timeout)
+                    except asyncio.TimeoutError:
+                        if not actor.queue:
+                            break
+                batch, actor.queue = actor.queue[:max_batch], actor.queue[max_batch:]
+                self.stats["batches"] += 1
+                self.stats["coalesced"] += len(batch) - 1
+                if len(batch) > 1:
+                    _log.info(f"群 {group_id} 合并 {len(batch)} 条消息为一次 AI 请求")
+                try:
+                    await self.handler(group_id, batch)
+                except Exception as e:
+                    _log.error(f"群 {group_id} 处理 AI 请求失败: {e}")
+                actor.last_active = time.monotonic()
+        finally:
+            if self._actors.get(group_id) is actor and not actor.queue:
+                del self._actors[group_id]
+                self.stats["evicted"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "active_groups": len(self._actors),
+            "queued": sum(len(actor.queue) for actor in self._actors.values()),
+        }
+
+    async def close(self) -> None:
+        """取消所有群队列（插件卸载时调用）"""
+        tasks = [actor.task for actor in self._actors.values() if actor.task and not actor.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._actors.clear()
+
+
+def build_batch_prompt(batch: List[PendingPrompt]) -> str:
+    """把多位成员的消息合并成一条提示，要求逐一回复"""
+    if len(batch) == 1:
+        return batch[0].text
+    lines = [
+        f"群里有 {len(batch)} 位成员几乎同时向你发了消息，请在一条回复里分别回应每个人，"
+        "回应时用“@昵称”开头区分对象："
+    ]
+    for prompt in batch:
+        text = prompt.text or "[图片]"
+        if prompt.image_urls:
+            text += f" [附带{len(prompt.image_urls)}张图片]"
+        lines.append(f"{prompt.sender_name}: {text}")
+    return "\n".join(lines)
@@ -4,6 +4,7 @@ from functools import wraps
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
 from .message_db import OpenAIContextManager
+from .actor import ConversationActors, PendingPrompt, build_batch_prompt
 from utils.cq_to_onebot import extract_at_users, remove_cq_codes
 from utils.onebot_v11_handler import extract_images
 
@@ -135,11 +136,7 @@ class AiReply(BasePlugin):
                         command_text = "请详细分析这张图片的内容。"
 
                     # 调用AI分析图片
-                    response = await self.context_manager.get_openai_reply(
-                        group_id, command_text, False, image_urls
-                    )
-                    if response:
-                        await self.api.post_group_msg(group_id, text=response, reply=msg.message_id)
+                    await self._send_ai_reply(msg, command_text, False, image_urls)
                 else:
                     # 没有图片，等待用户发送图片
                     command_text = raw_message.strip()[len("/分析图片"):].strip()
@@ -170,11 +167,7 @@ class AiReply(BasePlugin):
                     command_text = self.pending_image_analysis[group_id]['command_text']
                     del self.pending_image_analysis[group_id]
 
-                    response = await self.context_manager.get_openai_reply(
-                        group_id, command_text, False, image_urls
-                    )
-                    if response:
-                        await self.api.post_group_msg(group_id, text=response, reply=msg.message_id)
+                    await self._send_ai_reply(msg, command_text, False, image_urls)
                 else:
                     # 仍然没有图片
                     await self.api.post_group_msg(
@@ -217,15 +210,38 @@ class AiReply(BasePlugin):
                     reply_text = reply_text[len("联网"):].strip()
 
                 # 调用 OpenAIContextManager 获取回复，传入图片URL
-                response = await self.context_manager.get_openai_reply(
-                    group_id, reply_text, use_search_model, image_urls
-                )
-                if response:
-                    await self.api.post_group_msg(group_id, text=response, reply=msg.message_id)
+                await self._send_ai_reply(msg, reply_text, use_search_model, image_urls)
         except Exception as e:
             # 静默处理错误，避免日志污染
             pass
 
+    async def _send_ai_reply(self, msg: GroupMessage, text: str, use_search_model: bool, image_urls: List[str]):
+        """把请求放入群队列，同一个群的请求串行处理，生成期间到达的消息合并处理"""
+        self.actors.submit(msg.group_id, PendingPrompt(msg, text, use_search_model, list(image_urls or [])))
+
+    async def _process_batch(self, group_id: int, batch: List[PendingPrompt]):
+        """流式获取 AI 回复，首句生成后立即发送，其余内容分段追加"""
+        msg = batch[-1].msg
+        prompt = build_batch_prompt(batch)
+        use_search_model = any(p.use_search_model for p in batch)
+        image_urls = [url for p in batch for url in p.image_urls]
+        sent = 0
+
+        async def send_segment(segment: str):
+            nonlocal sent
+            # 只有第一条引用原消息
+            if sent == 0:
+                await self.api.post_group_msg(group_id, text=segment, reply=msg.message_id)
+            else:
+                await self.api.post_group_msg(group_id, text=segment)
+            sent += 1
+
+        response = await self.context_manager.get_openai_reply(
+            group_id, prompt, use_search_model, image_urls, on_segment=send_segment
+        )
+        if response and sent == 0:
+            await self.api.post_group_msg(group_id, text=response, reply=msg.message_id)
+
     async def _is_feature_enabled(self, group_id: int, feature_name: str) -> bool:
         """检查功能是否启用"""
         try:
@@ -238,7 +254,13 @@ class AiReply(BasePlugin):
         """插件加载时的初始化逻辑"""
         self.context_manager = OpenAIContextManager()
         await self.context_manager._initialize_database()
+        self.actors = ConversationActors(self._process_batch)
         self.bot_name = self.context_manager.bot_name
         self.pending_image_analysis = {}
         print(f"{self.name} 插件已加载")
-        print(f"插件版本: {self.version}")
\ No newline at end of file
+        print(f"插件版本: {self.version}")
+
+    async def on_unload(self):
+        """插件卸载时取消群队列"""
+        if hasattr(self, "actors"):
+            await self.actors.close()
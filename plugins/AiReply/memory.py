@@ -0,0 +1,335 @@
+"""
+AI 对话记忆 - 按轮次存储、内存环形缓冲、按 token 预算组装上下文并滚动摘要
+"""
+import asyncio
+import re
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from ncatbot.utils.logger import get_log
+from utils.config_manager import get_config
+from utils.database_pool import get_database
+
+_log = get_log()
+
+# config.yaml 中未配置 ai_memory 段时使用的默认值
+DEFAULT_AI_MEMORY_CONFIG: Dict[str, Any] = {
+    "prompt_token_budget": 3000,     # 设定 + 摘要 + 历史 + 本次消息的估算 token 上限
+    "ring_size": 40,                 # 每个群在内存中保留的最近轮次（单条消息）数量
+    "summary_trigger_tokens": 2000,  # 未摘要历史超过该值时把较早的轮次压缩进摘要
+    "keep_recent_turns": 8,          # 摘要时保留不压缩的最近消息条数
+    "summary_max_chars": 600,        # 摘要长度上限（字符）
+}
+
+# 中日韩文字大约一个字一个 token，其余文字大约四个字符一个 token
+_CJK_PATTERN = re.compile(r"[\u2e80-\u9fff\uac00-\ud7af\uf900-\ufaff\uff00-\uffef]")
+# 每条消息的角色、分隔等格式开销
+MESSAGE_OVERHEAD_TOKENS = 4
+# 每张图片按固定 token 计入预算
+IMAGE_TOKENS = 300
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本 token 数（不依赖具体模型的分词器）"""
+    if not text:
+        return MESSAGE_OVERHEAD_TOKENS
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4 + MESSAGE_OVERHEAD_TOKENS
+
+
+def estimate_message_tokens(message: Dict[str, Any]) -> int:
+    """估算一条 chat 消息的 token 数，支持多模态 content"""
+    content = message.get("content")
+    if isinstance(content, list):
+        tokens = MESSAGE_OVERHEAD_TOKENS
+        for part in content:
+            if part.get("type") == "text":
+                tokens += estimate_tokens(part.get("text", ""))
+            else:
+                tokens += IMAGE_TOKENS
+        return tokens
+    return estimate_tokens(content or "")
+
+
+@dataclass
+class Turn:
+    id: int
+    role: str  # user / assistant
+    content: str
+    tokens: int
+
+
+@dataclass
+class GroupMemory:
+    turns: Deque[Turn]
+    summary: str = ""
+    summary_tokens: int = 0
+    covered_until: int = 0  # 已并入摘要的最后一条轮次 id
+    compacting: Optional[asyncio.Task] = field(default=None, repr=False)
+
+
+# 摘要函数：(已有摘要, 待压缩轮次, 长度上限) -> 新摘要，失败返回 None
+Summarizer = Callable[[str, List[Turn], int], Awaitable[Optional[str]]]
+
+
+class ConversationMemory:
+    """
+    群聊对话记忆
+
+    - ai_turns 每条消息一行，回复后只追加两行，不再整段重写上下文
+    - 每个群在内存中保留最近 ring_size 条消息，组装上下文不必查库、不必重新解析
+    - 组装上下文时从最新的消息往前取，直到达到 token 预算
+    - 未摘要的历史过长或环形缓冲已满时，后台把较早的消息压缩进 ai_summaries 中的滚动摘要，
+      并删除已压缩的行；未压缩的行不会被删除
+    """
+
+    def __init__(self, db_path: str = "data.db", summarizer: Optional[Summarizer] = None,
+                 config: Optional[Dict[str, Any]] = None):
+        self.db = get_database(db_path)
+        self.summarizer = summarizer
+        self._config_override = config
+        self._config: Optional[Dict[str, Any]] = None
+        self._groups: Dict[str, GroupMemory] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """读取 ai_memory 配置（首次使用时从 config.yaml 加载）"""
+        if self._config is None:
+            user_config = self._config_override
+            if user_config is None:
+                user_config = get_config("ai_memory", {}) or {}
+            self._config = {**DEFAULT_AI_MEMORY_CONFIG, **user_config}
+        return self._config
+
+    async def initialize(self) -> None:
+        """创建轮次表和摘要表"""
+        await self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS ai_turns (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                group_id TEXT NOT NULL,
+                role TEXT NOT NULL,
+                content TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS idx_ai_turns_group ON ai_turns(group_id, id);
+            CREATE TABLE IF NOT EXISTS ai_summaries (
+                group_id TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                tokens INTEGER NOT NULL,
+                covered_until INTEGER NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+
+    def _lock(self, key: str) -> asyncio.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    async def _get(self, group_id) -> GroupMemory:
+        key = str(group_id)
+        memory = self._groups.get(key)
+        if memory is None:
+            async with self._lock(key):
+                memory = self._groups.get(key)
+                if memory is None:
+                    memory = self._groups[key] = await self._load(key)
+        return memory
+
+    async def _load(self, key: str) -> GroupMemory:
+        ring_size = int(self.config["ring_size"])
+        memory = GroupMemory(turns=deque(maxlen=ring_size))
+        row = await self.db.fetchone(
+            "SELECT summary, tokens, covered_until FROM ai_summaries WHERE group_id = ?", (key,)
+        )
+        if row:
+            memory.summary, memory.summary_tokens, memory.covered_until = row
+        rows = await self.db.fetchall(
+            """
+            SELECT id, role, content, tokens FROM (
+                SELECT id, role, content, tokens FROM ai_turns
+                WHERE group_id = ? AND id > ? ORDER BY id DESC LIMIT ?
+            ) ORDER BY id
+            """,
+            (key, memory.covered_until, ring_size),
+        )
+        if not rows and not row:
+            rows = await self._migrate_legacy_context(key)
+        memory.turns.extend(Turn(*r) for r in rows)
+        return memory
+
+    async def _migrate_legacy_context(self, key: str) -> List[tuple]:
+        """把旧版 ai_txt.context 中的 User:/Assistant: 文本拆成轮次（每个群只执行一次）"""
+        try:
+            row = await self.db.fetchone("SELECT context FROM ai_txt WHERE group_id = ?", (key,))
+        except Exception:
+            return []
+        if not row or not row[0]:
+            return []
+        pairs = []
+        parts = row[0].split("\n")
+        i = 0
+        while i < len(parts):
+            if i + 1 < len(parts) and parts[i].startswith("User: ") and parts[i + 1].startswith("Assistant: "):
+                pairs.append((parts[i][6:], parts[i + 1][11:]))
+                i += 2
+            else:
+                i += 1
+        rows = []
+        async with self.db.transaction() as conn:
+            for user_text, assistant_text in pairs:
+                for role, content in (("user", user_text), ("assistant", assistant_text)):
+                    tokens = estimate_tokens(content)
+                    async with conn.execute(
+                        "INSERT INTO ai_turns (group_id, role, content, tokens) VALUES (?, ?, ?, ?)",
+                        (key, role, content, tokens),
+                    ) as cursor:
+                        rows.append((cursor.lastrowid, role, content, tokens))
+            await conn.execute("UPDATE ai_txt SET context = '' WHERE group_id = ?", (key,))
+        _log.info(f"群 {key} 的旧版上下文已迁移为 {len(rows)} 条轮次")
+        return rows[-int(self.config["ring_size"]):]
+
+    async def build_messages(self, group_id, setting: str, user_message: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        组装发送给模型的消息列表
+
+        Args:
+            group_id: 群号
+            setting: 群组设定（system 消息）
+            user_message: 本次用户消息
+
+        Returns:
+            List[Dict]: system + 摘要 + 预算内的最近历史 + 本次消息
+        """
+        memory = await self._get(group_id)
+        budget = int(self.config["prompt_token_budget"])
+        messages: List[Dict[str, Any]] = [{"role": "system", "content": setting}]
+        used = estimate_tokens(setting) + estimate_message_tokens(user_message)
+        if memory.summary:
+            messages.append({"role": "system", "content": f"以下是更早对话的摘要：\n{memory.summary}"})
+            used += memory.summary_tokens
+
+        history: List[Turn] = []
+        for turn in reversed(memory.turns):
+            if used + turn.tokens > budget:
+                break
+            history.append(turn)
+            used += turn.tokens
+        history.reverse()
+        # 从用户消息开始，保持 user/assistant 成对
+        while history and history[0].role != "user":
+            history.pop(0)
+
+        messages.extend({"role": turn.role, "content": turn.content} for turn in history)
+        messages.append(user_message)
+        _log.debug(f"群 {group_id} 上下文: {len(history)} 条历史, 约 {used} tokens")
+        return messages
+
+    async def append_exchange(self, group_id, user_text: str, assistant_text: str) -> None:
+        """记录一轮问答"""
+        key = str(group_id)
+        memory = await self._get(key)
+        user_tokens, assistant_tokens = estimate_tokens(user_text), estimate_tokens(assistant_text)
+        async with self.db.transaction() as conn:
+            async with conn.execute(
+                "INSERT INTO ai_turns (group_id, role, content, tokens) VALUES (?, 'user', ?, ?)",
+                (key, user_text, user_tokens),
+            ) as cursor:
+                user_id = cursor.lastrowid
+            async with conn.execute(
+                "INSERT INTO ai_turns (group_id, role, content, tokens) VALUES (?, 'assistant', ?, ?)",
+                (key, assistant_text, assistant_tokens),
+            ) as cursor:
+                assistant_id = cursor.lastrowid
+            overflow = len(memory.turns) + 2 - memory.turns.maxlen
+            if overflow > 0 and self.summarizer is None:
+                # 没有摘要时环形缓冲将挤出最早的消息，数据库中同样不再保留它们；
+                # 有摘要时保留这些行，由 _compact 并入摘要后再删除
+                oldest_kept = memory.turns[overflow].id if overflow < len(memory.turns) else user_id
+                await conn.execute("DELETE FROM ai_turns WHERE group_id = ? AND id < ?", (key, oldest_kept))
+        memory.turns.append(Turn(user_id, "user", user_text, user_tokens))
+        memory.turns.append(Turn(assistant_id, "assistant", assistant_text, assistant_tokens))
+        self._maybe_compact(key, memory)
+
+    def _maybe_compact(self, key: str, memory: GroupMemory) -> None:
+        if self.summarizer is None or (memory.compacting and not memory.compacting.done()):
+            return
+        keep = int(self.config["keep_recent_turns"])
+        if len(memory.turns) <= keep:
+            return
+        # 环形缓冲已满时也要压缩，否则挤出的消息只留在数据库里，不会进入上下文
+        if (len(memory.turns) < memory.turns.maxlen
+                and sum(turn.tokens for turn in memory.turns) < int(self.config["summary_trigger_tokens"])):
+            return
+        memory.compacting = asyncio.create_task(self._compact(key, memory))
+
+    async def _compact(self, key: str, memory: GroupMemory) -> None:
+        """把较早的消息压缩进滚动摘要"""
+        keep = int(self.config["keep_recent_turns"])
+        old_turns = list(memory.turns)[:-keep]
+        # 以完整的一问一答为单位压缩
+        while old_turns and old_turns[-1].role != "assistant":
+            old_turns.pop()
+        if not old_turns:
+            return
+        # 从数据库读取，包含已被环形缓冲挤出但尚未并入摘要的消息
+        try:
+            rows = await self.db.fetchall(
+                "SELECT id, role, content, tokens FROM ai_turns WHERE group_id = ? AND id > ? AND id <= ? ORDER BY id",
+                (key, memory.covered_until, old_turns[-1].id),
+            )
+        except Exception as e:
+            _log.warning(f"群 {key} 读取待摘要消息失败: {e}")
+            return
+        old_turns = [Turn(*row) for row in rows] or old_turns
+        try:
+            summary = await self.summarizer(memory.summary, old_turns, int(self.config["summary_max_chars"]))
+        except Exception as e:
+            _log.warning(f"群 {key} 生成对话摘要失败: {e}")
+            return
+        if not summary:
+            return
+        if self._groups.get(key) is not memory:
+            return  # 压缩期间上下文已被清空
+
+        covered_until = old_turns[-1].id
+        summary = summary[: int(self.config["summary_max_chars"])]
+        tokens = estimate_tokens(summary)
+        try:
+            await self._save_summary(key, summary, tokens, covered_until)
+        except Exception as e:
+            _log.error(f"群 {key} 保存对话摘要失败: {e}")
+            return
+        memory.summary, memory.summary_tokens, memory.covered_until = summary, tokens, covered_until
+        while memory.turns and memory.turns[0].id <= covered_until:
+            memory.turns.popleft()
+        _log.info(f"群 {key} 已将 {len(old_turns)} 条消息压缩进摘要（{tokens} tokens）")
+
+    async def _save_summary(self, key: str, summary: str, tokens: int, covered_until: int) -> None:
+        async with self.db.transaction() as conn:
+            await conn.execute(
+                """
+                INSERT INTO ai_summaries (group_id, summary, tokens, covered_until, updated_at)
+                VALUES (?, ?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT(group_id) DO UPDATE SET
+                    summary = excluded.summary, tokens = excluded.tokens,
+                    covered_until = excluded.covered_until, updated_at = excluded.updated_at
+                """,
+                (key, summary, tokens, covered_until),
+            )
+            await conn.execute("DELETE FROM ai_turns WHERE group_id = ? AND id <= ?", (key, covered_until))
+
+    async def clear(self, group_id) -> None:
+        """清空指定群的对话历史和摘要"""
+        key = str(group_id)
+        async with self.db.transaction() as conn:
+            await conn.execute("DELETE FROM ai_turns WHERE group_id = ?", (key,))
+            await conn.execute("DELETE FROM ai_summaries WHERE group_id = ?", (key,))
+            await conn.execute("UPDATE ai_txt SET context = '' WHERE group_id = ?", (key,))
+        memory = self._groups.pop(key, None)
+        if memory and memory.compacting and not memory.compacting.done():
+            memory.compacting.cancel()
@@ -1,18 +1,24 @@
 import os
 import aiosqlite
-import aiohttp
 import yaml
 from ncatbot.utils.logger import get_log
+from utils.llm_gateway import llm_gateway
+from utils.llm_stream import LLMStreamError, SegmentBuffer
+from .memory import ConversationMemory
 
 _log = get_log()
 
+CHAT_MODEL = "gemini-2.0-flash-exp"
+SEARCH_MODEL = "gemini-2.0-flash:search"
+
 class OpenAIContextManager:
     def __init__(self, db_path="data.db"):
         """
         初始化数据库连接和配置加载
         """
         self.db_path = db_path
-        self.api_key, self.proxy, self.bot_name = self.load_config()  # 加载 bot_name
+        self.bot_name = self.load_config()  # 加载 bot_name
+        self.memory = ConversationMemory(db_path, summarizer=self.summarize_turns)
 
     async def _initialize_database(self):
         """
@@ -28,115 +34,62 @@ class OpenAIContextManager:
                     )
                 """)
                 await conn.commit()
+            await self.memory.initialize()
         except Exception as e:
             _log.error(f"初始化数据库时出错: {e}")
 
     def load_config(self):
         """
-        从根目录的 config.yaml 文件中加载 gemini_apikey、代理地址和 bot_name
+        从根目录的 config.yaml 文件中加载 bot_name（API 密钥和代理由 LLM 网关统一管理）
         """
         config_path = os.path.join(os.getcwd(), "config.yaml")
         try:
             with open(config_path, "r", encoding="utf-8") as file:
                 config = yaml.safe_load(file)
-                
-                # 处理API key配置，支持单个字符串或列表
-                api_key_config = config.get("gemini_apikey", "")
-                if isinstance(api_key_config, list):
-                    # 过滤掉空值和注释
-                    api_keys = [key.strip() for key in api_key_config if key and isinstance(key, str) and key.strip() and not key.strip().startswith('#')]
-                    api_key = api_keys[0] if api_keys else ""  # 默认使用第一个可用的key
-                    self.all_api_keys = api_keys  # 保存所有可用的key
-                    self.current_key_index = 0  # 当前使用的key索引
-                elif isinstance(api_key_config, str):
-                    api_key = api_key_config
-                    self.all_api_keys = [api_key] if api_key else []
-                    self.current_key_index = 0
-                else:
-                    api_key = ""
-                    self.all_api_keys = []
-                    self.current_key_index = 0
-                proxy = config.get("proxy", None)
-                bot_name = config.get("bot_name", "可琳雫")  # 默认值为“机器人”
-                return api_key, proxy, bot_name
+                return config.get("bot_name", "可琳雫")  # 默认值为“机器人”
         except FileNotFoundError:
             _log.error("配置文件 config.yaml 未找到！")
         except Exception as e:
             _log.error(f"加载配置文件时出错: {e}")
-        return "", None, "机器人"
-
-    def get_next_api_key(self):
-        """
-        获取下一个可用的API key
-        用于在当前key失败时切换到下一个
-        """
-        if not hasattr(self, 'all_api_keys') or not self.all_api_keys:
-            return None
-            
-        # 切换到下一个key
-        self.current_key_index = (self.current_key_index + 1) % len(self.all_api_keys)
-        next_key = self.all_api_keys[self.current_key_index]
-        
-        _log.info(f"切换到API key索引: {self.current_key_index}")
-        return next_key
-
-    def reset_to_first_api_key(self):
-        """
-        重置到第一个API key
-        """
-        if hasattr(self, 'all_api_keys') and self.all_api_keys:
-            self.current_key_index = 0
-            self.api_key = self.all_api_keys[0]
-            _log.info("重置到第一个API key")
+        return "机器人"
 
-    async def get_context(self, group_id):
-        """
-        获取指定群号的上下文内容
-        """
-        try:
-            async with aiosqlite.connect(self.db_path) as conn:
-                async with conn.execute("SELECT context FROM ai_txt WHERE group_id = ?", (group_id,)) as cursor:
-                    result = await cursor.fetchone()
-                    return result[0] if result else ""
-        except Exception as e:
-            _log.error(f"获取上下文时出错: {e}")
-            return ""
     async def clear_context(self, group_id):
         """
-        清空指定群号的上下文内容（只清空context字段，保留setting）
+        清空指定群号的对话历史和摘要（保留setting）
         """
         try:
-            async with aiosqlite.connect(self.db_path) as conn:
-                # 只更新context字段为空，不删除整个记录
-                await conn.execute("UPDATE ai_txt SET context = '' WHERE group_id = ?", (group_id,))
-                await conn.commit()
-                _log.info(f"已清空群号 {group_id} 的上下文")
-                return True
+            await self.memory.clear(group_id)
+            _log.info(f"已清空群号 {group_id} 的上下文")
+            return True
         except Exception as e:
             _log.error(f"清空上下文时出错: {e}")
             return False
-    async def save_context(self, group_id, context):
+
+    async def summarize_turns(self, previous_summary, turns, max_chars):
         """
-        保存或更新指定群号的上下文内容
+        把较早的对话压缩成摘要，供 ConversationMemory 滚动摘要使用
+
+        Returns:
+            str: 新摘要，失败时返回 None
         """
-        try:
-            async with aiosqlite.connect(self.db_path) as conn:
-                # 检查群组是否已存在
-                async with conn.execute("SELECT COUNT(*) FROM ai_txt WHERE group_id = ?", (group_id,)) as cursor:
-                    exists = (await cursor.fetchone())[0] > 0
-                
-                if exists:
-                    # 更新现有记录的上下文
-                    await conn.execute("UPDATE ai_txt SET context = ? WHERE group_id = ?", (context, group_id))
-                else:
-                    # 创建新记录
-                    await conn.execute("INSERT INTO ai_txt (group_id, context, setting) VALUES (?, ?, '你是一个智能助手。')", (group_id, context))
-                
-                await conn.commit()
-                return True
-        except Exception as e:
-            _log.error(f"保存上下文时出错: {e}")
-            return False
+        if not llm_gateway.has_keys():
+            return None
+        lines = [f"{'用户' if turn.role == 'user' else '助手'}: {turn.content}" for turn in turns]
+        prompt = (
+            f"请把下面的群聊对话压缩成不超过{max_chars}字的摘要，"
+            "保留人物、事实、约定和未完成的话题，只输出摘要本身。\n\n"
+        )
+        if previous_summary:
+            prompt += f"已有摘要：\n{previous_summary}\n\n"
+        prompt += "新的对话：\n" + "\n".join(lines)
+        payload = {
+            "model": CHAT_MODEL,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": 1024,
+            "temperature": 0.3
+        }
+        summary = await llm_gateway.complete(payload, name="ai_summary")
+        return summary.strip() or None
 
     async def save_setting(self, group_id, setting):
         """
@@ -180,7 +133,7 @@ class OpenAIContextManager:
             _log.error(f"获取设定时出错: {e}")
             return "你是一个智能助手。"
 
-    async def get_openai_reply(self, group_id, prompt, use_search_model=False, image_urls=None):
+    async def get_openai_reply(self, group_id, prompt, use_search_model=False, image_urls=None, on_segment=None):
         """
         调用 OpenAI 接口获取回复，并更新上下文
         支持图片分析功能
@@ -190,48 +143,18 @@ class OpenAIContextManager:
             prompt: 用户输入的文本
             use_search_model: 是否使用搜索模型
             image_urls: 图片URL列表，用于图片分析
+            on_segment: 分段发送回调，提供时以流式方式边生成边发送（首句生成后立即发送）
+
+        Returns:
+            str: 完整回复或错误提示；提供 on_segment 且已经分段发送过时，调用方无需再发送
         """
-        if not self.api_key:
+        if not llm_gateway.has_keys():
             _log.error("API 密钥未初始化，无法调用 OpenAI 接口！")
             return "抱歉，API 密钥未正确配置，无法处理您的请求。"
 
         # 获取当前设定
         setting = await self.get_setting(group_id)
 
-        # 构建对话历史
-        messages = [{"role": "system", "content": setting}]
-
-        # 获取并解析上下文，而不是简单地将其作为单个消息
-        context = await self.get_context(group_id)
-        if context:
-            try:
-                # 将保存的上下文分割成对话轮次
-                context_parts = context.split('\n')
-                i = 0
-                while i < len(context_parts):
-                    if i+1 < len(context_parts) and context_parts[i].startswith("User: ") and context_parts[i+1].startswith("Assistant: "):
-                        user_msg = context_parts[i][6:]  # 去掉 "User: " 前缀
-                        asst_msg = context_parts[i+1][11:]  # 去掉 "Assistant: " 前缀
-                        messages.append({"role": "user", "content": user_msg})
-                        messages.append({"role": "assistant", "content": asst_msg})
-                        i += 2
-                    else:
-                        i += 1
-            except Exception as e:
-                _log.error(f"解析上下文时出错: {e}")
-                # 出错时清空上下文重新开始
-                await self.clear_context(group_id)
-                messages = [{"role": "system", "content": setting}]
-
-        # 调试：打印当前使用的设定
-        _log.info(f"群组 {group_id} 当前设定: {setting}")
-        _log.info(f"消息历史长度: {len(messages)}")
-        for i, msg in enumerate(messages):
-            if msg["role"] == "system":
-                _log.info(f"系统消息 {i}: {msg['content'][:100]}...")
-            else:
-                _log.info(f"消息 {i} ({msg['role']}): {str(msg['content'])[:100] if isinstance(msg['content'], str) else 'multimodal'}...")
-
         # 构建用户消息内容
         if image_urls:
             # 有图片时，检查是否为base64格式，如果是则跳过图片分析
@@ -263,20 +186,22 @@ class OpenAIContextManager:
                         }
                     })
 
-                messages.append({"role": "user", "content": user_message_content})
+                user_message = {"role": "user", "content": user_message_content}
             else:
                 # 没有有效的HTTP图片，降级为纯文本
                 fallback_text = f"{prompt} [注：图片格式不支持，无法分析]" if prompt else "抱歉，图片格式不支持分析。"
-                messages.append({"role": "user", "content": fallback_text})
+                user_message = {"role": "user", "content": fallback_text}
                 _log.warning("所有图片都不是HTTP格式，降级为纯文本处理")
         else:
             # 没有图片，使用简单的文本格式
-            messages.append({"role": "user", "content": prompt})
+            user_message = {"role": "user", "content": prompt}
 
-        # 根据是否使用搜索模型选择模型名称
-        model_name = "gemini-2.0-flash:search" if use_search_model else "gemini-2.0-flash-exp"
+        # 设定 + 滚动摘要 + token 预算内的最近对话 + 本次消息
+        messages = await self.memory.build_messages(group_id, setting, user_message)
+        _log.info(f"群组 {group_id} 消息历史长度: {len(messages)}")
 
-        url = "https://gemn.ariaxz.tk/v1/chat/completions"
+        # 根据是否使用搜索模型选择模型名称
+        model_name = SEARCH_MODEL if use_search_model else CHAT_MODEL
 
         # 构建请求载荷
         payload = {
@@ -286,146 +211,55 @@ class OpenAIContextManager:
             "temperature": 0.7   # 添加温度参数
         }
 
-        # 调试：打印请求信息
         _log.info(f"API请求模型: {model_name}")
-        _log.info(f"消息数量: {len(messages)}")
-        for i, msg in enumerate(messages[-2:]):  # 只打印最后2条消息
-            if isinstance(msg.get('content'), list):
-                content_types = [item.get('type', 'unknown') for item in msg['content']]
-                _log.info(f"消息 {i} ({msg['role']}): 多模态内容 {content_types}")
-            else:
-                content_preview = str(msg.get('content', ''))[:100]
-                _log.info(f"消息 {i} ({msg['role']}): {content_preview}...")
-
-        # 尝试使用所有可用的API key
-        max_retries = len(self.all_api_keys) if hasattr(self, 'all_api_keys') and self.all_api_keys else 1
-        for attempt in range(max_retries):
-            current_api_key = self.api_key
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {current_api_key}"
-            }
-            
-            _log.info(f"尝试使用API key (索引: {getattr(self, 'current_key_index', 0)}, 尝试: {attempt + 1}/{max_retries})")
-
-            async with aiohttp.ClientSession() as session:
-                try:
-                    _log.info(f"发送API请求到: {url}")
-                    async with session.post(url, headers=headers, json=payload, proxy=self.proxy) as resp:
-                        response_text = await resp.text()
-                        _log.info(f"API响应状态码: {resp.status}")
-
-                        if resp.status == 200:
-                            try:
-                                data = await resp.json()
-                                reply = data.get("choices", [{}])[0].get("message", {}).get("content", "")
-
-                                if not reply:
-                                    _log.warning("API返回空回复")
-                                    return "抱歉，AI没有返回有效回复。"
-
-                                # 构建上下文记录
-                                context_prompt = prompt if prompt else "[图片分析]"
-                                if image_urls:
-                                    valid_count = len([url for url in image_urls if url.startswith('http')])
-                                    context_prompt += f" [包含{valid_count}张图片]"
-
-                                # 更新上下文，保持正确的格式
-                                new_context = context + (f"\nUser: {context_prompt}\nAssistant: {reply}" if context else f"User: {context_prompt}\nAssistant: {reply}")
-
-                                # 如果上下文太长，可以考虑截取最近的几轮对话
-                                if len(new_context) > 4000:  # 设置一个合理的长度限制
-                                    parts = new_context.split('\nUser: ')
-                                    if len(parts) > 3:  # 保留最近的几轮对话
-                                        new_context = 'User: ' + '\nUser: '.join(parts[-3:])
-
-                                await self.save_context(group_id, new_context)
-                                _log.info(f"AI回复成功，长度: {len(reply)}")
-                                
-                                # 成功时重置到第一个API key
-                                if attempt > 0:
-                                    self.reset_to_first_api_key()
-                                
-                                return reply
-
-                            except Exception as json_error:
-                                _log.error(f"解析API响应JSON失败: {json_error}")
-                                _log.error(f"原始响应: {response_text[:500]}...")
-                                # 如果这是最后一次尝试，返回错误
-                                if attempt == max_retries - 1:
-                                    return "抱歉，解析AI回复时出现错误。"
-                                else:
-                                    # 切换到下一个API key继续尝试
-                                    next_key = self.get_next_api_key()
-                                    if next_key:
-                                        self.api_key = next_key
-                                        _log.info(f"JSON解析失败，切换到下一个API key继续尝试")
-                                        continue
-                                    else:
-                                        return "抱歉，解析AI回复时出现错误。"
-
-                        elif resp.status == 401:
-                            _log.error(f"API密钥无效 (401): {response_text}")
-                            # API key无效，尝试下一个
-                            if attempt < max_retries - 1:
-                                next_key = self.get_next_api_key()
-                                if next_key:
-                                    self.api_key = next_key
-                                    _log.info(f"API密钥无效，切换到下一个API key")
-                                    continue
-                            return "抱歉，API密钥无效，请检查配置。"
-
-                        elif resp.status == 429:
-                            _log.error(f"API请求频率限制 (429): {response_text}")
-                            # 频率限制，尝试下一个API key
-                            if attempt < max_retries - 1:
-                                next_key = self.get_next_api_key()
-                                if next_key:
-                                    self.api_key = next_key
-                                    _log.info(f"请求频率限制，切换到下一个API key")
-                                    continue
-                            return "抱歉，请求过于频繁，请稍后再试。"
-
-                        elif resp.status == 400:
-                            _log.error(f"API请求参数错误 (400): {response_text}")
-                            # 尝试解析错误信息
-                            try:
-                                error_data = await resp.json()
-                                error_msg = error_data.get("error", {}).get("message", "未知错误")
-                                _log.error(f"详细错误信息: {error_msg}")
-
-                                # 如果是图片相关错误，提供更友好的提示
-                                if "image" in error_msg.lower() or "multimodal" in error_msg.lower():
-                                    return "抱歉，图片分析功能暂时不可用，请稍后再试或发送纯文本消息。"
-                                else:
-                                    return f"抱歉，请求格式有误：{error_msg}"
-                            except:
-                                return "抱歉，请求参数有误，请检查输入内容。"
-
-                        else:
-                            _log.error(f"API请求失败，状态码: {resp.status}, 响应: {response_text[:500]}...")
-                            # 其他错误，尝试下一个API key
-                            if attempt < max_retries - 1:
-                                next_key = self.get_next_api_key()
-                                if next_key:
-                                    self.api_key = next_key
-                                    _log.info(f"API请求失败 (状态码: {resp.status})，切换到下一个API key")
-                                    continue
-                            return f"抱歉，服务暂时不可用（错误码：{resp.status}）。"
-
-                except Exception as e:
-                    _log.error(f"请求API时发生异常: {e}")
-                    import traceback
-                    _log.error(f"异常详情: {traceback.format_exc()}")
-                    
-                    # 网络异常，尝试下一个API key
-                    if attempt < max_retries - 1:
-                        next_key = self.get_next_api_key()
-                        if next_key:
-                            self.api_key = next_key
-                            _log.info(f"网络异常，切换到下一个API key")
-                            continue
-                    return "抱歉，网络连接出现问题，请稍后再试。"
-        
-        # 如果所有API key都尝试失败了
-        return "抱歉，所有API密钥都不可用，请检查配置或稍后再试。"
\ No newline at end of file
+
+        segments = SegmentBuffer(on_segment) if on_segment else None
+        try:
+            result = await llm_gateway.stream_chat(
+                payload, on_text=segments.feed if segments else None, name="ai_reply"
+            )
+        except LLMStreamError as e:
+            _log.error(f"API请求失败: {e}")
+            reply = self._error_reply(e)
+            if segments and segments.sent:
+                # 已经发出部分内容，补发剩余部分并说明中断
+                await segments.flush(f"\n（{reply}）")
+            return reply
+
+        reply = result.text
+        if not reply:
+            _log.warning("API返回空回复")
+            return "抱歉，AI没有返回有效回复。"
+
+        # 构建上下文记录
+        context_prompt = prompt if prompt else "[图片分析]"
+        if image_urls:
+            valid_count = len([url for url in image_urls if url.startswith('http')])
+            context_prompt += f" [包含{valid_count}张图片]"
+
+        # 追加本轮问答，历史过长时由记忆模块在后台滚动摘要
+        try:
+            await self.memory.append_exchange(group_id, context_prompt, reply)
+        except Exception as e:
+            _log.error(f"保存对话记录时出错: {e}")
+        _log.info(f"AI回复成功，长度: {len(reply)}，首 token {result.ttft or 0:.2f}s，总耗时 {result.total_time:.2f}s")
+
+        if segments:
+            await segments.flush()
+        return reply
+
+    @staticmethod
+    def _error_reply(error):
+        """把接口错误转换成发给用户的提示"""
+        if error.status == 401:
+            return "抱歉，API密钥无效，请检查配置。"
+        if error.status == 429:
+            return "抱歉，请求过于频繁，请稍后再试。"
+        if error.status == 400:
+            message = str(error)
+            if "image" in message.lower() or "multimodal" in message.lower():
+                return "抱歉，图片分析功能暂时不可用，请稍后再试或发送纯文本消息。"
+            return "抱歉，请求参数有误，请检查输入内容。"
+        if error.status:
+            return f"抱歉，服务暂时不可用（错误码：{error.status}）。"
+        return "抱歉，网络连接出现问题，请稍后再试。"
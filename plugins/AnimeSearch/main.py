@@ -1,6 +1,5 @@
 import aiohttp
 import asyncio
-import time
 import hashlib
 from typing import List, Dict, Any, Optional
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
@@ -10,6 +9,8 @@ from utils.group_forward_msg import get_cqimg, _message_sender
 from PluginManager.plugin_manager import feature_required
 from urllib.parse import quote
 from utils.config_manager import get_config
+from utils.rate_limiter import USER, rate_limiter
+from utils.ttl_cache import TTLCache
 from ncatbot.utils.logger import get_log
 
 bot = CompatibleEnrollment
@@ -21,13 +22,12 @@ class AnimeSearch(BasePlugin):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.session: Optional[aiohttp.ClientSession] = None
-        self.search_cache: Dict[str, Dict[str, Any]] = {}
         self.cache_ttl = 600  # 缓存10分钟
+        self.search_cache = TTLCache(self.name, maxsize=200, ttl=self.cache_ttl, max_bytes=8 * 1024 * 1024)
         self.logger = get_log()
 
         # 请求限制
-        self.last_request_time = {}
-        self.request_interval = 2  # 2秒间隔
+        self.request_interval = rate_limiter.min_interval(self.name, USER)
 
         # 统计信息
         self.stats = {
@@ -76,38 +76,28 @@ class AnimeSearch(BasePlugin):
             await self.session.close()
         self.search_cache.clear()
         self.logger.info(f"{self.name} 插件已卸载")
-    def _is_cache_valid(self, cache_entry: Dict[str, Any]) -> bool:
-        """检查缓存是否有效"""
-        return time.time() - cache_entry.get("timestamp", 0) < self.cache_ttl
-
     def _get_cache_key(self, image_url: str) -> str:
         """生成缓存键"""
         return hashlib.md5(image_url.encode()).hexdigest()
 
-    def _check_rate_limit(self, user_id: int) -> bool:
+    def _check_rate_limit(self, user_id: int, group_id: int = None) -> bool:
         """检查用户请求频率限制"""
-        current_time = time.time()
-        if user_id in self.last_request_time:
-            if current_time - self.last_request_time[user_id] < self.request_interval:
-                return False
-        self.last_request_time[user_id] = current_time
-        return True
-
-    async def search_anime(self, image_url: str, user_id: int = None) -> Dict[str, Any]:
+        return rate_limiter.hit_all(self.name, user_id, group_id).allowed
+
+    async def search_anime(self, image_url: str, user_id: int = None, group_id: int = None) -> Dict[str, Any]:
         """调用 Trace.moe API 搜索番剧并返回结果"""
         self.stats["total_searches"] += 1
 
         # 检查缓存
         cache_key = self._get_cache_key(image_url)
-        if cache_key in self.search_cache:
-            cache_entry = self.search_cache[cache_key]
-            if self._is_cache_valid(cache_entry):
-                self.stats["cache_hits"] += 1
-                self.logger.info(f"使用缓存结果: {image_url[:50]}...")
-                return cache_entry["data"]
+        cached = self.search_cache.get(cache_key)
+        if cached is not None:
+            self.stats["cache_hits"] += 1
+            self.logger.info(f"使用缓存结果: {image_url[:50]}...")
+            return cached
 
         # 检查请求频率限制
-        if user_id and not self._check_rate_limit(user_id):
+        if user_id and not self._check_rate_limit(user_id, group_id):
             return {"success": False, "error": "请求过于频繁，请稍后再试"}
 
         encoded_url = quote(image_url, safe="")
@@ -142,13 +132,7 @@ class AnimeSearch(BasePlugin):
                 self.stats["successful_searches"] += 1
 
                 # 缓存结果
-                self.search_cache[cache_key] = {
-                    "data": result,
-                    "timestamp": time.time()
-                }
-
-                # 清理过期缓存
-                self._cleanup_cache()
+                self.search_cache.set(cache_key, result)
 
                 return result
 
@@ -165,16 +149,6 @@ class AnimeSearch(BasePlugin):
             self.stats["failed_searches"] += 1
             return {"success": False, "error": "搜索过程中发生未知错误，请稍后再试"}
 
-    def _cleanup_cache(self):
-        """清理过期缓存"""
-        current_time = time.time()
-        expired_keys = [
-            key for key, entry in self.search_cache.items()
-            if current_time - entry.get("timestamp", 0) > self.cache_ttl
-        ]
-        for key in expired_keys:
-            del self.search_cache[key]
-
     def format_results_for_forward(self, data: dict) -> List[Dict[str, Any]]:
         """格式化 API 返回的结果为合并转发消息格式"""
         if not data.get("result"):
@@ -293,7 +267,7 @@ class AnimeSearch(BasePlugin):
             await self.api.post_group_msg(group_id, text="🔍 正在搜索番剧，请稍候...")
 
             # 调用搜索API
-            result = await self.search_anime(image_url, user_id)
+            result = await self.search_anime(image_url, user_id, group_id)
 
             if not result["success"]:
                 await self.api.post_group_msg(group_id, text=f"❌ {result['error']}")
@@ -2,12 +2,13 @@ from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
 from ncatbot.core.element import MessageChain, Text, CustomMusic, Image
 from utils.group_forward_msg import send_group_forward_msg_ws
+from utils.render_executor import render_image
+from utils.rate_limiter import USER, rate_limiter
 from .utils import fetch_asmr_data, fetch_audio_data, format_asmr_data, generate_audio_list_image
 import re
 import tempfile
 import os
 import logging
-import time
 
 # 设置日志
 _log = logging.getLogger(__name__)
@@ -29,24 +30,15 @@ class AsmrSearch(BasePlugin):
         self.audio_play_count = 0
 
         # 频率控制
-        self.last_request_time = {}
-        self.request_interval = 3.0  # 3秒间隔
+        self.request_interval = rate_limiter.min_interval(self.name, USER)
 
         # 等待状态管理
         self.pending_search = {}
 
-    def _check_frequency_limit(self, user_id: int) -> tuple[bool, float]:
+    def _check_frequency_limit(self, user_id: int, group_id: int = None) -> tuple[bool, float]:
         """检查用户请求频率限制"""
-        current_time = time.time()
-
-        if user_id in self.last_request_time:
-            time_diff = current_time - self.last_request_time[user_id]
-            if time_diff < self.request_interval:
-                remaining_time = self.request_interval - time_diff
-                return False, remaining_time
-
-        self.last_request_time[user_id] = current_time
-        return True, 0.0
+        limit = rate_limiter.hit_all(self.name, user_id, group_id)
+        return limit.allowed, limit.retry_after
 
     async def show_help(self, group_id: int):
         """显示帮助信息"""
@@ -147,11 +139,11 @@ class AsmrSearch(BasePlugin):
 
             # 生成音频列表图片
             try:
-                image_data = generate_audio_list_image(audio_list)
+                image_data = await render_image(generate_audio_list_image, audio_list, name="asmr_list")
 
-                # 将 BytesIO 对象保存为临时文件
+                # 将图片数据保存为临时文件
                 with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
-                    temp_file.write(image_data.getvalue())
+                    temp_file.write(image_data)
                     temp_file_path = temp_file.name
 
                 try:
@@ -263,7 +255,7 @@ class AsmrSearch(BasePlugin):
 
         if match:
             # 频率控制检查
-            can_request, remaining_time = self._check_frequency_limit(user_id)
+            can_request, remaining_time = self._check_frequency_limit(user_id, group_id)
             if not can_request:
                 await self.api.post_group_msg(
                     group_id,
@@ -319,7 +311,7 @@ class AsmrSearch(BasePlugin):
 
         elif match_list:
             # 频率控制检查
-            can_request, remaining_time = self._check_frequency_limit(user_id)
+            can_request, remaining_time = self._check_frequency_limit(user_id, group_id)
             if not can_request:
                 await self.api.post_group_msg(
                     group_id,
@@ -1,7 +1,9 @@
 import aiohttp
 import logging
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 import io
+from utils.http_client import http_session
+from utils.asset_registry import load_font
 
 # 设置日志
 _log = logging.getLogger(__name__)
@@ -18,7 +20,7 @@ async def fetch_asmr_data(page: int):
 
     try:
         timeout = aiohttp.ClientTimeout(total=30)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with http_session(timeout=timeout) as session:
             async with session.get(api_url, headers=headers) as response:
                 if response.status == 200:
                     data = await response.json()
@@ -43,7 +45,7 @@ async def fetch_audio_data(audio_id: int):
 
     try:
         timeout = aiohttp.ClientTimeout(total=30)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
+        async with http_session(timeout=timeout) as session:
             async with session.get(api_url, headers=headers) as response:
                 if response.status == 200:
                     data = await response.json()
@@ -121,16 +123,10 @@ def generate_audio_list_image(audio_list):
         image = Image.new("RGB", (width, height), background_color)
         draw = ImageDraw.Draw(image)
 
-        # 尝试加载字体
-        try:
-            title_font = ImageFont.truetype(font_path, 28)
-            content_font = ImageFont.truetype(font_path, 18)
-            number_font = ImageFont.truetype(font_path, 16)
-        except IOError:
-            _log.warning(f"字体文件未找到: {font_path}，使用默认字体")
-            title_font = ImageFont.load_default()
-            content_font = ImageFont.load_default()
-            number_font = ImageFont.load_default()
+        # 加载字体（找不到时注册表退回默认字体）
+        title_font = load_font(font_path, 28)
+        content_font = load_font(font_path, 18)
+        number_font = load_font(font_path, 16)
 
         # 绘制标题背景
         draw.rectangle([0, 0, width, 80], fill=(255, 255, 255))
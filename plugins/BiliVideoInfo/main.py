@@ -2,12 +2,14 @@ import aiohttp
 import asyncio
 import re
 import logging
-import time
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
 from ncatbot.core.element import MessageChain, Text, Image
+from utils.single_flight import get_single_flight
+from utils.rate_limiter import rate_limiter
+from utils.ttl_cache import TTLCache
 
 # 尝试导入插件管理器
 try:
@@ -24,6 +26,9 @@ except ImportError:
 bot = CompatibleEnrollment
 _log = logging.getLogger("BiliVideoInfo.main")
 
+# 同一视频的并发请求合并为一次
+video_info_flight = get_single_flight("bili_video_info")
+
 class BiliVideoInfo(BasePlugin):
     name = "BiliVideoInfo"
     version = "2.0.0"
@@ -40,12 +45,8 @@ class BiliVideoInfo(BasePlugin):
         }
 
         # 缓存系统
-        self.video_cache = {}
         self.cache_expire_time = 3600  # 1小时缓存
-
-        # 请求限制
-        self.last_request_time = {}
-        self.request_interval = 1  # 1秒间隔
+        self.video_cache = TTLCache(self.name, maxsize=500, ttl=self.cache_expire_time, max_bytes=16 * 1024 * 1024)
 
     async def on_load(self):
         """插件加载时初始化"""
@@ -61,29 +62,23 @@ class BiliVideoInfo(BasePlugin):
         """插件加载时初始化（新版本）"""
         await self.on_load()
 
-    def _is_cache_valid(self, cache_time: float) -> bool:
-        """检查缓存是否有效"""
-        return time.time() - cache_time < self.cache_expire_time
-
-    def _should_rate_limit(self, group_id: int) -> bool:
-        """检查是否需要限流"""
-        current_time = time.time()
-        last_time = self.last_request_time.get(group_id, 0)
-        return current_time - last_time < self.request_interval
-
     async def fetch_video_info(self, video_id: str, is_bv: bool = True) -> Optional[Dict]:
         """
         调用 B站 API 获取视频信息
         支持BV号和AV号
         """
         # 检查缓存
-        cache_key = video_id
-        if cache_key in self.video_cache:
-            cache_data, cache_time = self.video_cache[cache_key]
-            if self._is_cache_valid(cache_time):
-                _log.info(f"使用缓存数据: {video_id}")
-                return cache_data
+        cache_data = self.video_cache.get(video_id)
+        if cache_data is not None:
+            _log.info(f"使用缓存数据: {video_id}")
+            return cache_data
+
+        # 多个群同时解析同一个视频时只请求一次
+        return await video_info_flight.do((video_id, is_bv), self._request_video_info, video_id, is_bv)
 
+    async def _request_video_info(self, video_id: str, is_bv: bool) -> Optional[Dict]:
+        """请求 B站 API 并写入缓存"""
+        cache_key = video_id
         try:
             # 选择API URL
             if is_bv:
@@ -97,7 +92,7 @@ class BiliVideoInfo(BasePlugin):
                         data = await response.json()
 
                         # 缓存数据
-                        self.video_cache[cache_key] = (data, time.time())
+                        self.video_cache.set(cache_key, data)
 
                         _log.info(f"成功获取视频信息: {video_id}")
                         return data
@@ -270,11 +265,6 @@ class BiliVideoInfo(BasePlugin):
             await self.show_help(event.group_id)
             return
 
-        # 检查限流
-        if self._should_rate_limit(event.group_id):
-            _log.info(f"群 {event.group_id} 请求过于频繁，跳过处理")
-            return
-
         # 提取BV号和AV号
         bv_pattern = r"(BV[a-zA-Z0-9]{10})"
         av_pattern = r"av(\d+)"
@@ -300,8 +290,10 @@ class BiliVideoInfo(BasePlugin):
 
         _log.info(f"检测到视频: {[req[0] for req in video_requests]}")
 
-        # 更新请求时间
-        self.last_request_time[event.group_id] = time.time()
+        # 检查限流
+        if not rate_limiter.hit_all(self.name, event.user_id, event.group_id):
+            _log.info(f"群 {event.group_id} 请求过于频繁，跳过处理")
+            return
 
         # 并发获取视频信息
         try:
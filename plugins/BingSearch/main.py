@@ -1,6 +1,6 @@
 import aiohttp
 import asyncio
-import time
+import math
 from bs4 import BeautifulSoup
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
@@ -31,6 +31,9 @@ except ImportError:
         }
         return config_defaults.get(key, default)
 
+from utils.rate_limiter import rate_limiter
+from utils.ttl_cache import TTLCache
+
 bot = CompatibleEnrollment
 
 class BingSearch(BasePlugin):
@@ -44,44 +47,19 @@ class BingSearch(BasePlugin):
         self.bot_uin = get_config("bt_uin", 123456)
 
         # 缓存机制
-        self.cache = {}
-        self.cache_ttl = 300  # 5分钟缓存
-
-        # 请求限制
-        self.last_request_time = {}
-        self.request_interval = 2  # 2秒间隔
+        self.cache = TTLCache("BingSearch", maxsize=200, ttl=300, max_bytes=2 * 1024 * 1024)  # 5分钟缓存
 
     def _get_cache_key(self, query: str) -> str:
         """生成缓存键"""
         return f"bing_search_{hash(query.lower())}"
 
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """检查缓存是否有效"""
-        if cache_key not in self.cache:
-            return False
-
-        cache_time, _ = self.cache[cache_key]
-        return time.time() - cache_time < self.cache_ttl
-
     def _get_cached_result(self, cache_key: str) -> Optional[str]:
         """获取缓存结果"""
-        if self._is_cache_valid(cache_key):
-            _, result = self.cache[cache_key]
-            return result
-        return None
+        return self.cache.get(cache_key)
 
     def _set_cache(self, cache_key: str, result: str):
         """设置缓存"""
-        self.cache[cache_key] = (time.time(), result)
-
-        # 清理过期缓存
-        current_time = time.time()
-        expired_keys = [
-            key for key, (cache_time, _) in self.cache.items()
-            if current_time - cache_time > self.cache_ttl
-        ]
-        for key in expired_keys:
-            del self.cache[key]
+        self.cache.set(cache_key, result)
 
     async def fetch_bing_results(self, query: str) -> str:
         """访问 Bing 搜索并解析结果"""
@@ -257,27 +235,6 @@ class BingSearch(BasePlugin):
 
         return header + "\n".join(result_lines) + footer
 
-    def _check_request_limit(self, user_id: int) -> bool:
-        """检查用户请求频率限制"""
-        current_time = time.time()
-        if user_id in self.last_request_time:
-            time_diff = current_time - self.last_request_time[user_id]
-            if time_diff < self.request_interval:
-                return False
-
-        self.last_request_time[user_id] = current_time
-        return True
-
-    def _get_remaining_cooldown(self, user_id: int) -> int:
-        """获取剩余冷却时间"""
-        if user_id not in self.last_request_time:
-            return 0
-
-        current_time = time.time()
-        time_diff = current_time - self.last_request_time[user_id]
-        remaining = self.request_interval - time_diff
-        return max(0, int(remaining))
-
     @bot.group_event()
     @feature_required("Bing搜索", "/bing")
     async def handle_group_message(self, event: GroupMessage):
@@ -308,11 +265,11 @@ class BingSearch(BasePlugin):
             return
 
         # 检查请求频率限制
-        if not self._check_request_limit(user_id):
-            remaining = self._get_remaining_cooldown(user_id)
+        limit = rate_limiter.hit_all(self.name, user_id, group_id)
+        if not limit:
             await self.api.post_group_msg(
                 group_id,
-                text=f"⏰ 搜索请求过于频繁，请等待 {remaining} 秒后再试"
+                text=f"⏰ 搜索请求过于频繁，请等待 {math.ceil(limit.retry_after)} 秒后再试"
             )
             return
 
@@ -352,12 +309,10 @@ class BingSearch(BasePlugin):
         self.logger.info(f"插件版本: {self.version}")
         self.logger.info("Bing搜索功能已启用")
 
-        # 清理缓存和请求记录
+        # 清理缓存
         self.cache.clear()
-        self.last_request_time.clear()
 
     async def on_unload(self):
         """插件卸载时的清理"""
         self.cache.clear()
-        self.last_request_time.clear()
         self.logger.info(f"{self.name} 插件已卸载")
@@ -1,7 +1,8 @@
 import logging
-import asyncio
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
+from utils.command_router import command_router, route
+from utils.rate_limiter import USER, rate_limiter
 from .utils import get_cos_images
 from utils.group_forward_msg import send_group_forward_msg_ws
 
@@ -24,13 +25,13 @@ class COSPlugin(BasePlugin):
         self.total_images = 0
 
         # 频率控制
-        self.last_request_time = {}
-        self.request_interval = 3.0  # 3秒间隔
+        self.request_interval = rate_limiter.min_interval(self.name, USER)
 
     async def on_load(self):
+        command_router.register_plugin(self)
         _log.info(f"COSPlugin v{self.version} 插件已加载")
 
-    @bot.group_event()
+    @route(prefixes=["/cos"], commands=["cos帮助", "cos统计"])
     async def handle_group_message(self, event: GroupMessage):
         raw_message = event.raw_message.strip()
         user_id = event.user_id
@@ -48,15 +49,10 @@ class COSPlugin(BasePlugin):
             return
 
         # 频率控制
-        current_time = asyncio.get_event_loop().time()
-        if user_id in self.last_request_time:
-            time_diff = current_time - self.last_request_time[user_id]
-            if time_diff < self.request_interval:
-                remaining = self.request_interval - time_diff
-                await self.api.post_group_msg(group_id=group_id, text=f"⏳ 请求过于频繁，请等待 {remaining:.1f} 秒后再试")
-                return
-
-        self.last_request_time[user_id] = current_time
+        limit = rate_limiter.hit_all(self.name, user_id, group_id)
+        if not limit:
+            await self.api.post_group_msg(group_id=group_id, text=f"⏳ 请求过于频繁，请等待 {limit.retry_after:.1f} 秒后再试")
+            return
 
         try:
             self.request_count += 1
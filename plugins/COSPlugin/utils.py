@@ -3,6 +3,7 @@ import hashlib
 import logging
 from typing import List, Optional
 from io import BytesIO
+from utils.http_client import httpx_client
 
 _log = logging.getLogger(__name__)
 
@@ -25,7 +26,7 @@ async def get_cos_images(num: int) -> List[str]:
     try:
         _log.info(f"请求COS图片API: {api_url}")
 
-        async with httpx.AsyncClient(timeout=15.0) as client:
+        async with httpx_client(timeout=15.0) as client:
             response = await client.get(api_url)
             response.raise_for_status()
 
@@ -0,0 +1,202 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from os.path import dirname
+from typing import Any, Dict, List, Optional, Tuple
+
+_log = logging.getLogger(__name__)
+
+JSON_DIR = dirname(__file__) + "/json"
+CATALOG_PATH = "data/csgo_catalog.db"
+# 表结构变化时递增，强制重建
+SCHEMA_VERSION = "1"
+
+# 数据源文件 -> 写入的表；箱子按 cases 在前、souvenir 在后编号
+SOURCES = {
+    "cases": f"{JSON_DIR}/cases.json",
+    "souvenir": f"{JSON_DIR}/souvenir.json",
+    "skins": f"{JSON_DIR}/skins.json",
+}
+
+
+class Catalog:
+    """
+    箱子/皮肤数据的 SQLite 目录
+
+    首次使用时把 json 目录下的大文件导入 data/csgo_catalog.db，之后按名称或序号按需查询，
+    不再在启动时把全部箱子和皮肤解析成模型对象。
+    json 文件的大小/修改时间变化时重新计算哈希，哈希变化才重建目录。
+    """
+
+    def __init__(self, db_path: str = CATALOG_PATH, sources: Optional[Dict[str, str]] = None):
+        self.db_path = db_path
+        self.sources = sources or SOURCES
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.RLock()
+
+    def connection(self) -> sqlite3.Connection:
+        """获取目录连接，必要时先检查并重建目录"""
+        if self._conn is None:
+            with self._lock:
+                if self._conn is None:
+                    self._conn = self._open()
+        return self._conn
+
+    def ensure_ready(self) -> None:
+        """提前打开目录（可在线程中调用，避免首次开箱时阻塞）"""
+        self.connection()
+
+    def _open(self) -> sqlite3.Connection:
+        os.makedirs(dirname(self.db_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS catalog_meta (
+                source TEXT PRIMARY KEY,
+                sha256 TEXT,
+                size INTEGER,
+                mtime_ns INTEGER
+            )
+        """)
+        stale = self._stale_sources(conn)
+        if stale:
+            _log.info(f"CSGO数据目录需要重建: {', '.join(stale)}")
+            self._rebuild(conn)
+        return conn
+
+    @staticmethod
+    def _file_sha256(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _source_states(self) -> Dict[str, Tuple[Optional[int], Optional[int]]]:
+        states = {}
+        for name, path in self.sources.items():
+            try:
+                st = os.stat(path)
+                states[name] = (st.st_size, st.st_mtime_ns)
+            except FileNotFoundError:
+                states[name] = (None, None)
+        return states
+
+    def _stale_sources(self, conn: sqlite3.Connection) -> List[str]:
+        """对比记录的文件状态，大小/修改时间变化时再比对哈希"""
+        recorded = {
+            row[0]: row[1:]
+            for row in conn.execute("SELECT source, sha256, size, mtime_ns FROM catalog_meta")
+        }
+        if recorded.get("__schema__", (None,))[0] != SCHEMA_VERSION:
+            return ["__schema__"]
+
+        stale = []
+        for name, (size, mtime_ns) in self._source_states().items():
+            old = recorded.get(name)
+            if old is None:
+                stale.append(name)
+                continue
+            old_sha, old_size, old_mtime = old
+            if (size, mtime_ns) == (old_size, old_mtime):
+                continue
+            if size is None or old_sha is None or self._file_sha256(self.sources[name]) != old_sha:
+                stale.append(name)
+            else:
+                # 内容未变（例如仅被 touch），只更新记录的文件状态
+                conn.execute(
+                    "UPDATE catalog_meta SET size = ?, mtime_ns = ? WHERE source = ?", (size, mtime_ns, name)
+                )
+        conn.commit()
+        return stale
+
+    def _load_json(self, name: str) -> List[Dict[str, Any]]:
+        path = self.sources[name]
+        if not os.path.exists(path):
+            _log.warning(f"CSGO数据文件不存在，跳过: {path}")
+            return []
+        with open(path, "rb") as f:
+            return json.loads(f.read())
+
+    def _rebuild(self, conn: sqlite3.Connection) -> None:
+        """从 json 文件重建整个目录"""
+        start = time.perf_counter()
+        cases = self._load_json("cases")
+        souvenirs = self._load_json("souvenir")
+        skins = self._load_json("skins")
+
+        with conn:
+            conn.executescript("""
+                DROP TABLE IF EXISTS crates;
+                DROP TABLE IF EXISTS skins;
+                CREATE TABLE crates (
+                    idx INTEGER PRIMARY KEY,
+                    id TEXT,
+                    name TEXT NOT NULL,
+                    type TEXT NOT NULL,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX idx_crates_name ON crates(name);
+                CREATE INDEX idx_crates_type ON crates(type, idx);
+                CREATE TABLE skins (
+                    seq INTEGER PRIMARY KEY,
+                    id TEXT,
+                    name TEXT NOT NULL,
+                    pattern_name TEXT,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX idx_skins_name ON skins(name, seq);
+            """)
+            conn.executemany(
+                "INSERT INTO crates (idx, id, name, type, data) VALUES (?, ?, ?, ?, ?)",
+                (
+                    (idx, item.get("id"), item["name"], item.get("type", ""), json.dumps(item, ensure_ascii=False))
+                    for idx, item in enumerate(cases + souvenirs, start=1)
+                ),
+            )
+            conn.executemany(
+                "INSERT INTO skins (id, name, pattern_name, data) VALUES (?, ?, ?, ?)",
+                (
+                    (
+                        item.get("id"),
+                        item["name"],
+                        (item.get("pattern") or {}).get("name"),
+                        json.dumps(item, ensure_ascii=False),
+                    )
+                    for item in skins
+                ),
+            )
+            conn.execute("DELETE FROM catalog_meta")
+            conn.execute(
+                "INSERT INTO catalog_meta (source, sha256) VALUES ('__schema__', ?)", (SCHEMA_VERSION,)
+            )
+            states = self._source_states()
+            for name, path in self.sources.items():
+                size, mtime_ns = states[name]
+                sha = self._file_sha256(path) if size is not None else None
+                conn.execute(
+                    "INSERT INTO catalog_meta (source, sha256, size, mtime_ns) VALUES (?, ?, ?, ?)",
+                    (name, sha, size, mtime_ns),
+                )
+        _log.info(
+            f"CSGO数据目录已重建: {len(cases)} 个武器箱, {len(souvenirs)} 个纪念包, {len(skins)} 个皮肤, "
+            f"耗时 {(time.perf_counter() - start) * 1000:.0f}ms"
+        )
+
+    def query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        conn = self.connection()
+        with self._lock:
+            return conn.execute(sql, params).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# 插件内共享的目录实例
+catalog = Catalog()
@@ -1,17 +1,25 @@
 import json
 import random
-from os.path import dirname
-from typing import List, Optional
+from collections import OrderedDict
+from itertools import accumulate
+from typing import Dict, List, Optional, Tuple
 import logging
-import httpx
+from .catalog import catalog
 from .model import Contains, Crate
 
-JSON_DIR = dirname(__file__) + "/json"
+# 同时保留在内存中的箱子对象数量
+CRATE_CACHE_SIZE = 32
+
+
 class Crates:
-    def __init__(self):
-        self.cases: List[Crate] = []
-        self.souvenirs: List[Crate] = []
+    """
+    武器箱/纪念包数据
+
+    箱子数据存放在 SQLite 目录中（见 catalog.py），名称列表在首次使用时读取，
+    单个箱子按需解析并放入小型 LRU 缓存，不再在导入时解析全部箱子。
+    """
 
+    def __init__(self):
         self.rarity_list = [
             "消费级",
             "工业级",
@@ -22,65 +30,100 @@ class Crates:
             "非凡",
             "违禁",
         ]
-        self.cases: List[Crate] = [Crate(**item) for item in self.get_cases_json()]
-        self.souvenirs: List[Crate] = [
-            Crate(**item) for item in self.get_souvenirs_json()
-        ]
+        self._case_names: Optional[List[str]] = None
+        self._souvenir_names: Optional[List[str]] = None
+        self._crate_cache: "OrderedDict[int, Crate]" = OrderedDict()
+        # crate.id -> (物品列表, 累积权重)
+        self._sampling_tables: Dict[str, Tuple[List[Contains], List[float]]] = {}
+
+    def _load_names(self) -> None:
+        """读取有序的箱子名称列表（武器箱在前，纪念包在后）"""
+        rows = catalog.query("SELECT name, type FROM crates ORDER BY idx")
+        self._case_names = [name for name, crate_type in rows if crate_type == "Case"]
+        self._souvenir_names = [name for name, crate_type in rows if crate_type != "Case"]
 
-    def get_cases_json(self):
-        with open(f"{JSON_DIR}/cases.json", "rb") as f:
-            data = f.read()
-            return json.loads(data)
+    @property
+    def case_names(self) -> List[str]:
+        if self._case_names is None:
+            self._load_names()
+        return self._case_names
 
-    def get_souvenirs_json(self):
-        with open(f"{JSON_DIR}/souvenir.json", "rb") as f:
-            data = f.read()
-            return json.loads(data)
+    @property
+    def souvenir_names(self) -> List[str]:
+        if self._souvenir_names is None:
+            self._load_names()
+        return self._souvenir_names
+
+    @property
+    def crate_names(self) -> List[str]:
+        return self.case_names + self.souvenir_names
+
+    @property
+    def cases(self) -> List[Crate]:
+        """全部武器箱（会解析所有武器箱，仅用于兼容旧代码）"""
+        return [self._get_crate(idx) for idx in range(1, len(self.case_names) + 1)]
+
+    @property
+    def souvenirs(self) -> List[Crate]:
+        """全部纪念包（会解析所有纪念包，仅用于兼容旧代码）"""
+        offset = len(self.case_names)
+        return [self._get_crate(offset + i) for i in range(1, len(self.souvenir_names) + 1)]
+
+    def _get_crate(self, idx: int) -> Optional[Crate]:
+        """按目录序号获取箱子对象"""
+        crate = self._crate_cache.get(idx)
+        if crate is not None:
+            self._crate_cache.move_to_end(idx)
+            return crate
+        rows = catalog.query("SELECT data FROM crates WHERE idx = ?", (idx,))
+        if not rows:
+            return None
+        crate = Crate(**json.loads(rows[0][0]))
+        self._crate_cache[idx] = crate
+        while len(self._crate_cache) > CRATE_CACHE_SIZE:
+            self._crate_cache.popitem(last=False)
+        return crate
+
+    def _find_crate(self, name: str, crate_type: str) -> Optional[Crate]:
+        """先按名称精确查找，找不到时按包含关系查找"""
+        rows = catalog.query(
+            "SELECT idx FROM crates WHERE type = ? AND name = ? ORDER BY idx LIMIT 1", (crate_type, name)
+        ) or catalog.query(
+            "SELECT idx FROM crates WHERE type = ? AND instr(name, ?) > 0 ORDER BY idx LIMIT 1", (crate_type, name)
+        )
+        return self._get_crate(rows[0][0]) if rows else None
 
-    # def get_case_name_list(self) -> list:
-    #     return [f"{idx+1}. {case.name}" for idx, case in enumerate(self.cases)]
     def get_case_name_list(self) -> list:
-    # 获取所有 case 的名称列表，索引从 40 开始
-        name_list = [f"{case.name}" for idx, case in enumerate(self.cases)]
-    
-    # 将名称列表转换为字典格式
-        name_dict = {idx + 1: name for idx, name in enumerate(name_list)}
-    
-    # 将字典写入 c.json 文件
-        with open('c.json', 'w', encoding='utf-8') as f:
-            json.dump(name_dict, f, ensure_ascii=False, indent=4)
+        """武器箱名称列表（序号从 1 开始）"""
+        return list(self.case_names)
 
-        return name_list
-    # def get_souvenir_name_list(self) -> list:
-    #     return [f"{idx+41}. {souvenir.name}" for idx, souvenir in enumerate(self.souvenirs)]
     def get_souvenir_name_list(self) -> list:
-    # 获取所有 souvenir 的名称列表
-     name_list = [souvenir.name for souvenir in self.souvenirs]
-    
-    # 将名称列表转换为字典格式
-     name_dict = {idx+41: name for idx, name in enumerate(name_list)}
-    
-    # 将字典写入 s.json 文件
-     with open('s.json', 'w', encoding='utf-8') as f:
-            json.dump(name_dict, f, ensure_ascii=False, indent=4)
+        """纪念包名称列表（序号接在武器箱之后）"""
+        return list(self.souvenir_names)
+
+    def get_crate_by_index(self, index: int) -> Tuple[Optional[Crate], Optional[str]]:
+        """
+        按列表序号获取箱子
+
+        Returns:
+            (箱子, 类型 "weapon"/"souvenir")，序号无效时返回 (None, None)
+        """
+        if index < 1 or index > len(self.case_names) + len(self.souvenir_names):
+            return None, None
+        case_type = "weapon" if index <= len(self.case_names) else "souvenir"
+        return self._get_crate(index), case_type
 
-     return name_list
     def get_random_case(self) -> dict:
-        return random.choice(self.cases)
+        return self._get_crate(random.randint(1, len(self.case_names)))
 
     def get_case_by_name(self, case_name: str) -> Crate:
         # raw_name = case_name.replace("武器箱", "")
-        for case in self.cases:
-            if case_name in case.name:
-                return case
-        return None
+        return self._find_crate(case_name, "Case")
 
     def get_souvenir_by_name(self, sv_name: str) -> Crate:
         # raw_name = sv_name.replace("纪念包", "")
-        for sv in self.souvenirs:
-            if sv_name in sv.name:
-                return sv
-        return None
+        return self._find_crate(sv_name, "Souvenir")
+
     # def get_case_by_name(self, name: str) -> Optional[Crate]:
         
     #     for case in self.cases:
@@ -111,26 +154,42 @@ class Crates:
         return random.choices(sv.contains, probability_list, k=1)[0]
 
     def open_crate_multiple(self, crate: Crate, amount: int) -> List[Contains]:
-        items: List[Contains] = []
+        """一次抽样得到 amount 个物品，概率与逐个调用 open_case / open_souvenir 相同"""
+        population, cum_weights = self.get_sampling_table(crate)
+        return random.choices(population, cum_weights=cum_weights, k=amount)
+
+    def get_sampling_table(self, crate: Crate) -> Tuple[List[Contains], List[float]]:
+        """
+        获取箱子的抽样表（按 crate.id 缓存）
+
+        把普通物品和罕见特殊物品合并为一张累积权重表:
+        普通物品共占 1 - rare_item_prob，按品质概率分配；特殊物品平分 rare_item_prob。
+        """
+        table = self._sampling_tables.get(crate.id)
+        if table is not None:
+            return table
+
         result = self.calculate_prob_list(crate)
-        for _ in range(amount):
-            if crate.type == "Case":
-                items.append(
-                    self.open_case(
-                        crate,
-                        result["contains_prob_list"],
-                        result["has_rare"],
-                        result["rare_item_prob"],
-                    )
-                )
-            else:
-                items.append(
-                    self.open_souvenir(
-                        crate,
-                        result["contains_prob_list"],
-                    )
-                )
-        return items
+        prob_list = result["contains_prob_list"]
+        population: List[Contains] = []
+        weights: List[float] = []
+
+        if crate.type == "Case" and (not result["has_rare"] or not crate.contains):
+            # 与 open_case 一致：没有隐秘品质时只从特殊物品中抽取
+            population = list(crate.contains_rare) or list(crate.contains)
+            weights = [1.0] * len(population)
+        else:
+            rare_prob = result["rare_item_prob"] if crate.type == "Case" and crate.contains_rare else 0
+            total = sum(prob_list)
+            population.extend(crate.contains)
+            weights.extend((1 - rare_prob) * p / total for p in prob_list)
+            if rare_prob:
+                population.extend(crate.contains_rare)
+                weights.extend([rare_prob / len(crate.contains_rare)] * len(crate.contains_rare))
+
+        table = (population, list(accumulate(weights)))
+        self._sampling_tables[crate.id] = table
+        return table
 
     def calculate_prob_list(self, crate: Crate):
         all_rarities = [key.rarity for key in crate.contains]
@@ -6,11 +6,15 @@ from ncatbot.core.message import GroupMessage
 from ncatbot.core.element import MessageChain, Text, Image
 from .utils import Utils
 from .database import CSGODatabase
+from .catalog import catalog
 from utils.config_manager import get_config
 
 bot = CompatibleEnrollment
 _log = logging.getLogger(__name__)
 
+# 单次开箱数量上限（抽样为一次批量操作，结果图最多展示 20 个）
+MAX_OPEN_AMOUNT = 500
+
 class CSGOCaseOpening(BasePlugin):
     name = "CSGOCaseOpening"  # 插件名称
     version = "2.0.0"  # 插件版本
@@ -22,6 +26,8 @@ class CSGOCaseOpening(BasePlugin):
         self.request_count = 0
         self.error_count = 0
         self.total_opened_cases = 0
+        # 在线程中检查/重建箱子数据目录，避免首次开箱时阻塞事件循环
+        await asyncio.to_thread(catalog.ensure_ready)
 
         _log.info(f"{self.name} v{self.version} 插件已加载")
         _log.info("CSGO开箱模拟器已启用")
@@ -138,7 +144,7 @@ class CSGOCaseOpening(BasePlugin):
                     await self.api.post_group_msg(event.group_id, text="❌ 获取排行榜失败")
 
             elif raw_message == "/开箱帮助":
-                help_text = """🎮 CSGO开箱模拟器帮助
+                help_text = f"""🎮 CSGO开箱模拟器帮助
 
 📝 基本命令：
 • /武器箱 - 查看武器箱列表
@@ -164,7 +170,8 @@ class CSGOCaseOpening(BasePlugin):
 
 ⚠️ 注意事项：
 • 序号请参考箱子列表
-• 开箱数量范围：1-50个
+• 开箱数量范围：1-{MAX_OPEN_AMOUNT}个
+• 超过20个时图片只展示品质最高的20个
 • 默认开箱数量：20个
 • 仅为娱乐模拟，非真实开箱"""
 
@@ -190,8 +197,8 @@ class CSGOCaseOpening(BasePlugin):
                             await self.api.post_group_msg(event.group_id, text="❌ 数量必须是数字")
                             return
                         amount = int(parts[2])
-                        if amount < 1 or amount > 50:
-                            await self.api.post_group_msg(event.group_id, text="❌ 开箱数量必须在1-50之间")
+                        if amount < 1 or amount > MAX_OPEN_AMOUNT:
+                            await self.api.post_group_msg(event.group_id, text=f"❌ 开箱数量必须在1-{MAX_OPEN_AMOUNT}之间")
                             return
 
                     _log.info(f"用户 {event.user_id} 在群 {event.group_id} 开箱: 序号{index}, 数量{amount}")
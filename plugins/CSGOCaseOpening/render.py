@@ -0,0 +1,195 @@
+"""
+开箱结果渲染 - 只依赖 Pillow 的纯函数，可在渲染进程池中执行
+"""
+import os
+from functools import lru_cache
+from io import BytesIO
+from os.path import dirname
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+from PIL import Image, ImageDraw
+from utils.asset_registry import load_font, load_template
+
+PATH = dirname(__file__)
+ASSSETS_DIR = PATH + "/assets"
+FONT_DIR = PATH + "/font/NotoSansSC-Bold.otf"
+
+RARITY_COLOR = {
+    "消费级": {"bg": "#5D6884", "stroke": "#4C556D"},
+    "工业级": {"bg": "#3869E8", "stroke": "#2E5AC9"},
+    "军规级": {"bg": "#3B38E8", "stroke": "#2827A7"},
+    "受限": {"bg": "#9033D9", "stroke": "#6C26A7"},
+    "保密": {"bg": "#DE55EA", "stroke": "#A842B3"},
+    "隐秘": {"bg": "#8D1F3B", "stroke": "#6C1531"},
+    "违禁": {"bg": "#C7B61F", "stroke": "#AD9F1E"},
+    "非凡": {"bg": "#C7B61F", "stroke": "#AD9F1E"},
+}
+
+# (稀有度, 名称, 磨损)
+CardInfo = Tuple[str, str, Optional[str]]
+
+
+def decode_image(data: Optional[bytes]) -> Image.Image:
+    """解码下载的图片，失败时使用占位图"""
+    if data:
+        try:
+            img = Image.open(BytesIO(data))
+            img.load()
+            return img
+        except Exception:
+            pass
+    return load_template(os.path.join(ASSSETS_DIR, "error.png"), mode=None)
+
+
+@lru_cache(maxsize=16)
+def _stroke_band(stoke_color) -> Image.Image:
+    """旋转后的斜纹条，按颜色缓存（只作为粘贴源使用）"""
+    band = Image.new("RGBA", (300, 20), stoke_color)
+    return band.rotate(45, expand=1)
+
+
+def generate_item_card_band(image: Image.Image, color: str, stoke_color) -> Image.Image:
+    band_bg = Image.new("RGBA", (500, 121), color)
+    image.paste(band_bg, (0, 379), band_bg)
+    band = _stroke_band(stoke_color)
+    for i in range(7):
+        image.paste(band, (-130 + i * 80, 350), band)
+    return image
+
+
+def generate_item_card(skin: Image.Image, rarity: str, name: str, wear: Union[str, None]):
+    image = Image.new("RGBA", (500, 500), "#D4D2D5")
+    image = generate_item_card_band(
+        image, RARITY_COLOR[rarity]["bg"], RARITY_COLOR[rarity]["stroke"]
+    )
+    # 背景在注册表中已预先缩放，只作为粘贴源使用
+    background_img = load_template(ASSSETS_DIR + "/bg.png", size=(500, 379), mode=None, copy=False)
+    image.paste(background_img, (0, 0), background_img)
+    skin = skin.resize((500, 394), Image.LANCZOS)
+    image.paste(skin, (0, 0), skin)
+    draw = ImageDraw.Draw(image)
+    font = load_font(FONT_DIR, 35)
+    draw.text((20, 390), "\n".join(name.split(" | ")), font=font, fill="white")
+    if wear != None:
+        draw.text((480 - font.getbbox(wear)[2], 435), wear, font=font, fill="white")
+    image = image.resize((128, 128), Image.LANCZOS)
+    return image
+
+
+def generate_main_img(skins: List[Image.Image], cards: Sequence[CardInfo]):
+    for i in range(len(skins)):
+        rarity, name, wear = cards[i]
+        skins[i] = generate_item_card(skins[i], rarity, name, wear)
+    main = load_template(ASSSETS_DIR + "/main_template.png", mode=None)
+    columns = 5
+    rows = (len(skins) - 1) // columns + 1
+    if rows == 1:
+        columns = len(skins)
+    for i in range(rows):
+        for j in range(columns):
+            index = i * columns + j
+            if index >= len(skins):
+                break
+            main.paste(
+                skins[index], (455 + j * 164, 101 + 151 * i), skins[index]
+            )
+    return main
+
+
+def generate_statistic(main_img: Image.Image, top_three: dict):
+    main_draw = ImageDraw.Draw(main_img)
+    info_font = load_font(FONT_DIR, 32)
+    i = 0
+    for rare, count in top_three.items():
+        main_draw.rounded_rectangle(
+            (25, 246 + 80 * i, 405, 313 + 80 * i),
+            radius=2,
+            fill=RARITY_COLOR[rare]["bg"],
+        )
+        main_draw.text((35, 255 + 80 * i), rare, font=info_font, fill="#FFFFFF")
+        main_draw.text(
+            (345, 255 + 80 * i), f"x{count}", font=info_font, fill="#FFFFFF"
+        )
+        i += 1
+
+
+def generate_info(main_img: Image.Image, case_name: str, user_name: str):
+    info_font = load_font(FONT_DIR, 32)
+    text_width, text_height = info_font.getbbox(user_name[:12])[2:4]
+    rank_img = load_template(ASSSETS_DIR + "/rank.png", size=(71, 43), mode=None, copy=False)
+    main_img.paste(rank_img, ((500 - text_width) // 2 - 75, 160), rank_img)
+
+    main_draw = ImageDraw.Draw(main_img)
+    main_draw.text(
+        ((500 - text_width) // 2, 155), user_name[:12], font=info_font, fill="white"
+    )
+
+    text_width, text_height = info_font.getbbox(case_name[:12])[2:4]
+    main_draw.text(
+        ((430 - text_width) // 2, 645), case_name[:12], font=info_font, fill="white"
+    )
+
+    return main_img
+
+
+def render_open_result(
+    skin_images: List[Optional[bytes]],
+    cards: Sequence[CardInfo],
+    case_image: Optional[bytes],
+    case_name: str,
+    user_name: str,
+    top_three: Dict[str, int],
+) -> Image.Image:
+    """
+    合成开箱结果图
+
+    Args:
+        skin_images: 各物品图片的原始字节（下载失败为 None）
+        cards: 与 skin_images 对应的 (稀有度, 名称, 磨损)
+        case_image: 箱子图片的原始字节
+        case_name: 箱子名称
+        user_name: 用户名称
+        top_three: 数量最多的前三个稀有度统计
+    """
+    main_img = generate_main_img([decode_image(data) for data in skin_images], cards)
+    main_img = generate_info(main_img, case_name, user_name)
+    case_img = decode_image(case_image).resize((173, 134), Image.LANCZOS)
+    main_img.paste(case_img, (128, 505), case_img)
+    generate_statistic(main_img, top_three)
+    return main_img
+
+
+def render_case_list(case_list: list, start_index: int = 1) -> Image.Image:
+    """
+    根据箱子列表生成图片，并为每个箱子添加序号。
+    :param case_list: 箱子名称列表
+    :param start_index: 序号起始值
+    """
+    font = load_font(FONT_DIR, 25)
+
+    # 计算每行的高度
+    line_height = font.getbbox("A")[3] + 2
+
+    # 行数
+    rows = len(case_list) // 2 + 1
+    width = len(case_list[0]) * 100
+    height = (rows + 1) * line_height
+
+    # 设置每列的宽度
+    column_width = width // 2
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+
+    # 遍历列表并绘制文本
+    for i, item in enumerate(case_list):
+        # 计算文本所在列的坐标
+        if i % 2 == 0:
+            x = 40
+        else:
+            x = column_width + 10
+
+        # 计算文本所在行的坐标
+        y = (i // 2) * line_height + 15
+
+        # 绘制文本，添加序号
+        draw.text((x, y), f"{start_index + i}. {item}", font=font, fill="#272829")
+    return image
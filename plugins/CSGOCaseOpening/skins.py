@@ -1,22 +1,12 @@
 import json
 import random
-from os.path import dirname
-from typing import List
+from typing import List, Optional
+from .catalog import catalog
 from .model import SelectedSkin, Skin
 
-JSON_DIR = dirname(__file__) + "/json"
 
 class Skins:
-    def __init__(self):
-        self.skins: List[Skin] = []
-        self.skins: List[Skin] = [
-            Skin(**self.add_missing_fields(item)) for item in self.get_skins_json()
-        ]
-
-    def get_skins_json(self):
-        with open(f"{JSON_DIR}/skins.json", "rb") as f:
-            data = f.read()
-            return json.loads(data)
+    """皮肤数据，按名称从 SQLite 目录中按需查询（见 catalog.py）"""
 
     def add_missing_fields(self, item: dict) -> dict:
         """为缺失字段提供默认值"""
@@ -24,20 +14,31 @@ class Skins:
             item["collection"] = None  # 如果缺少 collection 字段，设置为 None
         return item
 
-    def get_skins(self, name: str) -> SelectedSkin:
-        for skin in self.skins:
-            if skin.name == name:
-                return SelectedSkin(
-                    id=skin.id,
-                    name=skin.name,
-                    image=skin.image,
-                    rarity=skin.rarity.name,  # 将 Rarity 对象转换为字符串
-                    wear=random.choice(skin.wears).name if skin.wears else None,  # 将 Wear 对象转换为字符串
-                )
+    def _to_skin(self, data: str) -> Skin:
+        return Skin(**self.add_missing_fields(json.loads(data)))
+
+    @property
+    def skins(self) -> List[Skin]:
+        """全部皮肤（会解析整个皮肤库，仅用于兼容旧代码）"""
+        return [self._to_skin(row[0]) for row in catalog.query("SELECT data FROM skins ORDER BY seq")]
+
+    def get_skins(self, name: str) -> Optional[SelectedSkin]:
+        # 重名时取第一个（与原先线性查找结果一致）
+        rows = catalog.query("SELECT data FROM skins WHERE name = ? ORDER BY seq LIMIT 1", (name,))
+        if not rows:
+            return None
+        skin = self._to_skin(rows[0][0])
+        return SelectedSkin(
+            id=skin.id,
+            name=skin.name,
+            image=skin.image,
+            rarity=skin.rarity.name,  # 将 Rarity 对象转换为字符串
+            wear=random.choice(skin.wears).name if skin.wears else None,  # 将 Wear 对象转换为字符串
+        )
 
     def search_skin(self, skin_name: str) -> List[Skin]:
-        found_skin_list = []
-        for skin in self.skins:
-            if skin.pattern and skin_name.lower() in skin.pattern.name:
-                found_skin_list.append(skin)
-        return found_skin_list
+        rows = catalog.query(
+            "SELECT data FROM skins WHERE pattern_name IS NOT NULL AND instr(pattern_name, ?) > 0 ORDER BY seq",
+            (skin_name.lower(),),
+        )
+        return [self._to_skin(row[0]) for row in rows]
@@ -9,6 +9,8 @@ from PluginManager.plugin_manager import feature_required
 from urllib.parse import quote
 from utils.group_forward_msg import send_group_forward_msg_ws
 from utils.group_forward_msg import MessageBuilder, cq_img
+from utils.rate_limiter import rate_limiter
+from utils.ttl_cache import TTLCache
 import re
 from typing import Dict, List, Any, Optional
 
@@ -21,11 +23,7 @@ class ComicSearch(BasePlugin):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         # 缓存系统
-        self.cache = {}
-        self.cache_ttl = 300  # 5分钟缓存
-        # 请求限制
-        self.last_request_time = {}
-        self.request_interval = 2  # 2秒间隔
+        self.cache = TTLCache("ComicSearch", maxsize=100, ttl=300, max_bytes=4 * 1024 * 1024)  # 5分钟缓存
 
     async def __onload__(self):
         """插件加载时调用"""
@@ -38,32 +36,17 @@ class ComicSearch(BasePlugin):
         """生成缓存键"""
         return f"comic_search:{query}:{limit}"
 
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """检查缓存是否有效"""
-        if cache_key not in self.cache:
-            return False
-        timestamp, _ = self.cache[cache_key]
-        return time.time() - timestamp < self.cache_ttl
-
     def _get_cached_result(self, cache_key: str) -> Optional[Dict[str, Any]]:
         """获取缓存结果"""
-        if self._is_cache_valid(cache_key):
-            _, result = self.cache[cache_key]
-            return result
-        return None
+        return self.cache.get(cache_key)
 
     def _set_cache(self, cache_key: str, result: Dict[str, Any]):
         """设置缓存"""
-        self.cache[cache_key] = (time.time(), result)
+        self.cache.set(cache_key, result)
 
-    def _check_request_limit(self, user_id: int) -> bool:
+    def _check_request_limit(self, user_id: int, group_id: int = None) -> bool:
         """检查请求频率限制"""
-        current_time = time.time()
-        if user_id in self.last_request_time:
-            if current_time - self.last_request_time[user_id] < self.request_interval:
-                return False
-        self.last_request_time[user_id] = current_time
-        return True
+        return rate_limiter.hit_all(self.name, user_id, group_id).allowed
 
     async def fetch_comics(self, query: str, limit: int = 6, offset: int = 0) -> Optional[Dict[str, Any]]:
         """
@@ -381,7 +364,7 @@ class ComicSearch(BasePlugin):
                 return
 
             # 检查请求频率限制
-            if not self._check_request_limit(event.user_id):
+            if not self._check_request_limit(event.user_id, event.group_id):
                 await self.api.post_group_msg(
                     event.group_id,
                     text="⏰ 请求过于频繁，请等待2秒后再试"
@@ -0,0 +1,3 @@
+from .main import CommandRouter
+
+__all__ = ["CommandRouter"]
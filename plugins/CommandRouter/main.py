@@ -0,0 +1,25 @@
+"""
+命令路由插件 - 统一接收群消息并按路由表分发给各插件
+"""
+from ncatbot.plugin import BasePlugin, CompatibleEnrollment
+from ncatbot.core.message import GroupMessage
+from ncatbot.utils.logger import get_log
+
+from utils.command_router import command_router
+
+bot = CompatibleEnrollment
+_log = get_log()
+
+class CommandRouter(BasePlugin):
+    """命令路由插件"""
+
+    name = "CommandRouter"
+    version = "1.0.0"
+
+    async def on_load(self):
+        _log.info(f"{self.name} 插件已加载，版本: {self.version}")
+
+    @bot.group_event()
+    async def on_group_event(self, msg: GroupMessage):
+        """把群消息交给命令路由器，只调用前缀/正则匹配的处理器"""
+        await command_router.dispatch(msg)
@@ -0,0 +1,3 @@
+from .main import CoreServices
+
+__all__ = ["CoreServices"]
@@ -0,0 +1,88 @@
+"""
+核心服务插件 - 随机器人启动和关闭共享的基础服务
+"""
+from ncatbot.plugin import BasePlugin, CompatibleEnrollment
+from ncatbot.core.message import GroupMessage, PrivateMessage
+from ncatbot.utils.logger import get_log
+
+from PluginManager.plugin_manager import master_required
+from utils.broadcast import broadcaster
+from utils.command_router import command_router, route
+from utils.database_pool import close_all_databases
+from utils.handler_profiler import handler_profiler
+from utils.http_client import http_manager
+from utils.loop_watchdog import loop_watchdog
+from utils.metrics import instrument_api, metrics_server, record_message_received
+from utils.onebot_ws_client import close_onebot_client
+from utils.render_executor import render_executor
+
+bot = CompatibleEnrollment
+_log = get_log()
+
+class CoreServices(BasePlugin):
+    """核心服务插件"""
+
+    name = "CoreServices"
+    version = "1.0.0"
+
+    async def on_load(self):
+        """启动共享服务"""
+        # 兼容注册的事件处理器在所有插件加载后才订阅，这里先接管事件总线以便自动计时
+        handler_profiler.instrument_event_bus(self._event_bus)
+        command_router.register_plugin(self)
+        # 所有插件共用同一个 BotAPI，计时后可统计接口耗时和发出消息数
+        instrument_api(self.api)
+        await http_manager.start()
+        render_executor.start()
+        loop_watchdog.start()
+        await metrics_server.start()
+        try:
+            # 继续上次中断的群发推送
+            await broadcaster.resume_unfinished()
+        except Exception as e:
+            _log.error(f"恢复未完成的推送失败: {e}")
+        _log.info(f"{self.name} 插件已加载，版本: {self.version}")
+
+    async def on_unload(self):
+        """关闭共享服务"""
+        await metrics_server.stop()
+        loop_watchdog.stop()
+        await broadcaster.shutdown()
+        await http_manager.close()
+        await close_onebot_client()
+        render_executor.shutdown()
+        # 各插件和共享模块持有的 Database 实例都在此之后失效，只在退出时关闭
+        await close_all_databases()
+        _log.info(f"{self.name} 插件已卸载")
+
+    @bot.group_event()
+    async def count_group_message(self, event: GroupMessage):
+        """统计收到的群消息"""
+        record_message_received("group")
+
+    @bot.private_event()
+    async def count_private_message(self, event: PrivateMessage):
+        """统计收到的私聊消息"""
+        record_message_received("private")
+
+    @bot.notice_event()
+    async def count_notice(self, event):
+        """统计收到的通知事件"""
+        record_message_received("notice")
+
+    @route(prefixes="/插件耗时")
+    @master_required(commands="/插件耗时")
+    async def show_slowest_plugins(self, event: GroupMessage):
+        """/插件耗时 [数量] [占用]：按平均耗时（或占用事件循环的时间）列出最慢的插件"""
+        args = event.raw_message.strip()[len("/插件耗时"):].split()
+        count = next((int(arg) for arg in args if arg.isdigit()), 10)
+        key = "avg_busy" if "占用" in args else "avg_wall"
+        await self.api.post_group_msg(event.group_id, text=handler_profiler.format_top(min(count, 30), key))
+
+    @route(prefixes="/循环阻塞")
+    @master_required(commands="/循环阻塞")
+    async def show_loop_blockers(self, event: GroupMessage):
+        """/循环阻塞 [数量]：列出最近阻塞事件循环最久的插件和代码位置"""
+        args = event.raw_message.strip()[len("/循环阻塞"):].split()
+        count = next((int(arg) for arg in args if arg.isdigit()), 10)
+        await self.api.post_group_msg(event.group_id, text=loop_watchdog.format_report(min(count, 30)))
@@ -1,8 +1,10 @@
-import aiosqlite
-import aiohttp
 from datetime import datetime
 
+from utils.database_pool import get_database
+from utils.http_client import http_session
+
 DB_PATH = "data.db"
+_table_ready = False
 
 async def handle_daily_fortune(event, api):
     user_id = event.user_id
@@ -20,7 +22,7 @@ async def handle_daily_fortune(event, api):
 
     # 调用 API 获取运势图片
     api_url = "https://www.hhlqilongzhu.cn/api/tu_yunshi.php"
-    async with aiohttp.ClientSession() as session:
+    async with http_session() as session:
         async with session.get(api_url) as response:
             if response.status == 200:
                 image_url = str(response.url)
@@ -29,27 +31,32 @@ async def handle_daily_fortune(event, api):
                 message = "获取运势失败，请稍后再试！"
                 await send_message(api, group_id, user_id, message)
 
+async def _ensure_table():
+    global _table_ready
+    if _table_ready:
+        return
+    await get_database(DB_PATH).execute("""
+        CREATE TABLE IF NOT EXISTS user_requests (
+            user_id INTEGER PRIMARY KEY,
+            last_request_date TEXT
+        )
+    """)
+    _table_ready = True
+
 async def has_requested_today(user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS user_requests (
-                user_id INTEGER PRIMARY KEY,
-                last_request_date TEXT
-            )
-        """)
-        await db.commit()
-
-        async with db.execute("SELECT last_request_date FROM user_requests WHERE user_id = ?", (user_id,)) as cursor:
-            row = await cursor.fetchone()
-            if row:
-                last_request_date = datetime.strptime(row[0], "%Y-%m-%d").date()
-                return last_request_date == datetime.now().date()
+    await _ensure_table()
+    row = await get_database(DB_PATH).fetchone(
+        "SELECT last_request_date FROM user_requests WHERE user_id = ?", (user_id,)
+    )
+    if row:
+        last_request_date = datetime.strptime(row[0], "%Y-%m-%d").date()
+        return last_request_date == datetime.now().date()
     return False
 
 async def update_request_date(user_id, today):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute("REPLACE INTO user_requests (user_id, last_request_date) VALUES (?, ?)", (user_id, today))
-        await db.commit()
+    await get_database(DB_PATH).execute(
+        "REPLACE INTO user_requests (user_id, last_request_date) VALUES (?, ?)", (user_id, today)
+    )
 
 async def send_message(api, group_id, user_id, content, is_image=False):
     if group_id:
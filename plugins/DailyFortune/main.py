@@ -1,5 +1,6 @@
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage, PrivateMessage
+from utils.command_router import command_router, route
 from .handler import handle_daily_fortune
 
 bot = CompatibleEnrollment
@@ -9,6 +10,7 @@ class DailyFortune(BasePlugin):
     version = "1.0.0"  # 插件版本
 
     async def on_load(self):
+        command_router.register_plugin(self)
         print(f"{self.name} 插件已加载")
         print(f"插件版本: {self.version}")
 
@@ -16,7 +18,7 @@ class DailyFortune(BasePlugin):
         if event.raw_message.strip() == "今日运势":
             await handle_daily_fortune(event, self.api)
 
-    @bot.group_event()
+    @route(commands=["今日运势"])
     async def handle_group_message(self, event: GroupMessage):
         await self.handle_message(event)
 
@@ -1,6 +1,7 @@
 import logging
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
+from utils.command_router import command_router, route
 from .wife_handler import get_daily_wife_message
 from ncatbot.core.element import MessageChain, Text
 
@@ -21,6 +22,7 @@ class DailyWife(BasePlugin):
 
     async def on_load(self):
         """插件加载时初始化"""
+        command_router.register_plugin(self)
         _log.info(f"DailyWife v{self.version} 插件已加载")
 
     async def __onload__(self):
@@ -60,7 +62,7 @@ class DailyWife(BasePlugin):
         await self.api.post_group_msg(group_id, text=help_text)
         self.help_count += 1
 
-    @bot.group_event()
+    @route(commands=["/老婆帮助", "/今日老婆帮助", "老婆帮助", "抽老婆", "/今日老婆", "/老婆", "今日老婆"])
     async def handle_group_message(self, event: GroupMessage):
         """处理群消息事件"""
         raw_message = event.raw_message.strip()
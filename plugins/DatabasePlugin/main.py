@@ -11,6 +11,8 @@ from typing import Dict, List, Optional, Any
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
 from ncatbot.utils.logger import get_log
+from utils.command_router import command_router, route
+from utils.feature_cache import feature_index
 
 bot = CompatibleEnrollment
 _log = get_log()
@@ -24,9 +26,11 @@ class DatabasePlugin(BasePlugin):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._db_manager = None
+        self._known_groups = set()
     
     async def on_load(self):
         """插件加载时初始化数据库"""
+        command_router.register_plugin(self)
         try:
             self._db_manager = DatabaseManager()
             await self._db_manager.initialize()
@@ -35,14 +39,21 @@ class DatabasePlugin(BasePlugin):
             _log.error(f"数据库插件初始化失败: {e}")
             raise
     
-    @bot.group_event()
+    async def on_unload(self):
+        """插件卸载（共享数据库连接由 CoreServices 在退出时关闭，其它插件仍在使用）"""
+        _log.info(f"{self.name} 插件已卸载")
+    
+    @route(catch_all=True)
     async def on_group_event(self, msg: GroupMessage):
         """处理群组事件，确保群组有默认菜单"""
         try:
             group_id = msg.group_id
+            if group_id in self._known_groups:
+                return
             if not await self._db_manager.group_menu_exists(group_id):
                 await self._db_manager.create_default_menu_for_group(group_id)
                 _log.info(f"为群组 {group_id} 创建了默认菜单")
+            self._known_groups.add(group_id)
         except Exception as e:
             _log.error(f"处理群组事件失败: {e}")
 
@@ -386,6 +397,10 @@ class DatabaseManager:
             VALUES (?, ?)
             """, (group_id, menu_item))
             await conn.commit()
+        try:
+            feature_index.update_menu(group_id, json.loads(menu_item))
+        except json.JSONDecodeError:
+            feature_index.invalidate(group_id)
 
     async def get_menus_by_group(self, group_id):
         """获取指定群号的所有菜单项"""
@@ -426,6 +441,7 @@ class DatabaseManager:
                         (updated_menu_item, group_id)
                     )
                     await conn.commit()
+                    feature_index.update_menu(group_id, menu_item)
                     return True
                 else:
                     return False  # 如果未找到群的菜单配置，返回 False
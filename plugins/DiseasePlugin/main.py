@@ -2,6 +2,8 @@ import logging
 import random
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
+from utils.command_router import command_router, route
+from utils.rate_limiter import USER, rate_limiter
 from PluginManager.plugin_manager import feature_required
 from .data import DATA
 
@@ -23,14 +25,14 @@ class DiseasePlugin(BasePlugin):
         self.error_count = 0
 
         # 频率控制
-        self.last_request_time = {}
-        self.request_interval = 5.0  # 5秒间隔
+        self.request_interval = rate_limiter.min_interval(self.name, USER)
 
     async def on_load(self):
+        command_router.register_plugin(self)
         _log.info(f"DiseasePlugin v{self.version} 插件已加载")
         _log.info(f"发病语录数量: {len(DATA)}")
 
-    @bot.group_event()
+    @route(prefixes=["/发病"], commands=["发病帮助", "发病统计"])
     @feature_required("发病")
     async def handle_group_message(self, event: GroupMessage):
         """
@@ -52,16 +54,10 @@ class DiseasePlugin(BasePlugin):
             return
 
         # 频率控制
-        import asyncio
-        current_time = asyncio.get_event_loop().time()
-        if user_id in self.last_request_time:
-            time_diff = current_time - self.last_request_time[user_id]
-            if time_diff < self.request_interval:
-                remaining = self.request_interval - time_diff
-                await self.api.post_group_msg(group_id=group_id, text=f"⏳ 发病过于频繁，请等待 {remaining:.1f} 秒后再试")
-                return
-
-        self.last_request_time[user_id] = current_time
+        limit = rate_limiter.hit_all(self.name, user_id, group_id)
+        if not limit:
+            await self.api.post_group_msg(group_id=group_id, text=f"⏳ 发病过于频繁，请等待 {limit.retry_after:.1f} 秒后再试")
+            return
 
         try:
             self.request_count += 1
@@ -2,7 +2,6 @@ import aiohttp
 import asyncio
 import logging
 import random
-import time
 from typing import List, Optional, Dict, Any
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
@@ -21,6 +20,8 @@ except ImportError:
             return wrapper
         return decorator
 
+from utils.rate_limiter import rate_limiter
+from utils.ttl_cache import TTLCache
 from .utils import mix_emoji
 from .emoji_data import emojis
 
@@ -35,12 +36,8 @@ class EmojiKitchen(BasePlugin):
         super().__init__(event_bus, time_task_scheduler, debug=debug, **kwargs)
 
         # 缓存系统
-        self.emoji_cache = {}
         self.cache_expire_time = 3600  # 1小时缓存
-
-        # 请求限制
-        self.last_request_time = {}
-        self.request_interval = 2  # 2秒间隔
+        self.emoji_cache = TTLCache(self.name, maxsize=1000, ttl=self.cache_expire_time)
 
         # 统计信息
         self.mix_count = 0
@@ -60,16 +57,6 @@ class EmojiKitchen(BasePlugin):
         """插件加载时初始化（新版本）"""
         await self.on_load()
 
-    def _is_cache_valid(self, cache_time: float) -> bool:
-        """检查缓存是否有效"""
-        return time.time() - cache_time < self.cache_expire_time
-
-    def _should_rate_limit(self, group_id: int) -> bool:
-        """检查是否需要限流"""
-        current_time = time.time()
-        last_time = self.last_request_time.get(group_id, 0)
-        return current_time - last_time < self.request_interval
-
     def get_random_emoji(self) -> str:
         """获取随机emoji"""
         try:
@@ -136,18 +123,18 @@ class EmojiKitchen(BasePlugin):
         """
         # 检查缓存
         cache_key = f"{emoji1}_{emoji2}"
-        if cache_key in self.emoji_cache:
-            cache_data, cache_time = self.emoji_cache[cache_key]
-            if self._is_cache_valid(cache_time):
-                _log.info(f"使用缓存数据: {emoji1} + {emoji2}")
-                return cache_data
+        cache_data = self.emoji_cache.get(cache_key)
+        if cache_data is not None:
+            _log.info(f"使用缓存数据: {emoji1} + {emoji2}")
+            return cache_data
 
         try:
             # 使用本地数据获取合成结果
             result = await mix_emoji(emoji1, emoji2)
 
             # 缓存结果
-            self.emoji_cache[cache_key] = (result, time.time())
+            if result is not None:
+                self.emoji_cache.set(cache_key, result)
 
             if result and not result.startswith("不支持"):
                 _log.info(f"成功合成emoji: {emoji1} + {emoji2}")
@@ -257,11 +244,6 @@ class EmojiKitchen(BasePlugin):
             await self.random_emoji_mix(event.group_id)
             return
 
-        # 检查限流
-        if self._should_rate_limit(event.group_id):
-            _log.info(f"群 {event.group_id} 请求过于频繁，跳过处理")
-            return
-
         # 提取emoji
         emojis_found = self.extract_emojis(raw_message)
 
@@ -275,8 +257,10 @@ class EmojiKitchen(BasePlugin):
 
             _log.info(f"检测到emoji合成请求: {emoji1} + {emoji2}")
 
-            # 更新请求时间
-            self.last_request_time[event.group_id] = time.time()
+            # 检查限流
+            if not rate_limiter.hit_all(self.name, event.user_id, event.group_id):
+                _log.info(f"群 {event.group_id} 请求过于频繁，跳过处理")
+                return
             self.mix_count += 1
 
             try:
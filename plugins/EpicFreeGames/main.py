@@ -1,15 +1,18 @@
 import aiohttp
-import asyncio
-import aiosqlite
 import time
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
+from utils.command_router import command_router, route
 from ncatbot.core.element import MessageChain, Text, Image
 from PluginManager.plugin_manager import feature_required
 from utils.group_forward_msg import _message_sender
 from utils.config_manager import get_config
+from utils.database_pool import get_database
+from utils.http_client import http_session
+from utils.single_flight import single_flight
+from utils.broadcast import BroadcastJob, broadcaster
 from ncatbot.utils.logger import get_log
 
 bot = CompatibleEnrollment
@@ -24,62 +27,56 @@ class EpicFreeGames(BasePlugin):
         self.bot_name = get_config("bot_name", "NCatBot")
         self.bot_uin = get_config("bt_uin", 123456)
         self.db_path = "data.db"
+        self.db = get_database(self.db_path)
 
     async def init_db(self):
         """初始化数据库，创建订阅表"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute(
-                """
-                CREATE TABLE IF NOT EXISTS epic_subscriptions (
-                    group_id TEXT PRIMARY KEY,
-                    enabled INTEGER DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-                """
+        await self.db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS epic_subscriptions (
+                group_id TEXT PRIMARY KEY,
+                enabled INTEGER DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
-            await db.commit()
+            """
+        )
 
     async def add_subscription(self, group_id: int) -> bool:
         """添加群组订阅"""
-        async with aiosqlite.connect(self.db_path) as db:
-            try:
-                await db.execute(
-                    "INSERT OR REPLACE INTO epic_subscriptions (group_id, enabled) VALUES (?, 1)",
-                    (str(group_id),)
-                )
-                await db.commit()
-                return True
-            except Exception as e:
-                self.logger.error(f"添加Epic推送订阅失败: {e}")
-                return False
+        try:
+            await self.db.execute(
+                "INSERT OR REPLACE INTO epic_subscriptions (group_id, enabled) VALUES (?, 1)",
+                (str(group_id),)
+            )
+            return True
+        except Exception as e:
+            self.logger.error(f"添加Epic推送订阅失败: {e}")
+            return False
 
     async def remove_subscription(self, group_id: int) -> bool:
         """移除群组订阅"""
-        async with aiosqlite.connect(self.db_path) as db:
-            try:
-                await db.execute(
-                    "DELETE FROM epic_subscriptions WHERE group_id = ?",
-                    (str(group_id),)
-                )
-                await db.commit()
-                return True
-            except Exception as e:
-                self.logger.error(f"移除Epic推送订阅失败: {e}")
-                return False
+        try:
+            await self.db.execute(
+                "DELETE FROM epic_subscriptions WHERE group_id = ?",
+                (str(group_id),)
+            )
+            return True
+        except Exception as e:
+            self.logger.error(f"移除Epic推送订阅失败: {e}")
+            return False
 
     async def get_all_subscriptions(self) -> List[int]:
         """获取所有订阅的群组"""
-        async with aiosqlite.connect(self.db_path) as db:
-            try:
-                async with db.execute(
-                    "SELECT group_id FROM epic_subscriptions WHERE enabled = 1"
-                ) as cursor:
-                    rows = await cursor.fetchall()
-                    return [int(row[0]) for row in rows]
-            except Exception as e:
-                self.logger.error(f"获取Epic订阅群组失败: {e}")
-                return []
+        try:
+            rows = await self.db.fetchall(
+                "SELECT group_id FROM epic_subscriptions WHERE enabled = 1"
+            )
+            return [int(row[0]) for row in rows]
+        except Exception as e:
+            self.logger.error(f"获取Epic订阅群组失败: {e}")
+            return []
 
+    @single_flight("epic_free_games", key=lambda self: "free_games")
     async def fetch_free_games(self):
         """从 Epic API 获取喜加一内容"""
         url = "https://store-site-backend-static-ipv4.ak.epicgames.com/freeGamesPromotions?locale=zh-CN&country=CN&allowCountries=CN"
@@ -87,7 +84,7 @@ class EpicFreeGames(BasePlugin):
         try:
             # 优化超时设置，减少等待时间
             timeout = aiohttp.ClientTimeout(total=20, connect=5, sock_read=10)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with http_session(timeout=timeout) as session:
                 async with session.get(url) as response:
                     if response.status == 200:
                         data = await response.json()
@@ -195,7 +192,7 @@ class EpicFreeGames(BasePlugin):
         try:
             # 为了避免事件循环冲突，创建临时会话
             timeout = aiohttp.ClientTimeout(total=10)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with http_session(timeout=timeout) as session:
                 async with session.get(url, allow_redirects=False) as response:
                     if response.status == 302:  # 检查是否为重定向
                         return response.headers.get("Location")  # 返回重定向后的 URL
@@ -331,6 +328,10 @@ class EpicFreeGames(BasePlugin):
             await self.api.post_group_msg(group_id, text="❌ 当前没有免费游戏")
             return
 
+        await self.api.post_group_msg(group_id, text=self.format_simple_games(games))
+
+    def format_simple_games(self, games: List[Dict[str, Any]]) -> str:
+        """格式化简化版游戏信息（纯文本）"""
         current_free = [g for g in games if g.get("is_free_now")]
         upcoming_free = [g for g in games if g.get("is_free_upcoming")]
 
@@ -355,15 +356,12 @@ class EpicFreeGames(BasePlugin):
                 message += "\n"
 
         message += "💡 发送 /喜加一 查看完整信息"
-        await self.api.post_group_msg(group_id, text=message)
+        return message
 
     async def daily_push(self):
-        """每日Epic免费游戏推送定时任务"""
+        """每日Epic免费游戏推送定时任务（在后台限速并发投递，不阻塞定时任务）"""
         try:
-            # 使用asyncio.wait_for设置总超时时间，避免定时任务超时
-            await asyncio.wait_for(self._execute_daily_push(), timeout=50.0)
-        except asyncio.TimeoutError:
-            self.logger.warning("Epic免费游戏推送执行超时，但可能已部分完成")
+            await self._execute_daily_push()
         except Exception as e:
             self.logger.error(f"Epic免费游戏每日推送失败: {e}")
 
@@ -377,9 +375,6 @@ class EpicFreeGames(BasePlugin):
             self.logger.warning("没有获取到Epic免费游戏信息")
             return
 
-        # 格式化消息
-        forward_messages = self.format_games_for_forward(games)
-
         # 获取所有订阅的群组
         subscribed_groups = await self.get_all_subscriptions()
 
@@ -387,29 +382,16 @@ class EpicFreeGames(BasePlugin):
             self.logger.info("没有群组订阅Epic推送")
             return
 
-        # 向每个订阅的群组发送消息
-        success_count = 0
-        for group_id in subscribed_groups:
-            try:
-                success = await _message_sender.send_group_forward_msg(group_id, forward_messages)
-                if success:
-                    success_count += 1
-                    self.logger.info(f"已向群组 {group_id} 推送Epic免费游戏")
-                else:
-                    # 合并转发失败，尝试简化版本
-                    await self.send_simple_games(group_id, games)
-                    success_count += 1
-                    self.logger.info(f"已向群组 {group_id} 推送Epic免费游戏（简化版）")
-
-                # 避免发送过快，减少延迟
-                await asyncio.sleep(0.5)
-
-            except Exception as e:
-                self.logger.error(f"向群组 {group_id} 推送Epic免费游戏失败: {e}")
-
-        self.logger.info(f"Epic免费游戏推送完成，成功推送到 {success_count}/{len(subscribed_groups)} 个群组")
+        # 交给推送引擎：合并转发失败的群自动降级为简化文本，同一天重复触发不会重复投递
+        await broadcaster.start(BroadcastJob(
+            job_id=f"epic_daily:{datetime.now():%Y-%m-%d}",
+            groups=subscribed_groups,
+            forward=self.format_games_for_forward(games),
+            text=self.format_simple_games(games),
+        ))
+        self.logger.info(f"Epic免费游戏推送已开始，共 {len(subscribed_groups)} 个群组")
 
-    @bot.group_event()
+    @route(prefixes=["/喜加一"], commands=["/Epic推送开启", "/epic推送开启", "/Epic推送关闭", "/epic推送关闭"])
     @feature_required("喜加一", "/喜加一")
     async def handle_group_message(self, event: GroupMessage):
         """处理群消息事件"""
@@ -456,6 +438,7 @@ class EpicFreeGames(BasePlugin):
             return
 
     async def on_load(self):
+        command_router.register_plugin(self)
         # 初始化数据库
         await self.init_db()
 
@@ -2,13 +2,18 @@ import logging
 import random
 import json
 import time
-import httpx
 import yaml
 import os
 from typing import Dict, List, Optional, Any
 
+from utils.llm_gateway import llm_gateway
+from utils.llm_stream import LLMStreamError
+
 _log = logging.getLogger(__name__)
 
+# 伪装回复的最大长度，超出部分会被截断
+MAX_REPLY_CHARS = 50
+
 class AIIntegration:
     """AI集成管理器"""
 
@@ -17,7 +22,7 @@ class AIIntegration:
         self.context_manager = None
 
         # 加载配置
-        self.api_key, self.proxy, self.bot_name = self.load_config()
+        self.bot_name = self.load_config()
 
         # 预设回复库
         self.preset_responses = {
@@ -48,67 +53,23 @@ class AIIntegration:
         }
 
     def load_config(self):
-        """从根目录的 config.yaml 文件中加载 gemini_apikey、代理地址和 bot_name"""
+        """从根目录的 config.yaml 文件中加载 bot_name（API 密钥和代理由 LLM 网关统一管理）"""
         config_path = os.path.join(os.getcwd(), "config.yaml")
         try:
             with open(config_path, "r", encoding="utf-8") as file:
                 config = yaml.safe_load(file)
-                
-                # 处理API key配置，支持单个字符串或列表
-                api_key_config = config.get("gemini_apikey", "")
-                if isinstance(api_key_config, list):
-                    # 过滤掉空值和注释
-                    api_keys = [key.strip() for key in api_key_config if key and isinstance(key, str) and key.strip() and not key.strip().startswith('#')]
-                    api_key = api_keys[0] if api_keys else ""  # 默认使用第一个可用的key
-                    self.all_api_keys = api_keys  # 保存所有可用的key
-                    self.current_key_index = 0  # 当前使用的key索引
-                elif isinstance(api_key_config, str):
-                    api_key = api_key_config
-                    self.all_api_keys = [api_key] if api_key else []
-                    self.current_key_index = 0
-                else:
-                    api_key = ""
-                    self.all_api_keys = []
-                    self.current_key_index = 0
-                
-                proxy = config.get("proxy", None)
-                bot_name = config.get("bot_name", "可琳雫")
-                return api_key, proxy, bot_name
+                return config.get("bot_name", "可琳雫")
         except FileNotFoundError:
             _log.error("配置文件 config.yaml 未找到！")
         except Exception as e:
             _log.error(f"加载配置文件时出错: {e}")
-        return "", None, "机器人"
-    
-    def get_next_api_key(self):
-        """
-        获取下一个可用的API key
-        用于在当前key失败时切换到下一个
-        """
-        if not hasattr(self, 'all_api_keys') or not self.all_api_keys:
-            return None
-            
-        # 切换到下一个key
-        self.current_key_index = (self.current_key_index + 1) % len(self.all_api_keys)
-        next_key = self.all_api_keys[self.current_key_index]
-        
-        _log.info(f"切换到API key索引: {self.current_key_index}")
-        return next_key
+        return "机器人"
 
-    def reset_to_first_api_key(self):
-        """
-        重置到第一个API key
-        """
-        if hasattr(self, 'all_api_keys') and self.all_api_keys:
-            self.current_key_index = 0
-            self.api_key = self.all_api_keys[0]
-            _log.info("重置到第一个API key")
-    
     async def initialize(self, api):
         """初始化AI集成"""
         try:
             # 检查是否有API密钥
-            if not self.api_key:
+            if not llm_gateway.has_keys():
                 _log.warning("未配置Gemini API密钥，将使用预设回复")
                 return False
 
@@ -122,7 +83,7 @@ class AIIntegration:
     async def generate_response(self, group_id: int, message: str, fake_user: Dict[str, Any], api=None) -> str:
         """生成AI回复"""
         try:
-            if self.api_key:
+            if llm_gateway.has_keys():
                 return await self._generate_ai_response(group_id, message, fake_user, api)
             else:
                 return self._generate_preset_response(message)
@@ -154,9 +115,12 @@ class AIIntegration:
         return self._generate_preset_response(message)
 
     async def _call_gemini_api(self, prompt: str) -> str:
-        """调用Gemini API，支持多个API key自动切换"""
-        url = "https://gemn.ariaxz.tk/v1/chat/completions"
+        """
+        通过 LLM 网关流式调用Gemini API
 
+        伪装回复最终只保留前 MAX_REPLY_CHARS 个字符，生成的内容够用后立即停止读取，
+        不必等待完整回复；选择密钥、失败切换由网关负责。
+        """
         messages = [
             {"role": "system", "content": "你是一个活泼的群友，要自然地参与群聊。"},
             {"role": "user", "content": prompt}
@@ -169,110 +133,22 @@ class AIIntegration:
             "temperature": 0.8
         }
 
-        timeout = httpx.Timeout(30.0)
-        connector_kwargs = {}
-        if self.proxy:
-            connector_kwargs["proxy"] = self.proxy
+        received = []
 
-        # 尝试使用所有可用的API key
-        max_retries = len(self.all_api_keys) if hasattr(self, 'all_api_keys') and self.all_api_keys else 1
-        
-        for attempt in range(max_retries):
-            current_api_key = self.api_key
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {current_api_key}"
-            }
-            
-            _log.info(f"FakeChat尝试使用API key (索引: {getattr(self, 'current_key_index', 0)}, 尝试: {attempt + 1}/{max_retries})")
-
-            try:
-                async with httpx.AsyncClient(timeout=timeout, **connector_kwargs) as client:
-                    response = await client.post(url, headers=headers, json=payload)
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        if "choices" in result and len(result["choices"]) > 0:
-                            content = result["choices"][0]["message"]["content"]
-                            
-                            # 成功时重置到第一个API key
-                            if attempt > 0:
-                                self.reset_to_first_api_key()
-                            
-                            return content.strip()
-                        else:
-                            _log.error(f"Gemini API返回格式异常: {result}")
-                            # 如果这是最后一次尝试，返回空
-                            if attempt == max_retries - 1:
-                                return ""
-                            else:
-                                # 切换到下一个API key继续尝试
-                                next_key = self.get_next_api_key()
-                                if next_key:
-                                    self.api_key = next_key
-                                    _log.info(f"返回格式异常，切换到下一个API key")
-                                    continue
-                                else:
-                                    return ""
-                    
-                    elif response.status_code == 401:
-                        _log.error(f"FakeChat API密钥无效 (401)")
-                        # API key无效，尝试下一个
-                        if attempt < max_retries - 1:
-                            next_key = self.get_next_api_key()
-                            if next_key:
-                                self.api_key = next_key
-                                _log.info(f"API密钥无效，切换到下一个API key")
-                                continue
-                        return ""
-                    
-                    elif response.status_code == 429:
-                        _log.error(f"FakeChat API请求频率限制 (429)")
-                        # 频率限制，尝试下一个API key
-                        if attempt < max_retries - 1:
-                            next_key = self.get_next_api_key()
-                            if next_key:
-                                self.api_key = next_key
-                                _log.info(f"请求频率限制，切换到下一个API key")
-                                continue
-                        return ""
-                    
-                    else:
-                        _log.error(f"FakeChat Gemini API HTTP错误: {response.status_code}")
-                        # 其他HTTP错误，尝试下一个API key
-                        if attempt < max_retries - 1:
-                            next_key = self.get_next_api_key()
-                            if next_key:
-                                self.api_key = next_key
-                                _log.info(f"HTTP错误 ({response.status_code})，切换到下一个API key")
-                                continue
-                        return ""
-
-            except httpx.TimeoutException:
-                _log.error("FakeChat Gemini API调用超时")
-                # 超时，尝试下一个API key
-                if attempt < max_retries - 1:
-                    next_key = self.get_next_api_key()
-                    if next_key:
-                        self.api_key = next_key
-                        _log.info(f"API调用超时，切换到下一个API key")
-                        continue
-                return ""
-            
-            except Exception as e:
-                _log.error(f"FakeChat 调用Gemini API失败: {e}")
-                # 其他异常，尝试下一个API key
-                if attempt < max_retries - 1:
-                    next_key = self.get_next_api_key()
-                    if next_key:
-                        self.api_key = next_key
-                        _log.info(f"API调用异常，切换到下一个API key")
-                        continue
-                return ""
-        
-        # 如果所有API key都尝试失败了
-        _log.error("FakeChat 所有API密钥都不可用")
-        return ""
+        async def on_text(delta: str) -> bool:
+            received.append(delta)
+            text = "".join(received)
+            # 思考过程会在后处理中被移除，未闭合前不提前停止
+            if "<think>" in text and "</think>" not in text:
+                return False
+            return len(self._clean_model_output(text)) > MAX_REPLY_CHARS
+
+        try:
+            result = await llm_gateway.stream_chat(payload, on_text=on_text, name="fake_chat")
+        except LLMStreamError as e:
+            _log.error(f"FakeChat 所有API密钥都不可用: {e}")
+            return ""
+        return result.text.strip()
 
     async def _get_chat_history(self, group_id: int, api, limit: int = 5) -> List[Dict[str, Any]]:
         """获取群聊历史记录"""
@@ -432,8 +308,8 @@ class AIIntegration:
                 return self._generate_preset_response("")
 
         # 限制长度
-        if len(response) > 50:
-            response = response[:47] + "..."
+        if len(response) > MAX_REPLY_CHARS:
+            response = response[:MAX_REPLY_CHARS - 3] + "..."
 
 
 
@@ -466,7 +342,7 @@ class AIIntegration:
         """分析图片内容用于表情分类"""
         try:
             # 优先使用Gemini API进行图片分析
-            if self.api_key:
+            if llm_gateway.has_keys():
                 try:
                     analysis_prompt = """请分析这个表情图片，并严格按照以下格式回复：
 
@@ -532,9 +408,7 @@ class AIIntegration:
             return "其他:表情图片"
 
     async def _call_gemini_api_with_image(self, prompt: str, image_url: str) -> str:
-        """调用Gemini API进行图片分析，支持多个API key自动切换"""
-        url = "https://gemn.ariaxz.tk/v1/chat/completions"
-
+        """通过 LLM 网关调用Gemini API进行图片分析"""
         # 构建包含图片的消息
         messages = [
             {
@@ -561,100 +435,12 @@ class AIIntegration:
             "temperature": 0.7
         }
 
-        timeout = httpx.Timeout(30.0)
-        
-        # 尝试使用所有可用的API key
-        max_retries = len(self.all_api_keys) if hasattr(self, 'all_api_keys') and self.all_api_keys else 1
-        
-        for attempt in range(max_retries):
-            current_api_key = self.api_key
-            headers = {
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {current_api_key}"
-            }
-            
-            _log.info(f"FakeChat图片分析尝试使用API key (索引: {getattr(self, 'current_key_index', 0)}, 尝试: {attempt + 1}/{max_retries})")
-
-            try:
-                async with httpx.AsyncClient(timeout=timeout) as client:
-                    response = await client.post(url, headers=headers, json=payload)
-
-                    if response.status_code == 200:
-                        result = response.json()
-                        if 'choices' in result and len(result['choices']) > 0:
-                            content = result['choices'][0]['message']['content']
-                            
-                            # 成功时重置到第一个API key
-                            if attempt > 0:
-                                self.reset_to_first_api_key()
-                            
-                            return content.strip()
-                    
-                    elif response.status_code == 401:
-                        _log.error(f"FakeChat图片分析API密钥无效 (401)")
-                        # API key无效，尝试下一个
-                        if attempt < max_retries - 1:
-                            next_key = self.get_next_api_key()
-                            if next_key:
-                                self.api_key = next_key
-                                _log.info(f"API密钥无效，切换到下一个API key")
-                                continue
-                        return ""
-                    
-                    elif response.status_code == 429:
-                        _log.error(f"FakeChat图片分析API请求频率限制 (429)")
-                        # 频率限制，尝试下一个API key
-                        if attempt < max_retries - 1:
-                            next_key = self.get_next_api_key()
-                            if next_key:
-                                self.api_key = next_key
-                                _log.info(f"请求频率限制，切换到下一个API key")
-                                continue
-                        return ""
-                    
-                    else:
-                        _log.error(f"FakeChat图片分析HTTP错误: {response.status_code}")
-                        # 其他HTTP错误，尝试下一个API key
-                        if attempt < max_retries - 1:
-                            next_key = self.get_next_api_key()
-                            if next_key:
-                                self.api_key = next_key
-                                _log.info(f"HTTP错误 ({response.status_code})，切换到下一个API key")
-                                continue
-                        return ""
-
-            except Exception as e:
-                _log.warning(f"FakeChat Gemini图片分析失败: {e}")
-                # 异常，尝试下一个API key
-                if attempt < max_retries - 1:
-                    next_key = self.get_next_api_key()
-                    if next_key:
-                        self.api_key = next_key
-                        _log.info(f"图片分析异常，切换到下一个API key")
-                        continue
-                return ""
-        
-        # 如果所有API key都尝试失败了
-        _log.error("FakeChat图片分析所有API密钥都不可用")
-        return ""
-
-        # 如果图片分析失败，使用基于URL的简单分析
-        _log.info("图片分析失败，使用URL特征分析")
-        url_lower = image_url.lower()
-
-        if '.gif' in url_lower:
-            return "调皮:动态表情"
-        elif any(ext in url_lower for ext in ['.jpg', '.jpeg', '.png']):
-            if any(word in url_lower for word in ['meme', 'funny', 'joke']):
-                return "开心:搞笑图片"
-            elif any(word in url_lower for word in ['cute', '可爱']):
-                return "可爱:可爱图片"
-            else:
-                return "其他:表情图片"
-
-        return "其他:表情图片"
-
-
+        try:
+            response = await llm_gateway.complete(payload, name="fake_chat_image")
+        except LLMStreamError as e:
+            _log.error(f"FakeChat图片分析所有API密钥都不可用: {e}")
+            return ""
+        return response.strip()
 
     def get_response_with_emotion(self, message: str, target_emotion: str) -> str:
         """根据目标情感生成回复"""
@@ -666,6 +452,6 @@ class AIIntegration:
     
     def is_ai_available(self) -> bool:
         """检查AI是否可用"""
-        return bool(self.api_key)
+        return llm_gateway.has_keys()
     
 
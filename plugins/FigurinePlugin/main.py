@@ -1,4 +1,3 @@
-import aiohttp
 import base64
 import json
 import re
@@ -10,6 +9,8 @@ from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
 from ncatbot.core.element import MessageChain, Image, Text, At
 from PluginManager.plugin_manager import feature_required
+from utils.http_client import http_session
+from utils.image_cache import image_cache
 
 bot = CompatibleEnrollment
 
@@ -34,19 +35,12 @@ class FigurinePlugin(BasePlugin):
         }
         
         for attempt in range(max_retries):
-            try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.get(url, headers=headers, timeout=30) as response:
-                        if response.status == 200:
-                            image_data = await response.read()
-                            if len(image_data) < 100:  # 检查是否是有效图片
-                                continue
-                            return base64.b64encode(image_data).decode('utf-8')
-                        elif attempt < max_retries - 1:  # 不是最后一次尝试
-                            await asyncio.sleep(1)  # 等待1秒后重试
-            except Exception:
-                if attempt < max_retries - 1:  # 不是最后一次尝试
-                    await asyncio.sleep(1)  # 等待1秒后重试
+            # 头像经共享图片缓存获取，同一头像一小时内不重复下载
+            image_data = await image_cache.get(url, max_age=3600, headers=headers, timeout=30, min_size=100)
+            if image_data:
+                return base64.b64encode(image_data).decode('utf-8')
+            if attempt < max_retries - 1:  # 不是最后一次尝试
+                await asyncio.sleep(1)  # 等待1秒后重试
         
         # 所有尝试都失败，返回备用头像
         return await self.get_fallback_avatar()
@@ -61,7 +55,7 @@ class FigurinePlugin(BasePlugin):
         # 尝试从网络获取备用头像
         for url in fallback_urls:
             try:
-                async with aiohttp.ClientSession() as session:
+                async with http_session() as session:
                     async with session.get(url, timeout=30) as response:
                         if response.status == 200:
                             image_data = await response.read()
@@ -90,7 +84,7 @@ class FigurinePlugin(BasePlugin):
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with http_session() as session:
                 async with session.get(url, headers=headers, timeout=60) as response:
                     if response.status == 200:
                         image_data = await response.read()
@@ -152,7 +146,7 @@ class FigurinePlugin(BasePlugin):
             }
             
             # 发送请求到API
-            async with aiohttp.ClientSession() as session:
+            async with http_session() as session:
                 async with session.post(
                     "https://eb2.siyangyuan.gq:5208/v1/chat/completions",
                     json=payload,
@@ -1,15 +1,19 @@
 import aiohttp
 import asyncio
 import logging
-import time
-from PIL import Image, ImageDraw, ImageFont
-import io
+from PIL import Image, ImageDraw
 import textwrap
 import base64
 from datetime import datetime
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
 from ncatbot.core.element import MessageChain, Text, Image as NCImage
+from utils.command_router import RouteSpec, command_router
+from utils.http_client import http_session
+from utils.render_executor import render_image
+from utils.asset_registry import load_font
+from utils.single_flight import single_flight
+from utils.rate_limiter import USER, rate_limiter
 import os
 
 # 设置日志
@@ -17,6 +21,134 @@ _log = logging.getLogger(__name__)
 
 bot = CompatibleEnrollment
 
+def render_hot_search_image(data, platform_config):
+    """绘制热搜图片 - 现代 Tailwind 风格卡片（纯 Pillow 操作，在渲染执行器中执行）"""
+    theme_color = platform_config["color"]
+    items = data.get("items", [])[:10]  # 取前10条热搜
+    updated_time = data.get("updatedTime", 0)
+    
+    # --- 设计参数 (类 Tailwind 风格) ---
+    width = 800
+    header_height = 120
+    item_height = 75
+    footer_height = 60
+    padding = 32
+    total_height = header_height + len(items) * item_height + footer_height
+
+    # --- 颜色 (类 Tailwind 调色板) ---
+    colors = {
+        "bg": "#f8fafc",      # slate-50
+        "card": "#ffffff",    # white
+        "shadow": "#0000001a",
+        "text_primary": "#1e293b", # slate-800
+        "text_secondary": "#64748b", # slate-500
+        "border": "#e2e8f0",  # slate-200
+    }
+
+    # --- 创建画布 ---
+    img = Image.new('RGB', (width, total_height), color=colors["bg"])
+    draw = ImageDraw.Draw(img)
+
+    # --- 加载字体 ---
+    # 字体经资源注册表缓存，缺失时注册表退回默认字体
+    font_regular = load_font("msyh.ttc", 16)
+    font_bold = load_font("msyhbd.ttc", 16)
+    font_title = load_font("msyhbd.ttc", 24)
+    font_small = load_font("msyh.ttc", 12)
+    font_rank = load_font("msyhbd.ttc", 18)
+    # 尝试加载 Emoji 字体以解决乱码问题，缺失时使用标题/正文字体
+    font_emoji = load_font("seguiemj.ttf", 24, fallbacks=("msyhbd.ttc",))
+    font_emoji_tag = load_font("seguiemj.ttf", 16, fallbacks=("msyh.ttc",))
+
+    # --- 绘制卡片和阴影 ---
+    card_rect = [padding, padding, width - padding, total_height - padding]
+    shadow_rect = [card_rect[0] + 5, card_rect[1] + 5, card_rect[2] + 5, card_rect[3] + 5]
+    draw.rounded_rectangle(shadow_rect, radius=16, fill=colors["shadow"])
+    draw.rounded_rectangle(card_rect, radius=16, fill=colors["card"])
+
+    header_y = padding + 30
+    # 平台图标和名称
+    icon_text = platform_config['emoji']
+    # 使用 Emoji 专用字体绘制图标，解决乱码
+    draw.text((padding * 2, header_y), icon_text, font=font_emoji, fill=theme_color)
+    title_text = f"{platform_config['name']} 热搜榜"
+    draw.text((padding * 2 + 40, header_y), title_text, fill=colors["text_primary"], font=font_title)
+    
+    # 更新时间
+    if updated_time:
+        time_str = datetime.fromtimestamp(updated_time / 1000).strftime("%Y-%m-%d %H:%M")
+    else:
+        time_str = datetime.now().strftime("%Y-%m-%d %H:%M")
+    subtitle_text = f"更新于 {time_str}"
+    draw.text((padding * 2 + 40, header_y + 35), subtitle_text, fill=colors["text_secondary"], font=font_small)
+
+    # 头部底部分隔线
+    draw.line([(padding, header_height), (width - padding, header_height)], fill=colors["border"], width=1)
+
+    # --- 绘制热搜列表 ---
+    list_start_y = header_height
+    for i, item in enumerate(items):
+        y_pos = list_start_y + i * item_height
+        
+        # 排名 (垂直居中)
+        rank_text = str(i + 1)
+        rank_color = theme_color if i < 3 else colors["text_secondary"]
+        rank_bbox = draw.textbbox((0, 0), rank_text, font=font_rank)
+        rank_height = rank_bbox[3] - rank_bbox[1]
+        draw.text((padding * 2, y_pos + (item_height - rank_height) // 2), rank_text, fill=rank_color, font=font_rank)
+
+        # 标题 (自动换行和垂直居中)
+        title = item.get("title", "未知标题")
+        max_title_width = width - (padding * 4 + 40 + 60) # 计算标题最大宽度
+        
+        # 使用 textwrap 进行自动换行
+        wrapped_lines = textwrap.wrap(title, width=40, placeholder="...") # 这里的width是字符数估算
+        
+        # 限制最多两行，第二行末尾加省略号
+        if len(wrapped_lines) > 2:
+            wrapped_lines = wrapped_lines[:2]
+            wrapped_lines[1] = textwrap.shorten(wrapped_lines[1], width=40, placeholder="...")
+
+        line_height = font_bold.getbbox("A")[3] + 4 # 行高
+        total_text_height = len(wrapped_lines) * line_height
+        text_start_y = y_pos + (item_height - total_text_height) // 2
+
+        for j, line in enumerate(wrapped_lines):
+            draw.text((padding * 2 + 40, text_start_y + j * line_height), line, fill=colors["text_primary"], font=font_bold)
+
+        # 热度值 (绘制在标题下方，如果标题只有一行)
+        extra_info = item.get("extra", {}).get("info", "")
+        if extra_info and len(wrapped_lines) == 1:
+             draw.text((padding * 2 + 40, text_start_y + line_height), extra_info, fill=colors["text_secondary"], font=font_small)
+
+        # 热度标签 (右侧，垂直居中)
+        hot_text = item.get("extra", {}).get("tag", "")
+        tag_font = font_regular
+        if i < 3: 
+            hot_text = "🔥"
+            tag_font = font_emoji_tag # 对前三的热度标签使用Emoji字体
+
+        if hot_text:
+            tag_bbox = draw.textbbox((0, 0), hot_text, font=tag_font)
+            tag_width = tag_bbox[2] - tag_bbox[0]
+            tag_height = tag_bbox[3] - tag_bbox[1]
+            draw.text((width - padding * 2 - tag_width, y_pos + (item_height - tag_height) // 2), hot_text, fill=rank_color, font=tag_font)
+
+        # 分隔线
+        if i < len(items) - 1:
+            line_y = y_pos + item_height
+            draw.line([(padding * 2, line_y), (width - padding * 2, line_y)], fill=colors["border"], width=1)
+
+    # --- 绘制底部 ---
+    footer_y = total_height - padding - 25
+    footer_text = "Powered by siyangyuan & kln_bot"
+    footer_bbox = draw.textbbox((0, 0), footer_text, font=font_small)
+    footer_width = footer_bbox[2] - footer_bbox[0]
+    draw.text(((width - footer_width) // 2, footer_y), footer_text, fill=colors["text_secondary"], font=font_small)
+
+    return img
+
+
 class HotSearchPlugin(BasePlugin):
     name = "HotSearchPlugin"
     version = "2.0.0"
@@ -32,8 +164,7 @@ class HotSearchPlugin(BasePlugin):
         self.platform_stats = {}  # 各平台使用统计
 
         # 频率控制
-        self.last_request_time = {}
-        self.request_interval = 3.0  # 3秒间隔
+        self.request_interval = rate_limiter.min_interval(self.name, USER)
 
     # 定义支持的平台配置（类级别）
     platforms = {
@@ -91,23 +222,22 @@ class HotSearchPlugin(BasePlugin):
                     'success_count': 0,
                     'error_count': 0
                 }
+            # 平台命令来自实例配置，因此在加载时向命令路由注册
+            commands = ["/热搜", "/热搜帮助", "热搜", "热搜帮助", "/热搜统计", "热搜统计"]
+            for platform_config in self.platforms.values():
+                commands.extend(platform_config["commands"])
+            command_router.unregister_plugin(self.name)
+            command_router.register(self.name, self.handle_group_message, RouteSpec(commands=tuple(commands)))
             _log.info(f"HotSearchPlugin v{self.version} 插件已加载，支持 {len(self.platforms)} 个平台")
         except Exception as e:
             _log.error(f"HotSearchPlugin插件加载失败: {e}")
 
-    def _check_frequency_limit(self, user_id: int) -> tuple[bool, float]:
+    def _check_frequency_limit(self, user_id: int, group_id: int = None) -> tuple[bool, float]:
         """检查用户请求频率限制"""
-        current_time = time.time()
-
-        if user_id in self.last_request_time:
-            time_diff = current_time - self.last_request_time[user_id]
-            if time_diff < self.request_interval:
-                remaining_time = self.request_interval - time_diff
-                return False, remaining_time
-
-        self.last_request_time[user_id] = current_time
-        return True, 0.0
+        limit = rate_limiter.hit_all(self.name, user_id, group_id)
+        return limit.allowed, limit.retry_after
 
+    @single_flight("hot_search", key=lambda self, platform_id: platform_id)
     async def fetch_hot_search_data(self, platform_id):
         """获取指定平台的热搜数据"""
         if platform_id not in self.platforms:
@@ -125,7 +255,7 @@ class HotSearchPlugin(BasePlugin):
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
+            async with http_session() as session:
                 async with session.get(api_url, headers=headers, timeout=15) as response:
                     if response.status == 200:
                         data = await response.json()
@@ -135,148 +265,22 @@ class HotSearchPlugin(BasePlugin):
         except (aiohttp.ClientTimeout, Exception):
             return None
 
-    def create_hot_search_image(self, data, platform_id):
+    async def create_hot_search_image(self, data, platform_id):
         """生成热搜图片 - 现代 Tailwind 风格卡片"""
         if not data or data.get("status") != "success":
             return None
 
         if platform_id not in self.platforms:
             return None
-            
-        platform_config = self.platforms[platform_id]
-        theme_color = platform_config["color"]
-        items = data.get("items", [])[:10]  # 取前10条热搜
-        updated_time = data.get("updatedTime", 0)
-        
-        # --- 设计参数 (类 Tailwind 风格) ---
-        width = 800
-        header_height = 120
-        item_height = 75
-        footer_height = 60
-        padding = 32
-        total_height = header_height + len(items) * item_height + footer_height
-
-        # --- 颜色 (类 Tailwind 调色板) ---
-        colors = {
-            "bg": "#f8fafc",      # slate-50
-            "card": "#ffffff",    # white
-            "shadow": "#0000001a",
-            "text_primary": "#1e293b", # slate-800
-            "text_secondary": "#64748b", # slate-500
-            "border": "#e2e8f0",  # slate-200
-        }
-
-        # --- 创建画布 ---
-        img = Image.new('RGB', (width, total_height), color=colors["bg"])
-        draw = ImageDraw.Draw(img)
 
-        # --- 加载字体 ---
-        try:
-            font_regular = ImageFont.truetype("msyh.ttc", 16)
-            font_bold = ImageFont.truetype("msyhbd.ttc", 16)
-            font_title = ImageFont.truetype("msyhbd.ttc", 24)
-            font_small = ImageFont.truetype("msyh.ttc", 12)
-            font_rank = ImageFont.truetype("msyhbd.ttc", 18)
-            # 尝试加载 Emoji 字体以解决乱码问题
-            font_emoji = ImageFont.truetype("seguiemj.ttf", 24)
-            font_emoji_tag = ImageFont.truetype("seguiemj.ttf", 16)
-        except IOError:
-            font_regular = font_bold = font_title = font_small = font_rank = ImageFont.load_default()
-            font_emoji = font_title # Fallback
-            font_emoji_tag = font_regular # Fallback
-
-        # --- 绘制卡片和阴影 ---
-        card_rect = [padding, padding, width - padding, total_height - padding]
-        shadow_rect = [card_rect[0] + 5, card_rect[1] + 5, card_rect[2] + 5, card_rect[3] + 5]
-        draw.rounded_rectangle(shadow_rect, radius=16, fill=colors["shadow"])
-        draw.rounded_rectangle(card_rect, radius=16, fill=colors["card"])
-
-        header_y = padding + 30
-        # 平台图标和名称
-        icon_text = platform_config['emoji']
-        # 使用 Emoji 专用字体绘制图标，解决乱码
-        draw.text((padding * 2, header_y), icon_text, font=font_emoji, fill=theme_color)
-        title_text = f"{platform_config['name']} 热搜榜"
-        draw.text((padding * 2 + 40, header_y), title_text, fill=colors["text_primary"], font=font_title)
-        
-        # 更新时间
-        if updated_time:
-            time_str = datetime.fromtimestamp(updated_time / 1000).strftime("%Y-%m-%d %H:%M")
-        else:
-            time_str = datetime.now().strftime("%Y-%m-%d %H:%M")
-        subtitle_text = f"更新于 {time_str}"
-        draw.text((padding * 2 + 40, header_y + 35), subtitle_text, fill=colors["text_secondary"], font=font_small)
-
-        # 头部底部分隔线
-        draw.line([(padding, header_height), (width - padding, header_height)], fill=colors["border"], width=1)
-
-        # --- 绘制热搜列表 ---
-        list_start_y = header_height
-        for i, item in enumerate(items):
-            y_pos = list_start_y + i * item_height
-            
-            # 排名 (垂直居中)
-            rank_text = str(i + 1)
-            rank_color = theme_color if i < 3 else colors["text_secondary"]
-            rank_bbox = draw.textbbox((0, 0), rank_text, font=font_rank)
-            rank_height = rank_bbox[3] - rank_bbox[1]
-            draw.text((padding * 2, y_pos + (item_height - rank_height) // 2), rank_text, fill=rank_color, font=font_rank)
-
-            # 标题 (自动换行和垂直居中)
-            title = item.get("title", "未知标题")
-            max_title_width = width - (padding * 4 + 40 + 60) # 计算标题最大宽度
-            
-            # 使用 textwrap 进行自动换行
-            wrapped_lines = textwrap.wrap(title, width=40, placeholder="...") # 这里的width是字符数估算
-            
-            # 限制最多两行，第二行末尾加省略号
-            if len(wrapped_lines) > 2:
-                wrapped_lines = wrapped_lines[:2]
-                wrapped_lines[1] = textwrap.shorten(wrapped_lines[1], width=40, placeholder="...")
-
-            line_height = font_bold.getbbox("A")[3] + 4 # 行高
-            total_text_height = len(wrapped_lines) * line_height
-            text_start_y = y_pos + (item_height - total_text_height) // 2
-
-            for j, line in enumerate(wrapped_lines):
-                draw.text((padding * 2 + 40, text_start_y + j * line_height), line, fill=colors["text_primary"], font=font_bold)
-
-            # 热度值 (绘制在标题下方，如果标题只有一行)
-            extra_info = item.get("extra", {}).get("info", "")
-            if extra_info and len(wrapped_lines) == 1:
-                 draw.text((padding * 2 + 40, text_start_y + line_height), extra_info, fill=colors["text_secondary"], font=font_small)
-
-            # 热度标签 (右侧，垂直居中)
-            hot_text = item.get("extra", {}).get("tag", "")
-            tag_font = font_regular
-            if i < 3: 
-                hot_text = "🔥"
-                tag_font = font_emoji_tag # 对前三的热度标签使用Emoji字体
-
-            if hot_text:
-                tag_bbox = draw.textbbox((0, 0), hot_text, font=tag_font)
-                tag_width = tag_bbox[2] - tag_bbox[0]
-                tag_height = tag_bbox[3] - tag_bbox[1]
-                draw.text((width - padding * 2 - tag_width, y_pos + (item_height - tag_height) // 2), hot_text, fill=rank_color, font=tag_font)
-
-            # 分隔线
-            if i < len(items) - 1:
-                line_y = y_pos + item_height
-                draw.line([(padding * 2, line_y), (width - padding * 2, line_y)], fill=colors["border"], width=1)
-
-        # --- 绘制底部 ---
-        footer_y = total_height - padding - 25
-        footer_text = "Powered by siyangyuan & kln_bot"
-        footer_bbox = draw.textbbox((0, 0), footer_text, font=font_small)
-        footer_width = footer_bbox[2] - footer_bbox[0]
-        draw.text(((width - footer_width) // 2, footer_y), footer_text, fill=colors["text_secondary"], font=font_small)
-
-        # --- 保存图片 ---
-        img_buffer = io.BytesIO()
-        img.save(img_buffer, format='PNG', quality=95, optimize=True)
-        img_buffer.seek(0)
-        
-        image_base64 = base64.b64encode(img_buffer.getvalue()).decode('utf-8')
+        image_bytes = await render_image(
+            render_hot_search_image,
+            data,
+            self.platforms[platform_id],
+            save_options={"optimize": True},
+            name="hot_search",
+        )
+        image_base64 = base64.b64encode(image_bytes).decode('utf-8')
         return f"base64://{image_base64}"
 
     async def show_help_message(self, group_id):
@@ -364,7 +368,7 @@ class HotSearchPlugin(BasePlugin):
             return
 
         # 频率控制检查
-        can_request, remaining_time = self._check_frequency_limit(user_id)
+        can_request, remaining_time = self._check_frequency_limit(user_id, group_id)
         if not can_request:
             await self.api.post_group_msg(
                 group_id,
@@ -405,7 +409,7 @@ class HotSearchPlugin(BasePlugin):
                 return
 
             # 生成图片
-            image_data = self.create_hot_search_image(data, platform_id)
+            image_data = await self.create_hot_search_image(data, platform_id)
 
             if not image_data:
                 await self.api.post_group_msg(group_id, text="❌ 生成热搜图片失败")
@@ -435,7 +439,6 @@ class HotSearchPlugin(BasePlugin):
             self.error_count += 1
             self.platform_stats[platform_id]['error_count'] += 1
 
-    @bot.group_event()
     async def handle_group_message(self, event: GroupMessage):
         """统一处理群消息事件"""
         raw_message = event.raw_message.strip()
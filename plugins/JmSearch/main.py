@@ -1,9 +1,10 @@
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
 from .utils import create_client, handle_search_request, handle_download_request
+from utils.metrics import plugin_counters
+from utils.rate_limiter import USER, rate_limiter
 import re
 import os
-import time
 import asyncio
 import logging
 
@@ -20,16 +21,10 @@ class JmSearch(BasePlugin):
         super().__init__(event_bus, time_task_scheduler, debug=debug, **kwargs)
 
         # 统计信息
-        self.request_count = 0
-        self.search_count = 0
-        self.download_count = 0
-        self.success_count = 0
-        self.error_count = 0
-        self.help_count = 0
+        self.stats = plugin_counters(self.name, ["requests", "searches", "downloads", "successes", "errors", "help"])
 
-        # 频率控制
-        self.last_request_time = {}
-        self.request_interval = 5.0  # 5秒间隔
+        # 频率控制（规则见 config.yaml 的 rate_limit 段）
+        self.request_interval = rate_limiter.min_interval(self.name, USER)
 
         # 客户端初始化标志
         self.client_initialized = False
@@ -37,22 +32,14 @@ class JmSearch(BasePlugin):
         # 下载状态管理
         self.active_downloads = set()  # 正在下载的漫画ID
 
-    def _check_frequency_limit(self, user_id: int) -> tuple[bool, float]:
+    def _check_frequency_limit(self, user_id: int, group_id: int = None) -> tuple[bool, float]:
         """检查用户请求频率限制"""
-        current_time = time.time()
-        last_time = self.last_request_time.get(user_id, 0)
-        time_diff = current_time - last_time
-
-        if time_diff < self.request_interval:
-            remaining_time = self.request_interval - time_diff
-            return False, remaining_time
-
-        self.last_request_time[user_id] = current_time
-        return True, 0.0
+        limit = rate_limiter.hit_all(self.name, user_id, group_id)
+        return limit.allowed, limit.retry_after
 
     async def show_help(self, group_id: int):
         """显示帮助信息"""
-        self.help_count += 1
+        self.stats.inc("help")
         help_text = """🔍 禁漫搜索插件帮助 v2.0.0
 
 🎯 功能说明：
@@ -97,19 +84,19 @@ class JmSearch(BasePlugin):
 
     async def show_statistics(self, group_id: int):
         """显示使用统计"""
-        success_rate = (self.success_count / max(self.request_count, 1)) * 100
+        success_rate = (self.stats["successes"] / max(self.stats["requests"], 1)) * 100
         active_downloads_count = len(self.active_downloads)
 
         stats_text = f"""📊 禁漫搜索插件统计 v2.0.0
 
 📈 使用统计：
-🔢 总请求数: {self.request_count}
-🔍 搜索次数: {self.search_count}
-📥 下载次数: {self.download_count}
-✅ 成功次数: {self.success_count}
-❌ 失败次数: {self.error_count}
+🔢 总请求数: {self.stats['requests']}
+🔍 搜索次数: {self.stats['searches']}
+📥 下载次数: {self.stats['downloads']}
+✅ 成功次数: {self.stats['successes']}
+❌ 失败次数: {self.stats['errors']}
 📈 成功率: {success_rate:.1f}%
-📖 帮助查看: {self.help_count}次
+📖 帮助查看: {self.stats['help']}次
 ⏱️ 请求间隔: {self.request_interval}秒
 
 📥 下载状态：
@@ -147,10 +134,10 @@ class JmSearch(BasePlugin):
         """处理异步下载任务"""
         try:
             await handle_download_request(self.api, self.option, group_id, album_id, user_id)
-            self.success_count += 1
+            self.stats.inc("successes")
             _log.info(f"禁漫异步下载成功: 用户{user_id}, 群{group_id}, ID{album_id}")
         except Exception as e:
-            self.error_count += 1
+            self.stats.inc("errors")
             _log.error(f"禁漫异步下载失败: {e}")
             await self.api.post_group_msg(
                 group_id,
@@ -200,7 +187,7 @@ class JmSearch(BasePlugin):
         match_search = re.match(r"^/jm搜索\s+(.+)$", raw_message)
         if match_search:
             # 频率控制检查
-            can_request, remaining_time = self._check_frequency_limit(user_id)
+            can_request, remaining_time = self._check_frequency_limit(user_id, group_id)
             if not can_request:
                 await self.api.post_group_msg(
                     group_id,
@@ -217,16 +204,16 @@ class JmSearch(BasePlugin):
                 return
 
             # 更新统计
-            self.request_count += 1
-            self.search_count += 1
+            self.stats.inc("requests")
+            self.stats.inc("searches")
 
             page = 1  # 默认搜索第一页
             try:
                 await handle_search_request(self.api, self.client, group_id, query, page)
-                self.success_count += 1
+                self.stats.inc("successes")
                 _log.info(f"禁漫搜索成功: 用户{user_id}, 群{group_id}, 关键词'{query}'")
             except Exception as e:
-                self.error_count += 1
+                self.stats.inc("errors")
                 _log.error(f"禁漫搜索失败: {e}")
                 await self.api.post_group_msg(
                     group_id,
@@ -238,7 +225,7 @@ class JmSearch(BasePlugin):
         match_download = re.match(r"^/jm下载\s+(\d+)$", raw_message)
         if match_download:
             # 频率控制检查
-            can_request, remaining_time = self._check_frequency_limit(user_id)
+            can_request, remaining_time = self._check_frequency_limit(user_id, group_id)
             if not can_request:
                 await self.api.post_group_msg(
                     group_id,
@@ -263,8 +250,8 @@ class JmSearch(BasePlugin):
                 return
 
             # 更新统计
-            self.request_count += 1
-            self.download_count += 1
+            self.stats.inc("requests")
+            self.stats.inc("downloads")
 
             # 添加到下载队列
             self.active_downloads.add(album_id)
@@ -276,7 +263,7 @@ class JmSearch(BasePlugin):
             except Exception as e:
                 # 如果创建任务失败，从下载队列移除
                 self.active_downloads.discard(album_id)
-                self.error_count += 1
+                self.stats.inc("errors")
                 _log.error(f"禁漫下载任务创建失败: {e}")
                 await self.api.post_group_msg(
                     group_id,
@@ -2,11 +2,12 @@ import random
 import json
 import os
 import logging
-import time
 import datetime
 from typing import List
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
+from utils.command_router import command_router, route
+from utils.rate_limiter import GLOBAL, rate_limiter
 
 bot = CompatibleEnrollment
 _log = logging.getLogger(__name__)
@@ -24,8 +25,7 @@ class KfcThursday(BasePlugin):
         self.request_count = 0
         self.success_count = 0
         self.error_count = 0
-        self.last_request_time = 0
-        self.request_interval = 2.0  # 请求间隔（秒）
+        self.request_interval = rate_limiter.min_interval(self.name, GLOBAL)  # 请求间隔（秒）
 
         # 特殊功能
         self.thursday_bonus_enabled = True  # 周四特殊模式
@@ -33,6 +33,7 @@ class KfcThursday(BasePlugin):
 
     async def on_load(self):
         """插件加载时初始化"""
+        command_router.register_plugin(self)
         try:
             _log.info(f"{self.name} v{self.version} 插件开始加载")
 
@@ -113,13 +114,9 @@ class KfcThursday(BasePlugin):
 🎨 自定义文案: {len(self.custom_quotes)}
 ⏱️ 请求间隔: {self.request_interval}秒"""
 
-    async def rate_limit_check(self) -> bool:
+    async def rate_limit_check(self, event: GroupMessage) -> bool:
         """检查请求频率限制"""
-        current_time = time.time()
-        if current_time - self.last_request_time < self.request_interval:
-            return False
-        self.last_request_time = current_time
-        return True
+        return rate_limiter.hit_all(self.name, event.user_id, event.group_id).allowed
 
     async def get_random_quote(self) -> str:
         """获取随机KFC文案"""
@@ -144,7 +141,7 @@ class KfcThursday(BasePlugin):
             _log.error(f"获取随机文案失败: {e}")
             return "获取KFC文案失败，请稍后再试"
 
-    @bot.group_event()
+    @route(commands=["/kfc", "kfc", "疯狂星期四", "/疯狂星期四", "肯德基", "kfc统计", "/kfc统计", "疯狂星期四统计", "kfc帮助", "/kfc帮助", "疯狂星期四帮助"])
     async def handle_group_message(self, event: GroupMessage):
         """处理群消息事件"""
         message = event.raw_message.strip()
@@ -165,7 +162,7 @@ class KfcThursday(BasePlugin):
         """处理KFC文案请求"""
         try:
             # 频率限制检查
-            if not await self.rate_limit_check():
+            if not await self.rate_limit_check(event):
                 await self.api.post_group_msg(
                     event.group_id,
                     text=f"⏳ 请求过于频繁，请等待 {self.request_interval} 秒后再试"
@@ -2,7 +2,6 @@ import io
 import os
 import traceback
 import base64
-import requests
 import asyncio
 import logging
 from concurrent.futures import ThreadPoolExecutor
@@ -11,6 +10,8 @@ from meme_generator import Image as MemeImage
 from typing import Any, Optional
 from meme_generator import Meme, TextNumberMismatch, ImageNumberMismatch, ImageAssetMissing, ImageDecodeError, ImageEncodeError, DeserializeError, MemeFeedback, TextOverLength
 
+from utils.image_cache import image_cache
+
 _log = logging.getLogger(__name__)
 
 # 创建线程池用于执行同步的表情包生成
@@ -28,16 +29,14 @@ async def get_avatar(identifier: Any) -> Optional[io.BytesIO]:
     """
     获取QQ头像或从URL下载图片
     """
-    try:
-        if isinstance(identifier, str) and identifier.startswith("http"):  # 如果是URL
-            response = requests.get(identifier, stream=True, timeout=10)
-        else:  # 如果是QQ号
-            url = f"https://q.qlogo.cn/g?b=qq&nk={identifier}&s=640"
-            response = requests.get(url, stream=True, timeout=10)
-        response.raise_for_status()
-        return io.BytesIO(response.content)
-    except Exception:
+    if isinstance(identifier, str) and identifier.startswith("http"):  # 如果是URL
+        data = await image_cache.get(identifier, timeout=10)
+    else:  # 如果是QQ号，头像缓存一小时
+        url = f"https://q.qlogo.cn/g?b=qq&nk={identifier}&s=640"
+        data = await image_cache.get(url, max_age=3600, timeout=10)
+    if data is None:
         return None
+    return io.BytesIO(data)
 
 def _sync_generate_meme(meme: Meme, meme_images: list[MemeImage], texts: list[str], options: dict[str, Any]):
     """
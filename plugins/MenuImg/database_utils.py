@@ -5,6 +5,9 @@ import os
 from io import BytesIO
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 from ncatbot.utils.logger import get_log
+from utils.feature_cache import feature_index
+from utils.render_executor import render_image
+from utils.asset_registry import load_font, load_template
 
 _log = get_log()
 
@@ -114,6 +117,7 @@ async def update_menu_from_file(group_id):
 
             await conn.commit()
 
+        feature_index.update_menu(group_id, merged_menu_data)
         _log.info(f"群号 {group_id} 的菜单已更新并合并")
         return {
             "success": True,
@@ -166,12 +170,12 @@ def extract_members(menu_data):
     ]
 
 
-def generate_temp_image(members):
-    """生成临时图片并返回路径"""
+async def generate_temp_image(members):
+    """生成临时图片并返回路径（绘制在渲染执行器中进行）"""
     try:
-        image_data = generate_image(members)
+        image_data = await render_image(generate_image, members, name="menu")
         with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as temp_file:
-            temp_file.write(image_data.getvalue())
+            temp_file.write(image_data)
             return temp_file.name
     except Exception as e:
         _log.info(f"生成图片失败: {e}")
@@ -196,28 +200,19 @@ def generate_image(data: list) -> BytesIO:
     try:
         # 设置字体路径
         font_path = os.path.join("static", "font.ttf")  # 确保字体文件存在
-        if not os.path.exists(font_path):
-            font = ImageFont.load_default()
-        else:
-            font = ImageFont.truetype(font_path, 30)
+        font = load_font(font_path, 30)
 
-        # 加载状态图标
+        # 加载状态图标（注册表中已按比例缩放，只作为粘贴源使用）
         on_icon_path = os.path.join("static", "on.png")
         off_icon_path = os.path.join("static", "off.png")
-        on_icon = Image.open(on_icon_path).convert("RGBA") if os.path.exists(on_icon_path) else None
-        off_icon = Image.open(off_icon_path).convert("RGBA") if os.path.exists(off_icon_path) else None
-
-        # 调整图标大小并保持比例
         icon_size = (80, 80)
-        if on_icon:
-            on_icon.thumbnail(icon_size, Image.Resampling.LANCZOS)
-        if off_icon:
-            off_icon.thumbnail(icon_size, Image.Resampling.LANCZOS)
+        on_icon = load_template(on_icon_path, icon_size, keep_aspect=True, copy=False) if os.path.exists(on_icon_path) else None
+        off_icon = load_template(off_icon_path, icon_size, keep_aspect=True, copy=False) if os.path.exists(off_icon_path) else None
 
          # 加载背景图片
         bg_path = os.path.join("static", "bg.png")
         if os.path.exists(bg_path):
-            bg_image = Image.open(bg_path).convert("RGBA")
+            bg_image = load_template(bg_path, copy=False)
         else:
             raise FileNotFoundError("背景图片 bg.png 不存在")
 
@@ -233,8 +228,8 @@ def generate_image(data: list) -> BytesIO:
         rows = (len(data) + items_per_row - 1) // items_per_row  # 计算总行数
         img_height = rows * (box_height + padding) + padding  # 图片高度
 
-        # 调整背景图片大小
-        bg_image = bg_image.resize((img_width, img_height), Image.Resampling.LANCZOS)
+        # 调整背景图片大小（不同行数的尺寸各缓存一份）
+        bg_image = load_template(bg_path, (img_width, img_height), copy=False)
 
         # 创建图片
         img = Image.new("RGBA", (img_width, img_height), color=(255, 255, 255, 0))
@@ -281,7 +276,7 @@ def generate_image(data: list) -> BytesIO:
 
             # 使用更大的字体绘制标题
 
-            title_font = ImageFont.truetype(font_path, title_font_size) if os.path.exists(font_path) else ImageFont.load_default()
+            title_font = load_font(font_path, title_font_size)
 
             for offset in [(-stroke_width, -stroke_width), (-stroke_width, stroke_width), (stroke_width, -stroke_width), (stroke_width, stroke_width)]:
                 draw.text((text_x + offset[0], text_y + offset[1]), f"{index + 1}:{title}", fill=stroke_color, font=title_font)
@@ -570,6 +565,7 @@ async def toggle_plugin_status(group_id, plugin_name, new_status):
                 """, (group_id, json.dumps(menu_data, ensure_ascii=False)))
                 await conn.commit()
 
+            feature_index.update_menu(group_id, menu_data)
             _log.info(f"群 {group_id} 的插件 {plugin_name} 状态已更新为 {new_status}")
             return True
 
@@ -38,7 +38,7 @@ class MenuImg(BasePlugin):
                 return
 
             members = extract_members(menu_data)  # 提取成员信息
-            image_path = generate_temp_image(members)  # 生成临时图片
+            image_path = await generate_temp_image(members)  # 生成临时图片
 
             if image_path:
                 await send_image(self.api, msg.group_id, image_path)  # 发送图片
@@ -114,7 +114,7 @@ class MenuImg(BasePlugin):
                         return
 
                     members = extract_members(menu_data)
-                    image_path = generate_temp_image(members)
+                    image_path = await generate_temp_image(members)
 
                     if image_path:
                         await send_image(self.api, msg.group_id, image_path)
@@ -134,7 +134,7 @@ class MenuImg(BasePlugin):
                     return
 
                 members = extract_members(menu_data)
-                image_path = generate_temp_image(members)
+                image_path = await generate_temp_image(members)
 
                 if image_path:
                     await send_image(self.api, msg.group_id, image_path)
@@ -2,7 +2,7 @@ import aiohttp
 import asyncio
 import hashlib
 import time
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional
 from bs4 import BeautifulSoup
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
@@ -20,6 +20,9 @@ except ImportError:
 from utils.group_forward_msg import send_group_forward_msg_ws
 from utils.config_manager import get_config, load_config
 from utils.logger_config import get_logger
+from utils.metrics import plugin_counters
+from utils.rate_limiter import USER, rate_limiter
+from utils.ttl_cache import TTLCache
 
 # 获取日志记录器
 _log = get_logger(__name__)
@@ -33,21 +36,16 @@ class MikanAnimeSearch(BasePlugin):
     def __init__(self, event_bus=None, time_task_scheduler=None, debug=False, **kwargs):
         super().__init__(event_bus, time_task_scheduler, debug=debug, **kwargs)
         # 缓存系统
-        self._cache: Dict[str, Dict[str, Any]] = {}
         self._cache_ttl = 600  # 10分钟缓存
+        self._cache = TTLCache(self.name, maxsize=100, ttl=self._cache_ttl, max_bytes=16 * 1024 * 1024)
 
         # 频率限制
-        self._user_last_request: Dict[int, float] = {}
-        self._rate_limit_interval = 2.0  # 2秒间隔
+        self._rate_limit_interval = rate_limiter.min_interval(self.name, USER)
 
         # 统计数据
-        self._stats = {
-            "total_searches": 0,
-            "successful_searches": 0,
-            "failed_searches": 0,
-            "cache_hits": 0,
-            "cache_misses": 0
-        }
+        self._stats = plugin_counters(self.name, [
+            "total_searches", "successful_searches", "failed_searches", "cache_hits", "cache_misses",
+        ])
 
         # HTTP连接器配置
         self._connector = None
@@ -100,47 +98,22 @@ class MikanAnimeSearch(BasePlugin):
         """生成缓存键"""
         return hashlib.md5(query.encode('utf-8')).hexdigest()
 
-    def _is_cache_valid(self, cache_entry: Dict[str, Any]) -> bool:
-        """检查缓存是否有效"""
-        return time.time() - cache_entry['timestamp'] < self._cache_ttl
-
-    def _cleanup_cache(self):
-        """清理过期缓存"""
-        current_time = time.time()
-        expired_keys = [
-            key for key, entry in self._cache.items()
-            if current_time - entry['timestamp'] >= self._cache_ttl
-        ]
-        for key in expired_keys:
-            del self._cache[key]
-
-        if expired_keys:
-            _log.debug(f"清理了 {len(expired_keys)} 个过期缓存条目")
-
-    def _check_rate_limit(self, user_id: int) -> bool:
+    def _check_rate_limit(self, user_id: int, group_id: int = None) -> bool:
         """检查用户请求频率限制"""
-        current_time = time.time()
-        last_request = self._user_last_request.get(user_id, 0)
-
-        if current_time - last_request < self._rate_limit_interval:
-            return False
-
-        self._user_last_request[user_id] = current_time
-        return True
+        return rate_limiter.hit_all(self.name, user_id, group_id).allowed
 
     async def search_mikan_anime(self, query: str) -> Optional[str]:
         """访问 Mikanani 搜索并解析结果"""
         try:
             # 检查缓存
             cache_key = self._get_cache_key(query)
-            self._cleanup_cache()
-
-            if cache_key in self._cache and self._is_cache_valid(self._cache[cache_key]):
+            cached = self._cache.get(cache_key)
+            if cached is not None:
                 _log.info(f"缓存命中: {query}")
-                self._stats["cache_hits"] += 1
-                return self._cache[cache_key]['data']
+                self._stats.inc("cache_hits")
+                return cached
 
-            self._stats["cache_misses"] += 1
+            self._stats.inc("cache_misses")
 
             # 构建搜索URL
             base_url = "https://mikanani.me/Home/Search"
@@ -162,10 +135,7 @@ class MikanAnimeSearch(BasePlugin):
                     html_content = await response.text()
 
                     # 缓存结果
-                    self._cache[cache_key] = {
-                        'data': html_content,
-                        'timestamp': time.time()
-                    }
+                    self._cache.set(cache_key, html_content)
 
                     _log.info(f"搜索成功: {query}, 响应大小: {len(html_content)} 字符")
                     return html_content
@@ -438,7 +408,7 @@ class MikanAnimeSearch(BasePlugin):
                 return
 
             # 检查频率限制
-            if not self._check_rate_limit(event.user_id):
+            if not self._check_rate_limit(event.user_id, event.group_id):
                 await self.api.post_group_msg(
                     event.group_id,
                     text=f"请求过于频繁，请等待 {self._rate_limit_interval} 秒后再试"
@@ -446,7 +416,7 @@ class MikanAnimeSearch(BasePlugin):
                 return
 
             # 更新统计
-            self._stats["total_searches"] += 1
+            self._stats.inc("total_searches")
 
             _log.info(f"用户 {event.user_id} 搜索番剧: {query}")
             await self.api.post_group_msg(event.group_id, text="🔍 正在搜索，请稍候...")
@@ -454,17 +424,17 @@ class MikanAnimeSearch(BasePlugin):
             # 执行搜索
             results = await self.search_mikan_anime(query)
             if results is None:
-                self._stats["failed_searches"] += 1
+                self._stats.inc("failed_searches")
                 return
 
             # 解析结果
             parsed_results = self.parse_mikan_results(results)
             if parsed_results:
-                self._stats["successful_searches"] += 1
+                self._stats.inc("successful_searches")
                 await self.send_comics_forward(event, parsed_results)
                 _log.info(f"搜索成功: {query}, 返回 {len(parsed_results)} 个结果")
             else:
-                self._stats["failed_searches"] += 1
+                self._stats.inc("failed_searches")
                 await self.api.post_group_msg(
                     event.group_id,
                     text="😔 未找到相关番剧，请尝试其他关键词"
@@ -472,7 +442,7 @@ class MikanAnimeSearch(BasePlugin):
                 _log.info(f"搜索无结果: {query}")
 
         except Exception as e:
-            self._stats["failed_searches"] += 1
+            self._stats.inc("failed_searches")
             _log.error(f"搜索命令处理失败: {e}")
             await self.api.post_group_msg(
                 event.group_id,
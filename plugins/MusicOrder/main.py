@@ -9,6 +9,7 @@ from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
 from ncatbot.core.element import Music, CustomMusic, MessageChain
 from utils.group_forward_msg import send_group_msg_cq
+from utils.ttl_cache import TTLCache
 from PluginManager.plugin_manager import feature_required
 
 # 尝试导入pyncm，如果没有安装则使用备用API
@@ -54,7 +55,8 @@ class MusicOrder(BasePlugin):
         self.user_states: Dict[int, Dict[str, Any]] = {}
         self.session: Optional[aiohttp.ClientSession] = None
         self.timeout = aiohttp.ClientTimeout(total=15)  # 15秒超时
-        self.search_cache: Dict[str, List[SongInfo]] = {}  # 搜索结果缓存
+        # 搜索结果缓存：30分钟内直接返回，之后一小时内先返回旧结果并在后台刷新
+        self.search_cache = TTLCache(self.name, maxsize=300, ttl=1800, stale_ttl=3600)
 
     async def on_load(self):
         """插件加载时初始化"""
@@ -154,11 +156,12 @@ class MusicOrder(BasePlugin):
 
     async def search_songs(self, keyword: str, platform: str = "netease") -> List[SongInfo]:
         """搜索歌曲的统一入口"""
-        # 检查缓存
         cache_key = f"{platform}:{keyword}"
-        if cache_key in self.search_cache:
-            return self.search_cache[cache_key]
+        songs = await self.search_cache.get_or_load(cache_key, lambda: self._fetch_songs(keyword, platform))
+        return songs or []
 
+    async def _fetch_songs(self, keyword: str, platform: str) -> Optional[List[SongInfo]]:
+        """请求搜索接口，没有结果时返回None（不缓存）"""
         songs = []
 
         # 优先使用pyncm
@@ -169,11 +172,7 @@ class MusicOrder(BasePlugin):
         if not songs:
             songs = await self._search_songs_fallback(keyword, platform)
 
-        # 缓存结果
-        if songs:
-            self.search_cache[cache_key] = songs
-
-        return songs
+        return songs or None
 
     async def get_song_play_url(self, song_info: SongInfo) -> str:
         """获取歌曲播放链接"""
@@ -1,13 +1,13 @@
 import aiohttp
 import random
 import logging
-import asyncio
 from typing import Optional
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
 from ncatbot.core.element import MessageChain, Text, Image
 from PluginManager.plugin_manager import feature_required
 from utils.config_manager import get_config
+from utils.rate_limiter import GLOBAL, rate_limiter
 
 bot = CompatibleEnrollment
 _log = logging.getLogger(__name__)
@@ -24,25 +24,20 @@ class PantsuDraw(BasePlugin):
         ]
         self.request_count = 0
         self.error_count = 0
-        self.last_request_time = 0
-        self.rate_limit_delay = 1.0  # 请求间隔限制
+        self.rate_limit_delay = rate_limiter.min_interval(self.name, GLOBAL)  # 请求间隔限制
 
         _log.info(f"{self.name} v{self.version} 插件已加载")
         _log.info("胖次抽取功能已启用")
 
-    async def _check_rate_limit(self):
-        """检查请求频率限制"""
-        import time
-        current_time = time.time()
-        if current_time - self.last_request_time < self.rate_limit_delay:
-            wait_time = self.rate_limit_delay - (current_time - self.last_request_time)
-            await asyncio.sleep(wait_time)
-        self.last_request_time = time.time()
+    async def _check_rate_limit(self, group_id: int, user_id: int = None) -> bool:
+        """检查请求频率限制，超限时提示并返回False"""
+        limit = rate_limiter.hit_all(self.name, user_id, group_id)
+        if not limit:
+            await self.api.post_group_msg(group_id, text=f"⏳ 请求过于频繁，请等待 {limit.retry_after:.1f} 秒后再试")
+        return limit.allowed
 
     async def fetch_pantsu_image(self) -> Optional[str]:
         """调用 API 获取胖次图片 URL"""
-        await self._check_rate_limit()
-
         # 获取代理配置
         try:
             config = get_config()
@@ -133,6 +128,8 @@ class PantsuDraw(BasePlugin):
         message = event.raw_message.strip()
 
         if message == "抽胖次":
+            if not await self._check_rate_limit(event.group_id, event.user_id):
+                return
             try:
                 _log.info(f"用户 {event.user_id} 在群 {event.group_id} 请求抽胖次")
                 await self.api.post_group_msg(event.group_id, text="🎲 正在为你抽取胖次，请稍候...")
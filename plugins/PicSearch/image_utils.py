@@ -1,61 +1,179 @@
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Any, Tuple
+
 from PicImageSearch import Network, Yandex, Iqdb, SauceNAO
+from ncatbot.utils.logger import get_log
 from utils.config_manager import get_config
-from typing import Dict, List, Optional, Any
+from utils.http_client import http_session
+
+_log = get_log()
+
+# 各引擎的单独超时（秒），超时的引擎记为失败，不拖慢其它引擎
+ENGINE_TIMEOUTS = {
+    "SauceNAO": 20.0,
+    "Yandex": 25.0,
+    "Iqdb": 20.0,
+}
+# 整次搜索的总时限（秒），到期后取消仍未返回的引擎
+SEARCH_DEADLINE = 30.0
+
+# 按图片内容哈希缓存搜索结果（QQ 图片 URL 每次发送都会变化，不能用 URL 作为键）
+_CACHE_TTL = 3600
+_CACHE_MAX_ENTRIES = 256
+_result_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+EngineCallback = Callable[[str, Optional[List[Dict[str, Any]]]], Awaitable[None]]
+
+
+async def _download_image(image_url: str) -> Optional[bytes]:
+    """下载图片，失败时返回 None"""
+    try:
+        async with http_session(timeout="fast") as session:
+            async with session.get(image_url) as response:
+                if response.status == 200:
+                    return await response.read()
+    except Exception as e:
+        _log.debug(f"下载图片失败，改为由搜索引擎按URL获取: {e}")
+    return None
+
+
+def _image_cache_key(image_url: str, data: Optional[bytes]) -> str:
+    """按图片内容计算缓存键，未能下载时退化为 URL 哈希"""
+    if data is not None:
+        return "sha1:" + hashlib.sha1(data).hexdigest()
+    return "url:" + hashlib.sha1(image_url.encode("utf-8")).hexdigest()
+
+
+def _get_cached(key: str) -> Optional[Dict[str, Any]]:
+    entry = _result_cache.get(key)
+    if entry is None:
+        return None
+    timestamp, results = entry
+    if time.time() - timestamp > _CACHE_TTL:
+        del _result_cache[key]
+        return None
+    _result_cache.move_to_end(key)
+    return results
 
-async def search_image(image_url: str) -> Optional[Dict[str, Any]]:
+
+def _set_cached(key: str, results: Dict[str, Any]) -> None:
+    _result_cache[key] = (time.time(), results)
+    _result_cache.move_to_end(key)
+    while len(_result_cache) > _CACHE_MAX_ENTRIES:
+        _result_cache.popitem(last=False)
+
+
+async def search_image(
+    image_url: str,
+    on_engine_result: Optional[EngineCallback] = None,
+) -> Optional[Dict[str, Any]]:
     """
-    使用 PicImageSearch 搜索图片
+    使用 PicImageSearch 并行搜索图片
+
+    各引擎同时发起请求，每个引擎有独立超时，总时限到期后取消仍未返回的引擎。
+    相同图片（按内容哈希）的结果会被缓存，重复搜索直接返回。
 
     Args:
         image_url: 图片URL
+        on_engine_result: 可选回调，每个引擎完成时立即以 (引擎名, 结果) 调用，用于逐个发送结果；
+            命中缓存时不调用
 
     Returns:
         Dict: 搜索结果字典，包含各个引擎的结果
     """
+    # 图片只下载一次：既用于计算缓存键，也直接上传给各引擎，避免各引擎再分别拉取
+    data = await _download_image(image_url)
+    source = {"file": data} if data is not None else {"url": image_url}
+    cache_key = _image_cache_key(image_url, data)
+    cached = _get_cached(cache_key)
+    if cached is not None:
+        # 命中缓存时不逐个回调，由调用方一次性发送全部结果
+        _log.info(f"搜图命中缓存: {cache_key}")
+        return cached
+
     proxy = get_config("proxy")
+    saucenao_api_key = get_config("saucenao_api_key")
 
     try:
         async with Network(proxies=proxy) as client:
-            # 初始化搜索引擎
-            yandex = Yandex(client=client)
-            iqdb = Iqdb(client=client)
-
-            # 并行执行搜索任务
-            import asyncio
-            tasks = []
-
-            # SauceNAO搜索（如果有API Key）
-            saucenao_api_key = get_config("saucenao_api_key")
+            # 初始化搜索引擎，未配置 API Key 的 SauceNAO 不参与搜索，也不回调
+            engines = {}
             if saucenao_api_key:
                 saucenao = SauceNAO(api_key=saucenao_api_key, hide=3, client=client)
-                tasks.append(("SauceNAO", _search_saucenao(saucenao, image_url)))
+                engines["SauceNAO"] = _search_saucenao(saucenao, source)
+            engines["Yandex"] = _search_yandex(Yandex(client=client), source)
+            engines["Iqdb"] = _search_iqdb(Iqdb(client=client), source)
 
-            # Yandex搜索
-            tasks.append(("Yandex", _search_yandex(yandex, image_url)))
+            results = await _run_engines(engines, on_engine_result)
 
-            # Iqdb搜索
-            tasks.append(("Iqdb", _search_iqdb(iqdb, image_url)))
-
-            # 等待所有搜索完成
-            results = {}
-            for engine_name, task in tasks:
-                try:
-                    results[engine_name] = await task
-                except Exception:
-                    results[engine_name] = None
+    except Exception as e:
+        _log.error(f"搜图失败: {e}")
+        return None
 
-            # 如果没有SauceNAO API Key，添加None结果
-            if not saucenao_api_key:
-                results["SauceNAO"] = None
+    # 至少一个引擎成功时才缓存，避免缓存临时故障
+    if any(result is not None for result in results.values()):
+        _set_cached(cache_key, results)
+    return results
 
-            return results
 
-    except Exception:
-        return None
+async def _run_engines(
+    engines: Dict[str, Awaitable[List[Dict[str, Any]]]],
+    on_engine_result: Optional[EngineCallback],
+) -> Dict[str, Any]:
+    """并发执行所有引擎，按完成顺序收集结果并回调"""
+
+    async def _run(engine_name: str, coro: Awaitable[List[Dict[str, Any]]]):
+        try:
+            return engine_name, await asyncio.wait_for(coro, timeout=ENGINE_TIMEOUTS.get(engine_name, SEARCH_DEADLINE))
+        except asyncio.TimeoutError:
+            _log.warning(f"{engine_name} 搜索超时")
+        except Exception as e:
+            _log.warning(f"{engine_name} 搜索失败: {e}")
+        return engine_name, None
+
+    tasks = [asyncio.create_task(_run(name, coro)) for name, coro in engines.items()]
+    results: Dict[str, Any] = {}
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + SEARCH_DEADLINE
+    try:
+        pending = set(tasks)
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining > 0:
+                await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            # 到期时也先收集所有已完成的引擎（包括回调期间完成的），没有新完成的才结束
+            done = {task for task in pending if task.done()}
+            if not done:
+                break
+            pending -= done
+            for task in done:
+                engine_name, result = task.result()
+                results[engine_name] = result
+                if on_engine_result:
+                    try:
+                        await on_engine_result(engine_name, result)
+                    except Exception as e:
+                        _log.error(f"发送 {engine_name} 搜图结果失败: {e}")
+    finally:
+        # 取消超过总时限仍未返回的引擎
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    for engine_name in engines:
+        if engine_name not in results:
+            results[engine_name] = None
+            if on_engine_result:
+                await on_engine_result(engine_name, None)
+    return results
 
-async def _search_saucenao(saucenao: SauceNAO, image_url: str) -> List[Dict[str, Any]]:
+async def _search_saucenao(saucenao: SauceNAO, source: Dict[str, Any]) -> List[Dict[str, Any]]:
     """SauceNAO搜索"""
-    resp = await saucenao.search(url=image_url)
+    resp = await saucenao.search(**source)
     results = []
 
     for item in resp.raw:
@@ -68,9 +186,9 @@ async def _search_saucenao(saucenao: SauceNAO, image_url: str) -> List[Dict[str,
 
     return results
 
-async def _search_yandex(yandex: Yandex, image_url: str) -> List[Dict[str, Any]]:
+async def _search_yandex(yandex: Yandex, source: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Yandex搜索"""
-    resp = await yandex.search(url=image_url)
+    resp = await yandex.search(**source)
     results = []
 
     for item in resp.raw:
@@ -87,9 +205,9 @@ async def _search_yandex(yandex: Yandex, image_url: str) -> List[Dict[str, Any]]
 
     return results
 
-async def _search_iqdb(iqdb: Iqdb, image_url: str) -> List[Dict[str, Any]]:
+async def _search_iqdb(iqdb: Iqdb, source: Dict[str, Any]) -> List[Dict[str, Any]]:
     """Iqdb搜索"""
-    resp = await iqdb.search(url=image_url)
+    resp = await iqdb.search(**source)
     results = []
 
     for item in resp.raw:
@@ -107,7 +225,7 @@ async def format_results(results: dict, self_id: int):
     messages = []
     
     saucenao_key_missing = False
-    if results["SauceNAO"] is None and get_config("saucenao_api_key") is None:
+    if results.get("SauceNAO") is None and get_config("saucenao_api_key") is None:
         saucenao_key_missing = True
     
     for engine, result_list in results.items():
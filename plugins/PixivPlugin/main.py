@@ -1,12 +1,12 @@
 import re
 import logging
-import asyncio
 from typing import Optional, List, Dict
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
 from ncatbot.core.element import MessageChain, Text, Image
 from utils.group_forward_msg import send_group_forward_msg_ws
 from utils.config_manager import get_config
+from utils.rate_limiter import GLOBAL, rate_limiter
 from PluginManager.plugin_manager import feature_required
 from .pixiv_utils import initialize_pixiv_api, fetch_illusts, fetch_ranking, format_illusts, get_illust_detail
 
@@ -22,8 +22,7 @@ class PixivPlugin(BasePlugin):
         self.search_count = 0
         self.ranking_count = 0
         self.error_count = 0
-        self.last_search_time = 0
-        self.rate_limit_delay = 2.0  # 请求间隔限制
+        self.rate_limit_delay = rate_limiter.min_interval(self.name, GLOBAL)  # 请求间隔限制
 
         _log.info(f"{self.name} v{self.version} 插件已加载")
 
@@ -42,14 +41,12 @@ class PixivPlugin(BasePlugin):
             _log.error(f"Pixiv API初始化失败: {e}")
             raise
 
-    async def _check_rate_limit(self):
-        """检查请求频率限制"""
-        import time
-        current_time = time.time()
-        if current_time - self.last_search_time < self.rate_limit_delay:
-            wait_time = self.rate_limit_delay - (current_time - self.last_search_time)
-            await asyncio.sleep(wait_time)
-        self.last_search_time = time.time()
+    async def _check_rate_limit(self, group_id: int, user_id: int = None) -> bool:
+        """检查请求频率限制，超限时提示并返回False"""
+        limit = rate_limiter.hit_all(self.name, user_id, group_id)
+        if not limit:
+            await self.api.post_group_msg(group_id, text=f"⏳ 请求过于频繁，请等待 {limit.retry_after:.1f} 秒后再试")
+        return limit.allowed
 
     async def get_statistics(self) -> str:
         """获取使用统计"""
@@ -74,7 +71,8 @@ class PixivPlugin(BasePlugin):
 
         try:
             if re.match(r"^/pixs", raw_message):
-                await self._check_rate_limit()
+                if not await self._check_rate_limit(event.group_id, event.user_id):
+                    return
                 parts = re.sub(r"^/pixs", "", raw_message).strip().split()
                 query = parts[0] if parts else ""
                 page = int(parts[1]) if len(parts) > 1 and parts[1].isdigit() else 1
@@ -97,7 +95,8 @@ class PixivPlugin(BasePlugin):
                     await self.api.post_group_msg(event.group_id, text=f"❌ 未找到「{query}」相关插画\n💡 尝试使用其他关键词或检查拼写")
 
             elif re.match(r"^/pixb", raw_message):
-                await self._check_rate_limit()
+                if not await self._check_rate_limit(event.group_id, event.user_id):
+                    return
                 parts = re.sub(r"^/pixb", "", raw_message).strip().split()
                 mode_map = {"日": "day", "周": "week", "月": "month"}
                 mode = mode_map.get(parts[0], "day") if parts else "day"
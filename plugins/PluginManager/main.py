@@ -1,5 +1,6 @@
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
+from utils.command_router import command_router, route
 from PluginManager.plugin_manager import master_required
 from DatabasePlugin.main import DatabaseManager
 bot = CompatibleEnrollment
@@ -9,10 +10,11 @@ class PluginManager(BasePlugin):
     version = "1.0.0"   # 插件版本
 
     async def on_load(self):
+        command_router.register_plugin(self)
         print(f"{self.name} 插件已加载")
         print(f"插件版本: {self.version}")
 
-    @bot.group_event()
+    @route(prefixes=["/开启", "/关闭"])
     @master_required(commands=["/开启", "/关闭"])# 检查是否为管理员
     async def handle_group_message(self, event: GroupMessage):
         db_manager = DatabaseManager()
@@ -1,8 +1,6 @@
 """
 插件管理器 - 统一管理插件功能开关和权限控制
 """
-import asyncio
-import aiosqlite
 import json
 import re
 from functools import wraps
@@ -11,6 +9,8 @@ from pathlib import Path
 
 from ncatbot.utils.logger import get_log
 from utils.config_manager import get_config
+from utils.database_pool import get_database
+from utils.feature_cache import feature_index
 
 _log = get_log()
 
@@ -19,30 +19,33 @@ class DatabaseManager:
     
     def __init__(self, db_path: str = "data.db"):
         self.db_path = Path(db_path)
-        self._lock = asyncio.Lock()
+        self._db = get_database(self.db_path)
     
     async def execute_query(self, query: str, params: tuple = ()) -> Optional[Any]:
         """执行数据库查询"""
-        async with self._lock:
-            try:
-                async with aiosqlite.connect(self.db_path) as conn:
-                    async with conn.execute(query, params) as cursor:
-                        return await cursor.fetchone()
-            except Exception as e:
-                _log.error(f"数据库查询失败: {e}")
-                return None
+        try:
+            return await self._db.fetchone(query, params)
+        except Exception as e:
+            _log.error(f"数据库查询失败: {e}")
+            return None
+    
+    async def execute_write(self, query: str, params: tuple = ()) -> bool:
+        """执行数据库写操作并提交"""
+        try:
+            await self._db.execute(query, params)
+            return True
+        except Exception as e:
+            _log.error(f"数据库写入失败: {e}")
+            return False
     
     async def execute_many(self, query: str, params_list: List[tuple]) -> bool:
         """批量执行数据库操作"""
-        async with self._lock:
-            try:
-                async with aiosqlite.connect(self.db_path) as conn:
-                    await conn.executemany(query, params_list)
-                    await conn.commit()
-                    return True
-            except Exception as e:
-                _log.error(f"批量数据库操作失败: {e}")
-                return False
+        try:
+            await self._db.executemany(query, params_list)
+            return True
+        except Exception as e:
+            _log.error(f"批量数据库操作失败: {e}")
+            return False
 
 class PermissionManager:
     """权限管理器"""
@@ -99,27 +102,8 @@ class FeatureManager:
             bool: 功能是否开启
         """
         try:
-            query = "SELECT menu_item FROM group_menus WHERE group_id = ?"
-            result = await self.db_manager.execute_query(query, (group_id,))
-            
-            if result:
-                try:
-                    menu_item = json.loads(result[0])
-                    features = menu_item.get("info", [])
-                    
-                    for feature in features:
-                        if feature.get("title") == feature_name:
-                            return feature.get("status") == "1"
-                    
-                    # 如果没有找到该功能，默认开启
-                    return True
-                    
-                except json.JSONDecodeError as e:
-                    _log.error(f"解析功能配置JSON失败: {e}")
-                    
-            # 如果没有配置记录，默认开启
-            return True
-            
+            # 命中内存索引时不访问数据库，未加载的群首次查询时懒加载
+            return await feature_index.is_enabled(group_id, feature_name)
         except Exception as e:
             _log.error(f"检查功能状态失败: {e}")
             return True  # 出错时默认开启
@@ -167,11 +151,13 @@ class FeatureManager:
                     # 更新数据库
                     menu_item["info"] = features
                     update_query = "UPDATE group_menus SET menu_item = ? WHERE group_id = ?"
-                    await self.db_manager.execute_query(
+                    if not await self.db_manager.execute_write(
                         update_query, 
                         (json.dumps(menu_item, ensure_ascii=False), group_id)
-                    )
+                    ):
+                        return False
                     
+                    feature_index.update_menu(group_id, menu_item)
                     return True
                     
                 except json.JSONDecodeError as e:
@@ -188,16 +174,22 @@ class FeatureManager:
                 }
                 
                 insert_query = "INSERT INTO group_menus (group_id, menu_item) VALUES (?, ?)"
-                await self.db_manager.execute_query(
+                if not await self.db_manager.execute_write(
                     insert_query,
                     (group_id, json.dumps(menu_item, ensure_ascii=False))
-                )
+                ):
+                    return False
                 
+                feature_index.update_menu(group_id, menu_item)
                 return True
                 
         except Exception as e:
             _log.error(f"设置功能状态失败: {e}")
             return False
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取功能开关缓存的命中统计"""
+        return feature_index.get_stats()
 
 # 全局实例
 _db_manager = DatabaseManager()
@@ -324,3 +316,7 @@ async def is_feature_enabled(group_id: int, title: str) -> bool:
 async def is_master(user_id: int) -> bool:
     """向后兼容的管理员检查函数"""
     return await _permission_manager.is_master(user_id)
+
+def get_feature_cache_stats() -> Dict[str, Any]:
+    """获取功能开关缓存的命中统计"""
+    return _feature_manager.get_cache_stats()
@@ -4,6 +4,7 @@ import os
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.utils.config import config
 from ncatbot.core.message import GroupMessage
+from utils.command_router import command_router, route
 from .pokeData import (
     init_db, add_poke_reply, get_random_poke_reply,
     get_all_poke_replies, delete_poke_reply, generate_replies_image
@@ -19,11 +20,12 @@ class PokeReply(BasePlugin):
 
     async def on_load(self):
         """插件加载时初始化"""
+        command_router.register_plugin(self)
         await init_db()
         print(f"{self.name} 插件已加载")
         print(f"插件版本: {self.version}")
 
-    @bot.group_event()
+    @route(prefixes=["/添加cyc", "/查询cyc", "/删除cyc"], commands=["/cyc帮助", "/戳一戳帮助"])
     async def on_message(self, event: GroupMessage):
         """处理群消息事件"""
         message = event.raw_message.strip()
@@ -1,25 +1,26 @@
-import aiosqlite
 import random
 import os
 import html
 from typing import List, Optional
 from PIL import Image, ImageDraw, ImageFont
 
+from utils.database_pool import get_database
+
 DB_PATH = "data.db"
 
 async def init_db() -> None:
     """初始化数据库，创建戳一戳回复表"""
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS poke_replies (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    group_id INTEGER NOT NULL,
-                    content TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            await db.commit()
+        await get_database(DB_PATH).executescript("""
+            CREATE TABLE IF NOT EXISTS poke_replies (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                group_id INTEGER NOT NULL,
+                content TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS idx_poke_replies_group_id
+            ON poke_replies(group_id);
+        """)
     except Exception as e:
         print(f"[ERROR] 初始化戳一戳数据库失败: {e}")
 
@@ -29,13 +30,11 @@ async def add_poke_reply(group_id: int, content: str) -> bool:
         if not content.strip():
             return False
 
-        async with aiosqlite.connect(DB_PATH) as db:
-            await db.execute(
-                "INSERT INTO poke_replies (group_id, content) VALUES (?, ?)",
-                (group_id, content.strip())
-            )
-            await db.commit()
-            return True
+        await get_database(DB_PATH).execute(
+            "INSERT INTO poke_replies (group_id, content) VALUES (?, ?)",
+            (group_id, content.strip())
+        )
+        return True
     except Exception as e:
         print(f"[ERROR] 添加戳一戳回复失败: {e}")
         return False
@@ -43,15 +42,13 @@ async def add_poke_reply(group_id: int, content: str) -> bool:
 async def get_random_poke_reply(group_id: int) -> Optional[str]:
     """随机获取指定群组的戳一戳回复内容"""
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            async with db.execute(
-                "SELECT content FROM poke_replies WHERE group_id = ?",
-                (group_id,)
-            ) as cursor:
-                rows = await cursor.fetchall()
-                if rows:
-                    return random.choice(rows)[0]
-                return None
+        rows = await get_database(DB_PATH).fetchall(
+            "SELECT content FROM poke_replies WHERE group_id = ?",
+            (group_id,)
+        )
+        if rows:
+            return random.choice(rows)[0]
+        return None
     except Exception as e:
         print(f"[ERROR] 获取随机戳一戳回复失败: {e}")
         return None
@@ -59,13 +56,11 @@ async def get_random_poke_reply(group_id: int) -> Optional[str]:
 async def get_all_poke_replies(group_id: int) -> List[str]:
     """获取指定群组的所有戳一戳回复内容"""
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            async with db.execute(
-                "SELECT content FROM poke_replies WHERE group_id = ? ORDER BY id",
-                (group_id,)
-            ) as cursor:
-                rows = await cursor.fetchall()
-                return [row[0] for row in rows] if rows else []
+        rows = await get_database(DB_PATH).fetchall(
+            "SELECT content FROM poke_replies WHERE group_id = ? ORDER BY id",
+            (group_id,)
+        )
+        return [row[0] for row in rows] if rows else []
     except Exception as e:
         print(f"[ERROR] 获取戳一戳回复列表失败: {e}")
         return []
@@ -75,24 +70,20 @@ async def delete_poke_reply(group_id: int, index: int) -> bool:
         if index < 1:
             return False
 
-        async with aiosqlite.connect(DB_PATH) as db:
-            # 获取所有内容ID，按顺序排列
+        async with get_database(DB_PATH).transaction() as db:
+            # 获取对应序号的内容ID
             async with db.execute(
-                "SELECT id FROM poke_replies WHERE group_id = ? ORDER BY id",
-                (group_id,)
+                "SELECT id FROM poke_replies WHERE group_id = ? ORDER BY id LIMIT 1 OFFSET ?",
+                (group_id, index - 1)
             ) as cursor:
-                rows = await cursor.fetchall()
-
-                if not rows or index > len(rows):
-                    return False
+                row = await cursor.fetchone()
 
-                # 获取对应的内容ID
-                content_id = rows[index - 1][0]
+            if not row:
+                return False
 
-                # 删除对应内容
-                await db.execute("DELETE FROM poke_replies WHERE id = ?", (content_id,))
-                await db.commit()
-                return True
+            # 删除对应内容
+            await db.execute("DELETE FROM poke_replies WHERE id = ?", (row[0],))
+            return True
 
     except Exception as e:
         print(f"[ERROR] 删除戳一戳回复失败: {e}")
@@ -101,13 +92,11 @@ async def delete_poke_reply(group_id: int, index: int) -> bool:
 async def get_reply_count(group_id: int) -> int:
     """获取指定群组的戳一戳回复数量"""
     try:
-        async with aiosqlite.connect(DB_PATH) as db:
-            async with db.execute(
-                "SELECT COUNT(*) FROM poke_replies WHERE group_id = ?",
-                (group_id,)
-            ) as cursor:
-                result = await cursor.fetchone()
-                return result[0] if result else 0
+        result = await get_database(DB_PATH).fetchone(
+            "SELECT COUNT(*) FROM poke_replies WHERE group_id = ?",
+            (group_id,)
+        )
+        return result[0] if result else 0
     except Exception as e:
         print(f"[ERROR] 获取戳一戳回复数量失败: {e}")
         return 0
@@ -1,76 +1,188 @@
-import aiosqlite
+import asyncio
+import re
 from ncatbot.utils.logger import get_log
 import random
-from fuzzywuzzy import fuzz
+from typing import Dict, Optional, Set
+from utils.database_pool import get_database
+from .matcher import QAEntry, QAIndex
 
 _log = get_log()
 
+# 旧版每个群一张的问答表：ck_<群号>
+LEGACY_TABLE_PATTERN = re.compile(r"^ck_(\d+)$")
+
 class QADatabaseHandler:
     def __init__(self, db_path="data.db"):
         self.db_path = db_path
+        self.db = get_database(db_path)
+        self._initialized = False
+        self._init_lock = asyncio.Lock()
+        # 已确认不再有旧表数据待迁移的群
+        self._ready_groups: Set[int] = set()
+        self._migrate_lock = asyncio.Lock()
+        # 每个群的内存问答索引，首次查询时从数据库加载，之后随增删改增量更新
+        self._indexes: Dict[int, QAIndex] = {}
+        self._index_locks: Dict[int, asyncio.Lock] = {}
+
+    async def initialize(self) -> None:
+        """创建统一的问答表和索引。"""
+        if self._initialized:
+            return
+        async with self._init_lock:
+            if self._initialized:
+                return
+            await self.db.executescript("""
+                CREATE TABLE IF NOT EXISTS qa_pairs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    group_id INTEGER NOT NULL,
+                    question TEXT NOT NULL,
+                    answer TEXT NOT NULL,
+                    match_type TEXT NOT NULL DEFAULT 'exact',
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+                CREATE INDEX IF NOT EXISTS idx_qa_pairs_lookup
+                ON qa_pairs(group_id, match_type, question);
+                CREATE INDEX IF NOT EXISTS idx_qa_pairs_group
+                ON qa_pairs(group_id, id);
+                CREATE TABLE IF NOT EXISTS qa_migrations (
+                    table_name TEXT PRIMARY KEY,
+                    group_id INTEGER NOT NULL,
+                    rows INTEGER NOT NULL,
+                    migrated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            self._initialized = True
+
+    async def _legacy_tables(self) -> Dict[int, str]:
+        rows = await self.db.fetchall(
+            "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'ck\\_%' ESCAPE '\\'"
+        )
+        tables = {}
+        for (name,) in rows:
+            match = LEGACY_TABLE_PATTERN.match(name)
+            if match:
+                tables[int(match.group(1))] = name
+        return tables
+
+    async def _migrate_table(self, group_id: int, table_name: str) -> int:
+        """把一张旧表的数据复制到 qa_pairs 并删除旧表（同一事务内完成）。"""
+        async with self.db.transaction() as conn:
+            async with conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='table' AND name = ?", (table_name,)
+            ) as cursor:
+                if await cursor.fetchone() is None:
+                    return 0  # 已被其他任务迁移
+            async with conn.execute(f"PRAGMA table_info({table_name})") as cursor:
+                columns = {row[1] for row in await cursor.fetchall()}
+            match_type = "match_type" if "match_type" in columns else "'exact'"
+            # 按旧表 id 顺序插入，保持词条序号不变
+            async with conn.execute(
+                f"""
+                INSERT INTO qa_pairs (group_id, question, answer, match_type)
+                SELECT ?, question, answer, {match_type} FROM {table_name} ORDER BY id
+                """,
+                (group_id,),
+            ) as cursor:
+                migrated = cursor.rowcount
+            await conn.execute(
+                "INSERT OR REPLACE INTO qa_migrations (table_name, group_id, rows) VALUES (?, ?, ?)",
+                (table_name, group_id, migrated),
+            )
+            await conn.execute(f"DROP TABLE {table_name}")
+        _log.info(f"问答表 {table_name} 已迁移到 qa_pairs: {migrated} 条")
+        return migrated
 
-    async def create_table(self, group_id: int) -> bool:
-        """为指定群创建一个新的问答表，表名为 ck_群号。"""
-        table_name = f"ck_{group_id}"
+    async def ensure_group(self, group_id: int) -> None:
+        """确保指定群的旧表数据已迁移（按需迁移，不必等待后台迁移完成）。"""
+        if group_id in self._ready_groups:
+            return
+        await self.initialize()
+        async with self._migrate_lock:
+            if group_id in self._ready_groups:
+                return
+            table_name = f"ck_{group_id}"
+            row = await self.db.fetchone(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name = ?", (table_name,)
+            )
+            if row:
+                await self._migrate_table(group_id, table_name)
+            self._ready_groups.add(group_id)
+
+    async def migrate_legacy_tables(self) -> int:
+        """
+        在线迁移所有旧版 ck_<群号> 表。
+
+        每张表在独立事务中迁移，迁移期间机器人照常服务；
+        尚未迁移的群在首次访问时由 ensure_group 优先迁移。
+        """
+        await self.initialize()
+        total = 0
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute(f"""
-                    CREATE TABLE IF NOT EXISTS {table_name} (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        question TEXT NOT NULL,
-                        answer TEXT NOT NULL,
-                        match_type TEXT NOT NULL DEFAULT 'exact'
-                    )
-                """)
-                await db.commit()
-            _log.info(f"表 {table_name} 创建成功。")
-            return True
-        except aiosqlite.Error as e:
-            _log.error(f"创建表 {table_name} 失败: {e}")
-            return False
+            tables = await self._legacy_tables()
+            for group_id, table_name in tables.items():
+                async with self._migrate_lock:
+                    if group_id not in self._ready_groups:
+                        total += await self._migrate_table(group_id, table_name)
+                        self._ready_groups.add(group_id)
+                await asyncio.sleep(0)  # 让出事件循环，避免长时间占用
+            if tables:
+                _log.info(f"旧版问答表迁移完成: {len(tables)} 张表, {total} 条词条")
+        except Exception as e:
+            _log.error(f"迁移旧版问答表失败: {e}")
+        return total
+
+    def _index_lock(self, group_id: int) -> asyncio.Lock:
+        lock = self._index_locks.get(group_id)
+        if lock is None:
+            lock = self._index_locks[group_id] = asyncio.Lock()
+        return lock
+
+    async def get_index(self, group_id: int) -> QAIndex:
+        """获取指定群的问答索引（首次使用时加载）"""
+        index = self._indexes.get(group_id)
+        if index is None:
+            await self.ensure_group(group_id)
+            async with self._index_lock(group_id):
+                index = self._indexes.get(group_id)
+                if index is None:
+                    index = self._indexes[group_id] = await self._load_index(group_id)
+        return index
 
-    async def table_exists(self, group_id: int) -> bool:
-        """检查指定群的问答表是否存在。"""
-        table_name = f"ck_{group_id}"
+    async def _load_index(self, group_id: int) -> QAIndex:
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                async with db.execute(
-                    "SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,)
-                ) as cursor:
-                    result = await cursor.fetchone()
-                    return result is not None
-        except aiosqlite.Error as e:
-            _log.error(f"检查表 {table_name} 是否存在时出错: {e}")
-            return False
+            rows = await self.db.fetchall(
+                "SELECT id, question, answer, match_type FROM qa_pairs WHERE group_id = ? ORDER BY id",
+                (group_id,),
+            )
+        except Exception as e:
+            _log.warning(f"加载群 {group_id} 的问答索引失败: {e}")
+            rows = []
+        index = QAIndex(QAEntry(*row) for row in rows)
+        _log.info(f"已加载群 {group_id} 的问答索引: {len(index)} 条")
+        return index
 
-    async def save_qa(self, group_id: int, question: str, answer: str, match_type: str = 'exact') -> bool:
-        """保存问答到指定群的问答表中。"""
-        table_name = f"ck_{group_id}"
+    async def save_qa(self, group_id: int, question: str, answer: str, match_type: str = 'exact') -> Optional[int]:
+        """保存问答，返回新词条的 id（失败返回 None）。"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute(
-                    f"INSERT INTO {table_name} (question, answer, match_type) VALUES (?, ?, ?)", (question, answer, match_type)
+            await self.ensure_group(group_id)
+            async with self._index_lock(group_id):
+                qa_id = await self.db.insert(
+                    "INSERT INTO qa_pairs (group_id, question, answer, match_type) VALUES (?, ?, ?, ?)",
+                    (group_id, question, answer, match_type),
                 )
-                await db.commit()
-            _log.info(f"问答已保存到表 {table_name}。")
-            return True
-        except aiosqlite.Error as e:
-            _log.error(f"保存问答到表 {table_name} 失败: {e}")
-            return False
+                index = self._indexes.get(group_id)
+                if index is not None:
+                    index.add(QAEntry(qa_id, question, answer, match_type))
+            _log.info(f"群 {group_id} 的问答已保存: #{qa_id}")
+            return qa_id
+        except Exception as e:
+            _log.error(f"保存群 {group_id} 的问答失败: {e}")
+            return None
 
     async def get_answers(self, group_id: int, question: str, match_type: str = 'exact') -> list[str]:
-        """从指定群的问答表中查找匹配的答案列表。"""
-        table_name = f"ck_{group_id}"
-        try:
-            async with aiosqlite.connect(self.db_path) as db:
-                async with db.execute(
-                    f"SELECT answer FROM {table_name} WHERE question = ? AND match_type = ?", (question, match_type)
-                ) as cursor:
-                    results = await cursor.fetchall()
-                    return [row[0] for row in results] if results else []
-        except aiosqlite.Error as e:
-            _log.error(f"从表 {table_name} 获取答案失败: {e}")
-            return []
+        """从指定群的问答索引中查找匹配的答案列表。"""
+        index = await self.get_index(group_id)
+        return index.answers(question, match_type)
 
     async def get_answer(self, group_id: int, question: str) -> str | None:
         """从指定群的问答表中查找精确匹配的答案，并随机返回一个。"""
@@ -79,128 +191,112 @@ class QADatabaseHandler:
 
     async def get_answer_fuzzy(self, group_id: int, question: str, threshold: int = 60) -> str | None:
         """
-        从指定群的问答表中查找模糊匹配的答案，并随机返回一个。
-        使用 fuzzywuzzy 库进行模糊匹配。
+        从指定群的问答索引中查找模糊匹配的答案。
+        先用 n-gram 倒排索引筛选候选，再用 partial_ratio 打分，返回得分最高的答案。
         :param threshold: 匹配阈值，默认为 60。
         """
-        table_name = f"ck_{group_id}"
-        try:
-            async with aiosqlite.connect(self.db_path) as db:
-                async with db.execute(
-                    f"SELECT question, answer FROM {table_name} WHERE match_type = 'fuzzy'"
-                ) as cursor:
-                    results = await cursor.fetchall()
-                    
-                    # 使用 fuzzywuzzy 进行模糊匹配
-                    best_match = None
-                    best_ratio = 0
-                    for qa in results:
-                        ratio = fuzz.partial_ratio(question, qa[0])
-                        if ratio > best_ratio and ratio >= threshold:
-                            best_ratio = ratio
-                            best_match = qa[1]  # 答案
-
-                    return best_match if best_match else None
-        except aiosqlite.Error as e:
-            _log.error(f"从表 {table_name} 获取模糊匹配答案失败: {e}")
-            return None
+        index = await self.get_index(group_id)
+        match = index.match_fuzzy(question, threshold)
+        return match[0].answer if match else None
 
     async def get_all_qa(self, group_id: int) -> list[dict[str, str]]:
         """获取指定群的所有问答。"""
-        table_name = f"ck_{group_id}"
-        try:
-            async with aiosqlite.connect(self.db_path) as db:
-                async with db.execute(f"SELECT question, answer FROM {table_name}") as cursor:
-                    results = await cursor.fetchall()
-                    return [{"question": row[0], "answer": row[1]} for row in results]
-        except aiosqlite.Error as e:
-            _log.error(f"从表 {table_name} 获取所有问答失败: {e}")
-            return []
+        return [
+            {"question": qa["question"], "answer": qa["answer"]}
+            for qa in await self.get_all_qa_with_type(group_id)
+        ]
 
     async def get_all_qa_with_type(self, group_id: int) -> list[dict[str, str]]:
-        """获取指定群的所有问答，包含匹配类型。"""
-        table_name = f"ck_{group_id}"
+        """获取指定群的所有问答，包含匹配类型和 id。"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                async with db.execute(f"SELECT question, answer, match_type FROM {table_name}") as cursor:
-                    results = await cursor.fetchall()
-                    return [{"question": row[0], "answer": row[1], "match_type": row[2]} for row in results]
-        except aiosqlite.Error as e:
-            _log.error(f"从表 {table_name} 获取所有问答失败: {e}")
+            await self.ensure_group(group_id)
+            rows = await self.db.fetchall(
+                "SELECT id, question, answer, match_type FROM qa_pairs WHERE group_id = ? ORDER BY id",
+                (group_id,),
+            )
+            return [{"id": row[0], "question": row[1], "answer": row[2], "match_type": row[3]} for row in rows]
+        except Exception as e:
+            _log.error(f"获取群 {group_id} 的所有问答失败: {e}")
             return []
 
+    async def get_qa_stats(self, group_id: int) -> dict[str, int]:
+        """按匹配类型统计指定群的问答数量（只走索引）。"""
+        stats = {"total": 0, "exact": 0, "fuzzy": 0}
+        try:
+            await self.ensure_group(group_id)
+            rows = await self.db.fetchall(
+                "SELECT match_type, COUNT(*) FROM qa_pairs WHERE group_id = ? GROUP BY match_type",
+                (group_id,),
+            )
+        except Exception as e:
+            _log.error(f"统计群 {group_id} 的问答数量失败: {e}")
+            return stats
+        for match_type, count in rows:
+            stats[match_type] = count
+            stats["total"] += count
+        return stats
+
     async def get_qa_count(self, group_id: int) -> int:
         """获取指定群的问答总数。"""
-        table_name = f"ck_{group_id}"
-        try:
-            async with aiosqlite.connect(self.db_path) as db:
-                async with db.execute(f"SELECT COUNT(*) FROM {table_name}") as cursor:
-                    result = await cursor.fetchone()
-                    return result[0] if result else 0
-        except aiosqlite.Error as e:
-            _log.error(f"从表 {table_name} 获取问答数量失败: {e}")
-            return 0
+        return (await self.get_qa_stats(group_id))["total"]
 
     async def get_qa_count_by_type(self, group_id: int, match_type: str) -> int:
         """获取指定群指定类型的问答数量。"""
-        table_name = f"ck_{group_id}"
-        try:
-            async with aiosqlite.connect(self.db_path) as db:
-                async with db.execute(f"SELECT COUNT(*) FROM {table_name} WHERE match_type = ?", (match_type,)) as cursor:
-                    result = await cursor.fetchone()
-                    return result[0] if result else 0
-        except aiosqlite.Error as e:
-            _log.error(f"从表 {table_name} 获取{match_type}问答数量失败: {e}")
-            return 0
+        return (await self.get_qa_stats(group_id)).get(match_type, 0)
 
     async def search_qa(self, group_id: int, keyword: str) -> list[dict[str, str]]:
-        """搜索包含关键词的问答。"""
-        table_name = f"ck_{group_id}"
+        """搜索包含关键词的问答（按群号索引范围扫描，不扫描其他群）。"""
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                async with db.execute(
-                    f"SELECT question, answer, match_type FROM {table_name} WHERE question LIKE ? OR answer LIKE ?",
-                    (f"%{keyword}%", f"%{keyword}%")
-                ) as cursor:
-                    results = await cursor.fetchall()
-                    return [{"question": row[0], "answer": row[1], "match_type": row[2]} for row in results]
-        except aiosqlite.Error as e:
-            _log.error(f"从表 {table_name} 搜索问答失败: {e}")
+            await self.ensure_group(group_id)
+            rows = await self.db.fetchall(
+                """
+                SELECT id, question, answer, match_type FROM qa_pairs
+                WHERE group_id = ? AND (question LIKE ? OR answer LIKE ?)
+                ORDER BY id
+                """,
+                (group_id, f"%{keyword}%", f"%{keyword}%"),
+            )
+            return [{"id": row[0], "question": row[1], "answer": row[2], "match_type": row[3]} for row in rows]
+        except Exception as e:
+            _log.error(f"搜索群 {group_id} 的问答失败: {e}")
             return []
 
     async def clear_all_qa(self, group_id: int) -> bool:
         """清空指定群的所有问答。"""
-        table_name = f"ck_{group_id}"
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                await db.execute(f"DELETE FROM {table_name}")
-                await db.commit()
-            _log.info(f"表 {table_name} 所有问答已清空。")
+            await self.ensure_group(group_id)
+            async with self._index_lock(group_id):
+                await self.db.execute("DELETE FROM qa_pairs WHERE group_id = ?", (group_id,))
+                index = self._indexes.get(group_id)
+                if index is not None:
+                    index.clear()
+            _log.info(f"群 {group_id} 的所有问答已清空。")
             return True
-        except aiosqlite.Error as e:
-            _log.error(f"清空表 {table_name} 失败: {e}")
+        except Exception as e:
+            _log.error(f"清空群 {group_id} 的问答失败: {e}")
             return False
 
     async def delete_qa(self, group_id: int, index: int) -> bool:
-        """删除指定群的指定序号的问答。"""
-        table_name = f"ck_{group_id}"
+        """删除指定群的指定序号（按添加顺序，从 1 开始）的问答。"""
+        if index <= 0:
+            return False
         try:
-            async with aiosqlite.connect(self.db_path) as db:
-                # 获取所有问答
-                qa_list = await self.get_all_qa(group_id)
-                if not qa_list or index <= 0 or index > len(qa_list):
-                    return False  # 序号无效
-
-                # 获取要删除的问答的id
-                qa_to_delete = qa_list[index - 1]
-                
-                # 删除问答
-                await db.execute(
-                    f"DELETE FROM {table_name} WHERE question = ? AND answer = ?", (qa_to_delete["question"], qa_to_delete["answer"])
-                )
-                await db.commit()
-                _log.info(f"从表 {table_name} 删除问答成功。")
-                return True
-        except aiosqlite.Error as e:
-            _log.error(f"从表 {table_name} 删除问答失败: {e}")
+            await self.ensure_group(group_id)
+            async with self._index_lock(group_id):
+                async with self.db.transaction() as conn:
+                    async with conn.execute(
+                        "SELECT id FROM qa_pairs WHERE group_id = ? ORDER BY id LIMIT 1 OFFSET ?",
+                        (group_id, index - 1),
+                    ) as cursor:
+                        row = await cursor.fetchone()
+                    if not row:
+                        return False  # 序号无效
+                    await conn.execute("DELETE FROM qa_pairs WHERE id = ?", (row[0],))
+                qa_index = self._indexes.get(group_id)
+                if qa_index is not None:
+                    qa_index.remove(row[0])
+            _log.info(f"群 {group_id} 的问答 #{row[0]} 已删除。")
+            return True
+        except Exception as e:
+            _log.error(f"删除群 {group_id} 的问答失败: {e}")
             return False
@@ -1,5 +1,4 @@
 import asyncio
-import time
 import re
 import os
 import html
@@ -10,6 +9,8 @@ from QA.database_handler import QADatabaseHandler
 from QA.image_generator import generate_qa_image
 from PluginManager.plugin_manager import master_required
 from utils.group_forward_msg import send_group_msg_cq
+from utils.rate_limiter import rate_limiter
+from utils.ttl_cache import TTLCache
 
 bot = CompatibleEnrollment
 
@@ -20,12 +21,10 @@ class QA(BasePlugin):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
         self.db_handler = None
+        self._migration_task = None
         # 缓存系统
-        self.cache = {}
         self.cache_ttl = 300  # 5分钟缓存
-        # 请求限制
-        self.last_request_time = {}
-        self.request_interval = 1  # 1秒间隔
+        self.cache = TTLCache(self.name, maxsize=1000, ttl=self.cache_ttl, max_bytes=4 * 1024 * 1024)
         # 统计信息
         self.stats = {
             "total_queries": 0,
@@ -37,37 +36,32 @@ class QA(BasePlugin):
     async def on_load(self):
         print(f"{self.name} 插件已加载，版本: {self.version}")
         self.db_handler = QADatabaseHandler()
+        await self.db_handler.initialize()
+        # 旧版 ck_<群号> 表在后台逐张迁移，访问到的群会优先迁移
+        self._migration_task = asyncio.create_task(self.db_handler.migrate_legacy_tables())
+
+    async def on_unload(self):
+        # 停止后台迁移；每张表在独立事务中迁移，未完成的表下次加载时继续
+        task, self._migration_task = self._migration_task, None
+        if task is not None and not task.done():
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        print(f"{self.name} 插件已卸载")
 
     def _get_cache_key(self, group_id: int, query: str) -> str:
         """生成缓存键"""
         return f"qa_cache:{group_id}:{query}"
 
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """检查缓存是否有效"""
-        if cache_key not in self.cache:
-            return False
-        timestamp, _ = self.cache[cache_key]
-        return time.time() - timestamp < self.cache_ttl
-
     def _get_cached_result(self, cache_key: str) -> Optional[str]:
         """获取缓存结果"""
-        if self._is_cache_valid(cache_key):
-            _, result = self.cache[cache_key]
-            return result
-        return None
+        return self.cache.get(cache_key)
 
     def _set_cache(self, cache_key: str, result: str):
         """设置缓存"""
-        self.cache[cache_key] = (time.time(), result)
-
-    def _check_request_limit(self, user_id: int) -> bool:
-        """检查请求频率限制"""
-        current_time = time.time()
-        if user_id in self.last_request_time:
-            if current_time - self.last_request_time[user_id] < self.request_interval:
-                return False
-        self.last_request_time[user_id] = current_time
-        return True
+        self.cache.set(cache_key, result)
 
     def _parse_qa_command(self, message: str) -> Optional[Dict[str, Any]]:
         """
@@ -178,13 +172,9 @@ class QA(BasePlugin):
         raw_message = html.unescape(event.raw_message.strip())
 
         # 检查请求频率限制
-        if not self._check_request_limit(user_id):
+        if not rate_limiter.hit_all(self.name, user_id, group_id):
             return
 
-        # 确保数据库表存在
-        if not await self.db_handler.table_exists(group_id):
-            await self.db_handler.create_table(group_id)
-
         # 解析命令
         command = self._parse_qa_command(raw_message)
         if command:
@@ -272,15 +262,15 @@ class QA(BasePlugin):
 
     def _clear_group_cache(self, group_id: int):
         """清除指定群的缓存"""
-        keys_to_remove = [key for key in self.cache.keys() if key.startswith(f"qa_cache:{group_id}:")]
-        for key in keys_to_remove:
-            del self.cache[key]
+        prefix = f"qa_cache:{group_id}:"
+        self.cache.delete_where(lambda key: key.startswith(prefix))
 
     async def _show_stats(self, group_id: int):
         """显示统计信息"""
-        qa_count = await self.db_handler.get_qa_count(group_id)
-        exact_count = await self.db_handler.get_qa_count_by_type(group_id, "exact")
-        fuzzy_count = await self.db_handler.get_qa_count_by_type(group_id, "fuzzy")
+        qa_stats = await self.db_handler.get_qa_stats(group_id)
+        qa_count = qa_stats["total"]
+        exact_count = qa_stats["exact"]
+        fuzzy_count = qa_stats["fuzzy"]
 
         stats_text = f"""📊 QA系统统计信息
 
@@ -0,0 +1,175 @@
+"""
+QA 问答匹配索引 - 每个群一份的内存索引，避免每条消息都全表扫描
+"""
+import math
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    # rapidfuzz 为 C++ 实现，批量打分时不经过 Python 循环
+    from rapidfuzz import fuzz, process
+except ImportError:  # 未安装时退回 fuzzywuzzy（纯 Python，较慢）
+    from fuzzywuzzy import fuzz
+    process = None
+
+# 模糊阈值采用与 fuzzywuzzy 相同的整数四舍五入语义
+ROUNDING_SLACK = 0.5
+
+
+@dataclass
+class QAEntry:
+    id: int
+    question: str
+    answer: str
+    match_type: str
+
+
+def _tokens(text: str) -> Set[Tuple[str, int]]:
+    """
+    提取带出现序号的字符 1-gram：("天", 1), ("天", 2) ...
+
+    两段文本共享的 token 数恰好等于它们字符多重集的交集大小，
+    可以据此给出 partial_ratio 的上界并安全地剪枝。
+    """
+    seen: Counter = Counter()
+    tokens = set()
+    for char in text:
+        seen[char] += 1
+        tokens.add((char, seen[char]))
+    return tokens
+
+
+def _min_shared(query_len: int, question_len: int, threshold: float) -> int:
+    """
+    partial_ratio 达到阈值所需的最少共享字符数
+
+    partial_ratio 取较短文本 (长度 s) 与较长文本中长度 w<=s 的片段的最高相似度
+    2*LCS/(s+w)，且 LCS<=w，因此得分 t 需要 LCS >= t*s/(2-t)；
+    LCS 不超过两段文本字符多重集的交集，低于这个数的候选不可能命中。
+    """
+    t = max(0.0, threshold) / 100
+    if t >= 1:
+        return min(query_len, question_len)
+    return max(1, math.ceil(t * min(query_len, question_len) / (2 - t) - 1e-9))
+
+
+class QAIndex:
+    """
+    单个群的问答索引
+
+    - 精确问答：问题 -> 词条 id 列表的哈希表
+    - 模糊问答：字符倒排索引按共享字符数剪枝出候选，再用 partial_ratio 打分
+      （剪枝只排除不可能达到阈值的问题，结果与全量扫描一致）
+    - 增删清空时增量更新，不需要重新加载整张表
+    """
+
+    def __init__(self, entries: Iterable[QAEntry] = ()):
+        self.entries: Dict[int, QAEntry] = {}
+        self._exact: Dict[str, List[int]] = {}
+        self._postings: Dict[Tuple[str, int], Set[int]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._max_length = 0
+        for entry in entries:
+            self.add(entry)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, entry: QAEntry) -> None:
+        """加入一条词条"""
+        self.entries[entry.id] = entry
+        if entry.match_type == "fuzzy":
+            for token in _tokens(entry.question):
+                self._postings.setdefault(token, set()).add(entry.id)
+            self._lengths[entry.id] = len(entry.question)
+            self._max_length = max(self._max_length, len(entry.question))
+        else:
+            self._exact.setdefault(entry.question, []).append(entry.id)
+
+    def remove(self, entry_id: int) -> None:
+        """移除一条词条"""
+        entry = self.entries.pop(entry_id, None)
+        if entry is None:
+            return
+        if entry.match_type == "fuzzy":
+            for token in _tokens(entry.question):
+                ids = self._postings.get(token)
+                if ids is not None:
+                    ids.discard(entry_id)
+                    if not ids:
+                        del self._postings[token]
+            self._lengths.pop(entry_id, None)
+        else:
+            ids = self._exact.get(entry.question, [])
+            if entry_id in ids:
+                ids.remove(entry_id)
+            if not ids:
+                self._exact.pop(entry.question, None)
+
+    def remove_pair(self, question: str, answer: str) -> int:
+        """移除问题和答案都相同的词条，返回移除数量"""
+        ids = [e.id for e in self.entries.values() if e.question == question and e.answer == answer]
+        for entry_id in ids:
+            self.remove(entry_id)
+        return len(ids)
+
+    def clear(self) -> None:
+        self.entries.clear()
+        self._exact.clear()
+        self._postings.clear()
+        self._lengths.clear()
+        self._max_length = 0
+
+    def answers(self, question: str, match_type: str = "exact") -> List[str]:
+        """问题完全相同的答案列表（按添加顺序）"""
+        if match_type == "exact":
+            return [self.entries[i].answer for i in self._exact.get(question, ())]
+        return [
+            e.answer for e in sorted(self.entries.values(), key=lambda e: e.id)
+            if e.match_type == match_type and e.question == question
+        ]
+
+    def candidates(self, query: str, threshold: float = 60) -> List[int]:
+        """用倒排索引筛选可能达到阈值的模糊问题（按 id 排序）"""
+        shared: Counter = Counter()
+        for token in _tokens(query):
+            ids = self._postings.get(token)
+            if ids:
+                shared.update(ids)
+
+        # 按问题长度预先算好所需的共享字符数，逐个候选只做查表
+        query_len = len(query)
+        lengths = self._lengths
+        need = [_min_shared(query_len, length, threshold) for length in range(self._max_length + 1)]
+        return sorted(entry_id for entry_id, count in shared.items() if count >= need[lengths[entry_id]])
+
+    def match_fuzzy(self, query: str, threshold: int = 60) -> Optional[Tuple[QAEntry, float]]:
+        """
+        返回 partial_ratio 最高且不低于阈值的模糊词条
+
+        分数相同时取 id 最小（最早添加）的词条，与原先顺序扫描的结果一致。
+        """
+        if not query:
+            return None
+        ids = self.candidates(query, threshold - ROUNDING_SLACK)
+        if not ids:
+            return None
+        questions = [self.entries[i].question for i in ids]
+
+        if process is not None:
+            # fuzzywuzzy 的分数会四舍五入为整数，这里放宽 0.5 保持相同的阈值语义
+            best = process.extractOne(
+                query, questions, scorer=fuzz.partial_ratio, score_cutoff=threshold - ROUNDING_SLACK
+            )
+            if best is None:
+                return None
+            _, score, position = best
+            return self.entries[ids[position]], score
+
+        best_entry, best_score = None, 0
+        for entry_id, question in zip(ids, questions):
+            score = fuzz.partial_ratio(query, question)
+            if score > best_score and score >= threshold:
+                best_entry, best_score = self.entries[entry_id], score
+        return (best_entry, best_score) if best_entry else None
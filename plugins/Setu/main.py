@@ -7,7 +7,7 @@ import re
 import random
 import string
 import base64
-import time
+import math
 from typing import List, Dict, Any, Optional, Union
 from io import BytesIO
 from datetime import datetime
@@ -25,6 +25,10 @@ from utils.onebot_v11_handler import (
 )
 from utils.config_manager import get_config
 from utils.error_handler import retry_async, safe_async
+from utils.http_client import http_session
+from utils.image_cache import image_cache
+from utils.rate_limiter import rate_limiter
+from utils.ttl_cache import TTLCache
 
 bot = CompatibleEnrollment
 _log = get_log()
@@ -37,13 +41,8 @@ class Setu(BasePlugin):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        # 请求限制
-        self.last_request_time = {}
-        self.request_interval = 3  # 3秒间隔
-
         # 缓存机制
-        self.cache = {}
-        self.cache_ttl = 300  # 5分钟缓存
+        self.cache = TTLCache("Setu", maxsize=200, ttl=300, max_bytes=4 * 1024 * 1024)  # 5分钟缓存
 
         # 支持的尺寸
         self.supported_sizes = ["original", "regular", "small", "thumb", "mini"]
@@ -51,65 +50,26 @@ class Setu(BasePlugin):
         # 支持的排序方式
         self.supported_orders = ["date", "date_d", "popular", "popular_d"]
 
-    def _check_request_limit(self, user_id: int) -> bool:
-        """检查用户请求频率限制"""
-        current_time = time.time()
-        if user_id in self.last_request_time:
-            time_diff = current_time - self.last_request_time[user_id]
-            if time_diff < self.request_interval:
-                return False
-
-        self.last_request_time[user_id] = current_time
-        return True
-
-    def _get_remaining_cooldown(self, user_id: int) -> int:
-        """获取剩余冷却时间"""
-        if user_id not in self.last_request_time:
-            return 0
-
-        current_time = time.time()
-        time_diff = current_time - self.last_request_time[user_id]
-        remaining = self.request_interval - time_diff
-        return max(0, int(remaining))
-
     def _get_cache_key(self, **kwargs) -> str:
         """生成缓存键"""
         cache_data = {k: v for k, v in kwargs.items() if v is not None}
         return f"setu_{hash(str(sorted(cache_data.items())))}"
 
-    def _is_cache_valid(self, cache_key: str) -> bool:
-        """检查缓存是否有效"""
-        if cache_key not in self.cache:
-            return False
-
-        cache_time, _ = self.cache[cache_key]
-        return time.time() - cache_time < self.cache_ttl
-
     def _get_cached_result(self, cache_key: str) -> Optional[List[Dict[str, Any]]]:
         """获取缓存结果"""
-        if self._is_cache_valid(cache_key):
-            _, result = self.cache[cache_key]
-            # 验证缓存结果的类型
-            if isinstance(result, list):
-                return result
-            else:
-                _log.warning(f"缓存中的数据类型错误: {type(result)}, 清除缓存")
-                del self.cache[cache_key]
-                return None
+        result = self.cache.get(cache_key)
+        if result is None:
+            return None
+        # 验证缓存结果的类型
+        if isinstance(result, list):
+            return result
+        _log.warning(f"缓存中的数据类型错误: {type(result)}, 清除缓存")
+        self.cache.delete(cache_key)
         return None
 
     def _set_cache(self, cache_key: str, result: List[Dict[str, Any]]):
         """设置缓存"""
-        self.cache[cache_key] = (time.time(), result)
-
-        # 清理过期缓存
-        current_time = time.time()
-        expired_keys = [
-            key for key, (cache_time, _) in self.cache.items()
-            if current_time - cache_time > self.cache_ttl
-        ]
-        for key in expired_keys:
-            del self.cache[key]
+        self.cache.set(cache_key, result)
 
     async def on_load(self):
         """插件加载"""
@@ -133,7 +93,7 @@ class Setu(BasePlugin):
             params = {"num": 1, "r18": 0}
 
             timeout = aiohttp.ClientTimeout(total=10, connect=5)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with http_session(timeout=timeout) as session:
                 async with session.get(api_url, params=params) as response:
                     _log.info(f"测试API响应状态: {response.status}")
                     if response.status == 200:
@@ -258,7 +218,7 @@ class Setu(BasePlugin):
 
         try:
             timeout = aiohttp.ClientTimeout(total=15, connect=5)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with http_session(timeout=timeout) as session:
                 _log.info(f"请求API: {api_url}, 参数: {params}")
                 async with session.get(api_url, params=params, proxy=proxy_url) as response:
                     _log.info(f"API响应状态码: {response.status}")
@@ -330,21 +290,19 @@ class Setu(BasePlugin):
                 _log.warning(f"代理配置格式不支持: {type(proxy_config)}")
             
             timeout = aiohttp.ClientTimeout(total=30, connect=10)
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(image_url, proxy=proxy) as response:
-                    if response.status == 200:
-                        image_data = await response.read()
+            # 同一作品图片经共享缓存复用，不再重复下载
+            image_data = await image_cache.get(image_url, proxy=proxy, timeout=timeout)
+            if image_data is None:
+                _log.warning(f"图片下载失败: {image_url}")
+                return None
 
-                        # 添加随机字符串修改MD5
-                        random_string = ''.join(random.choices(string.ascii_letters + string.digits, k=32))
-                        modified_image_data = image_data + random_string.encode('utf-8')
+            # 添加随机字符串修改MD5
+            random_string = ''.join(random.choices(string.ascii_letters + string.digits, k=32))
+            modified_image_data = image_data + random_string.encode('utf-8')
 
-                        # 返回 base64:// 格式
-                        base64_data = base64.b64encode(modified_image_data).decode('utf-8')
-                        return f"base64://{base64_data}"
-                    else:
-                        _log.warning(f"图片下载失败，状态码: {response.status}")
-                        return None
+            # 返回 base64:// 格式
+            base64_data = base64.b64encode(modified_image_data).decode('utf-8')
+            return f"base64://{base64_data}"
         except Exception as e:
             import traceback
             _log.error(f"图片处理错误: {e}")
@@ -693,11 +651,11 @@ class Setu(BasePlugin):
                 return
 
             # 检查请求频率限制
-            if not self._check_request_limit(user_id):
-                remaining = self._get_remaining_cooldown(user_id)
+            limit = rate_limiter.hit_all(self.name, user_id, group_id)
+            if not limit:
                 await self.api.post_group_msg(
                     group_id,
-                    text=f"⏰ 请求过于频繁，请等待 {remaining} 秒后再试"
+                    text=f"⏰ 请求过于频繁，请等待 {math.ceil(limit.retry_after)} 秒后再试"
                 )
                 return
 
@@ -5,6 +5,7 @@ from datetime import datetime, date
 
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
+from utils.command_router import command_router, route
 from utils.group_forward_msg import send_group_msg_cq
 from .utils import (
     generate_signin_image,
@@ -41,6 +42,7 @@ class SignIn(BasePlugin):
 
     async def on_load(self):
         """插件加载时初始化（兼容旧版本）"""
+        command_router.register_plugin(self)
         try:
             _log.info(f"SignIn v{self.version} 插件已加载")
             await initialize_database()
@@ -52,7 +54,7 @@ class SignIn(BasePlugin):
         """插件加载时初始化（新版本）"""
         await self.on_load()
 
-    @bot.group_event()
+    @route(commands=["签到", "/签到帮助", "签到帮助", "/签到统计", "签到统计", "/签到排行", "签到排行"])
     @feature_required(feature_name="签到系统", commands=["签到", "/签到帮助", "/签到统计", "/签到排行"])
     async def handle_group_message(self, event: GroupMessage):
         """处理群消息事件"""
@@ -1,15 +1,21 @@
 import aiohttp
+import asyncio
 import datetime
 import io
 import os
 import random
 import logging
 import math
+from functools import lru_cache
 from typing import Optional, List, Tuple, Dict, Any
 from PIL import Image, ImageDraw, ImageFont, ImageEnhance, ImageFilter
 import base64
 import aiosqlite
 
+from utils.image_cache import image_cache
+from utils.render_executor import render_image
+from utils.asset_registry import load_font
+
 _log = logging.getLogger("SignIn.utils")
 
 async def get_inspirational_quote() -> str:
@@ -76,23 +82,22 @@ async def get_background_image() -> bytes:
     ]
 
     for source in image_sources:
-        try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(source, timeout=10) as response:
-                    if response.status == 200:
-                        image_data = await response.read()
-                        if len(image_data) > 1000:  # 确保图片有效
-                            _log.info(f"成功获取背景图片，大小: {len(image_data)} bytes")
-                            return image_data
-        except Exception as e:
-            _log.warning(f"从 {source} 获取图片失败: {e}")
-            continue
+        # 背景图源每次返回随机图片，不经过缓存，否则一小时内所有签到卡片都是同一张背景
+        image_data = await image_cache.download(source, timeout=10, min_size=1001)
+        if image_data:
+            _log.info(f"成功获取背景图片，大小: {len(image_data)} bytes")
+            return image_data
+        _log.warning(f"从 {source} 获取图片失败")
 
     _log.error("所有图片源都失败，使用默认背景")
     return b""
 
 def create_default_background() -> Image.Image:
-    """创建默认渐变背景"""
+    """创建默认渐变背景（生成一次后返回副本）"""
+    return _default_background().copy()
+
+@lru_cache(maxsize=1)
+def _default_background() -> Image.Image:
     # 创建渐变背景
     width, height = 800, 600
     image = Image.new('RGB', (width, height))
@@ -158,35 +163,130 @@ def apply_glass_effect(image: Image.Image, opacity: int = 180) -> Image.Image:
 
     return result
 
+# 主字体不可用时依次尝试的系统字体
+SYSTEM_FONTS = (
+    "C:/Windows/Fonts/msyh.ttc",  # 微软雅黑
+    "C:/Windows/Fonts/simhei.ttf",  # 黑体
+    "C:/Windows/Fonts/simsun.ttc",  # 宋体
+)
+
 def get_font(font_path: str, size: int) -> ImageFont.FreeTypeFont:
-    """安全地获取字体"""
-    try:
-        if os.path.exists(font_path):
-            return ImageFont.truetype(font_path, size)
-    except Exception as e:
-        _log.warning(f"加载字体失败 {font_path}: {e}")
+    """安全地获取字体（经资源注册表缓存，系统字体只探测一次）"""
+    return load_font(font_path, size, fallbacks=SYSTEM_FONTS)
+
+def render_signin_image(nickname: str, streak: int, quote: str, background_bytes: bytes,
+                        now: datetime.datetime, fortune: str) -> Image.Image:
+    """
+    绘制签到图片（纯 Pillow 操作，在渲染执行器中执行）
+
+    随机内容（语录、背景、运势、时间）由调用方准备好后传入
+    """
+    # 创建背景
+    if background_bytes:
+        try:
+            background = Image.open(io.BytesIO(background_bytes)).convert("RGB")
+            # 调整背景大小并保持比例
+            background = background.resize((800, 600), Image.Resampling.LANCZOS)
+        except Exception as e:
+            _log.warning(f"处理背景图片失败: {e}")
+            background = create_default_background()
+    else:
+        background = create_default_background()
+
+    # 应用轻微的模糊效果，让文字更突出
+    background = background.filter(ImageFilter.GaussianBlur(radius=1))
+
+    # 创建主画布
+    canvas = Image.new("RGBA", (800, 600), (0, 0, 0, 0))
+    canvas.paste(background, (0, 0))
+
+    # 加载字体
+    font_path = os.path.join("static", "font.ttf")
+    title_font = get_font(font_path, 48)
+    subtitle_font = get_font(font_path, 32)
+    content_font = get_font(font_path, 24)
+    small_font = get_font(font_path, 20)
+
+    # 创建主要内容区域的毛玻璃背景
+    main_card = create_rounded_rectangle((720, 520), 20, (255, 255, 255, 200))
+    main_card = apply_glass_effect(main_card, 160)
+    canvas.paste(main_card, (40, 40), main_card)
+
+    # 创建绘制对象
+    draw = ImageDraw.Draw(canvas)
+
+    # 获取当前时间信息
+    today = now.date()
+    weekday_names = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
+    weekday = weekday_names[today.weekday()]
+    date_str = today.strftime("%Y年%m月%d日")
+    time_str = now.strftime("%H:%M")
+
+    # 定义颜色方案
+    primary_color = (45, 55, 72)      # 深蓝灰
+    secondary_color = (74, 85, 104)   # 中蓝灰
+    accent_color = (56, 178, 172)     # 青色
+    success_color = (72, 187, 120)    # 绿色
+    text_light = (255, 255, 255)      # 白色
+    text_dark = (26, 32, 44)          # 深色
+
+    # 绘制标题区域
+    title_y = 70
+    draw_text_with_shadow(draw, (60, title_y), "✨ 签到成功", title_font,
+                        success_color, (0, 0, 0), (3, 3), 2, primary_color)
+
+    # 绘制用户信息
+    user_y = 140
+    draw_text_with_shadow(draw, (60, user_y), f"🎯 {nickname}", subtitle_font,
+                        primary_color, (255, 255, 255), (2, 2), 1, (200, 200, 200))
+
+    # 绘制日期时间
+    date_y = 190
+    draw_text_with_shadow(draw, (60, date_y), f"📅 {date_str} {weekday} {time_str}", content_font,
+                        secondary_color, (255, 255, 255), (1, 1))
+
+    # 绘制连续签到信息
+    if streak > 0:
+        streak_y = 240
+        streak_text = f"🔥 连续签到 {streak} 天"
+        if streak >= 30:
+            streak_text += " (签到达人!)"
+        elif streak >= 7:
+            streak_text += " (坚持不懈!)"
+        elif streak >= 3:
+            streak_text += " (继续加油!)"
+
+        draw_text_with_shadow(draw, (60, streak_y), streak_text, content_font,
+                            accent_color, (255, 255, 255), (1, 1))
 
-    # 尝试系统字体
-    try:
-        # Windows系统字体
-        system_fonts = [
-            "C:/Windows/Fonts/msyh.ttc",  # 微软雅黑
-            "C:/Windows/Fonts/simhei.ttf",  # 黑体
-            "C:/Windows/Fonts/simsun.ttc",  # 宋体
-        ]
+    # 今日运势
+    fortune_y = 290 if streak > 0 else 240
+    draw_text_with_shadow(draw, (60, fortune_y), f"✨ 今日提醒: {fortune}", content_font,
+                        (138, 43, 226), (255, 255, 255), (1, 1))  # 紫色
 
-        for font in system_fonts:
-            if os.path.exists(font):
-                return ImageFont.truetype(font, size)
+    # 创建励志语录区域
+    quote_y = 350
+    quote_card = create_rounded_rectangle((680, 160), 15, (255, 255, 255, 220))
+    canvas.paste(quote_card, (60, quote_y), quote_card)
 
-    except Exception as e:
-        _log.warning(f"加载系统字体失败: {e}")
+    # 绘制语录标题
+    draw_text_with_shadow(draw, (80, quote_y + 20), "💭 今日分享", content_font,
+                        accent_color, (255, 255, 255), (1, 1))
 
-    # 使用默认字体
-    try:
-        return ImageFont.load_default()
-    except:
-        return ImageFont.load_default()
+    # 自动换行处理励志语录
+    max_width = 600
+    wrapped_lines = wrap_text(quote, content_font, max_width, draw)
+
+    quote_text_y = quote_y + 60
+    for i, line in enumerate(wrapped_lines[:3]):  # 最多显示3行
+        if line.strip():
+            draw_text_with_shadow(draw, (80, quote_text_y + i * 30), line.strip(),
+                                small_font, primary_color, (255, 255, 255), (1, 1))
+
+    # 添加装饰性元素
+    add_decorative_elements(draw, canvas)
+
+    return canvas
 
 async def generate_signin_image(user_id: int, nickname: str, streak: int = 0) -> str:
     """生成高质量签到图片"""
@@ -194,120 +294,20 @@ async def generate_signin_image(user_id: int, nickname: str, streak: int = 0) ->
         _log.info(f"开始生成签到图片: 用户{user_id}, 昵称{nickname}, 连续{streak}天")
 
         # 获取励志语录和背景图片
-        quote = await get_inspirational_quote()
-        image_bytes = await get_background_image()
-
-        # 创建背景
-        if image_bytes:
-            try:
-                background = Image.open(io.BytesIO(image_bytes)).convert("RGB")
-                # 调整背景大小并保持比例
-                background = background.resize((800, 600), Image.Resampling.LANCZOS)
-            except Exception as e:
-                _log.warning(f"处理背景图片失败: {e}")
-                background = create_default_background()
-        else:
-            background = create_default_background()
-
-        # 应用轻微的模糊效果，让文字更突出
-        background = background.filter(ImageFilter.GaussianBlur(radius=1))
-
-        # 创建主画布
-        canvas = Image.new("RGBA", (800, 600), (0, 0, 0, 0))
-        canvas.paste(background, (0, 0))
-
-        # 加载字体
-        font_path = os.path.join("static", "font.ttf")
-        title_font = get_font(font_path, 48)
-        subtitle_font = get_font(font_path, 32)
-        content_font = get_font(font_path, 24)
-        small_font = get_font(font_path, 20)
-
-        # 创建主要内容区域的毛玻璃背景
-        main_card = create_rounded_rectangle((720, 520), 20, (255, 255, 255, 200))
-        main_card = apply_glass_effect(main_card, 160)
-        canvas.paste(main_card, (40, 40), main_card)
-
-        # 创建绘制对象
-        draw = ImageDraw.Draw(canvas)
-
-        # 获取当前时间信息
-        now = datetime.datetime.now()
-        today = now.date()
-        weekday_names = ["周一", "周二", "周三", "周四", "周五", "周六", "周日"]
-        weekday = weekday_names[today.weekday()]
-        date_str = today.strftime("%Y年%m月%d日")
-        time_str = now.strftime("%H:%M")
-
-        # 定义颜色方案
-        primary_color = (45, 55, 72)      # 深蓝灰
-        secondary_color = (74, 85, 104)   # 中蓝灰
-        accent_color = (56, 178, 172)     # 青色
-        success_color = (72, 187, 120)    # 绿色
-        text_light = (255, 255, 255)      # 白色
-        text_dark = (26, 32, 44)          # 深色
-
-        # 绘制标题区域
-        title_y = 70
-        draw_text_with_shadow(draw, (60, title_y), "✨ 签到成功", title_font,
-                            success_color, (0, 0, 0), (3, 3), 2, primary_color)
-
-        # 绘制用户信息
-        user_y = 140
-        draw_text_with_shadow(draw, (60, user_y), f"🎯 {nickname}", subtitle_font,
-                            primary_color, (255, 255, 255), (2, 2), 1, (200, 200, 200))
-
-        # 绘制日期时间
-        date_y = 190
-        draw_text_with_shadow(draw, (60, date_y), f"📅 {date_str} {weekday} {time_str}", content_font,
-                            secondary_color, (255, 255, 255), (1, 1))
-
-        # 绘制连续签到信息
-        if streak > 0:
-            streak_y = 240
-            streak_text = f"🔥 连续签到 {streak} 天"
-            if streak >= 30:
-                streak_text += " (签到达人!)"
-            elif streak >= 7:
-                streak_text += " (坚持不懈!)"
-            elif streak >= 3:
-                streak_text += " (继续加油!)"
-
-            draw_text_with_shadow(draw, (60, streak_y), streak_text, content_font,
-                                accent_color, (255, 255, 255), (1, 1))
-
-        # 获取今日运势
-        fortune = get_daily_fortune()
-        fortune_y = 290 if streak > 0 else 240
-        draw_text_with_shadow(draw, (60, fortune_y), f"✨ 今日提醒: {fortune}", content_font,
-                            (138, 43, 226), (255, 255, 255), (1, 1))  # 紫色
-
-        # 创建励志语录区域
-        quote_y = 350
-        quote_card = create_rounded_rectangle((680, 160), 15, (255, 255, 255, 220))
-        canvas.paste(quote_card, (60, quote_y), quote_card)
-
-        # 绘制语录标题
-        draw_text_with_shadow(draw, (80, quote_y + 20), "💭 今日分享", content_font,
-                            accent_color, (255, 255, 255), (1, 1))
-
-        # 自动换行处理励志语录
-        max_width = 600
-        wrapped_lines = wrap_text(quote, content_font, max_width, draw)
-
-        quote_text_y = quote_y + 60
-        for i, line in enumerate(wrapped_lines[:3]):  # 最多显示3行
-            if line.strip():
-                draw_text_with_shadow(draw, (80, quote_text_y + i * 30), line.strip(),
-                                    small_font, primary_color, (255, 255, 255), (1, 1))
-
-        # 添加装饰性元素
-        add_decorative_elements(draw, canvas)
-
-        # 保存图片到内存
-        output = io.BytesIO()
-        canvas.save(output, format="PNG", quality=95)
-        image_bytes = output.getvalue()
+        quote, background_bytes = await asyncio.gather(get_inspirational_quote(), get_background_image())
+
+        # 模糊、合成和编码放到渲染执行器中，避免阻塞事件循环
+        image_bytes = await render_image(
+            render_signin_image,
+            nickname,
+            streak,
+            quote,
+            background_bytes,
+            datetime.datetime.now(),
+            get_daily_fortune(),
+            save_options={"quality": 95},
+            name="signin",
+        )
         base64_str = f"[CQ:image,file=base64://{base64.b64encode(image_bytes).decode()}]"
 
         _log.info(f"签到图片生成成功，大小: {len(image_bytes)} bytes")
@@ -1,5 +1,4 @@
 import re
-import time
 import logging
 from typing import Dict, List, Any
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
@@ -8,6 +7,9 @@ from ncatbot.core.element import MessageChain, Text, Image
 from .utils import fetch_steam_games
 from utils.group_forward_msg import send_group_forward_msg_ws
 from utils.config_manager import get_config
+from utils.metrics import plugin_counters
+from utils.rate_limiter import rate_limiter
+from utils.ttl_cache import TTLCache
 
 # 设置日志
 _log = logging.getLogger(__name__)
@@ -21,17 +23,11 @@ class SteamGameSearch(BasePlugin):
     def __init__(self, event_bus=None, time_task_scheduler=None, debug=False, **kwargs):
         super().__init__(event_bus, time_task_scheduler, debug=debug, **kwargs)
         # 缓存系统
-        self.game_cache: Dict[str, tuple] = {}  # {query: (results, timestamp)}
         self.cache_duration = 3600  # 1小时缓存
-
-        # 请求限制
-        self.last_request_time: Dict[int, float] = {}  # {group_id: timestamp}
-        self.request_interval = 3.0  # 3秒间隔
+        self.game_cache = TTLCache(self.name, maxsize=300, ttl=self.cache_duration, max_bytes=8 * 1024 * 1024)
 
         # 统计信息
-        self.search_count = 0
-        self.cache_hit_count = 0
-        self.success_count = 0
+        self.stats = plugin_counters(self.name, ["searches", "cache_hits", "successes"])
 
     async def on_load(self):
         """插件加载时初始化"""
@@ -41,28 +37,9 @@ class SteamGameSearch(BasePlugin):
         """插件加载时初始化（新版本）"""
         await self.on_load()
 
-    def _is_cache_valid(self, cache_time: float) -> bool:
-        """检查缓存是否有效"""
-        return time.time() - cache_time < self.cache_duration
-
-    def _should_rate_limit(self, group_id: int) -> bool:
+    def _should_rate_limit(self, group_id: int, user_id: int = None) -> bool:
         """检查是否应该限流"""
-        current_time = time.time()
-        if group_id in self.last_request_time:
-            if current_time - self.last_request_time[group_id] < self.request_interval:
-                return True
-        self.last_request_time[group_id] = current_time
-        return False
-
-    def _clean_expired_cache(self):
-        """清理过期缓存"""
-        current_time = time.time()
-        expired_keys = [
-            key for key, (_, cache_time) in self.game_cache.items()
-            if current_time - cache_time >= self.cache_duration
-        ]
-        for key in expired_keys:
-            del self.game_cache[key]
+        return not rate_limiter.hit_all(self.name, user_id, group_id)
 
     def _format_game_info(self, games: List[Dict[str, Any]]) -> MessageChain:
         """格式化游戏信息为美观的消息"""
@@ -239,15 +216,15 @@ class SteamGameSearch(BasePlugin):
 
     async def show_statistics(self, group_id: int):
         """显示使用统计"""
-        cache_hit_rate = (self.cache_hit_count / max(self.search_count, 1)) * 100
-        success_rate = (self.success_count / max(self.search_count, 1)) * 100
+        cache_hit_rate = (self.stats["cache_hits"] / max(self.stats["searches"], 1)) * 100
+        success_rate = (self.stats["successes"] / max(self.stats["searches"], 1)) * 100
 
         stats_text = f"""📊 Steam搜索插件统计
 
 🔢 使用数据：
-• 总搜索次数: {self.search_count}
-• 成功搜索次数: {self.success_count}
-• 缓存命中次数: {self.cache_hit_count}
+• 总搜索次数: {self.stats['searches']}
+• 成功搜索次数: {self.stats['successes']}
+• 缓存命中次数: {self.stats['cache_hits']}
 
 📈 效率指标：
 • 成功率: {success_rate:.1f}%
@@ -287,24 +264,20 @@ class SteamGameSearch(BasePlugin):
             return
 
         # 检查请求限制
-        if self._should_rate_limit(event.group_id):
+        if self._should_rate_limit(event.group_id, event.user_id):
             return
 
-        # 清理过期缓存
-        self._clean_expired_cache()
-
         # 检查缓存
         cache_key = query.lower()
-        if cache_key in self.game_cache:
-            cached_results, cache_time = self.game_cache[cache_key]
-            if self._is_cache_valid(cache_time):
-                self.cache_hit_count += 1
-                forward_messages = self._format_game_info_for_forward(cached_results)
-                await self._send_forward_message(event.group_id, forward_messages)
-                return
+        cached_results = self.game_cache.get(cache_key)
+        if cached_results is not None:
+            self.stats.inc("cache_hits")
+            forward_messages = self._format_game_info_for_forward(cached_results)
+            await self._send_forward_message(event.group_id, forward_messages)
+            return
 
         # 更新统计
-        self.search_count += 1
+        self.stats.inc("searches")
 
         try:
             # 搜索游戏
@@ -312,8 +285,8 @@ class SteamGameSearch(BasePlugin):
 
             if games:
                 # 缓存结果
-                self.game_cache[cache_key] = (games, time.time())
-                self.success_count += 1
+                self.game_cache.set(cache_key, games)
+                self.stats.inc("successes")
 
                 # 格式化并发送结果（使用合并转发）
                 forward_messages = self._format_game_info_for_forward(games)
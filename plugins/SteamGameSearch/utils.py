@@ -3,6 +3,7 @@ import asyncio
 import logging
 from typing import List, Dict, Any, Optional
 from bs4 import BeautifulSoup
+from utils.single_flight import single_flight
 
 # 延迟导入config_manager以避免循环导入
 def get_config(key: str, default: str = "") -> str:
@@ -16,6 +17,7 @@ def get_config(key: str, default: str = "") -> str:
 # 设置日志
 _log = logging.getLogger(__name__)
 
+@single_flight("steam_search", key=lambda query, max_results=5: ((query or "").strip().lower(), max_results))
 async def fetch_steam_games(query: str, max_results: int = 5) -> List[Dict[str, Any]]:
     """
     调用Steam搜索页面并解析结果
@@ -1,12 +1,14 @@
 import aiohttp
 import base64
 import logging
-import time
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
 from ncatbot.core.element import MessageChain, Image
 from PluginManager.plugin_manager import feature_required
 from utils.config_manager import get_config
+from utils.http_client import http_session
+from utils.image_cache import image_cache
+from utils.rate_limiter import USER, rate_limiter
 
 # 设置日志
 _log = logging.getLogger(__name__)
@@ -27,8 +29,7 @@ class SuperResolution(BasePlugin):
         self.help_count = 0
 
         # 频率控制
-        self.last_request_time = {}
-        self.request_interval = 5.0  # 5秒间隔
+        self.request_interval = rate_limiter.min_interval(self.name, USER)
 
         # 等待状态管理
         self.pending_super_resolution = {}
@@ -45,18 +46,10 @@ class SuperResolution(BasePlugin):
         except Exception as e:
             _log.error(f"SuperResolution插件加载失败: {e}")
 
-    def _check_frequency_limit(self, user_id: int) -> tuple[bool, float]:
+    def _check_frequency_limit(self, user_id: int, group_id: int = None) -> tuple[bool, float]:
         """检查用户请求频率限制"""
-        current_time = time.time()
-
-        if user_id in self.last_request_time:
-            time_diff = current_time - self.last_request_time[user_id]
-            if time_diff < self.request_interval:
-                remaining_time = self.request_interval - time_diff
-                return False, remaining_time
-
-        self.last_request_time[user_id] = current_time
-        return True, 0.0
+        limit = rate_limiter.hit_all(self.name, user_id, group_id)
+        return limit.allowed, limit.retry_after
 
     async def show_help(self, group_id: int):
         """显示帮助信息"""
@@ -138,19 +131,16 @@ class SuperResolution(BasePlugin):
 
             # 下载图片并转换为 Base64 编码
             timeout = aiohttp.ClientTimeout(total=60)  # 60秒超时
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                # 保持原始协议，不强制转换为http
-                async with session.get(image_url) as response:
-                    if response.status == 200:
-                        image_data = await response.read()
-                        # 检查图片大小
-                        if len(image_data) > 10 * 1024 * 1024:  # 10MB限制
-                            _log.warning(f"图片过大: {len(image_data)} bytes")
-                            return None
-                        image_base64 = base64.b64encode(image_data).decode("utf-8")
-                    else:
-                        _log.error(f"下载图片失败，状态码: {response.status}")
-                        return None
+            # 保持原始协议，不强制转换为http；聊天图片 URL 只用一次且体积较大，不写入共享缓存
+            image_data = await image_cache.download(image_url, timeout=timeout)
+            if image_data is None:
+                _log.error(f"下载图片失败: {image_url}")
+                return None
+            # 检查图片大小
+            if len(image_data) > 10 * 1024 * 1024:  # 10MB限制
+                _log.warning(f"图片过大: {len(image_data)} bytes")
+                return None
+            image_base64 = base64.b64encode(image_data).decode("utf-8")
 
             payload = {
                 "fn_index": 0,
@@ -163,7 +153,7 @@ class SuperResolution(BasePlugin):
             }
 
             # 处理超分辨率请求
-            async with aiohttp.ClientSession(timeout=timeout) as session:
+            async with http_session(timeout=timeout) as session:
                 async with session.post(api_url, json=payload) as response:
                     if response.status == 200:
                         result = await response.json()
@@ -238,7 +228,7 @@ class SuperResolution(BasePlugin):
         # 超分辨率命令
         if raw_message.startswith("/超"):
             # 频率控制检查
-            can_request, remaining_time = self._check_frequency_limit(user_id)
+            can_request, remaining_time = self._check_frequency_limit(user_id, group_id)
             if not can_request:
                 await self.api.post_group_msg(
                     group_id,
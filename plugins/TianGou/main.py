@@ -1,9 +1,11 @@
 import aiohttp
 import asyncio
 import logging
-import time
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
+from utils.command_router import command_router, route
+from utils.rate_limiter import GLOBAL, rate_limiter
+from utils.http_client import http_session
 
 bot = CompatibleEnrollment
 _log = logging.getLogger(__name__)
@@ -18,8 +20,7 @@ class TianGou(BasePlugin):
         self.request_count = 0
         self.success_count = 0
         self.error_count = 0
-        self.last_request_time = 0
-        self.request_interval = 1.0  # 请求间隔（秒）
+        self.request_interval = rate_limiter.min_interval(self.name, GLOBAL)  # 请求间隔（秒）
 
         # API配置
         self.api_urls = [
@@ -30,6 +31,7 @@ class TianGou(BasePlugin):
         self.current_api_index = 0
 
     async def on_load(self):
+        command_router.register_plugin(self)
         _log.info(f"{self.name} v{self.version} 插件已加载")
         _log.info("舔狗日记插件初始化完成")
 
@@ -45,13 +47,9 @@ class TianGou(BasePlugin):
 ⏱️ 请求间隔: {self.request_interval}秒
 🔗 当前API: {self.api_urls[self.current_api_index]}"""
 
-    async def rate_limit_check(self) -> bool:
+    async def rate_limit_check(self, event: GroupMessage) -> bool:
         """检查请求频率限制"""
-        current_time = time.time()
-        if current_time - self.last_request_time < self.request_interval:
-            return False
-        self.last_request_time = current_time
-        return True
+        return rate_limiter.hit_all(self.name, event.user_id, event.group_id).allowed
 
     async def fetch_tiangou_content(self) -> tuple[str, bool]:
         """获取舔狗日记内容"""
@@ -61,7 +59,7 @@ class TianGou(BasePlugin):
                 _log.info(f"尝试从API获取舔狗日记: {api_url}")
 
                 timeout = aiohttp.ClientTimeout(total=15)
-                async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with http_session(timeout=timeout) as session:
                     async with session.get(api_url) as response:
                         if response.status == 200:
                             content = await response.text()
@@ -83,7 +81,7 @@ class TianGou(BasePlugin):
 
         return "获取舔狗日记失败，所有API都无法访问", False
 
-    @bot.group_event()
+    @route(commands=["/舔狗", "舔狗", "舔狗日记", "/舔狗日记", "舔狗统计", "/舔狗统计", "tiangou统计", "舔狗帮助", "/舔狗帮助", "tiangou帮助"])
     async def handle_group_message(self, event: GroupMessage):
         """处理群消息事件"""
         message = event.raw_message.strip()
@@ -104,7 +102,7 @@ class TianGou(BasePlugin):
         """处理舔狗日记请求"""
         try:
             # 频率限制检查
-            if not await self.rate_limit_check():
+            if not await self.rate_limit_check(event):
                 await self.api.post_group_msg(
                     event.group_id,
                     text=f"⏳ 请求过于频繁，请等待 {self.request_interval} 秒后再试"
@@ -1,17 +1,20 @@
-import aiohttp
 from datetime import datetime
 from .database import AnimeDB
-from utils.group_forward_msg import send_group_forward_msg_ws, cq_img
+from utils.broadcast import BroadcastJob, broadcaster
+from utils.group_forward_msg import cq_img
+from utils.http_client import http_session
+from utils.single_flight import single_flight
 
 class AnimeScheduler:
     def __init__(self, bot_api):
         self.db = AnimeDB()
         self.api = bot_api
     
+    @single_flight("bgm_calendar", key=lambda self: "calendar")
     async def fetch_anime_data(self):
         """获取番剧数据"""
         url = "https://api.bgm.tv/calendar"
-        async with aiohttp.ClientSession() as session:
+        async with http_session() as session:
             async with session.get(url, allow_redirects=True) as response:
                 if response.status == 200:
                     data = await response.json()
@@ -63,8 +66,15 @@ class AnimeScheduler:
             })
         return messages
 
+    def format_anime_text(self, anime_list):
+        """纯文本版番剧列表（合并转发失败时使用）"""
+        lines = ["📺 今日番剧更新："]
+        for index, anime in enumerate(anime_list, 1):
+            lines.append(f"{index}. {anime['title']}（{anime['air_date']}）")
+        return "\n".join(lines)
+
     async def send_daily_anime(self, bot_id):
-        """发送每日番剧到所有订阅群组"""
+        """发送每日番剧到所有订阅群组（在后台限速并发投递）"""
         # 获取番剧数据
         data = await self.fetch_anime_data()
         if not data:
@@ -82,11 +92,14 @@ class AnimeScheduler:
         
         # 获取所有订阅的群组
         subscribed_groups = await self.db.get_all_subscriptions()
-        
-        # 向每个订阅的群组发送消息
-        for group_id in subscribed_groups:
-            try:
-                await send_group_forward_msg_ws(group_id=group_id, content=messages)
-                print(f"已向群组 {group_id} 推送今日番剧")
-            except Exception as e:
-                print(f"向群组 {group_id} 推送番剧失败: {e}")
\ No newline at end of file
+        if not subscribed_groups:
+            return
+
+        # 交给推送引擎：合并转发失败的群自动降级为纯文本，同一天重复触发不会重复投递
+        await broadcaster.start(BroadcastJob(
+            job_id=f"anime_daily:{datetime.now():%Y-%m-%d}",
+            groups=[int(group_id) for group_id in subscribed_groups],
+            forward=messages,
+            text=self.format_anime_text(anime_list),
+        ))
+        print(f"今日番剧推送已开始，共 {len(subscribed_groups)} 个群组")
@@ -5,6 +5,8 @@ from datetime import datetime, timedelta
 from typing import Optional, List, Dict, Any
 from bs4 import BeautifulSoup
 from ncatbot.core.element import Image, Text
+from utils.metrics import plugin_counters
+from utils.single_flight import single_flight
 
 # 设置日志
 _log = logging.getLogger("TodayBirthday.utils")
@@ -15,8 +17,7 @@ class BirthdayCache:
     def __init__(self):
         self._cache: Dict[str, Any] = {}
         self._cache_time: Optional[datetime] = None
-        self._cache_hits = 0
-        self._network_requests = 0
+        self._counters = plugin_counters("TodayBirthday", ["cache_hits", "network_requests"])
 
     def get_today_birthday(self) -> Optional[List[Dict[str, Any]]]:
         """获取今日生日缓存数据"""
@@ -28,7 +29,7 @@ class BirthdayCache:
             datetime.now() - self._cache_time < timedelta(hours=6) and
             today in self._cache):
 
-            self._cache_hits += 1
+            self._counters.inc("cache_hits")
             _log.info("使用缓存的今日生日数据")
             return self._cache[today]
 
@@ -43,8 +44,10 @@ class BirthdayCache:
 
     def get_statistics(self) -> Dict[str, Any]:
         """获取缓存统计信息"""
-        total_requests = self._cache_hits + self._network_requests
-        hit_rate = (self._cache_hits / total_requests * 100) if total_requests > 0 else 0
+        cache_hits = self._counters["cache_hits"]
+        network_requests = self._counters["network_requests"]
+        total_requests = cache_hits + network_requests
+        hit_rate = (cache_hits / total_requests * 100) if total_requests > 0 else 0
 
         today = datetime.now().strftime("%Y-%m-%d")
         cache_valid = (self._cache_time and
@@ -52,8 +55,8 @@ class BirthdayCache:
                       datetime.now() - self._cache_time < timedelta(hours=6))
 
         return {
-            "cache_hits": self._cache_hits,
-            "network_requests": self._network_requests,
+            "cache_hits": cache_hits,
+            "network_requests": network_requests,
             "hit_rate": hit_rate,
             "last_update": self._cache_time.strftime("%Y-%m-%d %H:%M:%S") if self._cache_time else "从未更新",
             "cache_valid": cache_valid,
@@ -62,8 +65,9 @@ class BirthdayCache:
 
     def increment_network_requests(self):
         """增加网络请求计数"""
-        self._network_requests += 1
+        self._counters.inc("network_requests")
 
+@single_flight("bgm_birthday")
 async def fetch_birthday_data() -> Optional[str]:
     """从 Bangumi.tv 抓取今日生日数据"""
     url = "https://bangumi.tv/mono"
@@ -6,6 +6,8 @@ from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
 from ncatbot.core.element import MessageChain, Record, Image
 from utils.config_manager import get_config
+from utils.http_client import http_session
+from utils.rate_limiter import USER, rate_limiter
 from .characters import CHARACTERS, generate_character_list_image
 
 # 设置日志
@@ -27,8 +29,7 @@ class VitsTTS(BasePlugin):
         self.help_count = 0
 
         # 频率控制
-        self.last_request_time = {}
-        self.request_interval = 3.0  # 3秒间隔
+        self.request_interval = rate_limiter.min_interval(self.name, USER)
 
     async def on_load(self):
         """插件加载时初始化"""
@@ -44,19 +45,10 @@ class VitsTTS(BasePlugin):
         except Exception as e:
             _log.error(f"VitsTTS插件加载失败: {e}")
 
-    def _check_frequency_limit(self, user_id: int) -> tuple[bool, float]:
+    def _check_frequency_limit(self, user_id: int, group_id: int = None) -> tuple[bool, float]:
         """检查用户请求频率限制"""
-        import time
-        current_time = time.time()
-
-        if user_id in self.last_request_time:
-            time_diff = current_time - self.last_request_time[user_id]
-            if time_diff < self.request_interval:
-                remaining_time = self.request_interval - time_diff
-                return False, remaining_time
-
-        self.last_request_time[user_id] = current_time
-        return True, 0.0
+        limit = rate_limiter.hit_all(self.name, user_id, group_id)
+        return limit.allowed, limit.retry_after
 
     async def show_help(self, group_id: int):
         """显示帮助信息"""
@@ -135,7 +127,7 @@ class VitsTTS(BasePlugin):
             }
 
             timeout = aiohttp.ClientTimeout(total=30)  # 30秒超时
-            async with aiohttp.ClientSession(proxy=self.proxy, timeout=timeout) as session:
+            async with http_session(timeout=timeout, proxy=self.proxy) as session:
                 async with session.post(f"{self.vits_url.rstrip('/')}/api/generate", json=payload) as response:
                     if response.status == 200:
                         result = await response.json()
@@ -194,7 +186,7 @@ class VitsTTS(BasePlugin):
                 return
 
             # 频率控制检查
-            can_request, remaining_time = self._check_frequency_limit(user_id)
+            can_request, remaining_time = self._check_frequency_limit(user_id, group_id)
             if not can_request:
                 await self.api.post_group_msg(
                     group_id,
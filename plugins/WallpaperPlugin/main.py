@@ -1,11 +1,10 @@
 import re
 import logging
-import time
-import asyncio
 from typing import Dict, List, Optional
 from ncatbot.plugin import BasePlugin, CompatibleEnrollment
 from ncatbot.core.message import GroupMessage
 from utils.group_forward_msg import send_group_forward_msg_ws
+from utils.rate_limiter import GLOBAL, rate_limiter
 from PluginManager.plugin_manager import feature_required
 from .wallpaper_utils import fetch_wallpapers, WallpaperCategoryType, WallpaperOrderType
 
@@ -22,8 +21,7 @@ class WallpaperPlugin(BasePlugin):
         self.pc_request_count = 0
         self.mobile_request_count = 0
         self.error_count = 0
-        self.last_request_time = 0
-        self.rate_limit_delay = 1.0  # 请求间隔限制
+        self.rate_limit_delay = rate_limiter.min_interval(self.name, GLOBAL)  # 请求间隔限制
         self.category_stats = {}  # 分类统计
 
         _log.info(f"{self.name} v{self.version} 插件已加载")
@@ -32,13 +30,12 @@ class WallpaperPlugin(BasePlugin):
     async def on_unload(self):
         _log.info(f"{self.name} 插件已卸载")
 
-    async def _check_rate_limit(self):
-        """检查请求频率限制"""
-        current_time = time.time()
-        if current_time - self.last_request_time < self.rate_limit_delay:
-            wait_time = self.rate_limit_delay - (current_time - self.last_request_time)
-            await asyncio.sleep(wait_time)
-        self.last_request_time = time.time()
+    async def _check_rate_limit(self, group_id: int, user_id: int = None) -> bool:
+        """检查请求频率限制，超限时提示并返回False"""
+        limit = rate_limiter.hit_all(self.name, user_id, group_id)
+        if not limit:
+            await self.api.post_group_msg(group_id, text=f"⏳ 请求过于频繁，请等待 {limit.retry_after:.1f} 秒后再试")
+        return limit.allowed
 
     def _get_category_display_name(self, category: WallpaperCategoryType) -> str:
         """获取分类的中文显示名称"""
@@ -126,7 +123,8 @@ class WallpaperPlugin(BasePlugin):
             if not (raw_message.startswith("/电脑壁纸") or raw_message.startswith("/手机壁纸")):
                 return
 
-            await self._check_rate_limit()
+            if not await self._check_rate_limit(event.group_id, event.user_id):
+                return
 
             parts = re.sub(r"^/(电脑壁纸|手机壁纸)", "", raw_message).strip().split()
 
@@ -10,6 +10,7 @@ import httpx
 import urllib.parse
 from utils.group_forward_msg import send_group_msg_cq
 from utils.onebot_v11_handler import extract_images
+from utils.asset_registry import load_font, load_template
 from textwrap import wrap
 from typing import Dict, Optional, Any
 
@@ -76,8 +77,8 @@ class YuGiOhCardMaker(BasePlugin):
                 return
 
             # 加载字体
-            self.title_font = ImageFont.truetype(self.FONT_PATH, 108)
-            self.text_font = ImageFont.truetype(self.FONT_PATH, 54)
+            self.title_font = load_font(self.FONT_PATH, 108)
+            self.text_font = load_font(self.FONT_PATH, 54)
 
             # 初始化HTTP客户端
             self.http_client = httpx.AsyncClient(timeout=30.0)
@@ -342,7 +343,8 @@ class YuGiOhCardMaker(BasePlugin):
             if not os.path.exists(template_path):
                 _log.error(f"卡片模板文件不存在: {self.CARD_TYPE_MAP[card_type]}")
                 return None
-            return Image.open(template_path).convert("RGBA")
+            # 模板会被直接绘制，取注册表中预解码模板的副本
+            return load_template(template_path)
         except Exception as e:
             _log.error(f"加载卡片模板失败: {e}")
             return None
@@ -360,7 +362,7 @@ class YuGiOhCardMaker(BasePlugin):
             if not os.path.exists(attribute_icon_path):
                 _log.error(f"属性图标文件不存在: {attribute_icon_path}")
                 return None
-            return Image.open(attribute_icon_path).convert("RGBA")
+            return load_template(attribute_icon_path, copy=False)
         except Exception as e:
             _log.error(f"加载属性图标失败: {e}")
             return None
@@ -372,7 +374,7 @@ class YuGiOhCardMaker(BasePlugin):
             if not os.path.exists(level_icon_path):
                 _log.error("星星等级图标文件不存在: level.png")
                 return None
-            return Image.open(level_icon_path).convert("RGBA")
+            return load_template(level_icon_path, copy=False)
         except Exception as e:
             _log.error(f"加载星星等级图标失败: {e}")
             return None
@@ -418,10 +420,10 @@ class YuGiOhCardMaker(BasePlugin):
         """粘贴属性图标和等级."""
         # 如果是魔法卡或陷阱卡，则使用对应的属性图标
         if state["type"] == "2":
-            attribute_icon = Image.open(os.path.join(self.STATIC_PATH, "attribute-spell.png")).convert("RGBA")
+            attribute_icon = load_template(os.path.join(self.STATIC_PATH, "attribute-spell.png"), copy=False)
             card_template.paste(attribute_icon, self.ATTRIBUTE_ICON_POSITION, attribute_icon)
         elif state["type"] == "3":
-            attribute_icon = Image.open(os.path.join(self.STATIC_PATH, "attribute-trap.png")).convert("RGBA")
+            attribute_icon = load_template(os.path.join(self.STATIC_PATH, "attribute-trap.png"), copy=False)
             card_template.paste(attribute_icon, self.ATTRIBUTE_ICON_POSITION, attribute_icon)
         else:
             # 否则，使用默认的属性图标并绘制星星等级
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# 测试直接导入 utils/ 和 plugins/ 下的模块
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (ROOT, os.path.join(ROOT, "plugins")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,180 @@
+"""
+处理器剖析与 ncatbot 事件总线的集成测试
+"""
+import asyncio
+import functools
+import inspect
+import threading
+import time
+
+import pytest
+
+from utils.handler_profiler import HandlerProfiler, current_handler
+
+
+class _Plugin:
+    name = "DemoPlugin"
+    meta_data = {"name": "DemoPlugin"}
+
+    def __init__(self):
+        self.seen = []
+
+    async def on_async(self, event):
+        self.seen.append(("async", current_handler()))
+        await asyncio.sleep(0)
+        return "async"
+
+    def on_sync(self, event):
+        self.seen.append(("sync", threading.current_thread() is threading.main_thread()))
+        return "sync"
+
+    async def on_error(self, event):
+        raise ValueError("boom")
+
+
+def _compat(func):
+    """与 3.x CompatibleEnrollment 相同：同步包装函数，返回处理器的协程"""
+    @functools.wraps(func)
+    def wrapper(self, event):
+        return func(self, event.data)
+    return wrapper
+
+
+class _LegacyEvent:
+    def __init__(self, type, data):
+        self.type = type
+        self.data = data
+        self._propagation_stopped = False
+        self._results = []
+
+
+class _LegacyEventBus:
+    """ncatbot 3.8.10 EventBus 的订阅与分发逻辑（publish_async 原样照搬）"""
+
+    def __init__(self):
+        self._exact_handlers = {}
+
+    def subscribe(self, event_type, handler, priority=0):
+        self._exact_handlers.setdefault(event_type, []).append((None, priority, handler, object()))
+
+    async def publish_async(self, event):
+        handlers = [(h, pr, hid) for _, pr, h, hid in self._exact_handlers.get(event.type, [])]
+        results = []
+        for handler, priority, handler_id in sorted(handlers, key=lambda x: (-x[1], x[0].__name__)):
+            if event._propagation_stopped:
+                break
+            if inspect.iscoroutinefunction(handler):
+                await handler(event)
+            else:
+                asyncio.create_task(handler(event))
+            results.extend(event._results)
+        return results
+
+
+class _SlowPlugin:
+    name = "SlowPlugin"
+
+    def __init__(self):
+        self.finished = []
+
+    @_compat
+    async def on_a(self, data):
+        await asyncio.sleep(0.2)
+        self.finished.append(data)
+
+    @_compat
+    async def on_b(self, data):
+        await asyncio.sleep(0.2)
+        self.finished.append(data)
+
+    @_compat
+    async def on_c(self, data):
+        await asyncio.sleep(0.2)
+        self.finished.append(data)
+
+
+def _legacy_dispatch(bus, plugin):
+    """订阅三个兼容注册的慢处理器，返回 (发布耗时, 全部完成耗时)"""
+    for attr in ("on_a", "on_b", "on_c"):
+        # 3.x 插件加载器以 MethodType 绑定后调用 register_handler(event_type, func, priority)
+        bus.subscribe("group_message", getattr(plugin, attr), 0)
+
+    async def run():
+        start = time.perf_counter()
+        await bus.publish_async(_LegacyEvent("group_message", "hi"))
+        published = time.perf_counter() - start
+        while len(plugin.finished) < 3:
+            await asyncio.sleep(0.01)
+        return published, time.perf_counter() - start
+
+    return asyncio.run(run())
+
+
+def test_legacy_bus_keeps_compat_handlers_concurrent():
+    bus = _LegacyEventBus()
+    profiler = HandlerProfiler({"sample_rate": 1.0, "exclude": []})
+    profiler.instrument_event_bus(bus)
+    plugin = _SlowPlugin()
+
+    published, finished = _legacy_dispatch(bus, plugin)
+
+    # 包装后仍是同步函数，3.x 总线用 create_task 并发调度而不是逐个 await
+    assert published < 0.1
+    assert finished < 0.5
+    stats = profiler.get_stats()
+    assert sum(s["calls"] for s in stats.values()) == 3
+    assert all(s["sampled"] == 1 and s["max_wall"] >= 0.2 for s in stats.values())
+
+
+def test_real_legacy_event_bus_subscribe_signature():
+    event_bus_module = pytest.importorskip("ncatbot.plugin.event.event_bus")
+    bus = event_bus_module.EventBus()
+    profiler = HandlerProfiler({"sample_rate": 1.0, "exclude": []})
+    profiler.instrument_event_bus(bus)
+    plugin = _SlowPlugin()
+
+    published, finished = _legacy_dispatch(bus, plugin)
+
+    assert published < 0.1
+    assert finished < 0.5
+
+
+def test_handlers_registered_after_instrumentation_are_profiled():
+    event_bus_module = pytest.importorskip("ncatbot.plugin_system.event.event_bus")
+    from ncatbot.plugin_system.event.event import NcatBotEvent
+
+    bus = event_bus_module.EventBus()
+    profiler = HandlerProfiler({"sample_rate": 1.0, "exclude": []})
+    profiler.instrument_event_bus(bus)
+    plugin = _Plugin()
+
+    # 与 4.x BasePlugin.register_handler 相同的调用方式
+    bus.subscribe("test.event", plugin.on_async, 0, None, plugin=plugin)
+    bus.subscribe("test.event", plugin.on_sync, 0, None, plugin=plugin)
+    bus.subscribe("test.event", plugin.on_error, 0, timeout=5, plugin=plugin)
+
+    results = asyncio.run(bus.publish(NcatBotEvent("test.event", {})))
+
+    assert sorted(r for r in results if r) == ["async", "sync"]
+    assert ("async", ("DemoPlugin", "on_async")) in plugin.seen
+    # 同步处理器仍在线程中执行
+    assert ("sync", False) in plugin.seen
+
+    stats = profiler.get_stats()
+    assert stats["DemoPlugin.on_async"]["calls"] == 1
+    assert stats["DemoPlugin.on_async"]["sampled"] == 1
+    assert stats["DemoPlugin.on_sync"]["calls"] == 1
+    assert stats["DemoPlugin.on_error"]["errors"] == 1
+    assert profiler.top_plugins(1)[0]["plugin"] == "DemoPlugin"
+
+
+def test_instrumentation_is_idempotent_and_respects_exclude():
+    bus = _LegacyEventBus()
+    profiler = HandlerProfiler({"sample_rate": 1.0, "exclude": ["SlowPlugin"]})
+    profiler.instrument_event_bus(bus)
+    profiler.instrument_event_bus(bus)
+    plugin = _SlowPlugin()
+
+    _legacy_dispatch(bus, plugin)
+
+    assert profiler.get_stats() == {}
@@ -0,0 +1,182 @@
+"""
+静态资源注册表模块 - 进程内共享的字体和图片模板
+"""
+import os
+import threading
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from PIL import Image, ImageFont
+
+from ncatbot.utils.logger import get_log
+
+_log = get_log()
+
+FontKey = Tuple[str, int, int, Tuple[str, ...]]
+TemplateKey = Tuple[str, Optional[Tuple[int, int]], Optional[str], bool]
+
+
+class AssetRegistry:
+    """
+    字体与模板注册表
+
+    - 字体按 (路径, 字号) 只加载一次，加载失败时依次尝试备选字体，最后使用默认字体，
+      结果同样缓存，不会每次渲染都重新探测字体路径
+    - 模板图片解码、转换模式、缩放后常驻内存，按需返回副本
+    - 每个进程各有一份（渲染进程池中的工作进程各自缓存）
+    """
+
+    def __init__(self):
+        self._fonts: Dict[FontKey, Any] = {}
+        self._font_files: Dict[str, int] = {}
+        self._templates: Dict[TemplateKey, Image.Image] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "font_hits": 0,
+            "font_misses": 0,
+            "template_hits": 0,
+            "template_misses": 0,
+            "copies": 0,
+        }
+
+    def font(self, path: str, size: int, fallbacks: Iterable[str] = (), index: int = 0):
+        """
+        获取字体
+
+        Args:
+            path: 字体路径（也可以是 truetype 能在系统字体目录中找到的文件名）
+            size: 字号
+            fallbacks: 主字体加载失败时依次尝试的字体
+            index: ttc 字体集中的字体序号
+
+        Returns:
+            FreeTypeFont，全部失败时为默认字体
+        """
+        key = (path, size, index, tuple(fallbacks))
+        font = self._fonts.get(key)
+        if font is not None:
+            self.stats["font_hits"] += 1
+            return font
+
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is None:
+                self.stats["font_misses"] += 1
+                font = self._fonts[key] = self._load_font(key)
+            else:
+                self.stats["font_hits"] += 1
+        return font
+
+    def _load_font(self, key: FontKey):
+        path, size, index, fallbacks = key
+        for candidate in (path, *fallbacks):
+            try:
+                font = ImageFont.truetype(candidate, size, index=index)
+            except Exception:
+                continue
+            if candidate not in self._font_files:
+                try:
+                    self._font_files[candidate] = os.path.getsize(font.path)
+                except (OSError, TypeError):
+                    self._font_files[candidate] = 0
+            if candidate != path:
+                _log.warning(f"字体 {path} 加载失败，使用 {candidate}")
+            return font
+        _log.warning(f"字体 {path} 及备选字体均加载失败，使用默认字体")
+        return ImageFont.load_default()
+
+    def template(
+        self,
+        path: str,
+        size: Optional[Tuple[int, int]] = None,
+        mode: Optional[str] = "RGBA",
+        keep_aspect: bool = False,
+        copy: bool = True,
+    ) -> Image.Image:
+        """
+        获取模板图片
+
+        Args:
+            path: 图片路径
+            size: 缩放后的尺寸，None 表示原尺寸
+            mode: 转换到的色彩模式，None 表示保持原模式
+            keep_aspect: True 时按 thumbnail 方式缩放到 size 以内并保持比例
+            copy: False 时返回共享实例，只能作为只读的粘贴源使用
+
+        Returns:
+            Image.Image: 模板图片（文件不存在时抛出 FileNotFoundError）
+        """
+        key = (path, tuple(size) if size else None, mode, keep_aspect)
+        image = self._templates.get(key)
+        if image is not None:
+            self.stats["template_hits"] += 1
+        else:
+            with self._lock:
+                image = self._templates.get(key)
+                if image is None:
+                    self.stats["template_misses"] += 1
+                    image = self._templates[key] = self._load_template(key)
+                else:
+                    self.stats["template_hits"] += 1
+        if copy:
+            self.stats["copies"] += 1
+            return image.copy()
+        return image
+
+    @staticmethod
+    def _load_template(key: TemplateKey) -> Image.Image:
+        path, size, mode, keep_aspect = key
+        with Image.open(path) as source:
+            image = source.convert(mode) if mode and source.mode != mode else source.copy()
+        if size:
+            if keep_aspect:
+                image.thumbnail(size, Image.LANCZOS)
+            elif image.size != size:
+                image = image.resize(size, Image.LANCZOS)
+        image.load()
+        return image
+
+    def memory_usage(self) -> Dict[str, int]:
+        """估算常驻内存（字节）"""
+        template_bytes = sum(
+            image.width * image.height * len(image.getbands()) for image in self._templates.values()
+        )
+        return {"templates": template_bytes, "fonts": sum(self._font_files.values())}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取注册表统计信息"""
+        usage = self.memory_usage()
+        return {
+            **self.stats,
+            "fonts": len(self._fonts),
+            "templates": len(self._templates),
+            "template_bytes": usage["templates"],
+            "font_file_bytes": usage["fonts"],
+            "template_mb": round(usage["templates"] / 1024 / 1024, 2),
+        }
+
+    def clear(self) -> None:
+        """清空缓存（资源文件更新后使用）"""
+        with self._lock:
+            self._fonts.clear()
+            self._font_files.clear()
+            self._templates.clear()
+
+
+# 全局资源注册表实例
+asset_registry = AssetRegistry()
+
+
+def load_font(path: str, size: int, fallbacks: Iterable[str] = (), index: int = 0):
+    """从全局注册表获取字体"""
+    return asset_registry.font(path, size, fallbacks, index)
+
+
+def load_template(
+    path: str,
+    size: Optional[Tuple[int, int]] = None,
+    mode: Optional[str] = "RGBA",
+    keep_aspect: bool = False,
+    copy: bool = True,
+) -> Image.Image:
+    """从全局注册表获取模板图片"""
+    return asset_registry.template(path, size, mode, keep_aspect, copy)
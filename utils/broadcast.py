@@ -0,0 +1,349 @@
+"""
+群发推送模块 - 限速并发的定时推送，投递状态持久化，中断后可续推
+"""
+import asyncio
+import json
+import time
+from datetime import date, datetime
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from ncatbot.utils.logger import get_log
+from utils.config_manager import get_config
+from utils.database_pool import get_database
+from utils.group_forward_msg import _message_sender
+
+_log = get_log()
+
+# config.yaml 中未配置 broadcast 段时使用的默认值
+DEFAULT_BROADCAST_CONFIG: Dict[str, Any] = {
+    "concurrency": 4,         # 同时进行的发送数
+    "rate": 2.0,              # 全局发送速率（条/秒），合并转发与降级文本都计入
+    "burst": 4,               # 令牌桶容量
+    "max_attempts": 2,        # 每个群最多尝试的轮数（每轮先合并转发再降级文本）
+    "retry_delay": 10,        # 整轮失败后重试前等待（秒）
+    "progress_interval": 20,  # 每投递多少个群输出一次进度
+    "resume_max_age": 6,      # 重启后只续推创建不超过该小时数的推送，更早的标记为过期
+}
+
+# 投递状态
+PENDING, SENT, FALLBACK, FAILED, EXPIRED = "pending", "sent", "fallback", "failed", "expired"
+
+
+def _is_stale_daily_job(job_id: str) -> bool:
+    """job_id 以 YYYY-MM-DD 结尾且不是今天时视为过期的每日推送"""
+    try:
+        job_date = datetime.strptime(job_id.rsplit(":", 1)[-1], "%Y-%m-%d").date()
+    except ValueError:
+        return False
+    return job_date != date.today()
+
+
+class TokenBucket:
+    """令牌桶：平均速率 rate，允许 capacity 的突发"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = max(rate, 0.01)
+        self.capacity = max(capacity, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+@dataclass
+class BroadcastJob:
+    job_id: str                                  # 相同 job_id 的推送只投递一次，例如 "epic_daily:2025-01-01"
+    groups: List[int]
+    forward: Optional[List[Dict[str, Any]]] = None  # 合并转发节点
+    text: Optional[str] = None                   # 纯文本内容（合并转发失败时的降级内容）
+
+
+@dataclass
+class BroadcastProgress:
+    job_id: str
+    total: int
+    sent: int = 0
+    fallback: int = 0
+    failed: int = 0
+    skipped: int = 0   # 之前已经投递过的群
+    started_at: float = field(default_factory=time.monotonic)
+    finished: bool = False
+
+    @property
+    def done(self) -> int:
+        return self.sent + self.fallback + self.failed + self.skipped
+
+    def summary(self) -> str:
+        elapsed = time.monotonic() - self.started_at
+        return (
+            f"推送 {self.job_id}: {self.done}/{self.total} "
+            f"(合并转发 {self.sent}, 文本 {self.fallback}, 失败 {self.failed}, 已投递跳过 {self.skipped}) "
+            f"耗时 {elapsed:.1f}s"
+        )
+
+
+class Broadcaster:
+    """
+    群发推送引擎
+
+    - 固定数量的发送协程并发投递，所有发送共用一个全局令牌桶，按平台安全速率发送
+    - 每个群先发合并转发，失败时降级为纯文本
+    - 每个群的投递状态写入 broadcast_deliveries，推送内容写入 broadcast_jobs；
+      进程重启或插件重载后 resume_unfinished 会继续投递未完成的群，已投递的群不会重复发送，
+      过期的推送（非当天的每日推送或创建超过 resume_max_age 小时）不再续推
+    - 推送在后台任务中执行，不受定时任务超时限制
+    """
+
+    def __init__(self, db_path: str = "data.db"):
+        self.db = get_database(db_path)
+        self._config: Optional[Dict[str, Any]] = None
+        self._bucket: Optional[TokenBucket] = None
+        self._initialized = False
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self.progress: Dict[str, BroadcastProgress] = {}
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """读取 broadcast 配置（首次使用时从 config.yaml 加载）"""
+        if self._config is None:
+            user_config = get_config("broadcast", {}) or {}
+            self._config = {**DEFAULT_BROADCAST_CONFIG, **user_config}
+        return self._config
+
+    @property
+    def bucket(self) -> TokenBucket:
+        if self._bucket is None:
+            self._bucket = TokenBucket(float(self.config["rate"]), float(self.config["burst"]))
+        return self._bucket
+
+    async def initialize(self) -> None:
+        """创建推送任务表和投递状态表"""
+        if self._initialized:
+            return
+        await self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS broadcast_jobs (
+                job_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                total INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            );
+            CREATE TABLE IF NOT EXISTS broadcast_deliveries (
+                job_id TEXT NOT NULL,
+                group_id INTEGER NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (job_id, group_id)
+            );
+        """)
+        self._initialized = True
+
+    async def start(self, job: BroadcastJob) -> asyncio.Task:
+        """
+        登记推送并在后台开始投递
+
+        同一个 job_id 已在进行时返回已有任务；已完成的群不会重复投递。
+
+        Returns:
+            asyncio.Task: 推送任务，结果为 BroadcastProgress
+        """
+        await self.initialize()
+        task = self._tasks.get(job.job_id)
+        if task is not None and not task.done():
+            return task
+        payload = json.dumps({"forward": job.forward, "text": job.text}, ensure_ascii=False)
+        async with self.db.transaction() as conn:
+            await conn.execute(
+                """
+                INSERT INTO broadcast_jobs (job_id, payload, total) VALUES (?, ?, ?)
+                ON CONFLICT(job_id) DO UPDATE SET payload = excluded.payload, total = excluded.total
+                """,
+                (job.job_id, payload, len(job.groups)),
+            )
+            await conn.executemany(
+                "INSERT OR IGNORE INTO broadcast_deliveries (job_id, group_id) VALUES (?, ?)",
+                [(job.job_id, int(group_id)) for group_id in job.groups],
+            )
+        return self._spawn(job)
+
+    def _spawn(self, job: BroadcastJob) -> asyncio.Task:
+        task = asyncio.create_task(self._run(job))
+        self._tasks[job.job_id] = task
+        task.add_done_callback(lambda t, job_id=job.job_id: self._tasks.pop(job_id, None))
+        return task
+
+    async def run(self, job: BroadcastJob) -> BroadcastProgress:
+        """登记推送并等待投递完成"""
+        return await (await self.start(job))
+
+    async def resume_unfinished(self) -> int:
+        """
+        继续投递上次未完成的推送，返回恢复的推送数量
+
+        job_id 以日期结尾（例如 "epic_daily:2025-01-01"）且不是今天的推送，
+        或创建超过 resume_max_age 小时的推送不再续推，剩余的群标记为过期。
+        """
+        await self.initialize()
+        max_age = float(self.config["resume_max_age"])
+        rows = await self.db.fetchall(
+            "SELECT job_id, payload, created_at < datetime('now', ?) FROM broadcast_jobs WHERE finished_at IS NULL",
+            (f"-{max_age} hours",),
+        )
+        resumed = 0
+        for job_id, payload, too_old in rows:
+            if job_id in self._tasks:
+                continue
+            if too_old or _is_stale_daily_job(job_id):
+                await self._expire(job_id)
+                continue
+            groups = await self.db.fetchall(
+                "SELECT group_id FROM broadcast_deliveries WHERE job_id = ? ORDER BY group_id", (job_id,)
+            )
+            data = json.loads(payload)
+            self._spawn(BroadcastJob(job_id, [g for (g,) in groups], data.get("forward"), data.get("text")))
+            resumed += 1
+        if resumed:
+            _log.info(f"继续投递 {resumed} 个未完成的推送")
+        return resumed
+
+    async def _expire(self, job_id: str) -> None:
+        """把过期推送中未投递的群标记为过期并结束推送"""
+        async with self.db.transaction() as conn:
+            await conn.execute(
+                "UPDATE broadcast_deliveries SET status = ? WHERE job_id = ? AND status NOT IN (?, ?)",
+                (EXPIRED, job_id, SENT, FALLBACK),
+            )
+            await conn.execute(
+                "UPDATE broadcast_jobs SET finished_at = CURRENT_TIMESTAMP WHERE job_id = ?", (job_id,)
+            )
+        _log.info(f"推送 {job_id} 已过期，不再续推")
+
+    async def _run(self, job: BroadcastJob) -> BroadcastProgress:
+        config = self.config
+        rows = await self.db.fetchall(
+            "SELECT group_id, status FROM broadcast_deliveries WHERE job_id = ?", (job.job_id,)
+        )
+        progress = self.progress[job.job_id] = BroadcastProgress(job.job_id, len(rows))
+        queue: asyncio.Queue = asyncio.Queue()
+        for group_id, status in rows:
+            if status in (SENT, FALLBACK):
+                progress.skipped += 1
+            else:
+                queue.put_nowait(group_id)
+        _log.info(f"开始推送 {job.job_id}: {queue.qsize()} 个群待投递，{progress.skipped} 个已投递")
+
+        for round_index in range(int(config["max_attempts"])):
+            if queue.empty():
+                break
+            if round_index:
+                await asyncio.sleep(float(config["retry_delay"]))
+                _log.info(f"推送 {job.job_id} 第 {round_index + 1} 轮重试 {queue.qsize()} 个群")
+            retry: asyncio.Queue = asyncio.Queue()
+            workers = [
+                asyncio.create_task(self._worker(job, queue, retry, progress))
+                for _ in range(min(int(config["concurrency"]), queue.qsize()))
+            ]
+            await asyncio.gather(*workers)
+            queue = retry
+
+        # 多轮后仍失败的群
+        failed = []
+        while not queue.empty():
+            failed.append((FAILED, job.job_id, queue.get_nowait()))
+        progress.failed += len(failed)
+        progress.finished = True
+        async with self.db.transaction() as conn:
+            await conn.executemany(
+                "UPDATE broadcast_deliveries SET status = ? WHERE job_id = ? AND group_id = ?", failed
+            )
+            await conn.execute(
+                "UPDATE broadcast_jobs SET finished_at = CURRENT_TIMESTAMP WHERE job_id = ?", (job.job_id,)
+            )
+        _log.info(f"推送完成 {progress.summary()}")
+        return progress
+
+    async def _worker(self, job: BroadcastJob, queue: asyncio.Queue, retry: asyncio.Queue,
+                      progress: BroadcastProgress) -> None:
+        interval = max(1, int(self.config["progress_interval"]))
+        while not queue.empty():
+            group_id = queue.get_nowait()
+            status, error = await self._deliver(job, group_id)
+            await self.db.execute(
+                """
+                UPDATE broadcast_deliveries
+                SET status = ?, attempts = attempts + 1, error = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE job_id = ? AND group_id = ?
+                """,
+                (status, error, job.job_id, group_id),
+            )
+            if status == SENT:
+                progress.sent += 1
+            elif status == FALLBACK:
+                progress.fallback += 1
+            else:
+                retry.put_nowait(group_id)
+                continue
+            if progress.done % interval == 0:
+                _log.info(progress.summary())
+
+    async def _deliver(self, job: BroadcastJob, group_id: int):
+        """向一个群投递：合并转发 -> 纯文本"""
+        error = None
+        if job.forward:
+            await self.bucket.acquire()
+            try:
+                if await _message_sender.send_group_forward_msg(group_id, job.forward):
+                    return SENT, None
+                error = "合并转发失败"
+            except Exception as e:
+                error = f"合并转发失败: {e}"
+        if job.text:
+            await self.bucket.acquire()
+            try:
+                if await _message_sender.send_group_msg(group_id, job.text):
+                    return (FALLBACK if job.forward else SENT), None
+                error = "文本消息发送失败"
+            except Exception as e:
+                error = f"文本消息发送失败: {e}"
+        _log.warning(f"推送 {job.job_id} 到群 {group_id} 失败: {error}")
+        return PENDING, error
+
+    def get_progress(self, job_id: str) -> Optional[BroadcastProgress]:
+        return self.progress.get(job_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取进行中和最近推送的进度"""
+        return {
+            "running": [job_id for job_id, task in self._tasks.items() if not task.done()],
+            "jobs": {
+                job_id: {
+                    "total": p.total, "done": p.done, "sent": p.sent, "fallback": p.fallback,
+                    "failed": p.failed, "skipped": p.skipped, "finished": p.finished,
+                }
+                for job_id, p in self.progress.items()
+            },
+        }
+
+    async def shutdown(self) -> None:
+        """取消进行中的推送（投递状态已持久化，下次启动时续推）"""
+        tasks = [task for task in self._tasks.values() if not task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+# 全局推送引擎实例
+broadcaster = Broadcaster()
@@ -0,0 +1,273 @@
+"""
+命令路由模块 - 按命令前缀/正则把群消息只分发给匹配的插件处理器
+"""
+import asyncio
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Pattern, Tuple, Union
+
+from ncatbot.utils.logger import get_log
+from utils.handler_profiler import handler_profiler
+
+_log = get_log()
+
+_ROUTE_ATTR = "_route_specs"
+
+
+@dataclass
+class RouteSpec:
+    """处理器声明的路由规则"""
+    prefixes: Tuple[str, ...] = ()
+    commands: Tuple[str, ...] = ()
+    patterns: Tuple[Pattern, ...] = ()
+    catch_all: bool = False
+
+
+@dataclass
+class _Route:
+    """已注册的路由"""
+    plugin: str
+    name: str
+    handler: Callable
+    spec: RouteSpec
+    order: int = 0
+
+
+@dataclass
+class _TrieNode:
+    children: Dict[str, "_TrieNode"] = field(default_factory=dict)
+    prefix_routes: List[_Route] = field(default_factory=list)
+    exact_routes: List[_Route] = field(default_factory=list)
+
+
+def route(
+    prefixes: Optional[Union[str, Iterable[str]]] = None,
+    commands: Optional[Union[str, Iterable[str]]] = None,
+    patterns: Optional[Union[str, Pattern, Iterable[Union[str, Pattern]]]] = None,
+    catch_all: bool = False,
+):
+    """
+    声明群消息处理器的路由规则
+
+    被装饰的方法不再需要 @bot.group_event()，而是在插件 on_load 中调用
+    command_router.register_plugin(self) 统一注册。
+
+    Args:
+        prefixes: 命令前缀，消息（去除首尾空白后）以其开头即匹配
+        commands: 完整命令，消息与其完全相同才匹配
+        patterns: 正则表达式，使用 re.match 匹配
+        catch_all: 接收所有消息（用于 AI 聊天、问答等被动插件）
+    """
+    def _as_tuple(value) -> tuple:
+        if value is None:
+            return ()
+        if isinstance(value, (str, re.Pattern)):
+            return (value,)
+        return tuple(value)
+
+    spec = RouteSpec(
+        prefixes=_as_tuple(prefixes),
+        commands=_as_tuple(commands),
+        patterns=tuple(re.compile(p) if isinstance(p, str) else p for p in _as_tuple(patterns)),
+        catch_all=catch_all,
+    )
+
+    def decorator(func: Callable) -> Callable:
+        specs = list(getattr(func, _ROUTE_ATTR, []))
+        specs.append(spec)
+        setattr(func, _ROUTE_ATTR, specs)
+        return func
+    return decorator
+
+
+class CommandRouter:
+    """
+    群消息命令路由器
+
+    - 前缀和完整命令编译进一棵字符前缀树，一次遍历消息即可找到所有匹配的处理器
+    - 所有正则合并为一个组合正则做快速过滤，只有组合正则命中时才逐个确认
+    - catch_all 处理器保留给需要查看每条消息的被动插件
+    """
+
+    def __init__(self):
+        self._routes: List[_Route] = []
+        self._root = _TrieNode()
+        self._regex_routes: List[_Route] = []
+        self._combined_regex: Optional[Pattern] = None
+        self._catch_all: List[_Route] = []
+        self._order = 0
+        self.stats: Dict[str, int] = {
+            "messages": 0,
+            "routed": 0,
+            "unrouted": 0,
+            "handler_calls": 0,
+            "handler_errors": 0,
+        }
+
+    def register(self, plugin: str, handler: Callable, spec: RouteSpec, name: Optional[str] = None) -> None:
+        """注册单个处理器（与 register_plugin 一样经过处理器剖析包装）"""
+        name = name or getattr(handler, "__name__", "handler")
+        self._order += 1
+        self._routes.append(_Route(plugin, name, handler_profiler.wrap(plugin, name, handler), spec, self._order))
+        self._rebuild()
+
+    def register_plugin(self, plugin: Any) -> int:
+        """
+        注册插件实例上所有用 @route 声明的处理器
+
+        Args:
+            plugin: 插件实例
+
+        Returns:
+            int: 注册的处理器数量
+        """
+        plugin_name = getattr(plugin, "name", None) or type(plugin).__name__
+        # 重新加载插件时先移除旧的路由
+        self._routes = [r for r in self._routes if r.plugin != plugin_name]
+
+        count = 0
+        for attr_name in dir(type(plugin)):
+            func = getattr(type(plugin), attr_name, None)
+            specs = getattr(func, _ROUTE_ATTR, None)
+            if not specs:
+                continue
+            handler = handler_profiler.wrap(plugin_name, attr_name, getattr(plugin, attr_name))
+            for spec in specs:
+                self._order += 1
+                self._routes.append(_Route(plugin_name, attr_name, handler, spec, self._order))
+                count += 1
+
+        self._rebuild()
+        _log.info(f"命令路由: 插件 {plugin_name} 注册了 {count} 个处理器")
+        return count
+
+    def unregister_plugin(self, plugin_name: str) -> None:
+        """移除插件的所有路由"""
+        self._routes = [r for r in self._routes if r.plugin != plugin_name]
+        self._rebuild()
+
+    def _rebuild(self) -> None:
+        """根据当前路由表重建前缀树和组合正则"""
+        root = _TrieNode()
+        regex_routes: List[_Route] = []
+        catch_all: List[_Route] = []
+
+        for r in self._routes:
+            for prefix in r.spec.prefixes:
+                self._insert(root, prefix).prefix_routes.append(r)
+            for command in r.spec.commands:
+                self._insert(root, command).exact_routes.append(r)
+            if r.spec.patterns:
+                regex_routes.append(r)
+            if r.spec.catch_all:
+                catch_all.append(r)
+
+        combined = None
+        if regex_routes:
+            parts = [f"(?:{p.pattern})" for r in regex_routes for p in r.spec.patterns]
+            try:
+                combined = re.compile("|".join(parts))
+            except re.error as e:
+                # 不同正则的标志或命名分组冲突时退化为逐个匹配
+                _log.warning(f"命令路由: 无法合并正则，将逐个匹配: {e}")
+
+        self._root = root
+        self._regex_routes = regex_routes
+        self._combined_regex = combined
+        self._catch_all = catch_all
+
+    @staticmethod
+    def _insert(root: _TrieNode, key: str) -> _TrieNode:
+        node = root
+        for ch in key:
+            node = node.children.setdefault(ch, _TrieNode())
+        return node
+
+    def match(self, message: str) -> List[_Route]:
+        """
+        查找与消息匹配的所有处理器
+
+        Args:
+            message: 去除首尾空白后的原始消息
+
+        Returns:
+            List[_Route]: 按注册顺序排列、去重后的匹配路由
+        """
+        matched: Dict[int, _Route] = {}
+
+        node = self._root
+        for r in node.prefix_routes:
+            matched[id(r)] = r
+        for ch in message:
+            node = node.children.get(ch)
+            if node is None:
+                break
+            for r in node.prefix_routes:
+                matched[id(r)] = r
+        else:
+            for r in node.exact_routes:
+                matched[id(r)] = r
+
+        if self._regex_routes and (self._combined_regex is None or self._combined_regex.match(message)):
+            for r in self._regex_routes:
+                if any(p.match(message) for p in r.spec.patterns):
+                    matched[id(r)] = r
+
+        for r in self._catch_all:
+            matched[id(r)] = r
+
+        return sorted(matched.values(), key=lambda r: r.order)
+
+    async def dispatch(self, event: Any) -> int:
+        """
+        把事件分发给匹配的处理器
+
+        Args:
+            event: 群消息事件
+
+        Returns:
+            int: 被调用的处理器数量
+        """
+        self.stats["messages"] += 1
+        message = (getattr(event, "raw_message", "") or "").strip()
+        routes = self.match(message)
+        if not routes:
+            self.stats["unrouted"] += 1
+            return 0
+
+        self.stats["routed"] += 1
+        self.stats["handler_calls"] += len(routes)
+        results = await asyncio.gather(
+            *(r.handler(event) for r in routes),
+            return_exceptions=True,
+        )
+        for r, result in zip(routes, results):
+            if isinstance(result, Exception):
+                self.stats["handler_errors"] += 1
+                _log.error(f"命令路由: {r.plugin}.{r.name} 处理消息失败: {result}")
+        return len(routes)
+
+    def get_routes(self) -> List[Dict[str, Any]]:
+        """获取当前路由表（用于调试）"""
+        return [
+            {
+                "plugin": r.plugin,
+                "handler": r.name,
+                "prefixes": list(r.spec.prefixes),
+                "commands": list(r.spec.commands),
+                "patterns": [p.pattern for p in r.spec.patterns],
+                "catch_all": r.spec.catch_all,
+            }
+            for r in self._routes
+        ]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取路由统计信息"""
+        stats: Dict[str, Any] = dict(self.stats)
+        stats["routes"] = len(self._routes)
+        stats["catch_all"] = len(self._catch_all)
+        return stats
+
+
+# 全局命令路由器实例
+command_router = CommandRouter()
@@ -140,6 +140,86 @@ class ConfigManager:
                 "path": "data.db",
                 "backup_enabled": True,
                 "backup_interval": 3600
+            },
+            "http": {
+                "limit": 100,
+                "limit_per_host": 10,
+                "dns_cache_ttl": 300,
+                "keepalive_timeout": 30,
+                "timeouts": {"default": 300, "api": 30, "fast": 10, "download": 120}
+            },
+            "image_cache": {
+                "cache_dir": "data/image_cache",
+                "memory_budget_mb": 64,
+                "disk_budget_mb": 512,
+                "decoded_entries": 128,
+                "max_age": 86400
+            },
+            "render": {
+                "mode": "process",
+                "max_workers": 2,
+                "start_method": "spawn"
+            },
+            "ai_memory": {
+                "prompt_token_budget": 3000,
+                "ring_size": 40,
+                "summary_trigger_tokens": 2000,
+                "keep_recent_turns": 8,
+                "summary_max_chars": 600
+            },
+            "llm_stream": {
+                "first_token_timeout": 30,
+                "idle_timeout": 30,
+                "first_segment_chars": 8,
+                "segment_chars": 300,
+                "max_messages": 4
+            },
+            "llm_gateway": {
+                "url": "https://gemn.ariaxz.tk/v1/chat/completions",
+                "max_concurrency_per_key": 4,
+                "ewma_alpha": 0.3,
+                "auth_cooldown": 600,
+                "rate_limit_cooldown": 60,
+                "failure_threshold": 3,
+                "failure_cooldown": 30,
+                "max_cooldown": 1800,
+                "hedge_after": 0,
+                "max_attempts": 0
+            },
+            "ai_queue": {
+                "max_batch": 5,
+                "idle_timeout": 300
+            },
+            "broadcast": {
+                "concurrency": 4,
+                "rate": 2.0,
+                "burst": 4,
+                "max_attempts": 2,
+                "retry_delay": 10,
+                "progress_interval": 20,
+                "resume_max_age": 6
+            },
+            "rate_limit": {
+                "idle_ttl": 600,
+                "limits": {}
+            },
+            "handler_profiler": {
+                "enabled": True,
+                "sample_rate": 0.1,
+                "exclude": ["CommandRouter"]
+            },
+            "loop_watchdog": {
+                "enabled": True,
+                "interval": 0.1,
+                "threshold": 0.5,
+                "window": 3600,
+                "history": 500
+            },
+            "metrics": {
+                "enabled": False,
+                "host": "127.0.0.1",
+                "port": 9464,
+                "path": "/metrics"
             }
         }
         
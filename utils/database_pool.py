@@ -0,0 +1,269 @@
+"""
+数据库连接池模块 - 为所有插件提供共享的长连接 SQLite 访问层
+"""
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Union
+
+import aiosqlite
+
+from ncatbot.utils.logger import get_log
+from utils.metrics import record_db_query
+
+_log = get_log()
+
+
+class Database:
+    """
+    单个 SQLite 数据库文件的共享访问入口
+
+    - 一个写连接，所有写操作通过 FIFO 锁排队执行（SQLite 同一时刻只允许一个写者）
+    - 多个只读连接组成连接池，WAL 模式下读操作可与写操作并发
+    - 连接长期保持，启用 WAL、synchronous=NORMAL 以及 sqlite3 的预编译语句缓存
+    """
+
+    def __init__(
+        self,
+        db_path: Union[str, Path] = "data.db",
+        max_readers: int = 4,
+        cached_statements: int = 256,
+        busy_timeout_ms: int = 5000,
+    ):
+        self.db_path = Path(db_path)
+        self.max_readers = max_readers
+        self.cached_statements = cached_statements
+        self.busy_timeout_ms = busy_timeout_ms
+
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        self._connect_lock = asyncio.Lock()
+        self._readers: "asyncio.Queue[aiosqlite.Connection]" = asyncio.Queue()
+        self._reader_count = 0
+        self._all_readers: List[aiosqlite.Connection] = []
+        self._closed = False
+
+        # 统计信息
+        self._stats: Dict[str, float] = {
+            "reads": 0,
+            "writes": 0,
+            "errors": 0,
+            "read_time": 0.0,
+            "write_time": 0.0,
+            "write_wait_time": 0.0,
+        }
+
+    async def _connect(self) -> aiosqlite.Connection:
+        """创建并配置一个新连接"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = await aiosqlite.connect(self.db_path, cached_statements=self.cached_statements)
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        await conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        return conn
+
+    async def _get_writer(self) -> aiosqlite.Connection:
+        """获取写连接（懒创建）"""
+        if self._closed:
+            raise RuntimeError(f"数据库 {self.db_path} 已关闭")
+        if self._writer is None:
+            async with self._connect_lock:
+                if self._writer is None:
+                    self._writer = await self._connect()
+        return self._writer
+
+    async def _acquire_reader(self) -> aiosqlite.Connection:
+        """从连接池获取只读连接，池未满时创建新连接"""
+        if self._closed:
+            raise RuntimeError(f"数据库 {self.db_path} 已关闭")
+        try:
+            return self._readers.get_nowait()
+        except asyncio.QueueEmpty:
+            pass
+
+        async with self._connect_lock:
+            if self._reader_count < self.max_readers:
+                self._reader_count += 1
+                try:
+                    conn = await self._connect()
+                except Exception:
+                    self._reader_count -= 1
+                    raise
+                await conn.execute("PRAGMA query_only=ON")
+                self._all_readers.append(conn)
+                return conn
+
+        return await self._readers.get()
+
+    @asynccontextmanager
+    async def read(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        借用一个只读连接
+
+        用法:
+            async with db.read() as conn:
+                async with conn.execute(sql, params) as cursor:
+                    rows = await cursor.fetchall()
+        """
+        conn = await self._acquire_reader()
+        start = time.perf_counter()
+        try:
+            yield conn
+        except Exception:
+            self._stats["errors"] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self._stats["reads"] += 1
+            self._stats["read_time"] += elapsed
+            record_db_query(self.db_path.name, "read", elapsed)
+            if self._closed:
+                # 借出期间数据库已关闭，连接不再放回池中
+                try:
+                    await conn.close()
+                except Exception as e:
+                    _log.debug(f"关闭数据库读连接失败: {e}")
+            else:
+                self._readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """
+        在写连接上执行一个事务，退出时自动提交，异常时回滚
+
+        同一时刻只有一个事务持有写连接，其余写操作按到达顺序排队等待。
+        """
+        wait_start = time.perf_counter()
+        async with self._write_lock:
+            conn = await self._get_writer()
+            start = time.perf_counter()
+            self._stats["write_wait_time"] += start - wait_start
+            try:
+                yield conn
+                await conn.commit()
+            except BaseException:
+                self._stats["errors"] += 1
+                try:
+                    await conn.rollback()
+                except Exception as e:
+                    _log.error(f"数据库回滚失败: {e}")
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                self._stats["writes"] += 1
+                self._stats["write_time"] += elapsed
+                record_db_query(self.db_path.name, "write", elapsed)
+
+    async def fetchone(self, query: str, params: Iterable[Any] = ()) -> Optional[Any]:
+        """执行查询并返回第一行"""
+        async with self.read() as conn:
+            async with conn.execute(query, tuple(params)) as cursor:
+                return await cursor.fetchone()
+
+    async def fetchall(self, query: str, params: Iterable[Any] = ()) -> List[Any]:
+        """执行查询并返回所有行"""
+        async with self.read() as conn:
+            async with conn.execute(query, tuple(params)) as cursor:
+                return list(await cursor.fetchall())
+
+    async def execute(self, query: str, params: Iterable[Any] = ()) -> int:
+        """
+        执行单条写语句并提交
+
+        Returns:
+            int: 受影响的行数
+        """
+        async with self.transaction() as conn:
+            async with conn.execute(query, tuple(params)) as cursor:
+                return cursor.rowcount
+
+    async def insert(self, query: str, params: Iterable[Any] = ()) -> Optional[int]:
+        """
+        执行插入语句并提交
+
+        Returns:
+            Optional[int]: 新插入行的 rowid
+        """
+        async with self.transaction() as conn:
+            async with conn.execute(query, tuple(params)) as cursor:
+                return cursor.lastrowid
+
+    async def executemany(self, query: str, params_list: Iterable[Iterable[Any]]) -> None:
+        """批量执行写语句并在同一事务中提交"""
+        async with self.transaction() as conn:
+            await conn.executemany(query, [tuple(p) for p in params_list])
+
+    async def executescript(self, script: str) -> None:
+        """执行 SQL 脚本（通常用于建表）"""
+        async with self.transaction() as conn:
+            await conn.executescript(script)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取连接池统计信息"""
+        stats = dict(self._stats)
+        stats.update({
+            "db_path": str(self.db_path),
+            "readers": self._reader_count,
+            "idle_readers": self._readers.qsize(),
+            "avg_read_ms": self._stats["read_time"] / self._stats["reads"] * 1000
+            if self._stats["reads"] else 0.0,
+            "avg_write_ms": self._stats["write_time"] / self._stats["writes"] * 1000
+            if self._stats["writes"] else 0.0,
+        })
+        return stats
+
+    async def close(self) -> None:
+        """关闭所有连接"""
+        self._closed = True
+        async with self._write_lock:
+            if self._writer is not None:
+                try:
+                    await self._writer.close()
+                except Exception as e:
+                    _log.error(f"关闭数据库写连接失败: {e}")
+                self._writer = None
+
+        for conn in self._all_readers:
+            try:
+                await conn.close()
+            except Exception as e:
+                _log.error(f"关闭数据库读连接失败: {e}")
+        self._all_readers.clear()
+        self._reader_count = 0
+        self._readers = asyncio.Queue()
+
+
+# 按数据库文件路径索引的全局实例
+_databases: Dict[str, Database] = {}
+
+
+def get_database(db_path: Union[str, Path] = "data.db") -> Database:
+    """
+    获取指定数据库文件的共享实例
+
+    Args:
+        db_path: 数据库文件路径
+
+    Returns:
+        Database: 同一文件在进程内只对应一个实例
+    """
+    key = str(Path(db_path).resolve())
+    db = _databases.get(key)
+    if db is None or db._closed:
+        db = Database(db_path)
+        _databases[key] = db
+    return db
+
+
+def get_all_database_stats() -> List[Dict[str, Any]]:
+    """获取所有数据库实例的统计信息"""
+    return [db.get_stats() for db in _databases.values()]
+
+
+async def close_all_databases() -> None:
+    """关闭所有共享数据库连接"""
+    for db in list(_databases.values()):
+        await db.close()
+    _databases.clear()
+    _log.info("共享数据库连接已全部关闭")
@@ -0,0 +1,156 @@
+"""
+功能开关缓存模块 - 为群组功能开关提供内存索引
+"""
+import asyncio
+import json
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
+
+import aiosqlite
+
+from ncatbot.utils.logger import get_log
+from utils.database_pool import get_database
+
+_log = get_log()
+
+
+class FeatureIndex:
+    """
+    群组功能开关索引
+
+    以 group_id -> {title: enabled} 的形式缓存 group_menus 表中的功能状态。
+    每个群首次查询时从数据库懒加载，之后的查询均为内存中的O(1)查找；
+    所有写入 group_menus 的地方需要调用 update_menu / set_status 以保持索引一致。
+    """
+
+    def __init__(self, db_path: Union[str, Path] = "data.db"):
+        self.db_path = Path(db_path)
+        self._index: Dict[int, Dict[str, bool]] = {}
+        self._loading: Dict[int, asyncio.Future] = {}
+        self._stale_loads: set = set()
+        self.hits = 0
+        self.misses = 0
+
+    async def is_enabled(self, group_id: int, title: str) -> bool:
+        """
+        检查群组中指定功能是否开启
+
+        Args:
+            group_id: 群号
+            title: 功能名称
+
+        Returns:
+            bool: 功能是否开启（未配置的功能默认开启）
+        """
+        features = self._index.get(group_id)
+        if features is None:
+            self.misses += 1
+            features = await self._load_group(group_id)
+        else:
+            self.hits += 1
+        return features.get(title, True)
+
+    async def _load_group(self, group_id: int) -> Dict[str, bool]:
+        """从数据库加载单个群的功能索引，同一群的并发加载只查询一次"""
+        pending = self._loading.get(group_id)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[group_id] = future
+        try:
+            features = await self._read_from_db(group_id)
+            if features is None or group_id in self._stale_loads:
+                # 读取失败或加载期间发生了写入时不缓存，下次查询时重新读取
+                features = features or {}
+            else:
+                # 加载期间若已有写入更新了索引，以写入结果为准
+                features = self._index.setdefault(group_id, features)
+            future.set_result(features)
+            return features
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._loading.pop(group_id, None)
+            self._stale_loads.discard(group_id)
+            if future.done() and not future.cancelled():
+                # 避免 "Future exception was never retrieved" 警告
+                future.exception()
+
+    async def _read_from_db(self, group_id: int) -> Optional[Dict[str, bool]]:
+        """读取并解析群组菜单配置"""
+        try:
+            result = await get_database(self.db_path).fetchone(
+                "SELECT menu_item FROM group_menus WHERE group_id = ?", (group_id,)
+            )
+        except aiosqlite.Error as e:
+            _log.error(f"加载群 {group_id} 功能开关失败: {e}")
+            return None
+
+        if not result:
+            return {}
+
+        try:
+            return self._build_features(json.loads(result[0]))
+        except (json.JSONDecodeError, TypeError) as e:
+            _log.error(f"解析群 {group_id} 功能配置JSON失败: {e}")
+            return {}
+
+    @staticmethod
+    def _build_features(menu_item: Optional[Dict[str, Any]]) -> Dict[str, bool]:
+        """将菜单配置转换为 {title: enabled} 映射"""
+        if not isinstance(menu_item, dict):
+            return {}
+        features = {}
+        for feature in menu_item.get("info", []):
+            title = feature.get("title")
+            if title:
+                features[title] = feature.get("status") == "1"
+        return features
+
+    def update_menu(self, group_id: int, menu_item: Optional[Dict[str, Any]]) -> None:
+        """
+        使用写入数据库的完整菜单配置刷新群组索引
+
+        Args:
+            group_id: 群号
+            menu_item: 已写入数据库的菜单配置
+        """
+        self._index[group_id] = self._build_features(menu_item)
+
+    def set_status(self, group_id: int, title: str, enabled: bool) -> None:
+        """
+        更新单个功能的开关状态
+
+        仅在该群已被加载时更新；未加载的群在下次查询时会从数据库读取最新状态。
+        """
+        features = self._index.get(group_id)
+        if features is not None:
+            features[title] = enabled
+        elif group_id in self._loading:
+            self._stale_loads.add(group_id)
+
+    def invalidate(self, group_id: Optional[int] = None) -> None:
+        """使指定群（或全部群）的索引失效"""
+        if group_id is None:
+            self._index.clear()
+            self._stale_loads.update(self._loading)
+        else:
+            self._index.pop(group_id, None)
+            if group_id in self._loading:
+                self._stale_loads.add(group_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        total = self.hits + self.misses
+        return {
+            "groups": len(self._index),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+# 全局功能开关索引实例
+feature_index = FeatureIndex()
@@ -2,16 +2,13 @@
 消息发送工具模块 - 统一管理各种消息发送功能
 """
 import asyncio
-import websockets
-import json
 import html
 import re
 from typing import Union, List, Dict, Any, Optional
-from contextlib import asynccontextmanager
 
-from ncatbot.utils.config import config
 from ncatbot.utils.logger import get_log
 from ncatbot.core.element import MessageChain
+from utils.onebot_ws_client import get_onebot_client
 
 _log = get_log()
 
@@ -19,72 +16,41 @@ class MessageSender:
     """统一消息发送器"""
     
     def __init__(self):
-        self._connection_pool = {}
         self._max_retries = 3
         self._retry_delay = 1.0
-    
-    @asynccontextmanager
-    async def _get_websocket_connection(self):
-        """获取WebSocket连接的上下文管理器"""
-        ws_uri = config.ws_uri
-        if not ws_uri:
-            raise ValueError("WebSocket URI 未配置，请检查 config.set_ws_uri()")
-        
-        connection = None
-        try:
-            connection = await websockets.connect(ws_uri)
-            yield connection
-        except Exception as e:
-            _log.error(f"WebSocket连接失败: {e}")
-            raise
-        finally:
-            if connection:
-                await connection.close()
+        # 合并转发需要上传节点内容，响应明显慢于普通消息
+        self._timeouts = {
+            "send_group_forward_msg": 30.0,
+            "send_private_forward_msg": 30.0,
+        }
+        self._default_timeout = 10.0
     
     async def _send_with_retry(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """带重试机制的消息发送"""
+        """
+        通过共享的持久连接发送请求，连接错误时重试
+        
+        Returns:
+            Optional[Dict[str, Any]]: 对应 echo 的响应，超时未收到响应时返回 None
+        """
+        client = get_onebot_client()
+        action = payload.get("action")
+        timeout = self._timeouts.get(action, self._default_timeout)
         last_exception = None
         
         for attempt in range(self._max_retries):
             try:
-                async with self._get_websocket_connection() as websocket:
-                    await websocket.send(json.dumps(payload))
-                    
-                    # 循环接收响应，跳过元事件（心跳、生命周期等）
-                    max_responses = 15  # 增加最大响应数
-                    timeout = 5.0 if payload.get("action") == "send_group_forward_msg" else 2.0  # 合并转发用更长超时
-
-                    for i in range(max_responses):
-                        try:
-                            # 合并转发消息需要更长的等待时间
-                            response = await asyncio.wait_for(websocket.recv(), timeout=timeout)
-                            result = json.loads(response)
-
-                            # 跳过所有元事件，包括心跳和生命周期事件
-                            if result.get("post_type") == "meta_event":
-                                _log.debug(f"跳过元事件: {result.get('meta_event_type', 'unknown')}")
-                                continue
-
-                            # 记录收到的响应
-                            _log.debug(f"收到响应 ({i+1}/{max_responses}): {result}")
-
-                            # 对于合并转发消息，响应可能不同，更宽松地处理
-                            if result.get("status") == "ok" or "retcode" in result:
-                                _log.debug(f"找到有效响应: {result}")
-                                return result
-                            else:
-                                # 继续等待更多响应
-                                continue
-
-                        except asyncio.TimeoutError:
-                            _log.debug(f"等待响应超时 ({i+1}/{max_responses})")
-                            continue
-
-                    # 如果收到太多无关响应，返回空结果
-                    _log.debug("接收响应超时或收到过多无关响应，停止等待")
-                    return None
-                        
+                result = await client.call_action(action, payload.get("params"), timeout=timeout)
+                _log.debug(f"收到响应: {result}")
+                return result
+            except asyncio.TimeoutError:
+                # 请求已经发出，重试可能导致重复发送，直接返回
+                _log.warning(f"等待 {action} 响应超时 ({timeout:.0f}s)")
+                return None
             except Exception as e:
+                if getattr(e, "sent", False):
+                    # 请求帧已经发出后连接才断开，对端可能已执行，重试会重复发送
+                    _log.warning(f"{action} 已发出但等待响应时连接断开，不再重试: {e}")
+                    return None
                 last_exception = e
                 if attempt < self._max_retries - 1:
                     _log.warning(f"发送消息失败 (尝试 {attempt + 1}/{self._max_retries}): {e}")
@@ -132,9 +98,8 @@ class MessageSender:
                     _log.info("合并转发成功（有响应）")
                     return True
             else:
-                # 对于合并转发，无响应也可能是成功的（消息已发送）
-                _log.info("合并转发无响应，但可能已成功发送，等待3秒后假设成功")
-                await asyncio.sleep(3)  # 等待3秒让消息有时间发送
+                # 超时未收到响应时请求已发出，消息大概率已送达
+                _log.info("合并转发未在超时时间内响应，按已发送处理")
                 return True
             
         except Exception as e:
@@ -207,13 +172,13 @@ class MessageSender:
 _message_sender = MessageSender()
 
 # 兼容旧版本的函数
-async def send_group_forward_msg_ws(group_id: int, content: List[Dict[str, Any]]) -> None:
+async def send_group_forward_msg_ws(group_id: int, content: List[Dict[str, Any]]) -> bool:
     """发送群组转发消息（兼容旧版本）"""
-    await _message_sender.send_group_forward_msg(group_id, content)
+    return await _message_sender.send_group_forward_msg(group_id, content)
 
-async def send_group_msg_cq(group_id: int, content: str) -> None:
+async def send_group_msg_cq(group_id: int, content: str) -> bool:
     """发送群组消息（兼容旧版本）"""
-    await _message_sender.send_group_msg(group_id, content)
+    return await _message_sender.send_group_msg(group_id, content)
 
 def cq_img(url: str) -> str:
     """
@@ -0,0 +1,291 @@
+"""
+处理器性能剖析模块 - 自动统计各插件事件处理器的耗时、等待时间和异常
+"""
+import asyncio
+import functools
+import inspect
+import random
+import time
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from ncatbot.utils.logger import get_log
+from utils.config_manager import get_config
+from utils.performance_monitor import LatencyHistogram
+
+_log = get_log()
+
+# config.yaml 中未配置 handler_profiler 段时使用的默认值
+DEFAULT_HANDLER_PROFILER_CONFIG: Dict[str, Any] = {
+    "enabled": True,
+    "sample_rate": 0.1,            # 精确计时的调用比例，其余调用只计次数和异常
+    "exclude": ["CommandRouter"],  # 只做分发的插件，耗时已计入各路由处理器
+}
+
+# 当前正在执行的处理器 (插件名, 处理器名)，处理器内创建的任务会继承该值
+_current_handler: ContextVar[Optional[Tuple[str, str]]] = ContextVar("current_handler", default=None)
+
+_PROFILED_ATTR = "__handler_profiled__"
+
+
+def current_handler() -> Optional[Tuple[str, str]]:
+    """获取当前上下文所属的 (插件名, 处理器名)，不在处理器中时为 None"""
+    return _current_handler.get()
+
+
+class HandlerStats:
+    """单个处理器的统计，时间单位为纳秒"""
+    __slots__ = ("plugin", "handler", "calls", "errors", "sampled",
+                 "wall_ns", "busy_ns", "max_ns", "histogram")
+
+    def __init__(self, plugin: str, handler: str):
+        self.plugin = plugin
+        self.handler = handler
+        self.calls = 0
+        self.errors = 0
+        self.sampled = 0
+        self.wall_ns = 0   # 采样调用的总耗时
+        self.busy_ns = 0   # 其中占用事件循环的时间，其余为 await 等待
+        self.max_ns = 0
+        self.histogram = LatencyHistogram()
+
+    def record(self, wall_ns: int, busy_ns: int) -> None:
+        self.sampled += 1
+        self.wall_ns += wall_ns
+        self.busy_ns += busy_ns
+        if wall_ns > self.max_ns:
+            self.max_ns = wall_ns
+        self.histogram.record(wall_ns / 1e9)
+
+    def get_stats(self) -> Dict[str, Any]:
+        sampled = self.sampled or 1
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "sampled": self.sampled,
+            "avg_wall": self.wall_ns / sampled / 1e9,
+            "avg_busy": self.busy_ns / sampled / 1e9,
+            "avg_awaited": (self.wall_ns - self.busy_ns) / sampled / 1e9,
+            "max_wall": self.max_ns / 1e9,
+            "p95": self.histogram.percentile(95),
+        }
+
+
+class _BusyTimer:
+    """逐步驱动协程，累计每一步在事件循环上执行的时间"""
+    __slots__ = ("_awaitable", "busy_ns")
+
+    def __init__(self, awaitable: Awaitable):
+        self._awaitable = awaitable
+        self.busy_ns = 0
+
+    def __await__(self):
+        iterator = self._awaitable.__await__()
+        send, throw = iterator.send, iterator.throw
+        clock = time.perf_counter_ns
+        value, error = None, None
+        while True:
+            start = clock()
+            try:
+                signal = send(value) if error is None else throw(error)
+            except StopIteration as stop:
+                self.busy_ns += clock() - start
+                return stop.value
+            except BaseException:
+                self.busy_ns += clock() - start
+                raise
+            self.busy_ns += clock() - start
+            value, error = None, None
+            try:
+                value = yield signal
+            except BaseException as e:
+                error = e
+
+
+async def _call_in_thread(func: Callable, *args, **kwargs) -> Any:
+    """在线程中调用同步处理器，返回值可等待时在事件循环上继续等待"""
+    result = await asyncio.to_thread(func, *args, **kwargs)
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+class HandlerProfiler:
+    """
+    插件处理器剖析器
+
+    - 在插件加载时自动包装事件总线上的群聊/私聊/通知处理器和命令路由处理器，插件无需改动
+    - 每次调用都统计次数和异常，并在 contextvar 中记录当前插件和处理器
+    - 按 sample_rate 抽样的调用用 perf_counter_ns 记录总耗时和占用事件循环的时间，
+      两者之差即 await 等待时间；未抽中的调用几乎没有额外开销
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self._config_override = config
+        self._config: Optional[Dict[str, Any]] = None
+        self._stats: Dict[Tuple[str, str], HandlerStats] = {}
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """读取 handler_profiler 配置（首次使用时从 config.yaml 加载）"""
+        if self._config is None:
+            user_config = self._config_override
+            if user_config is None:
+                user_config = get_config("handler_profiler", {}) or {}
+            self._config = {**DEFAULT_HANDLER_PROFILER_CONFIG, **user_config}
+        return self._config
+
+    def wrap(self, plugin: str, name: str, handler: Callable, sync_in_thread: bool = False) -> Callable:
+        """
+        包装处理器
+
+        默认与原函数同为同步或异步：3.x 事件总线对同步处理器（兼容注册的处理器返回协程）
+        使用 create_task 并发调度、对异步处理器逐个 await，包装后保持原来的调度方式。
+        sync_in_thread 为 True 时（4.x 事件总线本就在线程中运行同步处理器）同步处理器包装为
+        在线程中调用的异步函数，返回值可等待时再在事件循环上计时执行。
+        """
+        config = self.config
+        if (not config["enabled"] or getattr(handler, _PROFILED_ATTR, False)
+                or plugin in (config.get("exclude") or ())):
+            return handler
+        stats = self._stats.get((plugin, name))
+        if stats is None:
+            stats = self._stats[(plugin, name)] = HandlerStats(plugin, name)
+
+        if inspect.iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def wrapper(*args, **kwargs):
+                return await self._run(stats, handler(*args, **kwargs))
+        elif sync_in_thread:
+            @functools.wraps(handler)
+            async def wrapper(*args, **kwargs):
+                return await self._run(stats, _call_in_thread(handler, *args, **kwargs))
+        else:
+            @functools.wraps(handler)
+            def wrapper(*args, **kwargs):
+                result = handler(*args, **kwargs)
+                if inspect.isawaitable(result):
+                    return self._run(stats, result)
+                return result
+        setattr(wrapper, _PROFILED_ATTR, True)
+        return wrapper
+
+    def wrap_bound(self, handler: Callable, plugin: Any = None, sync_in_thread: bool = False) -> Callable:
+        """按处理器所属的插件实例命名并包装"""
+        owner = plugin or getattr(handler, "__self__", None)
+        plugin_name = getattr(owner, "name", None) or getattr(handler, "__module__", None) or "unknown"
+        return self.wrap(plugin_name, getattr(handler, "__name__", repr(handler)), handler, sync_in_thread)
+
+    async def _run(self, stats: HandlerStats, awaitable: Awaitable) -> Any:
+        stats.calls += 1
+        token = _current_handler.set((stats.plugin, stats.handler))
+        try:
+            rate = self.config["sample_rate"]
+            if rate < 1 and random.random() >= rate:
+                return await awaitable
+            timer = _BusyTimer(awaitable)
+            start = time.perf_counter_ns()
+            try:
+                return await timer
+            finally:
+                stats.record(time.perf_counter_ns() - start, timer.busy_ns)
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            _current_handler.reset(token)
+
+    def instrument_event_bus(self, event_bus: Any) -> None:
+        """
+        包装之后注册到事件总线上的处理器
+
+        只替换 subscribe，参数原样透传给事件总线，并按事件总线的版本选择同步处理器的包装方式；
+        在此之前已注册的处理器不计时，因此应在其它插件注册处理器之前调用（CoreServices 加载时）。
+        """
+        if getattr(event_bus, _PROFILED_ATTR, False):
+            return
+        subscribe = event_bus.subscribe
+        # 3.x 事件总线提供 publish_async；4.x 只有 publish，并在线程中运行同步处理器
+        sync_in_thread = not hasattr(event_bus, "publish_async")
+
+        @functools.wraps(subscribe)
+        def profiled_subscribe(event_type: str, handler: Callable, *args, **kwargs):
+            wrapped = self.wrap_bound(handler, kwargs.get("plugin"), sync_in_thread)
+            return subscribe(event_type, wrapped, *args, **kwargs)
+
+        event_bus.subscribe = profiled_subscribe
+        setattr(event_bus, _PROFILED_ATTR, True)
+        _log.info(f"处理器剖析已启用，采样率 {self.config['sample_rate']:.0%}")
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """按 "插件.处理器" 导出统计"""
+        return {f"{plugin}.{name}": s.get_stats() for (plugin, name), s in self._stats.items()}
+
+    def iter_stats(self) -> List[HandlerStats]:
+        """返回各处理器统计对象的快照（只读使用）"""
+        return list(self._stats.values())
+
+    def top_plugins(self, n: int = 10, key: str = "avg_wall") -> List[Dict[str, Any]]:
+        """
+        按插件汇总并排序
+
+        Args:
+            n: 返回的插件数量
+            key: 排序字段，avg_wall（平均耗时）/ avg_busy（平均占用事件循环时间）/ p95 / errors
+        """
+        plugins: Dict[str, Dict[str, Any]] = {}
+        for s in self._stats.values():
+            item = plugins.get(s.plugin)
+            if item is None:
+                item = plugins[s.plugin] = {
+                    "plugin": s.plugin, "calls": 0, "errors": 0, "sampled": 0,
+                    "wall_ns": 0, "busy_ns": 0, "max_ns": 0, "histogram": LatencyHistogram(),
+                }
+            item["calls"] += s.calls
+            item["errors"] += s.errors
+            item["sampled"] += s.sampled
+            item["wall_ns"] += s.wall_ns
+            item["busy_ns"] += s.busy_ns
+            item["max_ns"] = max(item["max_ns"], s.max_ns)
+            item["histogram"].merge(s.histogram)
+
+        result = []
+        for item in plugins.values():
+            sampled = item["sampled"] or 1
+            result.append({
+                "plugin": item["plugin"],
+                "calls": item["calls"],
+                "errors": item["errors"],
+                "sampled": item["sampled"],
+                "avg_wall": item["wall_ns"] / sampled / 1e9,
+                "avg_busy": item["busy_ns"] / sampled / 1e9,
+                "avg_awaited": (item["wall_ns"] - item["busy_ns"]) / sampled / 1e9,
+                "max_wall": item["max_ns"] / 1e9,
+                "p95": item["histogram"].percentile(95),
+            })
+        result.sort(key=lambda item: item[key], reverse=True)
+        return result[:n]
+
+    def format_top(self, n: int = 10, key: str = "avg_wall") -> str:
+        """生成最慢插件排行文本"""
+        top = self.top_plugins(n, key)
+        if not top:
+            return "暂无处理器统计数据"
+        lines = [f"最慢插件 Top {len(top)} (采样率 {self.config['sample_rate']:.0%})"]
+        for index, item in enumerate(top, 1):
+            lines.append(
+                f"{index}. {item['plugin']}: 平均 {item['avg_wall'] * 1000:.1f}ms "
+                f"(占用 {item['avg_busy'] * 1000:.1f}ms, 等待 {item['avg_awaited'] * 1000:.1f}ms) "
+                f"p95 {item['p95'] * 1000:.0f}ms 最大 {item['max_wall'] * 1000:.0f}ms "
+                f"调用 {item['calls']} 异常 {item['errors']}"
+            )
+        return "\n".join(lines)
+
+    def reset(self) -> None:
+        """清空统计（已包装的处理器保持不变）"""
+        for s in self._stats.values():
+            s.__init__(s.plugin, s.handler)
+
+
+# 全局处理器剖析器实例
+handler_profiler = HandlerProfiler()
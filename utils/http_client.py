@@ -0,0 +1,327 @@
+"""
+HTTP 客户端模块 - 全局共享的连接池、DNS 缓存和超时配置
+"""
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple, Union
+
+import aiohttp
+
+from ncatbot.utils.logger import get_log
+from utils.config_manager import get_config
+
+_log = get_log()
+
+TimeoutSpec = Union[None, str, int, float, aiohttp.ClientTimeout]
+
+# config.yaml 中未配置 http 段时使用的默认值
+DEFAULT_HTTP_CONFIG: Dict[str, Any] = {
+    "limit": 100,             # 每个连接池的最大连接数
+    "limit_per_host": 10,     # 每个主机的最大连接数
+    "dns_cache_ttl": 300,     # DNS 缓存时间（秒）
+    "keepalive_timeout": 30,  # 空闲长连接保持时间（秒）
+    "timeouts": {
+        "default": 300,       # 与 aiohttp 默认总超时一致
+        "api": 30,
+        "fast": 10,
+        "download": 120,
+    },
+}
+
+
+class _SessionView:
+    """
+    共享 aiohttp 会话的轻量视图
+
+    为每次请求注入调用方指定的默认超时和代理，其余属性直接转发给底层会话。
+    视图本身不拥有连接，退出上下文时不会关闭共享会话。
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, defaults: Dict[str, Any]):
+        self._session = session
+        self._defaults = defaults
+
+    def _merge(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        for key, value in self._defaults.items():
+            kwargs.setdefault(key, value)
+        return kwargs
+
+    def request(self, method: str, url: Any, **kwargs):
+        return self._session.request(method, url, **self._merge(kwargs))
+
+    def get(self, url: Any, **kwargs):
+        return self._session.get(url, **self._merge(kwargs))
+
+    def post(self, url: Any, **kwargs):
+        return self._session.post(url, **self._merge(kwargs))
+
+    def put(self, url: Any, **kwargs):
+        return self._session.put(url, **self._merge(kwargs))
+
+    def delete(self, url: Any, **kwargs):
+        return self._session.delete(url, **self._merge(kwargs))
+
+    def head(self, url: Any, **kwargs):
+        return self._session.head(url, **self._merge(kwargs))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._session, name)
+
+
+class _HttpxClientView:
+    """共享 httpx 客户端的轻量视图，为每次请求注入默认超时"""
+
+    def __init__(self, client: Any, timeout: Any):
+        self._client = client
+        self._timeout = timeout
+
+    def _merge(self, kwargs: Dict[str, Any]) -> Dict[str, Any]:
+        if self._timeout is not None:
+            kwargs.setdefault("timeout", self._timeout)
+        return kwargs
+
+    async def request(self, method: str, url: Any, **kwargs):
+        return await self._client.request(method, url, **self._merge(kwargs))
+
+    async def get(self, url: Any, **kwargs):
+        return await self._client.get(url, **self._merge(kwargs))
+
+    async def post(self, url: Any, **kwargs):
+        return await self._client.post(url, **self._merge(kwargs))
+
+    async def put(self, url: Any, **kwargs):
+        return await self._client.put(url, **self._merge(kwargs))
+
+    async def delete(self, url: Any, **kwargs):
+        return await self._client.delete(url, **self._merge(kwargs))
+
+    async def head(self, url: Any, **kwargs):
+        return await self._client.head(url, **self._merge(kwargs))
+
+    def stream(self, method: str, url: Any, **kwargs):
+        return self._client.stream(method, url, **self._merge(kwargs))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._client, name)
+
+
+class HTTPClientManager:
+    """
+    HTTP 客户端管理器
+
+    - 每个 (代理, SSL 校验) 组合对应一个长期存在的 aiohttp 会话，连接器按主机复用 keep-alive 连接
+    - 连接器启用带 TTL 的 DNS 缓存，避免每次请求重新解析
+    - 超时按配置中的命名档位（default / fast / download ...）取用
+    """
+
+    def __init__(self):
+        self._sessions: Dict[Tuple[Optional[str], bool], aiohttp.ClientSession] = {}
+        self._httpx_clients: Dict[Tuple[Optional[str], bool], Any] = {}
+        self._lock = asyncio.Lock()
+        self._config: Optional[Dict[str, Any]] = None
+        self._closed = False
+        self.stats: Dict[str, int] = {
+            "sessions_created": 0,
+            "httpx_clients_created": 0,
+            "session_requests": 0,
+        }
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """读取 http 配置（首次使用时从 config.yaml 加载）"""
+        if self._config is None:
+            user_config = get_config("http", {}) or {}
+            config = {**DEFAULT_HTTP_CONFIG, **user_config}
+            config["timeouts"] = {**DEFAULT_HTTP_CONFIG["timeouts"], **(user_config.get("timeouts") or {})}
+            self._config = config
+        return self._config
+
+    def reload_config(self) -> None:
+        """重新读取配置（仅影响之后创建的会话）"""
+        self._config = None
+
+    def timeout(self, spec: TimeoutSpec = "default") -> aiohttp.ClientTimeout:
+        """
+        将超时档位名称或秒数转换为 aiohttp.ClientTimeout
+
+        Args:
+            spec: 档位名称、总超时秒数或已构造的 ClientTimeout
+        """
+        if isinstance(spec, aiohttp.ClientTimeout):
+            return spec
+        if spec is None:
+            spec = "default"
+        if isinstance(spec, str):
+            timeouts = self.config["timeouts"]
+            spec = timeouts.get(spec, timeouts["default"])
+        return aiohttp.ClientTimeout(total=float(spec))
+
+    @staticmethod
+    def default_proxy() -> Optional[str]:
+        """读取 config.yaml 中配置的代理地址"""
+        proxy = get_config("proxy")
+        if isinstance(proxy, dict):
+            if not proxy.get("enabled", False):
+                return None
+            proxy = proxy.get("https") or proxy.get("http")
+        return proxy or None
+
+    async def get_session(self, proxy: Optional[str] = None, verify_ssl: bool = True) -> aiohttp.ClientSession:
+        """
+        获取共享的 aiohttp 会话
+
+        Args:
+            proxy: 代理地址，None 表示直连
+            verify_ssl: 是否校验证书
+
+        Returns:
+            aiohttp.ClientSession: 不要在调用方关闭该会话
+        """
+        if self._closed:
+            raise RuntimeError("HTTP 客户端管理器已关闭")
+        key = (proxy or None, verify_ssl)
+        session = self._sessions.get(key)
+        if session is not None and not session.closed:
+            return session
+
+        async with self._lock:
+            session = self._sessions.get(key)
+            if session is None or session.closed:
+                config = self.config
+                connector = aiohttp.TCPConnector(
+                    limit=config["limit"],
+                    limit_per_host=config["limit_per_host"],
+                    ttl_dns_cache=config["dns_cache_ttl"],
+                    use_dns_cache=True,
+                    keepalive_timeout=config["keepalive_timeout"],
+                    ssl=verify_ssl,
+                )
+                session = aiohttp.ClientSession(
+                    connector=connector,
+                    timeout=self.timeout("default"),
+                    proxy=proxy or None,
+                )
+                self._sessions[key] = session
+                self.stats["sessions_created"] += 1
+                _log.debug(f"创建共享HTTP会话: proxy={proxy}, verify_ssl={verify_ssl}")
+        return session
+
+    async def get_httpx_client(self, proxy: Optional[str] = None, verify: bool = True) -> Any:
+        """
+        获取共享的 httpx.AsyncClient（用于依赖 httpx 特性的插件）
+
+        Args:
+            proxy: 代理地址，None 表示直连
+            verify: 是否校验证书
+        """
+        import httpx
+
+        if self._closed:
+            raise RuntimeError("HTTP 客户端管理器已关闭")
+        key = (proxy or None, verify)
+        client = self._httpx_clients.get(key)
+        if client is not None and not client.is_closed:
+            return client
+
+        async with self._lock:
+            client = self._httpx_clients.get(key)
+            if client is None or client.is_closed:
+                config = self.config
+                client = httpx.AsyncClient(
+                    proxy=proxy or None,
+                    verify=verify,
+                    timeout=float(config["timeouts"]["default"]),
+                    limits=httpx.Limits(
+                        max_connections=config["limit"],
+                        max_keepalive_connections=config["limit_per_host"],
+                        keepalive_expiry=config["keepalive_timeout"],
+                    ),
+                    follow_redirects=True,
+                )
+                self._httpx_clients[key] = client
+                self.stats["httpx_clients_created"] += 1
+        return client
+
+    @asynccontextmanager
+    async def session(
+        self,
+        timeout: TimeoutSpec = None,
+        proxy: Optional[str] = None,
+        verify_ssl: bool = True,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> AsyncIterator[_SessionView]:
+        """
+        以上下文管理器形式借用共享会话，可直接替换 `async with aiohttp.ClientSession(...)`
+
+        Args:
+            timeout: 本次借用期间请求的默认超时（档位名称、秒数或 ClientTimeout）
+            proxy: 代理地址
+            verify_ssl: 是否校验证书
+            headers: 本次借用期间请求的默认请求头
+        """
+        session = await self.get_session(proxy, verify_ssl)
+        defaults: Dict[str, Any] = {}
+        if timeout is not None:
+            defaults["timeout"] = self.timeout(timeout)
+        if headers:
+            defaults["headers"] = headers
+        self.stats["session_requests"] += 1
+        yield _SessionView(session, defaults)
+
+    @asynccontextmanager
+    async def httpx_client(
+        self,
+        timeout: Any = None,
+        proxy: Optional[str] = None,
+        verify: bool = True,
+    ) -> AsyncIterator[_HttpxClientView]:
+        """以上下文管理器形式借用共享 httpx 客户端，可直接替换 `async with httpx.AsyncClient(...)`"""
+        if isinstance(timeout, str):
+            timeout = float(self.config["timeouts"].get(timeout, self.config["timeouts"]["default"]))
+        client = await self.get_httpx_client(proxy, verify)
+        yield _HttpxClientView(client, timeout)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取连接池统计信息"""
+        stats: Dict[str, Any] = dict(self.stats)
+        stats["sessions"] = sum(1 for s in self._sessions.values() if not s.closed)
+        stats["httpx_clients"] = sum(1 for c in self._httpx_clients.values() if not c.is_closed)
+        return stats
+
+    async def start(self) -> None:
+        """随机器人启动：读取配置并允许创建会话"""
+        self._closed = False
+        self.reload_config()
+        _log.info("HTTP 客户端管理器已启动")
+
+    async def close(self) -> None:
+        """关闭所有共享会话"""
+        self._closed = True
+        for session in self._sessions.values():
+            if not session.closed:
+                await session.close()
+        for client in self._httpx_clients.values():
+            if not client.is_closed:
+                await client.aclose()
+        self._sessions.clear()
+        self._httpx_clients.clear()
+        _log.info("HTTP 客户端管理器已关闭")
+
+
+# 全局 HTTP 客户端管理器实例
+http_manager = HTTPClientManager()
+
+
+def http_session(
+    timeout: TimeoutSpec = None,
+    proxy: Optional[str] = None,
+    verify_ssl: bool = True,
+    headers: Optional[Dict[str, str]] = None,
+):
+    """借用全局共享的 aiohttp 会话（见 HTTPClientManager.session）"""
+    return http_manager.session(timeout=timeout, proxy=proxy, verify_ssl=verify_ssl, headers=headers)
+
+
+def httpx_client(timeout: Any = None, proxy: Optional[str] = None, verify: bool = True):
+    """借用全局共享的 httpx 客户端（见 HTTPClientManager.httpx_client）"""
+    return http_manager.httpx_client(timeout=timeout, proxy=proxy, verify=verify)
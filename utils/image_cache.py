@@ -0,0 +1,478 @@
+"""
+图片缓存模块 - 按 URL 和内容哈希缓存远程图片（内存 + 磁盘）
+"""
+import asyncio
+import hashlib
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from ncatbot.utils.logger import get_log
+from utils.config_manager import get_config
+from utils.database_pool import get_database
+from utils.http_client import TimeoutSpec, http_session
+
+_log = get_log()
+
+# config.yaml 中未配置 image_cache 段时使用的默认值
+DEFAULT_IMAGE_CACHE_CONFIG: Dict[str, Any] = {
+    "cache_dir": "data/image_cache",
+    "memory_budget_mb": 64,       # 内存中原始字节的上限
+    "disk_budget_mb": 512,        # 磁盘缓存的上限
+    "decoded_entries": 128,       # 解码后 PIL 图片的缓存数量，0 表示不缓存
+    "max_age": 86400,             # 默认新鲜期（秒），过期后按 ETag/Last-Modified 重新验证
+}
+
+
+@dataclass
+class _Entry:
+    """URL 对应的缓存元数据，图片内容按 sha256 存放，相同内容的不同 URL 共用一份"""
+    url: str
+    sha256: str
+    size: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    content_type: Optional[str] = None
+    fetched_at: float = 0.0
+
+
+class ImageCache:
+    """
+    远程图片缓存
+
+    - 内存层: sha256 -> 原始字节的 LRU，按字节数限制
+    - 磁盘层: 以 sha256 命名的文件，索引存放在 SQLite 中，超出预算时按最近使用淘汰
+    - 过期条目带 If-None-Match / If-Modified-Since 重新验证，304 时直接复用本地内容
+    - 同一 URL 的并发请求只发起一次下载
+    - 可选缓存解码后的 PIL 图片，返回副本供调用方修改
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self._config_override = config
+        self._config: Optional[Dict[str, Any]] = None
+        self._entries: Dict[str, _Entry] = {}
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk: "OrderedDict[str, int]" = OrderedDict()
+        self._disk_bytes = 0
+        self._decoded: "OrderedDict[str, Any]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self.stats: Dict[str, int] = {
+            "requests": 0,
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "revalidated": 0,
+            "not_modified": 0,
+            "stale_served": 0,
+            "coalesced": 0,
+            "decoded_hits": 0,
+            "bytes_downloaded": 0,
+            "uncached_downloads": 0,
+            "evictions": 0,
+            "errors": 0,
+        }
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """读取 image_cache 配置（首次使用时从 config.yaml 加载）"""
+        if self._config is None:
+            user_config = self._config_override
+            if user_config is None:
+                user_config = get_config("image_cache", {}) or {}
+            self._config = {**DEFAULT_IMAGE_CACHE_CONFIG, **user_config}
+        return self._config
+
+    @property
+    def cache_dir(self) -> Path:
+        return Path(self.config["cache_dir"])
+
+    def _blob_path(self, sha256: str) -> Path:
+        return self.cache_dir / sha256[:2] / sha256
+
+    @property
+    def _db(self):
+        return get_database(self.cache_dir / "index.db")
+
+    async def _ensure_loaded(self) -> None:
+        """首次使用时建表并把磁盘索引读入内存"""
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            await self._db.executescript("""
+                CREATE TABLE IF NOT EXISTS image_cache (
+                    url TEXT PRIMARY KEY,
+                    sha256 TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    content_type TEXT,
+                    fetched_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_image_cache_sha256 ON image_cache(sha256);
+            """)
+            rows = await self._db.fetchall(
+                "SELECT url, sha256, size, etag, last_modified, content_type, fetched_at "
+                "FROM image_cache ORDER BY fetched_at"
+            )
+            for row in rows:
+                entry = _Entry(*row)
+                self._entries[entry.url] = entry
+                if entry.sha256 not in self._disk:
+                    self._disk[entry.sha256] = entry.size
+                    self._disk_bytes += entry.size
+                self._disk.move_to_end(entry.sha256)
+            self._loaded = True
+            _log.info(f"图片缓存索引已加载: {len(self._entries)} 个URL, {self._disk_bytes / 1024 / 1024:.1f}MB")
+
+    async def get(
+        self,
+        url: str,
+        max_age: Optional[float] = None,
+        headers: Optional[Dict[str, str]] = None,
+        proxy: Optional[str] = None,
+        verify_ssl: bool = True,
+        timeout: TimeoutSpec = "download",
+        min_size: int = 0,
+    ) -> Optional[bytes]:
+        """
+        获取图片的原始字节
+
+        Args:
+            url: 图片地址
+            max_age: 新鲜期（秒），超过后重新验证；None 使用配置中的默认值
+            headers: 额外的请求头
+            proxy: 代理地址
+            verify_ssl: 是否校验证书
+            timeout: 下载超时（档位名称或秒数）
+            min_size: 小于该字节数的响应视为无效，不缓存
+
+        Returns:
+            Optional[bytes]: 图片内容，下载失败且没有本地副本时返回 None
+        """
+        entry = await self.get_entry(url, max_age, headers, proxy, verify_ssl, timeout, min_size)
+        if entry is None:
+            return None
+        return await self._read_blob(entry.sha256)
+
+    async def get_entry(
+        self,
+        url: str,
+        max_age: Optional[float] = None,
+        headers: Optional[Dict[str, str]] = None,
+        proxy: Optional[str] = None,
+        verify_ssl: bool = True,
+        timeout: TimeoutSpec = "download",
+        min_size: int = 0,
+    ) -> Optional[_Entry]:
+        """获取（必要时下载或重新验证）URL 对应的缓存条目，参数同 get"""
+        await self._ensure_loaded()
+        self.stats["requests"] += 1
+        if max_age is None:
+            max_age = self.config["max_age"]
+
+        entry = self._entries.get(url)
+        if entry is not None and time.time() - entry.fetched_at < max_age and self._has_blob(entry.sha256):
+            return entry
+
+        pending = self._inflight.get(url)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[url] = future
+        try:
+            result = await self._fetch(url, entry, headers, proxy, verify_ssl, timeout, min_size)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            self._inflight.pop(url, None)
+            if future.done() and not future.cancelled():
+                future.exception()
+
+    async def download(
+        self,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        proxy: Optional[str] = None,
+        verify_ssl: bool = True,
+        timeout: TimeoutSpec = "download",
+        min_size: int = 0,
+    ) -> Optional[bytes]:
+        """
+        下载图片但不读写缓存，参数同 get
+
+        用于每次请求内容都不同的随机图接口，以及只使用一次的图片（例如聊天中的图片 URL），
+        这类内容写入缓存既不会命中，也会挤占其他图片的磁盘预算。
+        """
+        try:
+            async with http_session(timeout=timeout, proxy=proxy, verify_ssl=verify_ssl) as session:
+                async with session.get(url, headers=headers) as response:
+                    if response.status != 200:
+                        raise ValueError(f"HTTP {response.status}")
+                    data = await response.read()
+        except Exception as e:
+            self.stats["errors"] += 1
+            _log.warning(f"图片下载失败: {url}, 错误: {e}")
+            return None
+
+        self.stats["uncached_downloads"] += 1
+        self.stats["bytes_downloaded"] += len(data)
+        if len(data) < min_size:
+            _log.warning(f"图片内容过小({len(data)} bytes): {url}")
+            return None
+        return data
+
+    def _has_blob(self, sha256: str) -> bool:
+        return sha256 in self._memory or sha256 in self._disk
+
+    async def _fetch(
+        self,
+        url: str,
+        entry: Optional[_Entry],
+        headers: Optional[Dict[str, str]],
+        proxy: Optional[str],
+        verify_ssl: bool,
+        timeout: TimeoutSpec,
+        min_size: int,
+    ) -> Optional[_Entry]:
+        """下载或重新验证图片，失败时退回到本地旧副本"""
+        if entry is not None and not self._has_blob(entry.sha256):
+            entry = None
+        request_headers = dict(headers or {})
+        if entry is not None:
+            self.stats["revalidated"] += 1
+            if entry.etag:
+                request_headers["If-None-Match"] = entry.etag
+            if entry.last_modified:
+                request_headers["If-Modified-Since"] = entry.last_modified
+        else:
+            self.stats["misses"] += 1
+
+        try:
+            async with http_session(timeout=timeout, proxy=proxy, verify_ssl=verify_ssl) as session:
+                async with session.get(url, headers=request_headers) as response:
+                    if response.status == 304 and entry is not None:
+                        self.stats["not_modified"] += 1
+                        entry.fetched_at = time.time()
+                        await self._db.execute(
+                            "UPDATE image_cache SET fetched_at = ? WHERE url = ?", (entry.fetched_at, url)
+                        )
+                        return entry
+                    if response.status != 200:
+                        raise ValueError(f"HTTP {response.status}")
+                    data = await response.read()
+                    etag = response.headers.get("ETag")
+                    last_modified = response.headers.get("Last-Modified")
+                    content_type = response.headers.get("Content-Type")
+        except Exception as e:
+            self.stats["errors"] += 1
+            if entry is not None:
+                self.stats["stale_served"] += 1
+                _log.debug(f"图片重新验证失败，使用本地副本: {url}, 错误: {e}")
+                return entry
+            _log.warning(f"图片下载失败: {url}, 错误: {e}")
+            return None
+
+        if len(data) < min_size:
+            _log.warning(f"图片内容过小({len(data)} bytes)，不缓存: {url}")
+            return entry
+
+        self.stats["bytes_downloaded"] += len(data)
+        return await self._store(url, data, etag, last_modified, content_type)
+
+    async def _store(
+        self,
+        url: str,
+        data: bytes,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        content_type: Optional[str],
+    ) -> _Entry:
+        """写入内存和磁盘，并更新索引"""
+        sha256 = hashlib.sha256(data).hexdigest()
+        entry = _Entry(url, sha256, len(data), etag, last_modified, content_type, time.time())
+
+        self._remember(sha256, data)
+        if sha256 in self._disk:
+            self._disk.move_to_end(sha256)
+        else:
+            try:
+                await asyncio.to_thread(self._write_blob_sync, self._blob_path(sha256), data)
+                self._disk[sha256] = len(data)
+                self._disk_bytes += len(data)
+            except OSError as e:
+                _log.error(f"写入图片缓存文件失败: {e}")
+
+        self._entries[url] = entry
+        await self._db.execute(
+            "INSERT OR REPLACE INTO image_cache "
+            "(url, sha256, size, etag, last_modified, content_type, fetched_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (url, sha256, entry.size, etag, last_modified, content_type, entry.fetched_at),
+        )
+        await self._evict_disk()
+        return entry
+
+    @staticmethod
+    def _write_blob_sync(path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _remember(self, sha256: str, data: bytes) -> None:
+        """放入内存 LRU，超出字节预算时淘汰最久未用的内容"""
+        if sha256 in self._memory:
+            self._memory.move_to_end(sha256)
+            return
+        budget = self.config["memory_budget_mb"] * 1024 * 1024
+        if len(data) > budget:
+            return
+        self._memory[sha256] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > budget:
+            _, old = self._memory.popitem(last=False)
+            self._memory_bytes -= len(old)
+
+    async def _read_blob(self, sha256: str) -> Optional[bytes]:
+        """按内容哈希读取图片，内存未命中时读取磁盘文件"""
+        data = self._memory.get(sha256)
+        if data is not None:
+            self.stats["memory_hits"] += 1
+            self._memory.move_to_end(sha256)
+            if sha256 in self._disk:
+                self._disk.move_to_end(sha256)
+            return data
+
+        try:
+            data = await asyncio.to_thread(self._blob_path(sha256).read_bytes)
+        except OSError as e:
+            _log.warning(f"读取图片缓存文件失败: {e}")
+            await self._forget_blob(sha256)
+            return None
+        self.stats["disk_hits"] += 1
+        if sha256 in self._disk:
+            self._disk.move_to_end(sha256)
+        self._remember(sha256, data)
+        return data
+
+    async def _evict_disk(self) -> None:
+        """磁盘缓存超出预算时按最近使用顺序淘汰"""
+        budget = self.config["disk_budget_mb"] * 1024 * 1024
+        while self._disk_bytes > budget and len(self._disk) > 1:
+            sha256 = next(iter(self._disk))
+            await self._forget_blob(sha256)
+            self.stats["evictions"] += 1
+
+    async def _forget_blob(self, sha256: str) -> None:
+        """删除某个内容及引用它的所有 URL 条目"""
+        size = self._disk.pop(sha256, None)
+        if size is not None:
+            self._disk_bytes -= size
+        data = self._memory.pop(sha256, None)
+        if data is not None:
+            self._memory_bytes -= len(data)
+        self._decoded.pop(sha256, None)
+        for url in [u for u, e in self._entries.items() if e.sha256 == sha256]:
+            del self._entries[url]
+        try:
+            self._blob_path(sha256).unlink(missing_ok=True)
+        except OSError as e:
+            _log.debug(f"删除图片缓存文件失败: {e}")
+        await self._db.execute("DELETE FROM image_cache WHERE sha256 = ?", (sha256,))
+
+    async def get_image(self, url: str, decoded_cache: bool = True, **kwargs) -> Optional[Any]:
+        """
+        获取解码后的 PIL 图片
+
+        Args:
+            url: 图片地址
+            decoded_cache: 是否复用解码结果（返回的是副本，可以直接修改）
+            **kwargs: 传给 get 的其余参数
+
+        Returns:
+            Optional[Image.Image]: 图片对象，下载或解码失败时返回 None
+        """
+        from PIL import Image
+
+        entry = await self.get_entry(url, **kwargs)
+        if entry is None:
+            return None
+
+        limit = self.config["decoded_entries"]
+        if decoded_cache and limit > 0:
+            image = self._decoded.get(entry.sha256)
+            if image is not None:
+                self.stats["decoded_hits"] += 1
+                self._decoded.move_to_end(entry.sha256)
+                return image.copy()
+
+        data = await self._read_blob(entry.sha256)
+        if data is None:
+            return None
+        try:
+            image = Image.open(BytesIO(data))
+            image.load()
+        except Exception as e:
+            self.stats["errors"] += 1
+            _log.warning(f"图片解码失败: {url}, 错误: {e}")
+            return None
+
+        if decoded_cache and limit > 0:
+            self._decoded[entry.sha256] = image
+            while len(self._decoded) > limit:
+                self._decoded.popitem(last=False)
+            return image.copy()
+        return image
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        stats: Dict[str, Any] = dict(self.stats)
+        lookups = stats["memory_hits"] + stats["disk_hits"]
+        stats.update({
+            "urls": len(self._entries),
+            "memory_items": len(self._memory),
+            "memory_mb": self._memory_bytes / 1024 / 1024,
+            "disk_items": len(self._disk),
+            "disk_mb": self._disk_bytes / 1024 / 1024,
+            "decoded_items": len(self._decoded),
+            "hit_rate": 1 - stats["misses"] / stats["requests"] if stats["requests"] else 0.0,
+            "memory_hit_rate": stats["memory_hits"] / lookups if lookups else 0.0,
+        })
+        return stats
+
+    def clear_memory(self) -> None:
+        """清空内存层（磁盘缓存保留）"""
+        self._memory.clear()
+        self._memory_bytes = 0
+        self._decoded.clear()
+
+
+# 全局图片缓存实例
+image_cache = ImageCache()
+
+
+async def get_cached_image_bytes(url: str, **kwargs) -> Optional[bytes]:
+    """获取图片原始字节（见 ImageCache.get）"""
+    return await image_cache.get(url, **kwargs)
+
+
+async def get_cached_image(url: str, **kwargs) -> Optional[Any]:
+    """获取解码后的 PIL 图片副本（见 ImageCache.get_image）"""
+    return await image_cache.get_image(url, **kwargs)
@@ -0,0 +1,390 @@
+"""
+LLM 网关模块 - 全局共享的 API 密钥池、健康评分、并发限制、熔断与对冲请求
+"""
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Set
+
+from ncatbot.utils.logger import get_log
+from utils.config_manager import get_config
+from utils.llm_stream import (
+    LLMAttemptError,
+    LLMStreamError,
+    StreamResult,
+    TextCallback,
+    continuation_request,
+    get_stream_config,
+    open_stream,
+)
+
+_log = get_log()
+
+# config.yaml 中未配置 llm_gateway 段时使用的默认值
+DEFAULT_LLM_GATEWAY_CONFIG: Dict[str, Any] = {
+    "url": "https://gemn.ariaxz.tk/v1/chat/completions",
+    "max_concurrency_per_key": 4,  # 每个密钥同时进行的请求数
+    "ewma_alpha": 0.3,             # 延迟、错误率滑动平均的权重
+    "auth_cooldown": 600,          # 401/403 后熔断时长（秒）
+    "rate_limit_cooldown": 60,     # 429 且未返回 Retry-After 时的熔断时长（秒）
+    "failure_threshold": 3,        # 连续失败多少次后熔断
+    "failure_cooldown": 30,        # 连续失败熔断时长（秒）
+    "max_cooldown": 1800,          # 反复熔断时退避的上限（秒）
+    "hedge_after": 0,              # 超过该秒数仍未收到首 token 时向另一个密钥发对冲请求，0 表示关闭
+    "max_attempts": 0,             # 单次调用最多尝试次数（含对冲），0 表示密钥数量
+}
+
+# 还没有延迟样本的密钥按该值（秒）参与评分，保证新密钥能被尝试到
+DEFAULT_LATENCY = 1.0
+
+
+def parse_api_keys(value: Any) -> List[str]:
+    """解析 gemini_apikey 配置，支持单个字符串或列表（忽略空值和 # 开头的注释）"""
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [
+        key.strip() for key in value
+        if isinstance(key, str) and key.strip() and not key.strip().startswith("#")
+    ]
+
+
+@dataclass
+class KeyState:
+    index: int
+    key: str
+    semaphore: asyncio.Semaphore
+    latency_ewma: Optional[float] = None  # 首 token 延迟
+    error_ewma: float = 0.0
+    in_flight: int = 0
+    requests: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    open_until: float = 0.0   # 熔断截止时间（monotonic），0 表示闭合
+    open_count: int = 0       # 连续熔断次数，用于退避
+    probing: bool = False     # 半开状态下已有探测请求在进行
+    last_error: str = ""
+
+    @property
+    def label(self) -> str:
+        return f"#{self.index}"
+
+    def state(self, now: float) -> str:
+        if not self.open_until:
+            return "closed"
+        return "open" if now < self.open_until else "half_open"
+
+    def usable(self, now: float) -> bool:
+        state = self.state(now)
+        return state == "closed" or (state == "half_open" and not self.probing)
+
+    def score(self, max_concurrency: int) -> float:
+        """越小越健康：延迟 × 负载 × 错误率"""
+        latency = self.latency_ewma if self.latency_ewma is not None else DEFAULT_LATENCY
+        return latency * (1 + self.in_flight / max(1, max_concurrency)) * (1 + 4 * self.error_ewma)
+
+
+class _LostRace(Exception):
+    """对冲请求中另一路已先收到首 token"""
+
+
+class _Race:
+    """同一次调用的多路请求中，只有最先收到首 token 的一路向调用方输出"""
+
+    def __init__(self, on_text: Optional[TextCallback], start: float):
+        self.on_text = on_text
+        self.start = start
+        self.text = ""
+        self.winner: Optional[KeyState] = None
+        self.ttft: Optional[float] = None
+        self.first_token: Dict[int, float] = {}
+        self.stopped = False
+
+    def sink(self, state: KeyState, attempt_start: float) -> TextCallback:
+        async def deliver(delta: str) -> bool:
+            if self.winner is None:
+                self.winner = state
+                self.first_token[state.index] = time.perf_counter() - attempt_start
+                if self.ttft is None:
+                    self.ttft = time.perf_counter() - self.start
+            elif self.winner is not state:
+                raise _LostRace()
+            self.text += delta
+            if self.on_text is not None and await self.on_text(delta):
+                self.stopped = True
+                return True
+            return False
+        return deliver
+
+
+class LLMGateway:
+    """
+    LLM 调用网关
+
+    - 密钥统一从 gemini_apikey 读取，所有插件共用一份健康状态
+    - 每个密钥一个信号量限制并发，按首 token 延迟、错误率的滑动平均和当前负载选择最健康的密钥
+    - 401/403/429 立即熔断该密钥，连续失败达到阈值也会熔断；冷却结束后先放行一个探测请求（半开）
+    - 可选对冲：超过 hedge_after 秒仍未收到首 token 时向另一个密钥再发一份，先到者胜出
+    - 每个密钥的请求记录到性能监控（llm_key:#序号），也可通过 get_stats 查看
+    """
+
+    def __init__(self):
+        self._config: Optional[Dict[str, Any]] = None
+        self._keys: Optional[List[KeyState]] = None
+        self.proxy: Optional[str] = None
+        self.stats = {"calls": 0, "failed_calls": 0, "hedges": 0, "hedge_wins": 0, "failovers": 0}
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """读取 llm_gateway 配置（首次使用时从 config.yaml 加载）"""
+        if self._config is None:
+            user_config = get_config("llm_gateway", {}) or {}
+            self._config = {**DEFAULT_LLM_GATEWAY_CONFIG, **user_config}
+        return self._config
+
+    @property
+    def keys(self) -> List[KeyState]:
+        if self._keys is None:
+            limit = int(self.config["max_concurrency_per_key"])
+            self._keys = [
+                KeyState(index, key, asyncio.Semaphore(limit))
+                for index, key in enumerate(parse_api_keys(get_config("gemini_apikey", "")))
+            ]
+            self.proxy = get_config("proxy", None) or None
+            _log.info(f"LLM 网关已加载 {len(self._keys)} 个 API 密钥")
+        return self._keys
+
+    def reload_config(self) -> None:
+        """重新读取配置和密钥（健康状态随之重置）"""
+        self._config = None
+        self._keys = None
+
+    def has_keys(self) -> bool:
+        return bool(self.keys)
+
+    def _pick(self, exclude: Set[int]) -> Optional[KeyState]:
+        now = time.monotonic()
+        limit = int(self.config["max_concurrency_per_key"])
+        candidates = [s for s in self.keys if s.index not in exclude and s.usable(now)]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda s: (s.score(limit), s.index))
+
+    def _on_success(self, state: KeyState, latency: float) -> None:
+        alpha = float(self.config["ewma_alpha"])
+        state.latency_ewma = latency if state.latency_ewma is None else (
+            alpha * latency + (1 - alpha) * state.latency_ewma
+        )
+        state.error_ewma *= 1 - alpha
+        state.consecutive_failures = 0
+        if state.open_until:
+            _log.info(f"API 密钥 {state.label} 探测成功，恢复使用")
+        state.open_until = 0.0
+        state.open_count = 0
+
+    def _on_failure(self, state: KeyState, error: LLMAttemptError) -> None:
+        config = self.config
+        alpha = float(config["ewma_alpha"])
+        state.error_ewma = alpha + (1 - alpha) * state.error_ewma
+        state.failures += 1
+        state.consecutive_failures += 1
+        state.last_error = str(error)[:200]
+
+        if error.status in (401, 403):
+            cooldown = float(config["auth_cooldown"])
+        elif error.status == 429:
+            cooldown = error.retry_after or float(config["rate_limit_cooldown"])
+        elif state.consecutive_failures >= int(config["failure_threshold"]) or state.open_until:
+            cooldown = float(config["failure_cooldown"])
+        else:
+            return
+        cooldown = min(cooldown * (2 ** state.open_count), float(config["max_cooldown"]))
+        state.open_until = time.monotonic() + cooldown
+        state.open_count += 1
+        _log.warning(f"API 密钥 {state.label} 熔断 {cooldown:.0f}s: {state.last_error}")
+
+    async def _attempt(self, state: KeyState, request: Dict[str, Any], race: _Race,
+                       stream_config: Dict[str, Any], is_probe: bool = False) -> None:
+        try:
+            async with state.semaphore:
+                state.in_flight += 1
+                state.requests += 1
+                start = time.perf_counter()
+                had_error = False
+                try:
+                    await open_stream(
+                        self.config["url"], request, state.key, self.proxy,
+                        race.sink(state, start), stream_config,
+                    )
+                except LLMAttemptError as e:
+                    had_error = True
+                    self._on_failure(state, e)
+                    raise
+                else:
+                    self._on_success(state, race.first_token.get(state.index, time.perf_counter() - start))
+                finally:
+                    state.in_flight -= 1
+                    _record(f"llm_key:{state.label}", time.perf_counter() - start, had_error)
+        finally:
+            # 只由设置了探测标记的这次请求清除，其它仍在进行的旧请求结束时不影响新的探测
+            if is_probe:
+                state.probing = False
+
+    async def stream_chat(self, payload: Dict[str, Any], on_text: Optional[TextCallback] = None,
+                          name: str = "llm") -> StreamResult:
+        """
+        流式调用 chat/completions
+
+        Args:
+            payload: 请求体（不含 stream 字段）
+            on_text: 文本增量回调，返回 True 时提前停止
+            name: 统计名称
+
+        Returns:
+            StreamResult
+
+        Raises:
+            LLMStreamError: 没有可用密钥、所有尝试都失败或遇到不可重试的错误
+        """
+        if not self.keys:
+            raise LLMStreamError("未配置 API 密钥")
+        self.stats["calls"] += 1
+        stream_config = get_stream_config()
+        start = time.perf_counter()
+        race = _Race(on_text, start)
+        max_attempts = int(self.config["max_attempts"]) or len(self.keys)
+        hedge_after = float(self.config["hedge_after"])
+        tried: Set[int] = set()
+        failovers: List[str] = []
+        last_error: Optional[LLMAttemptError] = None
+        attempts = 0
+        hedged = False
+
+        while attempts < max_attempts:
+            state = self._pick(tried)
+            if state is None:
+                break
+            request = continuation_request(payload, race.text)
+            race.winner = None
+            tasks: Dict[asyncio.Task, KeyState] = {}
+
+            def launch(key_state: KeyState) -> None:
+                tried.add(key_state.index)
+                is_probe = bool(key_state.open_until)
+                if is_probe:
+                    key_state.probing = True  # 半开状态只放行这一个探测请求
+                tasks[asyncio.create_task(
+                    self._attempt(key_state, request, race, stream_config, is_probe))] = key_state
+
+            launch(state)
+            attempts += 1
+            try:
+                while tasks:
+                    can_hedge = (hedge_after > 0 and not hedged and not race.text
+                                 and len(tasks) == 1 and attempts < max_attempts)
+                    done, _ = await asyncio.wait(
+                        tasks, timeout=hedge_after if can_hedge else None,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    if not done:
+                        hedged = True
+                        backup = self._pick(tried) if race.winner is None else None
+                        if backup is not None:
+                            self.stats["hedges"] += 1
+                            _log.info(f"{name} {hedge_after:.1f}s 未收到首 token，向密钥 {backup.label} 发送对冲请求")
+                            launch(backup)
+                            attempts += 1
+                        continue
+                    for task in done:
+                        key_state = tasks.pop(task)
+                        error = task.exception()
+                        if error is None:
+                            if key_state is not state:
+                                self.stats["hedge_wins"] += 1
+                            total = time.perf_counter() - start
+                            if race.ttft is not None:
+                                _record(f"llm_ttft:{name}", race.ttft)
+                            _record(f"llm_total:{name}", total)
+                            return StreamResult(
+                                race.text, key_state.index, attempts, race.ttft, total, race.stopped, failovers
+                            )
+                        if isinstance(error, _LostRace):
+                            continue
+                        if not isinstance(error, LLMAttemptError):
+                            raise error  # 回调出错
+                        last_error = error
+                        stage = "流中断" if race.winner is key_state else "请求失败"
+                        failovers.append(f"{key_state.label} {stage}: {error}")
+                        self.stats["failovers"] += 1
+                        _log.warning(f"{name} 使用密钥 {key_state.label} {stage}: {error}")
+                        if not error.retryable:
+                            raise LLMStreamError(str(error), error.status, race.text)
+                        if race.winner is key_state:
+                            # 已输出部分内容的一路中断，其余路已落选，换密钥从截断处继续
+                            for other in tasks:
+                                other.cancel()
+                            tasks.clear()
+                            break
+            except LLMStreamError:
+                self.stats["failed_calls"] += 1
+                _record(f"llm_total:{name}", time.perf_counter() - start, True)
+                raise
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        self.stats["failed_calls"] += 1
+        _record(f"llm_total:{name}", time.perf_counter() - start, True)
+        if last_error is None:
+            raise LLMStreamError("所有 API 密钥都处于熔断状态", 429, race.text)
+        raise LLMStreamError(str(last_error), last_error.status, race.text)
+
+    async def complete(self, payload: Dict[str, Any], name: str = "llm") -> str:
+        """调用 chat/completions 并返回完整回复文本"""
+        result = await self.stream_chat(payload, name=name)
+        return result.text
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取网关和每个密钥的统计信息"""
+        now = time.monotonic()
+        return {
+            **self.stats,
+            "keys": [
+                {
+                    "index": s.index,
+                    "state": s.state(now),
+                    "reopen_in": round(max(0.0, s.open_until - now), 1) if s.open_until else 0,
+                    "latency_ewma": round(s.latency_ewma, 3) if s.latency_ewma is not None else None,
+                    "error_ewma": round(s.error_ewma, 3),
+                    "in_flight": s.in_flight,
+                    "requests": s.requests,
+                    "failures": s.failures,
+                    "last_error": s.last_error,
+                }
+                for s in self.keys
+            ],
+        }
+
+
+def _record(name: str, seconds: float, had_error: bool = False) -> None:
+    try:
+        from utils.performance_monitor import global_monitor
+        global_monitor.record_function_call(name, seconds, had_error)
+    except Exception:
+        pass
+
+
+# 全局 LLM 网关实例
+llm_gateway = LLMGateway()
+
+
+async def stream_chat(payload: Dict[str, Any], on_text: Optional[TextCallback] = None,
+                      name: str = "llm") -> StreamResult:
+    """通过全局网关流式调用 chat/completions"""
+    return await llm_gateway.stream_chat(payload, on_text, name)
+
+
+async def chat_completion(payload: Dict[str, Any], name: str = "llm") -> str:
+    """通过全局网关调用 chat/completions，返回完整回复文本"""
+    return await llm_gateway.complete(payload, name)
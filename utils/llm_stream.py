@@ -0,0 +1,233 @@
+"""
+LLM 流式调用模块 - OpenAI 兼容接口的 SSE 流式请求与分段发送
+"""
+import asyncio
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import aiohttp
+
+from ncatbot.utils.logger import get_log
+from utils.config_manager import get_config
+from utils.http_client import http_session
+
+_log = get_log()
+
+# config.yaml 中未配置 llm_stream 段时使用的默认值
+DEFAULT_LLM_STREAM_CONFIG: Dict[str, Any] = {
+    "first_token_timeout": 30,   # 等待首个 token 的超时（秒）
+    "idle_timeout": 30,          # 两个数据块之间的最长间隔（秒）
+    "first_segment_chars": 8,    # 首段至少积累的字符数，之后遇到句末即发送
+    "segment_chars": 300,        # 后续分段至少积累的字符数，之后遇到段落结尾即发送
+    "max_messages": 4,           # 单次回复最多拆成的消息条数
+}
+
+# 状态码为这些值时换下一个密钥重试，其余 4xx 直接失败
+RETRYABLE_STATUS = {401, 403, 408, 429}
+
+CONTINUE_PROMPT = "你的上一条回复在中途被截断了，请从截断处继续输出剩余内容，不要重复已经输出的部分。"
+
+_SENTENCE_END = re.compile(r"[。！？!?…\n]")
+
+TextCallback = Callable[[str], Awaitable[Optional[bool]]]
+
+
+def get_stream_config() -> Dict[str, Any]:
+    """读取 llm_stream 配置"""
+    return {**DEFAULT_LLM_STREAM_CONFIG, **(get_config("llm_stream", {}) or {})}
+
+
+class LLMStreamError(Exception):
+    """所有密钥都调用失败，或遇到不可重试的错误"""
+
+    def __init__(self, message: str, status: Optional[int] = None, partial: str = ""):
+        super().__init__(message)
+        self.status = status
+        self.partial = partial
+
+
+class LLMAttemptError(Exception):
+    """单次请求失败（HTTP 错误、超时、流中断）"""
+
+    def __init__(self, message: str, status: Optional[int] = None, retryable: bool = True,
+                 retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+@dataclass
+class StreamResult:
+    text: str
+    key_index: int
+    attempts: int
+    ttft: Optional[float]        # 从发出请求到收到首个 token 的时间（秒）
+    total_time: float
+    stopped_early: bool = False  # 调用方在生成结束前主动停止
+    failovers: List[str] = field(default_factory=list)
+
+
+class _CallbackError(Exception):
+    """回调本身出错，不属于接口故障，不触发换密钥重试"""
+
+
+def continuation_request(payload: Dict[str, Any], partial: str) -> Dict[str, Any]:
+    """构造流式请求体；已输出部分内容时要求模型从截断处继续"""
+    request = {**payload, "stream": True}
+    if partial:
+        request["messages"] = list(payload["messages"]) + [
+            {"role": "assistant", "content": partial},
+            {"role": "user", "content": CONTINUE_PROMPT},
+        ]
+    return request
+
+
+async def open_stream(
+    url: str,
+    request: Dict[str, Any],
+    api_key: str,
+    proxy: Optional[str] = None,
+    on_text: Optional[TextCallback] = None,
+    config: Optional[Dict[str, Any]] = None,
+) -> bool:
+    """
+    用一个密钥发起一次 SSE 流式请求，逐段回调 on_text(delta)
+
+    回调返回 True 时停止读取并关闭连接；回调自身抛出的异常原样向上传递。
+
+    Returns:
+        bool: 是否被回调提前停止
+
+    Raises:
+        LLMAttemptError: 请求失败、首 token 或数据间隔超时、流中断
+    """
+    config = config or get_stream_config()
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}",
+        "Accept": "text/event-stream",
+    }
+    try:
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=None)
+        async with http_session(timeout=timeout) as session:
+            async with session.post(url, headers=headers, json=request, proxy=proxy) as resp:
+                if resp.status != 200:
+                    body = (await resp.text())[:500]
+                    raise LLMAttemptError(
+                        f"HTTP {resp.status}: {body}", resp.status,
+                        resp.status in RETRYABLE_STATUS or resp.status >= 500,
+                        _retry_after(resp.headers.get("Retry-After")),
+                    )
+                async for delta in _iter_sse_text(resp, config):
+                    if on_text is None:
+                        continue
+                    try:
+                        stop = await on_text(delta)
+                    except Exception as e:
+                        raise _CallbackError() from e
+                    if stop:
+                        return True
+        return False
+    except _CallbackError as e:
+        raise e.__cause__
+    except LLMAttemptError:
+        raise
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        raise LLMAttemptError(f"{type(e).__name__}: {e}")
+
+
+def _retry_after(value: Optional[str]) -> Optional[float]:
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+async def _iter_sse_text(resp: aiohttp.ClientResponse, config: Dict[str, Any]):
+    """逐个产出 SSE 事件中的文本增量，收到 [DONE] 或连接正常结束时停止"""
+    timeout = float(config["first_token_timeout"])
+    while True:
+        try:
+            line = await asyncio.wait_for(resp.content.readline(), timeout)
+        except asyncio.TimeoutError:
+            raise LLMAttemptError(f"超过 {timeout:.0f}s 没有收到数据")
+        if not line:
+            return
+        line = line.strip()
+        if not line.startswith(b"data:"):
+            continue
+        data = line[5:].strip()
+        if data == b"[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            continue
+        if chunk.get("error"):
+            raise LLMAttemptError(f"流中返回错误: {chunk['error']}")
+        choices = chunk.get("choices") or [{}]
+        delta = (choices[0].get("delta") or {}).get("content") or ""
+        if delta:
+            timeout = float(config["idle_timeout"])
+            yield delta
+
+
+class SegmentBuffer:
+    """
+    把流式文本切成适合逐条发送的消息
+
+    首段在积累到 first_segment_chars 个字符后遇到句末即发送，尽快让用户看到回复；
+    之后按段落合并，至少积累 segment_chars 个字符再发送，避免刷屏；
+    已发送 max_messages - 1 条后，剩余内容等生成结束一次性发送。
+    """
+
+    def __init__(self, send: Callable[[str], Awaitable[Any]], config: Optional[Dict[str, Any]] = None):
+        self._send = send
+        self.config = config or get_stream_config()
+        self._buffer = ""
+        self.sent = 0
+
+    async def feed(self, delta: str) -> None:
+        """追加文本，达到分段条件时发送"""
+        self._buffer += delta
+        if self.sent >= int(self.config["max_messages"]) - 1:
+            return
+        cut = self._cut_position()
+        if cut:
+            segment, self._buffer = self._buffer[:cut], self._buffer[cut:]
+            await self._emit(segment)
+
+    def _cut_position(self) -> int:
+        if self.sent == 0:
+            min_chars = int(self.config["first_segment_chars"])
+            boundary = _SENTENCE_END
+        else:
+            min_chars = int(self.config["segment_chars"])
+            boundary = re.compile(r"\n")
+        if len(self._buffer) < min_chars:
+            return 0
+        cut = 0
+        for match in boundary.finditer(self._buffer, min_chars - 1):
+            cut = match.end()
+            if self.sent == 0:
+                break  # 首段在第一个句末就发送
+        return cut
+
+    async def flush(self, suffix: str = "") -> None:
+        """发送剩余内容"""
+        segment, self._buffer = self._buffer + suffix, ""
+        await self._emit(segment)
+
+    async def _emit(self, segment: str) -> None:
+        segment = segment.strip()
+        if segment:
+            self.sent += 1
+            try:
+                await self._send(segment)
+            except Exception as e:
+                _log.error(f"发送分段消息失败: {e}")
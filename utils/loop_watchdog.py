@@ -0,0 +1,218 @@
+"""
+事件循环看门狗 - 检测事件循环被同步代码阻塞的情况，并定位到阻塞的插件
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from ncatbot.utils.logger import get_log
+from utils.config_manager import get_config
+from utils.metrics import metrics
+
+_log = get_log()
+
+# config.yaml 中未配置 loop_watchdog 段时使用的默认值
+DEFAULT_LOOP_WATCHDOG_CONFIG: Dict[str, Any] = {
+    "enabled": True,
+    "interval": 0.1,     # 心跳间隔（秒）
+    "threshold": 0.5,    # 事件循环延迟超过该秒数视为阻塞并抓取调用栈
+    "window": 3600,      # 阻塞排行统计最近多少秒
+    "history": 500,      # 最多保留的阻塞记录数
+}
+
+_loop_lag = metrics.gauge("bot_event_loop_lag_seconds", "事件循环延迟（最近一次心跳）")
+_stalls = metrics.counter("bot_event_loop_stalls", "事件循环阻塞次数", ("plugin",))
+_stall_seconds = metrics.counter("bot_event_loop_stall_seconds", "事件循环阻塞累计时间", ("plugin",))
+
+_ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PLUGINS_DIR = os.path.join(_ROOT_DIR, "plugins") + os.sep
+_UTILS_DIR = os.path.join(_ROOT_DIR, "utils") + os.sep
+
+
+@dataclass
+class Stall:
+    """一次事件循环阻塞"""
+    timestamp: float     # time.time()
+    duration: float      # 事件循环延迟（秒）
+    owner: str           # 阻塞所属的插件（或 utils 模块）
+    site: str            # 项目代码中最内层的调用位置
+    leaf: str            # 实际阻塞的位置（可能在第三方库中）
+
+
+def _describe(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{frame.f_lineno} {code.co_name}"
+
+
+def attribute_frame(frame) -> Tuple[str, str, str]:
+    """
+    从最内层栈帧向外查找第一个属于项目的帧
+
+    Returns:
+        (所属插件或模块, 项目内调用位置, 最内层调用位置)
+    """
+    leaf = _describe(frame) if frame is not None else "-"
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_PLUGINS_DIR):
+            plugin = filename[len(_PLUGINS_DIR):].split(os.sep, 1)[0]
+            relative = os.path.relpath(filename, _PLUGINS_DIR).replace(os.sep, "/")
+            return plugin, f"{relative}:{frame.f_lineno} {frame.f_code.co_name}", leaf
+        if filename.startswith(_UTILS_DIR) and not filename.endswith("loop_watchdog.py"):
+            module = "utils." + os.path.splitext(os.path.basename(filename))[0]
+            return module, f"utils/{os.path.basename(filename)}:{frame.f_lineno} {frame.f_code.co_name}", leaf
+        frame = frame.f_back
+    return "unknown", "-", leaf
+
+
+class LoopWatchdog:
+    """
+    事件循环阻塞检测
+
+    - 事件循环上的心跳协程每 interval 秒更新一次时间戳，并记录实际延迟（loop lag）
+    - 后台线程同样每 interval 秒检查一次；心跳超过 threshold 未更新时，
+      通过 sys._current_frames 抓取事件循环线程的调用栈，按栈帧所在的插件目录归属
+    - 心跳恢复后按实际延迟记录本次阻塞；只有发生阻塞时才抓取调用栈，平时开销可忽略
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self._config_override = config
+        self._config: Optional[Dict[str, Any]] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._pending: Optional[Tuple[str, str, str]] = None  # 本次阻塞中抓到的调用位置
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self.stalls: deque = deque()
+        self.stats = {"stalls": 0, "stall_seconds": 0.0, "last_lag": 0.0, "max_lag": 0.0}
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """读取 loop_watchdog 配置（首次使用时从 config.yaml 加载）"""
+        if self._config is None:
+            user_config = self._config_override
+            if user_config is None:
+                user_config = get_config("loop_watchdog", {}) or {}
+            self._config = {**DEFAULT_LOOP_WATCHDOG_CONFIG, **user_config}
+        return self._config
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """在事件循环线程中调用，启动心跳和看门狗线程"""
+        if not self.config["enabled"] or self.running:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self.stalls = deque(self.stalls, maxlen=int(self.config["history"]))
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat_task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        _log.info(f"事件循环看门狗已启动，阻塞阈值 {self.config['threshold']}s")
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._heartbeat_task is not None and not self._heartbeat_task.done():
+            self._heartbeat_task.cancel()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+        self._thread = None
+
+    async def _heartbeat(self) -> None:
+        interval = float(self.config["interval"])
+        threshold = float(self.config["threshold"])
+        while True:
+            expected = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            now = time.monotonic()
+            lag = max(0.0, now - expected)
+            with self._lock:
+                self._last_beat = now
+                pending, self._pending = self._pending, None
+            self.stats["last_lag"] = lag
+            _loop_lag.set(lag)
+            if lag > self.stats["max_lag"]:
+                self.stats["max_lag"] = lag
+            if lag >= threshold:
+                self._record(lag, pending)
+
+    def _watch(self) -> None:
+        interval = float(self.config["interval"])
+        threshold = float(self.config["threshold"])
+        while not self._stop.wait(interval):
+            with self._lock:
+                stalled = self._pending is None and time.monotonic() - self._last_beat > threshold + interval
+            if not stalled:
+                continue
+            frame = sys._current_frames().get(self._loop_thread_id)
+            location = attribute_frame(frame)
+            del frame
+            with self._lock:
+                # 心跳可能在抓栈期间恢复，此时丢弃
+                if time.monotonic() - self._last_beat > threshold + interval:
+                    self._pending = location
+
+    def _record(self, lag: float, location: Optional[Tuple[str, str, str]]) -> None:
+        owner, site, leaf = location or ("unknown", "-", "-")
+        self.stalls.append(Stall(time.time(), lag, owner, site, leaf))
+        self.stats["stalls"] += 1
+        self.stats["stall_seconds"] += lag
+        _stalls.inc(plugin=owner)
+        _stall_seconds.inc(lag, plugin=owner)
+        _log.warning(f"事件循环阻塞 {lag:.2f}s: {owner} ({site} -> {leaf})")
+
+    def worst_blockers(self, n: int = 10, window: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        最近 window 秒内按累计阻塞时间排序的阻塞位置
+
+        Returns:
+            每项包含 owner、site、leaf（最近一次）、count、total、max
+        """
+        window = float(self.config["window"] if window is None else window)
+        cutoff = time.time() - window
+        blockers: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for stall in self.stalls:
+            if stall.timestamp < cutoff:
+                continue
+            item = blockers.get((stall.owner, stall.site))
+            if item is None:
+                item = blockers[(stall.owner, stall.site)] = {
+                    "owner": stall.owner, "site": stall.site, "leaf": stall.leaf,
+                    "count": 0, "total": 0.0, "max": 0.0,
+                }
+            item["leaf"] = stall.leaf
+            item["count"] += 1
+            item["total"] += stall.duration
+            item["max"] = max(item["max"], stall.duration)
+        return sorted(blockers.values(), key=lambda item: item["total"], reverse=True)[:n]
+
+    def format_report(self, n: int = 10) -> str:
+        """生成阻塞排行文本"""
+        blockers = self.worst_blockers(n)
+        minutes = float(self.config["window"]) / 60
+        if not blockers:
+            return f"最近 {minutes:.0f} 分钟没有检测到事件循环阻塞（阈值 {self.config['threshold']}s）"
+        lines = [f"最近 {minutes:.0f} 分钟事件循环阻塞 Top {len(blockers)}"]
+        for index, item in enumerate(blockers, 1):
+            lines.append(
+                f"{index}. {item['owner']} 累计 {item['total']:.2f}s / {item['count']} 次 "
+                f"最长 {item['max']:.2f}s\n   {item['site']} -> {item['leaf']}"
+            )
+        return "\n".join(lines)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "running": self.running, "recent": len(self.stalls)}
+
+
+# 全局事件循环看门狗实例
+loop_watchdog = LoopWatchdog()
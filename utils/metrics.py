@@ -0,0 +1,440 @@
+"""
+指标模块 - 统一的计数器/仪表/直方图接口，并以 OpenMetrics 格式通过本地 HTTP 端口导出
+"""
+import asyncio
+import functools
+import math
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from ncatbot.utils.logger import get_log
+from utils.config_manager import get_config
+
+_log = get_log()
+
+# config.yaml 中未配置 metrics 段时使用的默认值
+DEFAULT_METRICS_CONFIG: Dict[str, Any] = {
+    "enabled": False,      # 是否开启 HTTP 导出端口（指标本身始终记录）
+    "host": "127.0.0.1",   # 只监听本机，由本机的 Prometheus/Agent 抓取
+    "port": 9464,
+    "path": "/metrics",
+}
+
+# 耗时直方图的默认分桶（秒）
+DEFAULT_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# 发送消息的 OneBot 接口及其消息类型
+_SEND_ACTIONS = {
+    "send_group_msg": "group",
+    "send_private_msg": "private",
+    "send_msg": "message",
+    "send_group_forward_msg": "group_forward",
+    "send_private_forward_msg": "private_forward",
+}
+
+_INSTRUMENTED_ATTR = "__metrics_instrumented__"
+
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类：按标签值保存数据"""
+    type = "unknown"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
+class Counter(_Metric):
+    """只增不减的计数器，导出时名称带 _total 后缀"""
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[Sample]:
+        for key, value in self._values.items():
+            yield "_total", self._labels(key), value
+
+
+class Gauge(_Metric):
+    """可任意设置的数值"""
+    type = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[Sample]:
+        for key, value in self._values.items():
+            yield "", self._labels(key), value
+
+
+class Histogram(_Metric):
+    """固定分桶的直方图"""
+    type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _series(self, labels: Dict[str, Any]) -> List[float]:
+        key = self._key(labels)
+        series = self._values.get(key)
+        if series is None:
+            # 各桶计数（非累计）、+Inf 桶、总和
+            series = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        return series
+
+    def observe(self, value: float, **labels) -> None:
+        series = self._series(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        series[index] += 1
+        series[-1] += value
+
+    def load(self, counts_le: Sequence[int], count: int, total: float, **labels) -> None:
+        """直接写入累计计数（用于从其它直方图转换），counts_le 与 buckets 一一对应"""
+        series = self._series(labels)
+        previous = 0
+        for i, cumulative in enumerate(counts_le):
+            series[i] = cumulative - previous
+            previous = cumulative
+        series[len(self.buckets)] = count - previous
+        series[-1] = total
+
+    def samples(self) -> Iterable[Sample]:
+        for key, series in self._values.items():
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                cumulative += count
+                yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield "_count", labels, cumulative
+            yield "_sum", labels, series[-1]
+
+
+class PluginCounters:
+    """
+    插件计数器
+
+    代替插件里的 self.xxx_count 之类的实例属性，计数会以
+    bot_plugin_events_total{plugin="...", event="..."} 导出。
+    """
+
+    def __init__(self, plugin: str, events: Iterable[str] = ()):
+        self.plugin = plugin
+        self._counter = metrics.counter("bot_plugin_events", "插件自定义事件计数", ("plugin", "event"))
+        for event in events:
+            self._counter.inc(0, plugin=plugin, event=event)
+
+    def inc(self, event: str, amount: int = 1) -> None:
+        self._counter.inc(amount, plugin=self.plugin, event=event)
+
+    def __getitem__(self, event: str) -> int:
+        return int(self._counter.get(plugin=self.plugin, event=event))
+
+    def as_dict(self) -> Dict[str, int]:
+        return {
+            labels["event"]: int(value)
+            for _, labels, value in self._counter.samples()
+            if labels["plugin"] == self.plugin
+        }
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+
+    - counter/gauge/histogram 按名称获取或创建指标，插件重载时拿到的是同一个对象
+    - 其它模块已有的统计（缓存、数据库、限流等）通过 collector 在抓取时转换，不重复计数
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[_Metric]]] = []
+
+    def _get_or_create(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> Any:
+        metric = self._metrics.get(name)
+        if metric is None:
+            metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+        elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+            raise ValueError(f"指标 {name} 已以不同的类型或标签注册")
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def register_collector(self, collector: Callable[[], Iterable[_Metric]]) -> None:
+        """登记在每次抓取时生成指标的函数"""
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def collect(self) -> List[_Metric]:
+        families = list(self._metrics.values())
+        for collector in self._collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                _log.error(f"收集指标失败 {getattr(collector, '__name__', collector)}: {e}")
+        return families
+
+    def render(self) -> str:
+        """生成 OpenMetrics 文本"""
+        lines: List[str] = []
+        for metric in self.collect():
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for suffix, labels, value in metric.samples():
+                if labels:
+                    label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                    lines.append(f"{metric.name}{suffix}{{{label_text}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{metric.name}{suffix} {_format_value(value)}")
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+# 全局指标注册表
+metrics = MetricsRegistry()
+
+_ws_request_seconds = metrics.histogram(
+    "bot_ws_request_seconds", "OneBot 接口调用耗时（发送到收到响应）", ("client", "action"))
+_ws_request_errors = metrics.counter("bot_ws_request_errors", "OneBot 接口调用失败次数", ("client", "action"))
+_messages_sent = metrics.counter("bot_messages_sent", "发出的消息数", ("type",))
+_messages_received = metrics.counter("bot_messages_received", "收到的消息和通知数", ("type",))
+_db_query_seconds = metrics.histogram(
+    "bot_db_query_seconds", "数据库读查询/写事务耗时", ("db", "kind"),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+
+
+def plugin_counters(plugin: str, events: Iterable[str] = ()) -> PluginCounters:
+    """获取插件计数器，events 中的事件预先以 0 导出"""
+    return PluginCounters(plugin, events)
+
+
+def record_ws_request(client: str, action: str, seconds: float, had_error: bool = False) -> None:
+    """记录一次 OneBot 接口调用，发送消息类接口同时计入发出消息数"""
+    _ws_request_seconds.observe(seconds, client=client, action=action)
+    if had_error:
+        _ws_request_errors.inc(client=client, action=action)
+    elif action in _SEND_ACTIONS:
+        _messages_sent.inc(type=_SEND_ACTIONS[action])
+
+
+def record_message_received(kind: str) -> None:
+    """记录收到的一条事件，kind 为 group / private / notice"""
+    _messages_received.inc(type=kind)
+
+
+def record_db_query(db: str, kind: str, seconds: float) -> None:
+    """记录一次数据库读查询（read）或写事务（write）"""
+    _db_query_seconds.observe(seconds, db=db, kind=kind)
+
+
+def instrument_api(api: Any) -> None:
+    """
+    为 ncatbot 的 BotAPI 计时
+
+    所有插件共用同一个 BotAPI，接口调用都经过同一个入口（4.x 为 api.async_callback，
+    3.x 为 api._http.post），包装它即可统计各接口耗时和发出消息数。
+    """
+    if getattr(api, _INSTRUMENTED_ATTR, False):
+        return
+    if callable(getattr(api, "async_callback", None)):
+        owner, attr = api, "async_callback"
+    elif getattr(api, "_http", None) is not None:
+        owner, attr = api._http, "post"
+    else:
+        _log.warning(f"{type(api).__name__} 没有可计时的请求入口，OneBot 接口耗时和发出消息数不会被统计")
+        return
+    call = getattr(owner, attr)
+
+    @functools.wraps(call)
+    async def timed_call(path: str, *args, **kwargs):
+        start = time.perf_counter()
+        had_error = False
+        try:
+            return await call(path, *args, **kwargs)
+        except Exception:
+            had_error = True
+            raise
+        finally:
+            record_ws_request("ncatbot", path.strip("/"), time.perf_counter() - start, had_error)
+
+    setattr(owner, attr, timed_call)
+    setattr(api, _INSTRUMENTED_ATTR, True)
+
+
+def _latency_counts_le(histogram: Any, bounds: Sequence[float]) -> List[int]:
+    """把 LatencyHistogram 的对数分桶换算为各上界的累计计数（按桶上界归属）"""
+    result = []
+    items = sorted(histogram.counts.items())
+    position, cumulative = 0, 0
+    for bound in bounds:
+        while position < len(items) and histogram.MIN_VALUE * histogram.GROWTH ** items[position][0] <= bound:
+            cumulative += items[position][1]
+            position += 1
+        result.append(cumulative)
+    return result
+
+
+def _collect_builtin() -> Iterable[_Metric]:
+    """把各共享模块已有的统计转换为指标"""
+    families: List[_Metric] = []
+
+    from utils.handler_profiler import handler_profiler
+    handler_seconds = Histogram("bot_handler_seconds", "插件处理器耗时（抽样）", ("plugin", "handler"))
+    handler_busy = Counter("bot_handler_busy_seconds", "插件处理器占用事件循环的时间（抽样）", ("plugin", "handler"))
+    handler_calls = Counter("bot_handler_calls", "插件处理器调用次数", ("plugin", "handler"))
+    handler_errors = Counter("bot_handler_errors", "插件处理器异常次数", ("plugin", "handler"))
+    for s in handler_profiler.iter_stats():
+        labels = {"plugin": s.plugin, "handler": s.handler}
+        handler_seconds.load(_latency_counts_le(s.histogram, handler_seconds.buckets),
+                             s.sampled, s.wall_ns / 1e9, **labels)
+        handler_busy.inc(s.busy_ns / 1e9, **labels)
+        handler_calls.inc(s.calls, **labels)
+        handler_errors.inc(s.errors, **labels)
+    families.extend([handler_seconds, handler_busy, handler_calls, handler_errors])
+
+    from utils.ttl_cache import get_cache_stats
+    cache_requests = Counter("bot_cache_requests", "缓存查询次数", ("cache", "result"))
+    cache_ratio = Gauge("bot_cache_hit_ratio", "缓存命中率", ("cache",))
+    cache_entries = Gauge("bot_cache_entries", "缓存条目数", ("cache",))
+    for name, stats in get_cache_stats().items():
+        cache_requests.inc(stats["hits"], cache=name, result="hit")
+        cache_requests.inc(stats["stale_hits"], cache=name, result="stale")
+        cache_requests.inc(stats["misses"], cache=name, result="miss")
+        cache_ratio.set(stats["hit_rate"], cache=name)
+        cache_entries.set(stats["size"], cache=name)
+    families.extend([cache_requests, cache_ratio, cache_entries])
+
+    from utils.rate_limiter import rate_limiter
+    rate_limited = Counter("bot_rate_limit_requests", "限流判定次数", ("plugin", "scope", "result"))
+    for name, counter in rate_limiter.get_stats()["limits"].items():
+        plugin, scope = name.rsplit(".", 1)
+        rate_limited.inc(counter["allowed"], plugin=plugin, scope=scope, result="allowed")
+        rate_limited.inc(counter["rejected"], plugin=plugin, scope=scope, result="rejected")
+    families.append(rate_limited)
+
+    try:
+        import psutil
+        rss = Gauge("bot_process_resident_memory_bytes", "进程常驻内存")
+        rss.set(psutil.Process().memory_info().rss)
+        families.append(rss)
+    except Exception:
+        pass
+    return families
+
+
+metrics.register_collector(_collect_builtin)
+
+
+class MetricsServer:
+    """只提供 GET 指标路径的最小 HTTP 服务，不依赖额外的 Web 框架"""
+
+    def __init__(self, registry: MetricsRegistry = metrics):
+        self.registry = registry
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._config: Optional[Dict[str, Any]] = None
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """读取 metrics 配置（首次使用时从 config.yaml 加载）"""
+        if self._config is None:
+            user_config = get_config("metrics", {}) or {}
+            self._config = {**DEFAULT_METRICS_CONFIG, **user_config}
+        return self._config
+
+    async def start(self) -> None:
+        if not self.config["enabled"] or self._server is not None:
+            return
+        host, port = self.config["host"], int(self.config["port"])
+        try:
+            self._server = await asyncio.start_server(self._handle, host, port)
+            _log.info(f"指标导出已启动: http://{host}:{port}{self.config['path']}")
+        except OSError as e:
+            _log.error(f"指标导出端口 {host}:{port} 启动失败: {e}")
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), timeout=5)
+            # 丢弃请求头
+            while (await asyncio.wait_for(reader.readline(), timeout=5)) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[0] == "GET" and parts[1].split("?", 1)[0] == self.config["path"]:
+                status, content_type, body = "200 OK", CONTENT_TYPE, self.registry.render().encode("utf-8")
+            else:
+                status, content_type, body = "404 Not Found", "text/plain; charset=utf-8", b"not found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        except Exception as e:
+            _log.error(f"处理指标请求失败: {e}")
+        finally:
+            writer.close()
+
+
+# 全局指标导出服务
+metrics_server = MetricsServer()
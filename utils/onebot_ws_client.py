@@ -0,0 +1,295 @@
+"""
+OneBot WebSocket 客户端 - 进程内共享的持久连接，按 echo 复用请求/响应
+"""
+import asyncio
+import itertools
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import websockets
+from websockets.exceptions import ConnectionClosed
+
+from ncatbot.utils.config import config
+from ncatbot.utils.logger import get_log
+from utils.metrics import record_ws_request
+
+_log = get_log()
+
+EventListener = Callable[[Dict[str, Any]], Optional[Awaitable[None]]]
+
+
+class ActionConnectionError(ConnectionError):
+    """
+    调用 API 期间连接不可用或断开
+
+    sent 表示请求帧是否已经写入连接：为 True 时对端可能已经执行了该请求，
+    调用方不应重试，否则连接恢复后会重复执行（例如重复发消息）。
+    """
+
+    def __init__(self, message: str, sent: bool = False):
+        super().__init__(message)
+        self.sent = sent
+
+
+class OneBotWebSocketClient:
+    """
+    持久化的 OneBot v11 WebSocket 客户端
+
+    - 整个进程只保持一条连接，所有插件的 API 调用共用
+    - 每个请求带唯一 echo，响应通过 echo 对应到各自的 Future，互不串扰
+    - 元事件和其它上报事件分发给已注册的监听器，而不是被丢弃
+    - 连接断开后，下一次调用时按指数退避自动重连
+    """
+
+    def __init__(
+        self,
+        ws_uri: Optional[str] = None,
+        reconnect_base_delay: float = 0.5,
+        reconnect_max_delay: float = 30.0,
+        max_connect_attempts: int = 5,
+    ):
+        self._ws_uri = ws_uri
+        self._reconnect_base_delay = reconnect_base_delay
+        self._reconnect_max_delay = reconnect_max_delay
+        self._max_connect_attempts = max_connect_attempts
+
+        self._ws: Optional[Any] = None
+        self._reader_task: Optional[asyncio.Task] = None
+        self._connect_lock = asyncio.Lock()
+        self._send_lock = asyncio.Lock()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._listeners: Dict[str, List[EventListener]] = defaultdict(list)
+        self._echo_prefix = f"kln-{os.getpid()}-{random.randrange(1 << 16):04x}"
+        self._echo_counter = itertools.count(1)
+        self._closed = False
+
+        # 统计信息
+        self.stats: Dict[str, int] = {
+            "connects": 0,
+            "reconnects": 0,
+            "requests": 0,
+            "responses": 0,
+            "timeouts": 0,
+            "events": 0,
+            "orphan_responses": 0,
+        }
+
+    @property
+    def ws_uri(self) -> str:
+        """WebSocket 地址，未显式指定时读取 ncatbot 配置"""
+        uri = self._ws_uri or config.ws_uri
+        if not uri:
+            raise ValueError("WebSocket URI 未配置，请检查 config.set_ws_uri()")
+        return uri
+
+    @property
+    def connected(self) -> bool:
+        """当前连接是否可用"""
+        return self._ws is not None and self._reader_task is not None and not self._reader_task.done()
+
+    def add_listener(self, post_type: str, listener: EventListener) -> None:
+        """
+        注册上报事件监听器
+
+        Args:
+            post_type: 事件类型（meta_event / message / notice / request），"*" 表示全部
+            listener: 回调函数，可以是同步函数或协程函数
+        """
+        self._listeners[post_type].append(listener)
+
+    def remove_listener(self, post_type: str, listener: EventListener) -> None:
+        """移除上报事件监听器"""
+        if listener in self._listeners.get(post_type, []):
+            self._listeners[post_type].remove(listener)
+
+    async def _ensure_connected(self) -> None:
+        """确保连接可用，断开时按指数退避重连"""
+        if self.connected:
+            return
+
+        async with self._connect_lock:
+            if self.connected:
+                return
+            if self._closed:
+                raise ConnectionError("OneBot WebSocket 客户端已关闭")
+
+            last_error: Optional[Exception] = None
+            for attempt in range(self._max_connect_attempts):
+                try:
+                    self._ws = await websockets.connect(self.ws_uri, max_size=None)
+                    if self.stats["connects"]:
+                        self.stats["reconnects"] += 1
+                    self.stats["connects"] += 1
+                    self._reader_task = asyncio.create_task(self._reader_loop(self._ws))
+                    _log.info(f"OneBot WebSocket 已连接: {self.ws_uri}")
+                    return
+                except Exception as e:
+                    last_error = e
+                    delay = min(self._reconnect_max_delay, self._reconnect_base_delay * (2 ** attempt))
+                    delay *= random.uniform(0.8, 1.2)
+                    _log.warning(
+                        f"OneBot WebSocket 连接失败 (尝试 {attempt + 1}/{self._max_connect_attempts}): {e}，"
+                        f"{delay:.1f}秒后重试"
+                    )
+                    await asyncio.sleep(delay)
+
+            raise ConnectionError(f"无法连接到 OneBot WebSocket: {last_error}")
+
+    async def _reader_loop(self, ws: Any) -> None:
+        """持续读取连接上的所有帧并分发"""
+        try:
+            async for raw in ws:
+                try:
+                    data = json.loads(raw)
+                except (TypeError, ValueError):
+                    _log.debug(f"忽略无法解析的 WebSocket 帧: {raw!r:.200}")
+                    continue
+                self._dispatch(data)
+        except ConnectionClosed as e:
+            _log.warning(f"OneBot WebSocket 连接已断开: {e}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            _log.error(f"OneBot WebSocket 读取出错: {e}")
+        finally:
+            if self._ws is ws:
+                self._ws = None
+            self._fail_pending(ConnectionError("OneBot WebSocket 连接已断开"))
+
+    def _dispatch(self, data: Dict[str, Any]) -> None:
+        """按 echo 投递响应，或把上报事件分发给监听器"""
+        echo = data.get("echo")
+        if echo is not None and "post_type" not in data:
+            future = self._pending.pop(str(echo), None)
+            if future is not None and not future.done():
+                self.stats["responses"] += 1
+                future.set_result(data)
+            else:
+                self.stats["orphan_responses"] += 1
+            return
+
+        post_type = data.get("post_type")
+        if post_type is None:
+            return
+        self.stats["events"] += 1
+        for listener in self._listeners.get(post_type, []) + self._listeners.get("*", []):
+            try:
+                result = listener(data)
+                if asyncio.iscoroutine(result):
+                    asyncio.create_task(result)
+            except Exception as e:
+                _log.error(f"WebSocket 事件监听器执行失败: {e}")
+
+    def _fail_pending(self, error: Exception) -> None:
+        """连接断开时让所有等待中的请求立即失败"""
+        pending, self._pending = self._pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(error)
+
+    async def call_action(
+        self,
+        action: str,
+        params: Optional[Dict[str, Any]] = None,
+        timeout: float = 10.0,
+    ) -> Dict[str, Any]:
+        """
+        调用 OneBot API 并等待对应的响应
+
+        Args:
+            action: API 名称，例如 send_group_msg
+            params: API 参数
+            timeout: 等待响应的超时时间（秒）
+
+        Returns:
+            Dict[str, Any]: OneBot 响应数据
+
+        Raises:
+            ActionConnectionError: 连接不可用或在等待期间断开（sent 标记请求是否已发出）
+            asyncio.TimeoutError: 超时未收到响应
+        """
+        await self._ensure_connected()
+
+        echo = f"{self._echo_prefix}-{next(self._echo_counter)}"
+        future = asyncio.get_running_loop().create_future()
+        self._pending[echo] = future
+        payload = {"action": action, "params": params or {}, "echo": echo}
+        start = time.perf_counter()
+        had_error = False
+        sent = False
+
+        try:
+            async with self._send_lock:
+                ws = self._ws
+                if ws is None:
+                    raise ActionConnectionError("OneBot WebSocket 连接已断开")
+                await ws.send(json.dumps(payload, ensure_ascii=False))
+            sent = True
+            self.stats["requests"] += 1
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            had_error = True
+            self.stats["timeouts"] += 1
+            raise
+        except ActionConnectionError:
+            had_error = True
+            raise
+        except (ConnectionClosed, ConnectionError) as e:
+            # _fail_pending 在断线时投递的错误由多个请求共享，这里按本次请求是否已发出重新包装
+            had_error = True
+            raise ActionConnectionError(f"OneBot WebSocket 连接已断开: {e}", sent=sent) from e
+        except Exception:
+            had_error = True
+            raise
+        finally:
+            self._pending.pop(echo, None)
+            record_ws_request("onebot", action, time.perf_counter() - start, had_error)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取客户端统计信息"""
+        stats: Dict[str, Any] = dict(self.stats)
+        stats["connected"] = self.connected
+        stats["pending"] = len(self._pending)
+        return stats
+
+    async def close(self) -> None:
+        """关闭连接并取消读取任务"""
+        self._closed = True
+        ws, self._ws = self._ws, None
+        if ws is not None:
+            try:
+                await ws.close()
+            except Exception as e:
+                _log.debug(f"关闭 WebSocket 连接时出错: {e}")
+        if self._reader_task is not None and not self._reader_task.done():
+            self._reader_task.cancel()
+            try:
+                await self._reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+        self._reader_task = None
+        self._fail_pending(ConnectionError("OneBot WebSocket 客户端已关闭"))
+
+
+# 全局客户端实例
+_client: Optional[OneBotWebSocketClient] = None
+
+
+def get_onebot_client() -> OneBotWebSocketClient:
+    """获取进程内共享的 OneBot WebSocket 客户端"""
+    global _client
+    if _client is None or _client._closed:
+        _client = OneBotWebSocketClient()
+    return _client
+
+
+async def close_onebot_client() -> None:
+    """关闭共享的 OneBot WebSocket 客户端"""
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -2,6 +2,7 @@
 性能监控模块 - 监控系统性能和资源使用情况
 """
 import asyncio
+import math
 import time
 import psutil
 import functools
@@ -14,6 +15,75 @@ from ncatbot.utils.logger import get_log
 
 _log = get_log()
 
+# 报告中展示的统计窗口（分钟）
+WINDOWS = (1, 5, 15)
+
+
+class LatencyHistogram:
+    """
+    对数分桶的耗时直方图（HDR 风格）
+
+    第 i 个桶覆盖 (MIN_VALUE * GROWTH^(i-1), MIN_VALUE * GROWTH^i]，
+    分位数的相对误差约 5%；最多 BUCKETS 个桶，内存不随调用次数增长。
+    """
+    MIN_VALUE = 1e-5   # 10 微秒以下记入第 0 个桶
+    GROWTH = 1.1
+    BUCKETS = 200      # 最大约 1700 秒，更长的记入最后一个桶
+    _LOG_GROWTH = math.log(GROWTH)
+
+    __slots__ = ("counts", "total")
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+
+    @classmethod
+    def bucket_of(cls, value: float) -> int:
+        if value <= cls.MIN_VALUE:
+            return 0
+        index = math.ceil(math.log(value / cls.MIN_VALUE) / cls._LOG_GROWTH)
+        return min(index, cls.BUCKETS - 1)
+
+    @classmethod
+    def bucket_value(cls, index: int) -> float:
+        """桶的代表值（上下边界的几何中点）"""
+        if index == 0:
+            return cls.MIN_VALUE
+        return cls.MIN_VALUE * cls.GROWTH ** (index - 0.5)
+
+    def record(self, value: float) -> None:
+        index = self.bucket_of(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        self.total += 1
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.total += other.total
+
+    def percentile(self, p: float) -> float:
+        """第 p 百分位（0-100）的耗时，没有数据时为 0"""
+        if not self.total:
+            return 0.0
+        rank = max(1, math.ceil(self.total * p / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return self.bucket_value(index)
+        return self.bucket_value(max(self.counts))
+
+
+@dataclass
+class _MinuteSlot:
+    """一分钟内的调用统计"""
+    minute: int
+    calls: int = 0
+    errors: int = 0
+    total_time: float = 0.0
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+
 @dataclass
 class PerformanceMetrics:
     """性能指标数据类"""
@@ -25,7 +95,11 @@ class PerformanceMetrics:
     max_time: float = 0.0
     error_count: int = 0
     last_called: Optional[datetime] = None
-    recent_times: deque = field(default_factory=lambda: deque(maxlen=100))
+    histogram: LatencyHistogram = field(default_factory=LatencyHistogram)
+    # 最近 max(WINDOWS) 个完整分钟加当前分钟的按分钟统计
+    window: deque = field(default_factory=lambda: deque(maxlen=max(WINDOWS) + 1))
+    # 开始统计的时间（monotonic），窗口早于此时刻的部分不计入速率的分母
+    created_at: float = field(default_factory=time.monotonic)
     
     def update(self, execution_time: float, had_error: bool = False):
         """更新性能指标"""
@@ -35,17 +109,61 @@ class PerformanceMetrics:
         self.min_time = min(self.min_time, execution_time)
         self.max_time = max(self.max_time, execution_time)
         self.last_called = datetime.now()
-        self.recent_times.append(execution_time)
+        self.histogram.record(execution_time)
+
+        minute = int(time.monotonic() // 60)
+        if not self.window or self.window[-1].minute != minute:
+            self.window.append(_MinuteSlot(minute))
+        slot = self.window[-1]
+        slot.calls += 1
+        slot.total_time += execution_time
+        slot.histogram.record(execution_time)
         
         if had_error:
             self.error_count += 1
+            slot.errors += 1
+
+    def percentile(self, p: float) -> float:
+        """全部调用耗时的第 p 百分位"""
+        return min(max(self.histogram.percentile(p), self.min_time), self.max_time) if self.call_count else 0.0
+
+    def window_stats(self, minutes: int) -> Dict[str, float]:
+        """
+        最近 minutes 分钟的统计
+
+        窗口包含之前 minutes 个完整分钟和当前未结束的分钟，
+        速率按窗口起点（不早于开始统计的时间）到现在的实际时长计算。
+
+        Returns:
+            calls/rate(次/秒)/error_rate/avg/p50/p95/p99
+        """
+        now = time.monotonic()
+        oldest = int(now // 60) - minutes
+        merged = LatencyHistogram()
+        calls = errors = 0
+        total_time = 0.0
+        for slot in self.window:
+            if slot.minute >= oldest:
+                calls += slot.calls
+                errors += slot.errors
+                total_time += slot.total_time
+                merged.merge(slot.histogram)
+        # 刚开始统计时时长过短会把少量调用放大成很高的速率，至少按一分钟计算
+        elapsed = max(now - max(oldest * 60, self.created_at), 60.0)
+        return {
+            "calls": calls,
+            "rate": calls / elapsed,
+            "error_rate": errors / calls if calls else 0.0,
+            "avg": total_time / calls if calls else 0.0,
+            "p50": merged.percentile(50),
+            "p95": merged.percentile(95),
+            "p99": merged.percentile(99),
+        }
     
     @property
     def recent_avg_time(self) -> float:
-        """最近调用的平均时间"""
-        if not self.recent_times:
-            return 0.0
-        return sum(self.recent_times) / len(self.recent_times)
+        """最近5分钟调用的平均时间"""
+        return self.window_stats(5)["avg"]
     
     @property
     def error_rate(self) -> float:
@@ -81,36 +199,42 @@ class PerformanceMonitor:
             self._monitoring_task.cancel()
             _log.info("性能监控已停止")
     
+    @staticmethod
+    def _sample_system() -> Dict[str, Any]:
+        """收集系统指标（在线程中执行）"""
+        # interval=None 不等待，返回距上次调用期间的 CPU 占用率
+        cpu_percent = psutil.cpu_percent(interval=None)
+        memory = psutil.virtual_memory()
+        disk = psutil.disk_usage('/')
+        return {
+            'timestamp': datetime.now(),
+            'cpu_percent': cpu_percent,
+            'memory_percent': memory.percent,
+            'memory_used_mb': memory.used / 1024 / 1024,
+            'disk_percent': disk.percent,
+            'disk_used_gb': disk.used / 1024 / 1024 / 1024
+        }
+
     async def _monitor_system(self):
-        """监控系统性能"""
+        """监控系统性能，采样在线程中进行，不阻塞事件循环"""
+        try:
+            # 第一次调用只建立 CPU 占用率的基准
+            await asyncio.to_thread(psutil.cpu_percent, None)
+        except Exception as e:
+            _log.error(f"系统监控初始化出错: {e}")
         while True:
             try:
-                # 收集系统指标
-                cpu_percent = psutil.cpu_percent(interval=1)
-                memory = psutil.virtual_memory()
-                disk = psutil.disk_usage('/')
-                
-                system_metric = {
-                    'timestamp': datetime.now(),
-                    'cpu_percent': cpu_percent,
-                    'memory_percent': memory.percent,
-                    'memory_used_mb': memory.used / 1024 / 1024,
-                    'disk_percent': disk.percent,
-                    'disk_used_gb': disk.used / 1024 / 1024 / 1024
-                }
-                
+                await asyncio.sleep(self._monitor_interval)
+                system_metric = await asyncio.to_thread(self._sample_system)
                 self._system_metrics.append(system_metric)
                 
                 # 检查告警阈值
                 await self._check_alerts(system_metric)
                 
-                await asyncio.sleep(self._monitor_interval)
-                
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 _log.error(f"系统监控出错: {e}")
-                await asyncio.sleep(self._monitor_interval)
     
     async def _check_alerts(self, metric: Dict[str, Any]):
         """检查告警条件"""
@@ -181,16 +305,126 @@ class PerformanceMonitor:
             )[:10]
             
             report_lines.append("## 函数调用统计 (Top 10)")
-            report_lines.append("| 函数名 | 调用次数 | 平均时间 | 最大时间 | 错误率 |")
-            report_lines.append("|--------|----------|----------|----------|--------|")
+            report_lines.append("| 函数名 | 调用次数 | 平均时间 | p50 | p95 | p99 | 最大时间 | 错误率 |")
+            report_lines.append("|--------|----------|----------|-----|-----|-----|----------|--------|")
             
             for metric in sorted_metrics:
                 report_lines.append(
                     f"| {metric.function_name} | {metric.call_count} | "
-                    f"{metric.avg_time:.3f}s | {metric.max_time:.3f}s | "
-                    f"{metric.error_rate:.1%} |"
+                    f"{metric.avg_time:.3f}s | {metric.percentile(50):.3f}s | "
+                    f"{metric.percentile(95):.3f}s | {metric.percentile(99):.3f}s | "
+                    f"{metric.max_time:.3f}s | {metric.error_rate:.1%} |"
                 )
-        
+
+            # 最近窗口内的速率和尾延迟，便于发现近期的性能退化
+            report_lines.extend([
+                "",
+                "## 最近调用 (次/分钟 · p95 · p99)",
+                "| 函数名 | " + " | ".join(f"{m}分钟" for m in WINDOWS) + " |",
+                "|--------|" + "|".join("------" for _ in WINDOWS) + "|",
+            ])
+            for metric in sorted_metrics:
+                cells = []
+                for minutes in WINDOWS:
+                    stats = metric.window_stats(minutes)
+                    if stats["calls"]:
+                        cells.append(f"{stats['rate'] * 60:.1f} · {stats['p95']:.3f}s · {stats['p99']:.3f}s")
+                    else:
+                        cells.append("-")
+                report_lines.append(f"| {metric.function_name} | " + " | ".join(cells) + " |")
+
+        # 插件事件处理器耗时
+        try:
+            from utils.handler_profiler import handler_profiler
+            top = handler_profiler.top_plugins(10)
+            if top:
+                report_lines.extend([
+                    "",
+                    f"## 插件处理器 (采样率 {handler_profiler.config['sample_rate']:.0%})",
+                    "| 插件 | 调用次数 | 平均耗时 | 占用循环 | 等待 | p95 | 异常 |",
+                    "|------|----------|----------|----------|------|-----|------|",
+                ])
+                for item in top:
+                    report_lines.append(
+                        f"| {item['plugin']} | {item['calls']} | {item['avg_wall']:.3f}s | "
+                        f"{item['avg_busy']:.3f}s | {item['avg_awaited']:.3f}s | {item['p95']:.3f}s | {item['errors']} |"
+                    )
+        except Exception:
+            pass
+
+        # 事件循环阻塞
+        try:
+            from utils.loop_watchdog import loop_watchdog
+            loop_stats = loop_watchdog.get_stats()
+            if loop_stats["running"]:
+                report_lines.extend([
+                    "",
+                    "## 事件循环",
+                    f"当前延迟: {loop_stats['last_lag'] * 1000:.1f}ms 最大延迟: {loop_stats['max_lag']:.2f}s "
+                    f"阻塞: {loop_stats['stalls']} 次 共 {loop_stats['stall_seconds']:.1f}s",
+                ])
+                for item in loop_watchdog.worst_blockers(5):
+                    report_lines.append(
+                        f"{item['owner']}: {item['total']:.2f}s / {item['count']} 次 ({item['site']} -> {item['leaf']})"
+                    )
+        except Exception:
+            pass
+
+        # LLM 网关密钥健康状态
+        try:
+            from utils.llm_gateway import llm_gateway
+            if llm_gateway._keys:
+                stats = llm_gateway.get_stats()
+                report_lines.extend([
+                    "",
+                    "## LLM 网关",
+                    f"调用: {stats['calls']} 失败: {stats['failed_calls']} "
+                    f"切换: {stats['failovers']} 对冲: {stats['hedges']} (胜出 {stats['hedge_wins']})",
+                    "| 密钥 | 状态 | 延迟EWMA | 错误率EWMA | 进行中 | 请求 | 失败 |",
+                    "|------|------|----------|------------|--------|------|------|",
+                ])
+                for key in stats["keys"]:
+                    latency = f"{key['latency_ewma']:.2f}s" if key["latency_ewma"] is not None else "-"
+                    report_lines.append(
+                        f"| #{key['index']} | {key['state']} | {latency} | {key['error_ewma']:.1%} | "
+                        f"{key['in_flight']} | {key['requests']} | {key['failures']} |"
+                    )
+        except Exception:
+            pass
+
+        # 插件缓存命中情况
+        try:
+            from utils.ttl_cache import get_cache_stats
+            cache_stats = get_cache_stats()
+            if cache_stats:
+                report_lines.extend([
+                    "",
+                    "## 缓存",
+                    "| 缓存 | 条目 | 内存 | 命中率 | 命中 | 未命中 | 淘汰 | 过期 |",
+                    "|------|------|------|--------|------|--------|------|------|",
+                ])
+                for name, stats in sorted(cache_stats.items()):
+                    memory = f"{stats['bytes'] / 1024:.0f}KB" if stats["max_bytes"] else "-"
+                    report_lines.append(
+                        f"| {name} | {stats['size']}/{stats['maxsize']} | {memory} | {stats['hit_rate']:.1%} | "
+                        f"{stats['hits'] + stats['stale_hits']} | {stats['misses']} | "
+                        f"{stats['evictions']} | {stats['expirations']} |"
+                    )
+        except Exception:
+            pass
+
+        # 请求限流
+        try:
+            from utils.rate_limiter import rate_limiter
+            limit_stats = rate_limiter.get_stats()
+            rejected = {name: c for name, c in limit_stats["limits"].items() if c["rejected"]}
+            if rejected:
+                report_lines.extend(["", f"## 限流 (跟踪对象 {limit_stats['tracked_keys']})"])
+                for name, counter in sorted(rejected.items(), key=lambda item: -item[1]["rejected"]):
+                    report_lines.append(f"{name}: 放行 {counter['allowed']} 拒绝 {counter['rejected']}")
+        except Exception:
+            pass
+
         return "\n".join(report_lines)
 
 # 全局性能监控器实例
@@ -205,7 +439,7 @@ def monitor_performance(function_name: Optional[str] = None):
         
         @functools.wraps(func)
         async def async_wrapper(*args, **kwargs) -> Any:
-            start_time = time.time()
+            start_time = time.perf_counter()
             had_error = False
             
             try:
@@ -215,12 +449,12 @@ def monitor_performance(function_name: Optional[str] = None):
                 had_error = True
                 raise
             finally:
-                execution_time = time.time() - start_time
+                execution_time = time.perf_counter() - start_time
                 global_monitor.record_function_call(function_name, execution_time, had_error)
         
         @functools.wraps(func)
         def sync_wrapper(*args, **kwargs) -> Any:
-            start_time = time.time()
+            start_time = time.perf_counter()
             had_error = False
             
             try:
@@ -230,7 +464,7 @@ def monitor_performance(function_name: Optional[str] = None):
                 had_error = True
                 raise
             finally:
-                execution_time = time.time() - start_time
+                execution_time = time.perf_counter() - start_time
                 global_monitor.record_function_call(function_name, execution_time, had_error)
         
         # 判断是否为异步函数
@@ -284,23 +518,19 @@ class ResourcePool:
         pass
 
 class HTTPConnectionPool(ResourcePool):
-    """HTTP连接池"""
+    """HTTP连接池（委托给 utils.http_client 的共享会话）"""
     
     def __init__(self, max_size: int = 10):
         super().__init__(max_size)
-        self._session = None
     
     async def _create_resource(self):
-        """创建HTTP会话"""
-        import aiohttp
-        if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
-        return self._session
+        """获取共享HTTP会话"""
+        from utils.http_client import http_manager
+        return await http_manager.get_session()
     
     async def _destroy_resource(self, resource):
-        """销毁HTTP会话"""
-        if resource and not resource.closed:
-            await resource.close()
+        """共享会话由 http_manager 统一关闭"""
+        pass
 
 # 全局HTTP连接池
 http_pool = HTTPConnectionPool()
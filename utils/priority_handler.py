@@ -16,16 +16,19 @@ def register_handler(priority: int):
 
 async def dispatch_event(event: Any, plugins_dict: Dict[str, Any]) -> bool:
     global _handlers
-    updated_handlers = []
-    for priority, handler, plugin_instance in _handlers:
-        if plugin_instance is None:
-            for plugin_instance in plugins_dict.values():
-                if hasattr(plugin_instance, handler.__name__):
-                    updated_handlers.append((priority, handler, plugin_instance))
-                    break
-        else:
-            updated_handlers.append((priority, handler, plugin_instance))
-    _handlers = updated_handlers
+    # 只为尚未绑定插件实例的处理器查找一次实例，避免每个事件都重建列表
+    if any(plugin_instance is None for _, _, plugin_instance in _handlers):
+        resolved = []
+        for priority, handler, plugin_instance in _handlers:
+            if plugin_instance is None:
+                for candidate in plugins_dict.values():
+                    if hasattr(candidate, handler.__name__):
+                        plugin_instance = candidate
+                        break
+                else:
+                    continue
+            resolved.append((priority, handler, plugin_instance))
+        _handlers = resolved
     for priority, handler, plugin_instance in _handlers:
         if plugin_instance:
             try:
@@ -35,4 +38,4 @@ async def dispatch_event(event: Any, plugins_dict: Dict[str, Any]) -> bool:
                     return True
             except Exception as e:
                 print(f"Error executing handler {handler.__name__} (priority {priority}): {e}")
-    return False
\ No newline at end of file
+    return False
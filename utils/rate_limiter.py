@@ -0,0 +1,278 @@
+"""
+限流模块 - 按 (插件, 范围, 对象) 统一管理请求频率，规则来自 config.yaml
+"""
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, Optional, Tuple, Union
+
+from ncatbot.utils.logger import get_log
+from utils.config_manager import get_config
+
+_log = get_log()
+
+# 限流范围
+USER, GROUP, GLOBAL = "user", "group", "global"
+
+# 各插件的默认限流规则，可在 config.yaml 的 rate_limit.limits 中按插件覆盖
+# 规则写法：数字表示两次请求的最小间隔（秒）；{limit, window} 为滑动窗口；{rate, burst} 为令牌桶
+DEFAULT_LIMITS: Dict[str, Dict[str, Any]] = {
+    "AnimeSearch": {USER: 2},
+    "AsmrSearch": {USER: 3},
+    "BiliVideoInfo": {GROUP: 1},
+    "BingSearch": {USER: 2},
+    "COSPlugin": {USER: 3},
+    "ComicSearch": {USER: 2},
+    "DiseasePlugin": {USER: 5},
+    "EmojiKitchen": {GROUP: 2},
+    "HotSearchPlugin": {USER: 3},
+    "JmSearch": {USER: 5},
+    "KfcThursday": {GLOBAL: 2},
+    "MikanAnimeSearch": {USER: 2},
+    "PantsuDraw": {GLOBAL: 1},
+    "PixivPlugin": {GLOBAL: 2},
+    "QA": {USER: 1},
+    "Setu": {USER: 3},
+    "SteamGameSearch": {GROUP: 3},
+    "SuperResolution": {USER: 5},
+    "TianGou": {GLOBAL: 1},
+    "VitsTTS": {USER: 3},
+    "WallpaperPlugin": {GLOBAL: 1},
+}
+
+# config.yaml 中未配置 rate_limit 段时使用的默认值
+DEFAULT_RATE_LIMIT_CONFIG: Dict[str, Any] = {
+    "idle_ttl": 600,   # 对象空闲多久（秒）后回收其限流状态
+    "limits": {},      # 按插件覆盖 DEFAULT_LIMITS，例如 {"Setu": {"user": 5}}
+}
+
+
+@dataclass(frozen=True)
+class Rule:
+    """限流规则：滑动窗口（window 秒内最多 limit 次）或令牌桶（速率 rate，容量 burst）"""
+    limit: int = 1
+    window: float = 0.0
+    rate: float = 0.0
+    burst: float = 1.0
+
+    @classmethod
+    def parse(cls, spec: Union[int, float, Dict[str, Any]]) -> "Rule":
+        if isinstance(spec, (int, float)):
+            return cls(limit=1, window=float(spec))
+        if "rate" in spec:
+            return cls(rate=float(spec["rate"]), burst=float(spec.get("burst", 1)))
+        if "interval" in spec:
+            return cls(limit=1, window=float(spec["interval"]))
+        return cls(limit=int(spec.get("limit", 1)), window=float(spec.get("window", 0)))
+
+    @property
+    def is_bucket(self) -> bool:
+        return self.rate > 0
+
+    @property
+    def min_interval(self) -> float:
+        """平均每次请求的间隔（秒），用于帮助信息展示"""
+        if self.is_bucket:
+            return 1 / self.rate
+        return self.window / max(self.limit, 1)
+
+    @property
+    def horizon(self) -> float:
+        """空闲超过该时间后状态与初始状态一致，可安全回收"""
+        return self.burst / self.rate if self.is_bucket else self.window
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    allowed: bool
+    retry_after: float = 0.0   # 被拒绝时距离下次可请求的秒数
+
+    def __bool__(self) -> bool:
+        return self.allowed
+
+
+class _State:
+    __slots__ = ("rule", "hits", "tokens", "updated", "last_seen")
+
+    def __init__(self, rule: Rule, now: float):
+        self.rule = rule
+        self.hits: deque = deque()
+        self.tokens = rule.burst
+        self.updated = now
+        self.last_seen = now
+
+
+class RateLimiter:
+    """
+    统一限流服务
+
+    - 每个 (插件, 范围, 对象) 一份状态，范围为 user / group / global
+    - 插件通过 hit_all 同时检查所有已配置的范围，配置中新增任意范围的规则无需改动插件
+    - 超限时直接拒绝并返回需要等待的时间，不在处理函数中 sleep
+    - 状态按最近访问顺序存放，空闲超过 idle_ttl 的对象在后续请求中顺带回收
+    - 每个插件范围的放行/拒绝次数可通过 get_stats 导出
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self._config_override = config
+        self._config: Optional[Dict[str, Any]] = None
+        self._rules: Dict[Tuple[str, str], Optional[Rule]] = {}
+        self._states: "OrderedDict[Tuple[str, str, Hashable], _State]" = OrderedDict()
+        self._counters: Dict[Tuple[str, str], Dict[str, int]] = {}
+        self.evicted = 0
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """读取 rate_limit 配置（首次使用时从 config.yaml 加载）"""
+        if self._config is None:
+            user_config = self._config_override
+            if user_config is None:
+                user_config = get_config("rate_limit", {}) or {}
+            self._config = {**DEFAULT_RATE_LIMIT_CONFIG, **user_config}
+            for plugin, limits in (self._config.get("limits") or {}).items():
+                unknown = set(limits or {}) - {USER, GROUP, GLOBAL}
+                if unknown:
+                    _log.warning(f"限流规则 {plugin} 包含未知范围 {sorted(unknown)}，仅支持 user/group/global")
+        return self._config
+
+    def reload_config(self) -> None:
+        """重新读取配置，已有的限流状态按新规则重新计数"""
+        self._config = None
+        self._rules.clear()
+        self._states.clear()
+
+    def get_rule(self, plugin: str, scope: str) -> Optional[Rule]:
+        """获取插件在某个范围上的规则，未配置时返回 None（不限流）"""
+        key = (plugin, scope)
+        if key not in self._rules:
+            limits = {**DEFAULT_LIMITS.get(plugin, {}), **((self.config.get("limits") or {}).get(plugin) or {})}
+            spec = limits.get(scope)
+            try:
+                self._rules[key] = Rule.parse(spec) if spec is not None else None
+            except (TypeError, ValueError, AttributeError) as e:
+                _log.error(f"限流规则 {plugin}.{scope} 配置错误: {e}")
+                self._rules[key] = None
+        return self._rules[key]
+
+    def min_interval(self, plugin: str, scope: str) -> float:
+        """平均请求间隔（秒），未限流时为 0"""
+        rule = self.get_rule(plugin, scope)
+        return rule.min_interval if rule else 0.0
+
+    def hit(self, plugin: str, scope: str, target: Hashable = None) -> RateLimitResult:
+        """
+        记录一次请求并判断是否放行
+
+        Args:
+            plugin: 插件名
+            scope: 限流范围（user / group / global）
+            target: 用户号或群号，global 范围可省略
+
+        Returns:
+            RateLimitResult: 可直接作为布尔值使用，被拒绝时 retry_after 为需要等待的秒数
+        """
+        rule = self.get_rule(plugin, scope)
+        if rule is None:
+            return RateLimitResult(True)
+        now = time.monotonic()
+        state = self._get_state(plugin, scope, target, rule, now)
+        retry_after = self._retry_after(state, now)
+        if retry_after <= 0:
+            self._consume(state, now)
+        self._count(plugin, scope, retry_after <= 0)
+        self._evict_idle(now)
+        return RateLimitResult(retry_after <= 0, max(retry_after, 0.0))
+
+    def hit_all(self, plugin: str, user_id: Hashable = None, group_id: Hashable = None) -> RateLimitResult:
+        """
+        按插件配置的所有范围（user / group / global）记录一次请求并判断是否放行
+
+        只有全部范围都允许时才计数，任一范围超限时其它范围不消耗额度；
+        插件应优先使用该方法，这样 config.yaml 中为任意范围配置的规则都会生效。
+
+        Args:
+            plugin: 插件名
+            user_id: 用户号，为 None 时跳过 user 范围
+            group_id: 群号，为 None 时跳过 group 范围（例如私聊）
+
+        Returns:
+            RateLimitResult: 被拒绝时 retry_after 为各超限范围中最长的等待秒数
+        """
+        now = time.monotonic()
+        checks = []
+        for scope, target in ((USER, user_id), (GROUP, group_id), (GLOBAL, None)):
+            rule = self.get_rule(plugin, scope)
+            if rule is None or (scope != GLOBAL and target is None):
+                continue
+            state = self._get_state(plugin, scope, target, rule, now)
+            checks.append((scope, state, self._retry_after(state, now)))
+        retry_after = max((check[2] for check in checks), default=0.0)
+        for scope, state, scope_retry in checks:
+            if retry_after <= 0:
+                self._consume(state, now)
+                self._count(plugin, scope, True)
+            elif scope_retry > 0:
+                self._count(plugin, scope, False)
+        self._evict_idle(now)
+        return RateLimitResult(retry_after <= 0, max(retry_after, 0.0))
+
+    def _get_state(self, plugin: str, scope: str, target: Hashable, rule: Rule, now: float) -> _State:
+        key = (plugin, scope, target)
+        state = self._states.get(key)
+        if state is None or state.rule is not rule:
+            state = self._states[key] = _State(rule, now)
+        else:
+            self._states.move_to_end(key)
+        state.last_seen = now
+        return state
+
+    @staticmethod
+    def _retry_after(state: _State, now: float) -> float:
+        """补充令牌/清理过期记录，返回距离下次可请求的秒数（可请求时为 0）"""
+        rule = state.rule
+        if rule.is_bucket:
+            state.tokens = min(rule.burst, state.tokens + (now - state.updated) * rule.rate)
+            state.updated = now
+            return 0.0 if state.tokens >= 1 else (1 - state.tokens) / rule.rate
+        hits = state.hits
+        while hits and hits[0] <= now - rule.window:
+            hits.popleft()
+        return 0.0 if len(hits) < rule.limit else hits[0] + rule.window - now
+
+    @staticmethod
+    def _consume(state: _State, now: float) -> None:
+        if state.rule.is_bucket:
+            state.tokens -= 1
+        else:
+            state.hits.append(now)
+
+    def _count(self, plugin: str, scope: str, allowed: bool) -> None:
+        counter = self._counters.get((plugin, scope))
+        if counter is None:
+            counter = self._counters[(plugin, scope)] = {"allowed": 0, "rejected": 0}
+        counter["allowed" if allowed else "rejected"] += 1
+
+    def reset(self, plugin: str, scope: str, target: Hashable = None) -> None:
+        """清除某个对象的限流状态"""
+        self._states.pop((plugin, scope, target), None)
+
+    def _evict_idle(self, now: float) -> None:
+        idle_ttl = float(self.config["idle_ttl"])
+        while self._states:
+            key, state = next(iter(self._states.items()))
+            if now - state.last_seen <= max(idle_ttl, state.rule.horizon):
+                break
+            del self._states[key]
+            self.evicted += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """导出各插件范围的放行/拒绝计数"""
+        return {
+            "tracked_keys": len(self._states),
+            "evicted": self.evicted,
+            "limits": {f"{plugin}.{scope}": dict(counter) for (plugin, scope), counter in self._counters.items()},
+        }
+
+
+# 全局限流器实例
+rate_limiter = RateLimiter()
@@ -0,0 +1,306 @@
+"""
+渲染执行器模块 - 在事件循环之外执行 Pillow 图片渲染
+"""
+import asyncio
+import importlib
+import multiprocessing
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from io import BytesIO
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from ncatbot.utils.logger import get_log
+from utils.config_manager import get_config
+
+_log = get_log()
+
+# config.yaml 中未配置 render 段时使用的默认值
+DEFAULT_RENDER_CONFIG: Dict[str, Any] = {
+    "mode": "process",        # process: 进程池；thread: 线程池
+    "max_workers": 2,         # 渲染进程/线程数量
+    "start_method": "spawn",  # 进程启动方式，spawn 不会继承事件循环和连接
+}
+
+
+class RenderUnavailable(Exception):
+    """渲染函数无法在工作进程中导入"""
+
+
+@dataclass
+class RenderSpec:
+    """
+    一次渲染任务的描述
+
+    func 必须是模块级函数（进程池按 "模块:名称" 在工作进程中重新导入），
+    返回 PIL.Image、bytes 或 BytesIO；args/kwargs 必须可以 pickle。
+    """
+    func: Callable[..., Any]
+    args: Tuple[Any, ...] = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    format: str = "PNG"
+    save_options: Dict[str, Any] = field(default_factory=dict)
+    name: Optional[str] = None
+
+    @property
+    def ref(self) -> str:
+        return f"{self.func.__module__}:{self.func.__qualname__}"
+
+    @property
+    def label(self) -> str:
+        return self.name or self.func.__qualname__
+
+
+def _encode(result: Any, fmt: str, save_options: Dict[str, Any]) -> bytes:
+    """把渲染结果编码为图片字节"""
+    if isinstance(result, (bytes, bytearray)):
+        return bytes(result)
+    if isinstance(result, BytesIO):
+        return result.getvalue()
+    image = result
+    if fmt.upper() in ("JPEG", "JPG") and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    buffer = BytesIO()
+    image.save(buffer, format=fmt, **save_options)
+    return buffer.getvalue()
+
+
+_resolved: Dict[str, Callable[..., Any]] = {}
+
+
+def _resolve(ref: str) -> Callable[..., Any]:
+    func = _resolved.get(ref)
+    if func is None:
+        module_name, qualname = ref.split(":", 1)
+        obj: Any = importlib.import_module(module_name)
+        for part in qualname.split("."):
+            obj = getattr(obj, part)
+        func = _resolved[ref] = obj
+    return func
+
+
+def _render_in_process(
+    ref: str, args: Tuple[Any, ...], kwargs: Dict[str, Any], fmt: str, save_options: Dict[str, Any]
+) -> Tuple[bytes, float]:
+    """工作进程入口：导入渲染函数、执行并编码"""
+    start = time.perf_counter()
+    try:
+        func = _resolve(ref)
+    except Exception as e:
+        raise RenderUnavailable(f"{ref}: {e}") from None
+    data = _encode(func(*args, **kwargs), fmt, save_options)
+    return data, time.perf_counter() - start
+
+
+def _render_in_thread(spec: RenderSpec) -> Tuple[bytes, float]:
+    """线程池入口：直接调用渲染函数"""
+    start = time.perf_counter()
+    data = _encode(spec.func(*spec.args, **spec.kwargs), spec.format, spec.save_options)
+    return data, time.perf_counter() - start
+
+
+class RenderExecutor:
+    """
+    共享渲染执行器
+
+    - 默认使用进程池，CPU 密集的缩放、模糊、合成不再占用事件循环和 GIL
+    - 进程池不可用、渲染函数无法按名称导入或参数无法 pickle 时退回线程池
+    - 记录排队深度、排队等待时间和渲染耗时
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self._config_override = config
+        self._config: Optional[Dict[str, Any]] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_disabled = False
+        self._thread_only: Set[str] = set()
+        self._in_flight = 0
+        self.stats: Dict[str, Any] = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "process_renders": 0,
+            "thread_renders": 0,
+            "fallbacks": 0,
+            "max_queue_depth": 0,
+            "render_time": 0.0,
+            "wait_time": 0.0,
+            "max_render_time": 0.0,
+        }
+        self._per_task: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def config(self) -> Dict[str, Any]:
+        """读取 render 配置（首次使用时从 config.yaml 加载）"""
+        if self._config is None:
+            user_config = self._config_override
+            if user_config is None:
+                user_config = get_config("render", {}) or {}
+            self._config = {**DEFAULT_RENDER_CONFIG, **user_config}
+        return self._config
+
+    @property
+    def max_workers(self) -> int:
+        return max(1, int(self.config["max_workers"] or os.cpu_count() or 1))
+
+    def _get_process_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self._process_disabled or self.config["mode"] != "process":
+            return None
+        if self._process_pool is None:
+            try:
+                context = multiprocessing.get_context(self.config["start_method"])
+                self._process_pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=context)
+                _log.info(f"渲染进程池已创建: {self.max_workers} 个进程 ({self.config['start_method']})")
+            except Exception as e:
+                _log.warning(f"无法创建渲染进程池，改用线程池: {e}")
+                self._process_disabled = True
+                return None
+        return self._process_pool
+
+    def _get_thread_pool(self) -> ThreadPoolExecutor:
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="render")
+        return self._thread_pool
+
+    def _can_use_process(self, spec: RenderSpec) -> bool:
+        qualname = getattr(spec.func, "__qualname__", "")
+        return "<" not in qualname and spec.ref not in self._thread_only
+
+    async def render(self, spec: RenderSpec) -> bytes:
+        """
+        执行渲染任务
+
+        Args:
+            spec: 渲染任务
+
+        Returns:
+            bytes: 编码后的图片数据
+        """
+        loop = asyncio.get_running_loop()
+        self.stats["submitted"] += 1
+        self._in_flight += 1
+        queue_depth = max(0, self._in_flight - self.max_workers)
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], queue_depth)
+        start = time.perf_counter()
+        had_error = False
+        render_time = 0.0
+        try:
+            data, render_time = await self._submit(loop, spec)
+            self.stats["completed"] += 1
+            return data
+        except Exception:
+            had_error = True
+            self.stats["failed"] += 1
+            raise
+        finally:
+            self._in_flight -= 1
+            self._record(spec.label, time.perf_counter() - start, render_time, had_error)
+
+    async def _submit(self, loop: asyncio.AbstractEventLoop, spec: RenderSpec) -> Tuple[bytes, float]:
+        pool = self._get_process_pool() if self._can_use_process(spec) else None
+        if pool is not None:
+            try:
+                result = await loop.run_in_executor(
+                    pool, _render_in_process, spec.ref, spec.args, spec.kwargs, spec.format, spec.save_options
+                )
+                self.stats["process_renders"] += 1
+                return result
+            except RenderUnavailable as e:
+                _log.warning(f"渲染函数无法在进程中执行，改用线程池: {e}")
+                self._thread_only.add(spec.ref)
+            except BrokenProcessPool as e:
+                _log.error(f"渲染进程池已损坏，改用线程池: {e}")
+                self._discard_process_pool()
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                # 参数无法 pickle 时会以这几类异常返回，其余同类异常来自渲染函数本身
+                if not isinstance(e, pickle.PicklingError) and "pickle" not in str(e).lower():
+                    raise
+                _log.warning(f"渲染参数无法序列化，改用线程池: {spec.label}: {e}")
+                self._thread_only.add(spec.ref)
+            self.stats["fallbacks"] += 1
+
+        result = await loop.run_in_executor(self._get_thread_pool(), _render_in_thread, spec)
+        self.stats["thread_renders"] += 1
+        return result
+
+    def _discard_process_pool(self) -> None:
+        pool, self._process_pool = self._process_pool, None
+        self._process_disabled = True
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def _record(self, label: str, total_time: float, render_time: float, had_error: bool) -> None:
+        self.stats["render_time"] += render_time
+        self.stats["wait_time"] += max(0.0, total_time - render_time)
+        self.stats["max_render_time"] = max(self.stats["max_render_time"], render_time)
+        task = self._per_task.setdefault(label, {"count": 0, "errors": 0, "render_time": 0.0, "total_time": 0.0})
+        task["count"] += 1
+        task["errors"] += int(had_error)
+        task["render_time"] += render_time
+        task["total_time"] += total_time
+        try:
+            from utils.performance_monitor import global_monitor
+            global_monitor.record_function_call(f"render:{label}", total_time, had_error)
+        except Exception:
+            pass
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取渲染统计信息"""
+        stats: Dict[str, Any] = dict(self.stats)
+        finished = stats["completed"] + stats["failed"]
+        stats.update({
+            "mode": "thread" if self._process_disabled or self.config["mode"] != "process" else "process",
+            "workers": self.max_workers,
+            "in_flight": self._in_flight,
+            "queue_depth": max(0, self._in_flight - self.max_workers),
+            "avg_render_ms": stats["render_time"] / finished * 1000 if finished else 0.0,
+            "avg_wait_ms": stats["wait_time"] / finished * 1000 if finished else 0.0,
+            "thread_only": sorted(self._thread_only),
+            "tasks": {
+                label: {
+                    "count": t["count"],
+                    "errors": t["errors"],
+                    "avg_render_ms": t["render_time"] / t["count"] * 1000,
+                    "avg_total_ms": t["total_time"] / t["count"] * 1000,
+                }
+                for label, t in self._per_task.items()
+            },
+        })
+        return stats
+
+    def start(self) -> None:
+        """随机器人启动：读取配置并预先创建进程池"""
+        self._config = None
+        self._process_disabled = False
+        self._get_process_pool()
+
+    def shutdown(self) -> None:
+        """关闭进程池和线程池"""
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        _log.info("渲染执行器已关闭")
+
+
+# 全局渲染执行器实例
+render_executor = RenderExecutor()
+
+
+async def render_image(
+    func: Callable[..., Any],
+    *args: Any,
+    format: str = "PNG",
+    save_options: Optional[Dict[str, Any]] = None,
+    name: Optional[str] = None,
+    **kwargs: Any,
+) -> bytes:
+    """在共享渲染执行器中执行 func(*args, **kwargs) 并返回编码后的图片字节"""
+    spec = RenderSpec(func, args, kwargs, format, save_options or {}, name)
+    return await render_executor.render(spec)
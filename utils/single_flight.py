@@ -0,0 +1,114 @@
+"""
+请求合并模块 - 相同请求并发时只执行一次（single-flight）
+"""
+import asyncio
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+from ncatbot.utils.logger import get_log
+
+_log = get_log()
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    按请求标识合并并发调用
+
+    同一个 key 已有请求在进行时，后来的调用者直接等待同一个结果，不再发起新的上游请求；
+    请求结束后立即移除，之后的调用会重新执行（结果缓存仍由各插件自己负责）。
+
+    - 上游请求在独立任务中执行，某个调用者被取消不会影响其他等待者
+    - 所有等待者拿到的是同一个结果对象，调用方不应原地修改
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self.stats = {"calls": 0, "executions": 0, "deduplicated": 0, "errors": 0}
+
+    async def do(self, key: Hashable, func: Callable[..., Awaitable[T]], *args, **kwargs) -> T:
+        """
+        执行 func(*args, **kwargs)，相同 key 的并发调用共享一次执行
+
+        Args:
+            key: 请求标识
+            func: 异步函数
+
+        Returns:
+            func 的返回值（异常同样会传给所有等待者）
+        """
+        self.stats["calls"] += 1
+        task = self._calls.get(key)
+        if task is None:
+            self.stats["executions"] += 1
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._calls[key] = task
+            task.add_done_callback(lambda t, k=key: self._finish(k, t))
+        else:
+            self.stats["deduplicated"] += 1
+            _log.debug(f"{self.name} 合并重复请求: {key}")
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        if not task.cancelled() and task.exception() is not None:
+            self.stats["errors"] += 1
+
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "in_flight": len(self._calls)}
+
+
+_groups: Dict[str, SingleFlight] = {}
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """获取（必要时创建）指定名称的合并组"""
+    group = _groups.get(name)
+    if group is None:
+        group = _groups[name] = SingleFlight(name)
+    return group
+
+
+def get_single_flight_stats() -> Dict[str, Dict[str, Any]]:
+    """获取所有合并组的统计信息"""
+    return {name: group.get_stats() for name, group in _groups.items()}
+
+
+def _default_key(args: tuple, kwargs: Dict[str, Any]) -> Hashable:
+    key = (args, tuple(sorted(kwargs.items())))
+    try:
+        hash(key)
+    except TypeError:
+        key = repr(key)
+    return key
+
+
+def single_flight(name: Optional[str] = None, key: Optional[Callable[..., Hashable]] = None):
+    """
+    请求合并装饰器
+
+    Args:
+        name: 合并组名称（用于统计），默认为函数的限定名
+        key: 根据调用参数计算请求标识的函数，默认使用全部参数
+
+    Example:
+        @single_flight("hot_search", key=lambda self, platform_id: platform_id)
+        async def fetch_hot_search_data(self, platform_id): ...
+    """
+    def decorator(func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        group = get_single_flight(name or func.__qualname__)
+
+        @wraps(func)
+        async def wrapper(*args, **kwargs) -> T:
+            request_key = key(*args, **kwargs) if key else _default_key(args, kwargs)
+            return await group.do(request_key, func, *args, **kwargs)
+
+        wrapper.single_flight = group
+        return wrapper
+    return decorator
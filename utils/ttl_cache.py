@@ -0,0 +1,225 @@
+"""
+内存缓存模块 - 带过期时间、条目数/字节数上限的 LRU 缓存，供各插件共用
+"""
+import asyncio
+import heapq
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+from ncatbot.utils.logger import get_log
+from utils.single_flight import get_single_flight
+
+_log = get_log()
+
+_MISSING = object()
+
+
+def estimate_size(value: Any, _depth: int = 0) -> int:
+    """粗略估算对象占用的字节数（用于字节上限，不追求精确）"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return len(value)
+    if isinstance(value, str):
+        return len(value.encode("utf-8", "ignore"))
+    size = sys.getsizeof(value, 64)
+    if _depth >= 3:
+        return size
+    if isinstance(value, dict):
+        size += sum(estimate_size(k, _depth + 1) + estimate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, _depth + 1) for item in value)
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size", "seq")
+
+    def __init__(self, value: Any, expires_at: float, size: int, seq: int):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.seq = seq
+
+
+class TTLCache:
+    """
+    带过期时间的 LRU 缓存
+
+    - get/set 均为 O(1)（过期清理为均摊 O(log n)），不会在每次写入时遍历整个缓存
+    - 过期时间记录在最小堆中，写入时顺带弹出已过期的条目
+    - 超出 maxsize 或 max_bytes 时按最近最少使用淘汰
+    - stale_ttl > 0 时，get_or_load 在条目过期后的 stale_ttl 秒内先返回旧值，并在后台刷新
+    - 创建时按名称登记，命中/未命中/淘汰统计会出现在性能报告中
+    """
+
+    def __init__(self, name: str, maxsize: int = 256, ttl: float = 300, max_bytes: int = 0,
+                 stale_ttl: float = 0, sizeof: Optional[Callable[[Any], int]] = None):
+        """
+        Args:
+            name: 缓存名称（用于统计，通常为插件名）
+            maxsize: 最多条目数
+            ttl: 默认过期时间（秒）
+            max_bytes: 字节数上限，0 表示不限制
+            stale_ttl: 过期后仍可返回旧值并后台刷新的时间（秒），0 表示不启用
+            sizeof: 计算条目字节数的函数，默认 estimate_size
+        """
+        self.name = name
+        self.maxsize = max(1, int(maxsize))
+        self.ttl = float(ttl)
+        self.max_bytes = int(max_bytes)
+        self.stale_ttl = float(stale_ttl)
+        self._sizeof = sizeof or estimate_size
+        self._data: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._heap: List[Tuple[float, int, Hashable]] = []
+        self._seq = 0
+        self._bytes = 0
+        self._flight = get_single_flight(f"cache:{name}")
+        self.stats = {
+            "hits": 0, "misses": 0, "stale_hits": 0,
+            "sets": 0, "evictions": 0, "expirations": 0, "load_errors": 0,
+        }
+        _caches[name] = self
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        entry = self._data.get(key)
+        return entry is not None and entry.expires_at > time.monotonic()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """获取未过期的值，不存在或已过期时返回 default"""
+        entry = self._data.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return default
+        if entry.expires_at <= time.monotonic():
+            if not self.stale_ttl:
+                self._remove(key)
+                self.stats["expirations"] += 1
+            self.stats["misses"] += 1
+            return default
+        self._data.move_to_end(key)
+        self.stats["hits"] += 1
+        return entry.value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """写入缓存，ttl 为空时使用默认过期时间"""
+        now = time.monotonic()
+        expires_at = now + (self.ttl if ttl is None else float(ttl))
+        size = self._sizeof(value) if self.max_bytes else 0
+        if key in self._data:
+            self._remove(key)
+        self._seq += 1
+        self._data[key] = _Entry(value, expires_at, size, self._seq)
+        self._bytes += size
+        heapq.heappush(self._heap, (expires_at + self.stale_ttl, self._seq, key))
+        self.stats["sets"] += 1
+        self._purge_expired(now)
+        self._enforce_bounds()
+
+    def delete(self, key: Hashable) -> bool:
+        """删除条目，返回是否存在"""
+        if key not in self._data:
+            return False
+        self._remove(key)
+        return True
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """删除键满足条件的所有条目，返回删除数量"""
+        keys = [key for key in self._data if predicate(key)]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._heap.clear()
+        self._bytes = 0
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                          ttl: Optional[float] = None) -> Any:
+        """
+        读取缓存，未命中时调用 loader 加载并写入
+
+        同一个 key 的并发加载只执行一次；loader 返回 None 时不缓存（视为加载失败）。
+        启用 stale_ttl 时，刚过期的条目直接返回旧值，同时在后台刷新。
+        """
+        entry = self._data.get(key)
+        if entry is not None:
+            now = time.monotonic()
+            if entry.expires_at > now:
+                self._data.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry.value
+            if self.stale_ttl and entry.expires_at + self.stale_ttl > now:
+                self._data.move_to_end(key)
+                self.stats["stale_hits"] += 1
+                asyncio.ensure_future(self._refresh(key, loader, ttl))
+                return entry.value
+        self.stats["misses"] += 1
+        return await self._flight.do(key, self._load, key, loader, ttl)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float]) -> Any:
+        try:
+            value = await loader()
+        except Exception:
+            self.stats["load_errors"] += 1
+            raise
+        if value is not None:
+            self.set(key, value, ttl)
+        return value
+
+    async def _refresh(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float]) -> None:
+        try:
+            await self._flight.do(key, self._load, key, loader, ttl)
+        except Exception as e:
+            _log.warning(f"缓存 {self.name} 后台刷新 {key} 失败: {e}")
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._data.pop(key)
+        self._bytes -= entry.size
+
+    def _purge_expired(self, now: float) -> None:
+        heap = self._heap
+        while heap and heap[0][0] <= now:
+            _, seq, key = heapq.heappop(heap)
+            entry = self._data.get(key)
+            if entry is not None and entry.seq == seq:
+                self._remove(key)
+                self.stats["expirations"] += 1
+        # 覆盖写入和淘汰会在堆中留下失效记录，过多时重建
+        if len(heap) > 2 * len(self._data) + 64:
+            self._heap = [(e.expires_at + self.stale_ttl, e.seq, k) for k, e in self._data.items()]
+            heapq.heapify(self._heap)
+
+    def _enforce_bounds(self) -> None:
+        while self._data and (len(self._data) > self.maxsize or
+                              (self.max_bytes and self._bytes > self.max_bytes)):
+            key = next(iter(self._data))
+            self._remove(key)
+            self.stats["evictions"] += 1
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["stale_hits"] + self.stats["misses"]
+        return (self.stats["hits"] + self.stats["stale_hits"]) / lookups if lookups else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hit_rate": self.hit_rate,
+        }
+
+
+_caches: Dict[str, TTLCache] = {}
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """获取所有已登记缓存的统计信息"""
+    return {name: cache.get_stats() for name, cache in _caches.items()}